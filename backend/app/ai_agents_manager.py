@@ -1,47 +1,157 @@
-from typing import List, Dict, Any, Optional
-from google.cloud.aiplatform_v1beta1.types import (
-    Content,
-)  # Specific to Vertex AI history
+import asyncio
+import json
+import threading
+import time
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
 
-# Import specific agent implementations
-from .vertex_agent import VertexAIAgent
+if TYPE_CHECKING:
+    from google.cloud.aiplatform_v1beta1.types import (
+        Content,
+    )  # Specific to Vertex AI history
+
+# Agent implementations are imported when the manager is created: the Vertex AI
+# SDK takes seconds to import and should not slow down importing the app.
+from .circuit_breaker import CircuitBreaker
+from .coalescing import SingleFlight, normalize_prompt
+from .faults import wrap_agent
+from .shadow import get_shadow_traffic
+from . import metrics
+from . import turn_trace
 # from .openai_agent import OpenAIAgent # Future placeholder
 # from .anthropic_agent import AnthropicAgent # Future placeholder
 
 # Import configuration
-from backend.app import config as app_config
+from backend.app.settings import app_config, get_setting
+
+
+def create_agent(provider_name: str, model_name: Optional[str] = None, transport: Any = None) -> Any:
+    """
+    A new agent for `provider_name`, using `model_name` instead of the configured
+    model if given. `transport` replaces the Vertex AI transport selected by
+    LLM_FIXTURE_MODE.
+    """
+    if provider_name == "VERTEX_AI":
+        from .vertex_agent import VertexAIAgent
+
+        agent = VertexAIAgent(model_name or app_config.MODEL_NAME, transport=transport)
+        if not agent.model:
+            print(
+                f"CRITICAL: Failed to initialize {provider_name} agent model. AI functionalities will be impacted."
+            )
+        return agent
+    if provider_name == "FAKE":
+        # Offline scripted agent for benchmarks and tests (no credentials needed)
+        from .fake_agent import FakeLLMAgent
+
+        agent = FakeLLMAgent()
+        if model_name:
+            agent.model_name = model_name
+        return agent
+    # if provider_name == "OPENAI":
+    #     agent = OpenAIAgent() # Assuming OpenAIAgent is defined elsewhere
+    #     if not agent.is_ready(): # Example check
+    #          print(f"CRITICAL: Failed to initialize {provider_name} agent.")
+    #     return agent
+    # if provider_name == "ANTHROPIC":
+    #     agent = AnthropicAgent()
+    #     if not agent.is_ready():
+    #          print(f"CRITICAL: Failed to initialize {provider_name} agent.")
+    #     return agent
+    print(
+        f"CRITICAL: Unsupported LLM provider configured: {provider_name}. AI functionalities will not work."
+    )
+    raise ValueError(f"Unsupported LLM provider: {provider_name}")
 
 
 class AIAgentsManager:
     def __init__(self):
         self.active_agent = None
-        self.provider_name = app_config.ACTIVE_LLM_PROVIDER  # Use from config
+        self.provider_name = get_setting(
+            "ACTIVE_LLM_PROVIDER", app_config.ACTIVE_LLM_PROVIDER
+        )  # Use from config, overridable via environment
 
-        if self.provider_name == "VERTEX_AI":
-            self.active_agent = VertexAIAgent()
-            if not self.active_agent.model:
-                print(
-                    f"CRITICAL: Failed to initialize {self.provider_name} agent model. AI functionalities will be impacted."
-                )
-        # elif self.provider_name == "OPENAI":
-        #     self.active_agent = OpenAIAgent() # Assuming OpenAIAgent is defined elsewhere
-        #     if not self.active_agent.is_ready(): # Example check
-        #          print(f"CRITICAL: Failed to initialize {self.provider_name} agent.")
-        # elif self.provider_name == "ANTHROPIC":
-        #     self.active_agent = AnthropicAgent()
-        #     if not self.active_agent.is_ready():
-        #          print(f"CRITICAL: Failed to initialize {self.provider_name} agent.")
-        else:
-            print(
-                f"CRITICAL: Unsupported LLM provider configured: {self.provider_name}. AI functionalities will not work."
-            )
-            raise ValueError(f"Unsupported LLM provider: {self.provider_name}")
+        self.active_agent = create_agent(self.provider_name)
+        # Injected latency and failures for resilience tests (FAULT_INJECTION)
+        self.active_agent = wrap_agent(self.active_agent)
+        # Sampled calls mirrored to a candidate model (SHADOW_SAMPLE_RATE)
+        self.shadow = get_shadow_traffic()
+
+        # Single-flight deduplication of identical first-turn prompts
+        self.coalescing_enabled = get_setting("COALESCE_IDENTICAL_PROMPTS", True)
+        self.single_flight = SingleFlight(
+            wait_window_s=get_setting("COALESCE_WAIT_SECONDS", 15.0)
+        )
+        self.coalescing_skipped_stateful = 0
+        metrics.register("coalescing", self.coalescing_stats)
+
+        # Bounded LLM calls and a circuit breaker, so callers can switch to the
+        # degraded (retrieval-only) path while the provider is failing or slow.
+        self.llm_timeout_s = get_setting("LLM_TIMEOUT_SECONDS", 20.0)
+        self.circuit_breaker = CircuitBreaker(
+            window_size=get_setting("CIRCUIT_WINDOW_SIZE", 20),
+            min_calls=get_setting("CIRCUIT_MIN_CALLS", 5),
+            error_rate_threshold=get_setting("CIRCUIT_ERROR_RATE_THRESHOLD", 0.5),
+            p95_latency_ms_threshold=get_setting("CIRCUIT_P95_LATENCY_MS", 15000.0),
+            open_seconds=get_setting("CIRCUIT_OPEN_SECONDS", 30.0),
+        )
+        metrics.register("circuit_breaker", self.circuit_breaker.stats)
 
         if self.active_agent:
             print(
                 f"AIAgentsManager initialized with active provider: {self.provider_name}"
             )
 
+    def readiness_error(self) -> Optional[str]:
+        """None when the active agent can serve requests, otherwise the reason it cannot."""
+        if not self.active_agent:
+            return f"No active LLM agent ({self.provider_name})."
+        if not self.active_agent.is_ready():
+            return (
+                self.active_agent.init_error
+                or f"{self.provider_name} agent model is not initialized."
+            )
+        return None
+
+    def coalescing_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.coalescing_enabled,
+            "skipped_stateful_requests": self.coalescing_skipped_stateful,
+            **self.single_flight.stats(),
+        }
+
+    def _coalescing_key(
+        self,
+        chat_history: List[Any],
+        user_message: str,
+        has_attachments: bool,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        """
+        Key for sharing an in-flight LLM call, or None when the request must not be coalesced.
+        Only stateless requests qualify: empty history, text only. Any turn with
+        history (including tool follow-ups) depends on per-user state and always
+        gets its own call.
+        """
+        if not self.coalescing_enabled:
+            return None
+        if chat_history or has_attachments or not user_message:
+            if chat_history:
+                self.coalescing_skipped_stateful += 1
+            return None
+        model_name = model_name or getattr(self.active_agent, "model_name", "")
+        return "|".join(
+            [
+                self.provider_name,
+                model_name,
+                ",".join(getattr(self.active_agent, "tool_names", [])),
+                system_instruction or "",
+                json.dumps(generation_config or {}, sort_keys=True),
+                normalize_prompt(user_message),
+            ]
+        )
+
     async def get_agent_response(
         self,
         chat_history: List[Any],
@@ -50,6 +160,9 @@ class AIAgentsManager:
         image_mime_type: Optional[str] = None,
         audio_base64: Optional[str] = None,
         audio_mime_type: Optional[str] = None,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Gets a response from the currently active LLM agent, potentially with multimodal input.
@@ -58,31 +171,137 @@ class AIAgentsManager:
         Args:
             chat_history: The conversation history. The format might need to be adapted
                           by the specific agent implementation if they differ significantly.
-                          For Vertex AI, this is List[Content].
+                          For Vertex AI, this is List[Message] (see messages.py).
             user_message: The current user's message.
+            model_name: Another model of the active provider to use for this call
+                        (e.g. a cheaper one when the user is over budget).
+            system_instruction: System instruction for this call (see prompts.py).
+            generation_config: Generation settings for this call, e.g.
+                               {"temperature": 0.2, "max_output_tokens": 256}.
 
         Returns:
             A dictionary containing either a "text" response or a "function_call",
-            or an "error" key if something went wrong.
+            or an "error" key if something went wrong. Errors caused by the provider
+            (agent errors flagged "provider_error", timeouts, open circuit) also
+            carry "llm_unavailable": True; other errors (e.g. an empty message) do not.
+            Responses may carry token "usage" (prompt/completion/total tokens).
         """
+        started = time.perf_counter()
+        response = await self._get_agent_response(
+            chat_history,
+            user_message,
+            image_base64,
+            image_mime_type,
+            audio_base64,
+            audio_mime_type,
+            model_name,
+            system_instruction,
+            generation_config,
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        # Recorded per caller, so coalesced requests each see the shared call
+        # (without its usage, which only the leader's response carries).
+        turn_trace.record_llm_call(latency_ms, response)
+        if self.shadow is not None and not response.get("coalesced"):
+            self.shadow.mirror(
+                {
+                    "chat_history": chat_history,
+                    "user_message": user_message,
+                    "image_base64": image_base64,
+                    "image_mime_type": image_mime_type,
+                    "audio_base64": audio_base64,
+                    "audio_mime_type": audio_mime_type,
+                    "system_instruction": system_instruction,
+                    "generation_config": generation_config,
+                },
+                response,
+                self.provider_name,
+                model_name or getattr(self.active_agent, "model_name", ""),
+                latency_ms,
+            )
+        return response
+
+    async def _get_agent_response(
+        self,
+        chat_history: List[Any],
+        user_message: str,
+        image_base64: Optional[str],
+        image_mime_type: Optional[str],
+        audio_base64: Optional[str],
+        audio_mime_type: Optional[str],
+        model_name: Optional[str],
+        system_instruction: Optional[str],
+        generation_config: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
         if not self.active_agent:
             return {
-                "error": f"No active LLM agent configured or agent failed to initialize ({self.provider_name})."
+                "error": f"No active LLM agent configured or agent failed to initialize ({self.provider_name}).",
+                "llm_unavailable": True,
+            }
+        if not self.circuit_breaker.allow():
+            return {
+                "error": f"The {self.provider_name} agent is temporarily unavailable.",
+                "llm_unavailable": True,
             }
 
         try:
-            if self.provider_name == "VERTEX_AI":
-                # VertexAIAgent.get_gemini_response expects List[Content] for history
+            if self.provider_name in ("VERTEX_AI", "FAKE"):
+                # VertexAIAgent.get_gemini_response expects List[Message] for history
                 # Ensure chat_history is in the correct format or adapt it here if necessary.
                 # main.py should provide chat_history in the correct format for the current AI.
-                return await self.active_agent.get_gemini_response(
-                    chat_history=chat_history,  # type: ignore
-                    user_message=user_message,
-                    image_base64=image_base64,
-                    image_mime_type=image_mime_type,
-                    audio_base64=audio_base64,
-                    audio_mime_type=audio_mime_type,
+                async def call_agent() -> Dict[str, Any]:
+                    started = time.perf_counter()
+                    succeeded: Optional[bool] = None  # Outcome for the circuit breaker
+                    try:
+                        response = await asyncio.wait_for(
+                            self.active_agent.get_gemini_response(
+                                chat_history=chat_history,  # type: ignore
+                                user_message=user_message,
+                                image_base64=image_base64,
+                                image_mime_type=image_mime_type,
+                                audio_base64=audio_base64,
+                                audio_mime_type=audio_mime_type,
+                                **({"model_name": model_name} if model_name else {}),
+                                **({"system_instruction": system_instruction} if system_instruction else {}),
+                                **({"generation_config": generation_config} if generation_config else {}),
+                            ),
+                            timeout=self.llm_timeout_s,
+                        )
+                        # Only provider and transport errors count as failures.
+                        if "error" not in response:
+                            succeeded = True
+                        elif response.get("provider_error"):
+                            succeeded = False
+                            response = dict(response, llm_unavailable=True)
+                    except asyncio.TimeoutError:
+                        succeeded = False
+                        return {
+                            "error": f"The AI agent did not respond within {self.llm_timeout_s:g}s.",
+                            "llm_unavailable": True,
+                        }
+                    except Exception:
+                        succeeded = False
+                        raise
+                    finally:
+                        if succeeded is None:
+                            # Cancelled, or a local error (empty message, missing fixture):
+                            # says nothing about the provider but must free a half-open probe.
+                            self.circuit_breaker.release_probe()
+                        else:
+                            self.circuit_breaker.record(succeeded, (time.perf_counter() - started) * 1000)
+                    return response
+
+                coalescing_key = self._coalescing_key(
+                    chat_history,
+                    user_message,
+                    bool(image_base64 or audio_base64),
+                    model_name,
+                    system_instruction,
+                    generation_config,
                 )
+                if coalescing_key is None:
+                    return await call_agent()
+                return await self.single_flight.run(coalescing_key, call_agent)
             # elif self.provider_name == "OPENAI":
             #     # Adapt chat_history format if needed for OpenAI
             #     return await self.active_agent.get_openai_response(chat_history, user_message)
@@ -99,17 +318,30 @@ class AIAgentsManager:
                 f"Error during LLM interaction via AIAgentsManager ({self.provider_name}): {e}"
             )
             return {
-                "error": f"An unexpected error occurred with the AI agent: {str(e)}"
+                "error": f"An unexpected error occurred with the AI agent: {str(e)}",
+                "llm_unavailable": True,
             }
 
 
-# Global instance of the manager
-# The application will import and use this instance.
-ai_manager = AIAgentsManager()
+# One manager per worker process, created on first use (or by the FastAPI
+# lifespan in main.py) rather than at import time.
+_ai_manager: Optional[AIAgentsManager] = None
+_ai_manager_lock = threading.Lock()  # Warm-up may create it from a worker thread
+
+
+def get_ai_manager() -> AIAgentsManager:
+    """Returns this process's AIAgentsManager, creating it on first use."""
+    global _ai_manager
+    with _ai_manager_lock:
+        if _ai_manager is None:
+            _ai_manager = AIAgentsManager()
+    return _ai_manager
+
 
 if __name__ == "__main__":
     # Example of how this manager might be tested (basic)
     async def test_manager():
+        ai_manager = get_ai_manager()
         print(f"Testing AIAgentsManager with provider: {ai_manager.provider_name}")
         if not ai_manager.active_agent:
             print("No active agent to test.")
@@ -0,0 +1,372 @@
+"""
+Conversation analytics: one record per `/chat` turn in append-only files.
+
+The exporter buffers turn records in memory (bounded; records are dropped and
+counted when the buffer is full) and a background task writes them in batches
+to JSONL files in ANALYTICS_DIR, off the request path. Each worker writes its
+own files, rotated by size and age; rotated files are compacted to Parquet
+when `pyarrow` is installed. User ids are stored as salted hashes.
+
+Query the files from the project root:
+    python -m backend.app.analytics report --dir analytics
+    python -m backend.app.analytics compact --dir analytics
+"""
+
+import argparse
+import asyncio
+import glob
+import hashlib
+import math
+import os
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from typing import Iterator, List, Dict, Any, Optional
+
+from backend.app import metrics
+from backend.app.http_io import dumps, loads
+from backend.app.settings import get_setting
+
+try:
+    import pyarrow  # Optional dependency: Parquet compaction of rotated files
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+FILE_PREFIX = "turns-"
+
+
+def hash_user_id(user_id: str, salt: str) -> str:
+    """Pseudonymous user key: turns of a user can be grouped, the id is not stored."""
+    return hashlib.sha256(f"{salt}:{user_id}".encode("utf-8")).hexdigest()[:16]
+
+
+def tool_succeeded(result: Dict[str, Any]) -> bool:
+    """False for the failure shapes tools return: "error", status "error" or success False."""
+    return "error" not in result and result.get("status") != "error" and result.get("success") is not False
+
+
+class AnalyticsExporter:
+    """
+    Batched, asynchronous writer of turn records. `record` only appends to the
+    buffer; the task started by `start` writes a batch every `flush_interval_s`
+    (or as soon as `batch_size` records are waiting) in a worker thread. The
+    current file is replaced by a new one once it reaches `rotate_bytes` or
+    `rotate_seconds`; the previous one is then compacted if `compact` is set.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        buffer_size: int = 10000,
+        batch_size: int = 500,
+        flush_interval_s: float = 1.0,
+        rotate_bytes: int = 64 * 1024 * 1024,
+        rotate_seconds: float = 3600.0,
+        compact: bool = True,
+        user_salt: str = "",
+    ):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.compact = compact and pyarrow is not None
+        self.user_salt = user_salt
+        self._buffer: deque = deque()
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._path: Optional[str] = None
+        self._opened_at = 0.0
+        self._sequence = 0
+        self.records_buffered = 0
+        self.records_dropped = 0
+        self.records_written = 0
+        self.batches_written = 0
+        self.files_rotated = 0
+        self.files_compacted = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        """Starts the background writer (must be called from the event loop)."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._batch_ready = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._run())
+
+    def record(self, turn: Dict[str, Any]) -> None:
+        """Queues a turn record; `user_id` is replaced by its hash."""
+        if len(self._buffer) >= self.buffer_size:
+            self.records_dropped += 1
+            return
+        if "user_id" in turn:
+            turn = dict(turn)
+            turn["user"] = hash_user_id(str(turn.pop("user_id")), self.user_salt)
+        self._buffer.append(turn)
+        self.records_buffered += 1
+        if len(self._buffer) >= self.batch_size and self._batch_ready is not None:
+            self._batch_ready.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+            if self._closing:
+                return
+
+    async def flush(self) -> None:
+        """Writes all buffered records."""
+        async with self._flush_lock:
+            while self._buffer:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                data = b"".join(dumps(turn) + b"\n" for turn in batch)
+                try:
+                    await asyncio.to_thread(self._write, data)
+                except OSError as e:
+                    self.write_errors += 1
+                    print(f"Analytics: dropped a batch of {len(batch)} records: {e}")
+                    continue
+                self.records_written += len(batch)
+                self.batches_written += 1
+
+    def _new_path(self) -> str:
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        return os.path.join(self.directory, f"{FILE_PREFIX}{stamp}-{os.getpid()}-{self._sequence}.jsonl")
+
+    def _write(self, data: bytes) -> None:
+        if self._path is not None and (
+            time.monotonic() - self._opened_at >= self.rotate_seconds
+            or not os.path.exists(self._path)
+            or os.path.getsize(self._path) >= self.rotate_bytes
+        ):
+            self._rotate()
+        if self._path is None:
+            self._path = self._new_path()
+            self._opened_at = time.monotonic()
+        # Opened per batch, so rotated files are never held open.
+        with open(self._path, "ab") as f:
+            f.write(data)
+
+    def _rotate(self) -> None:
+        previous, self._path = self._path, None
+        self.files_rotated += 1
+        if self.compact and previous and os.path.exists(previous):
+            try:
+                compact_file(previous)
+                self.files_compacted += 1
+            except Exception as e:  # The JSONL file stays; `compact` can retry it
+                self.write_errors += 1
+                print(f"Analytics: compacting {previous} failed: {e}")
+
+    async def close(self) -> None:
+        """Stops the writer after writing the remaining records, and rotates the current file."""
+        if self._task is not None:
+            self._closing = True
+            self._batch_ready.set()
+            await self._task  # Its last pass flushes the buffer
+            self._task = None
+        if self._path is not None:
+            await asyncio.to_thread(self._rotate)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "buffered": len(self._buffer),
+            "records_buffered": self.records_buffered,
+            "records_dropped": self.records_dropped,
+            "records_written": self.records_written,
+            "batches_written": self.batches_written,
+            "files_rotated": self.files_rotated,
+            "files_compacted": self.files_compacted,
+            "write_errors": self.write_errors,
+            "parquet_compaction": self.compact,
+        }
+
+
+# --- Compaction and queries ---
+
+
+def compact_file(path: str) -> str:
+    """Converts a rotated JSONL file to Parquet (requires pyarrow); returns the new path."""
+    if pyarrow is None:
+        raise RuntimeError("Parquet compaction requires the `pyarrow` package.")
+    parquet_path = path[: -len(".jsonl")] + ".parquet"
+    with open(path, "rb") as f:
+        rows = [loads(line) for line in f if line.strip()]
+    if rows:
+        # Records differ in their fields (e.g. refused turns); give all rows every column.
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        table = pyarrow.Table.from_pylist([{key: row.get(key) for key in columns} for row in rows])
+        temporary_path = f"{parquet_path}.tmp"
+        pyarrow.parquet.write_table(table, temporary_path, compression="zstd")
+        os.replace(temporary_path, parquet_path)
+    os.remove(path)
+    return parquet_path
+
+
+def compact_directory(directory: str, min_age_s: float) -> List[str]:
+    """Compacts the JSONL files not written to for `min_age_s` (writers have rotated away from them)."""
+    now = time.time()
+    return [
+        compact_file(path)
+        for path in sorted(glob.glob(os.path.join(directory, f"{FILE_PREFIX}*.jsonl")))
+        if now - os.path.getmtime(path) >= min_age_s
+    ]
+
+
+def read_turns(directory: str, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Turn records from the JSONL and Parquet files in `directory` (recorded at or after `since`)."""
+    paths = sorted(glob.glob(os.path.join(directory, f"{FILE_PREFIX}*.*")))
+    for path in paths:
+        if path.endswith(".jsonl"):
+            with open(path, "rb") as f:
+                rows: List[Dict[str, Any]] = [loads(line) for line in f if line.strip()]
+        elif path.endswith(".parquet"):
+            if pyarrow is None:
+                print(f"Skipping {path}: reading Parquet requires the `pyarrow` package.")
+                continue
+            rows = pyarrow.parquet.read_table(path).to_pylist()
+        else:
+            continue
+        for row in rows:
+            if since is None or row.get("ts", 0) >= since:
+                yield row
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize_turns(turns: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency per intent, failure rate per tool and outcome counts."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    tool_calls: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    outcomes: Counter = Counter()
+    count = 0
+    for turn in turns:
+        count += 1
+        latencies[turn.get("intent") or "unknown"].append(float(turn.get("latency_ms") or 0.0))
+        outcomes[turn.get("outcome") or "unknown"] += 1
+        for call in turn.get("tool_calls") or []:
+            tool_calls[call["name"]].append(call)
+
+    intents = {}
+    for intent, values in sorted(latencies.items()):
+        values.sort()
+        intents[intent] = {
+            "turns": len(values),
+            "p50_latency_ms": round(_percentile(values, 50), 3),
+            "p95_latency_ms": round(_percentile(values, 95), 3),
+        }
+    tools = {}
+    for name, calls in sorted(tool_calls.items()):
+        failures = sum(1 for call in calls if not call.get("ok"))
+        durations = sorted(float(call.get("ms") or 0.0) for call in calls)
+        tools[name] = {
+            "calls": len(calls),
+            "failures": failures,
+            "failure_rate": round(failures / len(calls), 4),
+            "p95_ms": round(_percentile(durations, 95), 3),
+        }
+    return {"turns": count, "intents": intents, "tools": tools, "outcomes": dict(outcomes)}
+
+
+def build_analytics_exporter() -> Optional[AnalyticsExporter]:
+    """The exporter configured by the ANALYTICS_* settings, or None when ANALYTICS_DIR is empty."""
+    directory = get_setting("ANALYTICS_DIR", "")
+    if not directory:
+        return None
+    return AnalyticsExporter(
+        directory,
+        buffer_size=get_setting("ANALYTICS_BUFFER_SIZE", 10000),
+        batch_size=get_setting("ANALYTICS_BATCH_SIZE", 500),
+        flush_interval_s=get_setting("ANALYTICS_FLUSH_SECONDS", 1.0),
+        rotate_bytes=get_setting("ANALYTICS_ROTATE_BYTES", 64 * 1024 * 1024),
+        rotate_seconds=get_setting("ANALYTICS_ROTATE_SECONDS", 3600.0),
+        compact=get_setting("ANALYTICS_COMPACT", True),
+        user_salt=get_setting("ANALYTICS_USER_SALT", ""),
+    )
+
+
+_analytics_exporter: Optional[AnalyticsExporter] = None
+_analytics_configured = False
+
+
+def get_analytics_exporter() -> Optional[AnalyticsExporter]:
+    """This worker's exporter (started on first use), or None when analytics are off."""
+    global _analytics_exporter, _analytics_configured
+    if not _analytics_configured:
+        _analytics_configured = True
+        _analytics_exporter = build_analytics_exporter()
+        if _analytics_exporter is not None:
+            _analytics_exporter.start()
+            metrics.register("analytics", _analytics_exporter.stats)
+            print(f"Analytics export to {_analytics_exporter.directory}")
+    return _analytics_exporter
+
+
+async def close_analytics_exporter() -> None:
+    global _analytics_exporter, _analytics_configured
+    if _analytics_exporter is not None:
+        await _analytics_exporter.close()
+    _analytics_exporter = None
+    _analytics_configured = False
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    print(f"{summary['turns']} turns; outcomes: {summary['outcomes']}")
+    print(f"\n{'intent':<36} {'turns':>8} {'p50 ms':>10} {'p95 ms':>10}")
+    for intent, row in summary["intents"].items():
+        print(f"{intent:<36} {row['turns']:>8} {row['p50_latency_ms']:>10.1f} {row['p95_latency_ms']:>10.1f}")
+    print(f"\n{'tool':<36} {'calls':>8} {'failed':>8} {'rate':>8} {'p95 ms':>10}")
+    for name, row in summary["tools"].items():
+        print(
+            f"{name:<36} {row['calls']:>8} {row['failures']:>8} "
+            f"{row['failure_rate']:>8.2%} {row['p95_ms']:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=("report", "compact"))
+    parser.add_argument("--dir", default=get_setting("ANALYTICS_DIR", "") or "analytics")
+    parser.add_argument("--since", help="Only turns on or after this UTC date (YYYY-MM-DD).")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    parser.add_argument(
+        "--min-age-seconds",
+        type=float,
+        default=get_setting("ANALYTICS_ROTATE_SECONDS", 3600.0),
+        help="compact: only files not written to for this long.",
+    )
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        if pyarrow is None:
+            parser.error("compact requires the `pyarrow` package.")
+        compacted = compact_directory(args.dir, args.min_age_seconds)
+        print(f"Compacted {len(compacted)} files.")
+        return
+    since = None
+    if args.since:
+        since = datetime.strptime(args.since, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    summary = summarize_turns(read_turns(args.dir, since))
+    if args.json:
+        print(dumps(summary).decode("utf-8"))
+    else:
+        _print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
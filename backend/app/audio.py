@@ -0,0 +1,296 @@
+import asyncio
+import base64
+import io
+import shutil
+import subprocess
+import sys
+import wave
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from backend.app import metrics
+from backend.app.settings import get_setting
+
+TARGET_SAMPLE_RATE = 16000  # Enough for speech
+FRAME_MS = 20  # Voice activity detection frame
+WAV_MIME_TYPES = ("audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave")
+
+
+def decode_wav(data: bytes) -> Tuple[array, int]:
+    """Mono 16-bit samples and sample rate of a PCM WAV file (channels are averaged)."""
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        channels = reader.getnchannels()
+        width = reader.getsampwidth()
+        rate = reader.getframerate()
+        frames = reader.readframes(reader.getnframes())
+    if width == 2:
+        samples = array("h", frames)
+        if sys.byteorder == "big":
+            samples.byteswap()
+    elif width == 1:  # Unsigned 8-bit
+        samples = array("h", ((byte - 128) << 8 for byte in frames))
+    elif width in (3, 4):  # Keep the 16 most significant bits
+        samples = array(
+            "h",
+            (
+                int.from_bytes(frames[i + width - 2 : i + width], "little", signed=True)
+                for i in range(0, len(frames), width)
+            ),
+        )
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width} bytes")
+    if channels > 1:
+        samples = array("h", (sum(frame) // channels for frame in zip(*[iter(samples)] * channels)))
+    return samples, rate
+
+
+def pcm_bytes(samples: array) -> bytes:
+    """Little-endian 16-bit PCM, as in WAV files and ffmpeg's s16le."""
+    if sys.byteorder == "big":
+        samples = array("h", samples)
+        samples.byteswap()
+    return samples.tobytes()
+
+
+def encode_wav(samples: array, rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(pcm_bytes(samples))
+    return buffer.getvalue()
+
+
+def run_ffmpeg(ffmpeg: str, args, data: bytes, timeout_s: float) -> bytes:
+    completed = subprocess.run(
+        [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", *args],
+        input=data,
+        capture_output=True,
+        timeout=timeout_s,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {completed.stderr.decode(errors='replace').strip()}")
+    return completed.stdout
+
+
+def voiced_range(samples: array, rate: int, threshold_db: float, pad_ms: int) -> Optional[Tuple[int, int]]:
+    """
+    (start, end) sample offsets from the first to the last 20 ms frame whose RMS
+    level reaches `threshold_db` (dBFS), widened by `pad_ms`; None if no frame does.
+    """
+    frame = max(1, rate * FRAME_MS // 1000)
+    # Compare mean squares to avoid a square root per frame
+    threshold = (32768 * 10 ** (threshold_db / 20)) ** 2
+    voiced = []
+    for start in range(0, len(samples), frame):
+        chunk = samples[start : start + frame]
+        if sum(x * x for x in chunk) >= threshold * len(chunk):
+            voiced.append(start)
+    if not voiced:
+        return None
+    pad = rate * pad_ms // 1000
+    return max(0, voiced[0] - pad), min(len(samples), voiced[-1] + frame + pad)
+
+
+def resample(samples: array, rate: int, target_rate: int) -> array:
+    """Linear interpolation; enough for speech sent to a speech model."""
+    if rate == target_rate or not samples:
+        return samples
+    count = max(1, len(samples) * target_rate // rate)
+    step = rate / target_rate
+    last = len(samples) - 1
+    out = array("h", bytes(2 * count))
+    for i in range(count):
+        position = i * step
+        index = int(position)
+        if index >= last:
+            out[i] = samples[last]
+        else:
+            fraction = position - index
+            out[i] = int(samples[index] + (samples[index + 1] - samples[index]) * fraction)
+    return out
+
+
+def preprocess_audio(
+    data: bytes,
+    mime_type: str,
+    max_seconds: float = 60.0,
+    silence_threshold_db: float = -40.0,
+    pad_ms: int = 200,
+    ffmpeg: Optional[str] = None,
+    opus_bitrate_kbps: int = 24,
+    timeout_s: float = 10.0,
+) -> Dict[str, Any]:
+    """
+    Normalizes a voice message: decode, downmix to mono, trim leading and
+    trailing silence, cap at `max_seconds`, resample to 16 kHz and re-encode
+    (Opus in Ogg with `ffmpeg`, else 16-bit WAV). Without `ffmpeg` only WAV
+    input can be decoded; other formats come back unchanged ("passthrough").
+    """
+    if mime_type.lower() in WAV_MIME_TYPES or data[:4] == b"RIFF":
+        samples, rate = decode_wav(data)
+    elif ffmpeg:
+        rate = TARGET_SAMPLE_RATE  # ffmpeg decodes, downmixes and resamples in one pass
+        pcm = run_ffmpeg(
+            ffmpeg, ["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(rate), "pipe:1"], data, timeout_s
+        )
+        samples = array("h", pcm[: len(pcm) // 2 * 2])
+        if sys.byteorder == "big":
+            samples.byteswap()
+    else:
+        return {"status": "passthrough", "data": data, "mime_type": mime_type, "seconds_in": 0.0, "seconds_out": 0.0}
+
+    seconds_in = len(samples) / rate if rate else 0.0
+    span = voiced_range(samples, rate, silence_threshold_db, pad_ms)
+    start, end = span if span else (0, len(samples))  # All silence: keep it, only capped
+    end = min(end, start + int(max_seconds * rate))
+    samples = resample(samples[start:end], rate, TARGET_SAMPLE_RATE)
+
+    if ffmpeg:
+        encoded = run_ffmpeg(
+            ffmpeg,
+            [
+                "-f", "s16le", "-ar", str(TARGET_SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+                "-c:a", "libopus", "-b:a", f"{opus_bitrate_kbps}k", "-application", "voip",
+                "-f", "ogg", "pipe:1",
+            ],
+            pcm_bytes(samples),
+            timeout_s,
+        )
+        encoded_mime_type = "audio/ogg"
+    else:
+        encoded = encode_wav(samples, TARGET_SAMPLE_RATE)
+        encoded_mime_type = "audio/wav"
+    return {
+        "status": "processed",
+        "data": encoded,
+        "mime_type": encoded_mime_type,
+        "seconds_in": seconds_in,
+        "seconds_out": len(samples) / TARGET_SAMPLE_RATE,
+    }
+
+
+def _preprocess_base64(audio_base64: str, mime_type: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Pool entry point: base64 is decoded and encoded in the worker process, not on the event loop."""
+    data = base64.b64decode(audio_base64)
+    result = preprocess_audio(data, mime_type, **options)
+    result["bytes_in"] = len(data)
+    result["bytes_out"] = len(result["data"])
+    result["data"] = base64.b64encode(result["data"]).decode("ascii")
+    return result
+
+
+class AudioPreprocessor:
+    """
+    Runs `preprocess_audio` for `/chat` voice messages in a process pool. The
+    normalized clip replaces the original when it is shorter or smaller;
+    failures and timeouts keep the original.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_seconds: float = 60.0,
+        silence_threshold_db: float = -40.0,
+        pad_ms: int = 200,
+        ffmpeg_path: str = "ffmpeg",
+        opus_bitrate_kbps: int = 24,
+        timeout_s: float = 10.0,
+    ):
+        self.options = {
+            "max_seconds": max_seconds,
+            "silence_threshold_db": silence_threshold_db,
+            "pad_ms": pad_ms,
+            "ffmpeg": shutil.which(ffmpeg_path) if ffmpeg_path else None,
+            "opus_bitrate_kbps": opus_bitrate_kbps,
+            "timeout_s": timeout_s,
+        }
+        self.timeout_s = timeout_s
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.counts = {"processed": 0, "unchanged": 0, "passthrough": 0, "failed": 0}
+        self.bytes_in = self.bytes_out = 0
+        self.seconds_in = self.seconds_out = 0.0
+
+    async def process(self, audio_base64: str, mime_type: str) -> Tuple[str, str]:
+        """(audio_base64, mime_type) to send to the model."""
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(self.pool, _preprocess_base64, audio_base64, mime_type, self.options),
+                timeout=self.timeout_s,
+            )
+        except Exception as e:
+            print(f"Audio preprocessing failed ({mime_type}): {e!r}; sending the original audio.")
+            self.counts["failed"] += 1
+            return audio_base64, mime_type
+
+        status = result["status"]
+        if status == "processed" and not (
+            result["seconds_out"] < result["seconds_in"] or result["bytes_out"] < result["bytes_in"]
+        ):
+            status = "unchanged"  # Nothing to trim and no smaller encoding: keep the original
+        self.counts[status] += 1
+        self.bytes_in += result["bytes_in"]
+        self.seconds_in += result["seconds_in"]
+        if status != "processed":
+            self.bytes_out += result["bytes_in"]
+            self.seconds_out += result["seconds_in"]
+            return audio_base64, mime_type
+        self.bytes_out += result["bytes_out"]
+        self.seconds_out += result["seconds_out"]
+        return result["data"], result["mime_type"]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clips": dict(self.counts),
+            "encoder": "opus" if self.options["ffmpeg"] else "wav",
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "audio_seconds_in": round(self.seconds_in, 3),
+            "audio_seconds_out": round(self.seconds_out, 3),
+            "audio_seconds_saved": round(self.seconds_in - self.seconds_out, 3),
+        }
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def build_audio_preprocessor() -> Optional[AudioPreprocessor]:
+    """The preprocessor configured by the AUDIO_* settings, or None when disabled."""
+    if not get_setting("AUDIO_PREPROCESSING", False):
+        return None
+    return AudioPreprocessor(
+        workers=get_setting("AUDIO_PREPROCESS_WORKERS", 2),
+        max_seconds=get_setting("AUDIO_MAX_SECONDS", 60.0),
+        silence_threshold_db=get_setting("AUDIO_SILENCE_THRESHOLD_DB", -40.0),
+        pad_ms=get_setting("AUDIO_SILENCE_PAD_MS", 200),
+        ffmpeg_path=get_setting("AUDIO_FFMPEG_PATH", "ffmpeg"),
+        opus_bitrate_kbps=get_setting("AUDIO_OPUS_BITRATE_KBPS", 24),
+        timeout_s=get_setting("AUDIO_PREPROCESS_TIMEOUT_SECONDS", 10.0),
+    )
+
+
+_audio_preprocessor: Optional[AudioPreprocessor] = None
+_audio_preprocessor_configured = False
+
+
+def get_audio_preprocessor() -> Optional[AudioPreprocessor]:
+    """This worker's audio preprocessor, or None when AUDIO_PREPROCESSING is off."""
+    global _audio_preprocessor, _audio_preprocessor_configured
+    if not _audio_preprocessor_configured:
+        _audio_preprocessor_configured = True
+        _audio_preprocessor = build_audio_preprocessor()
+        if _audio_preprocessor is not None:
+            metrics.register("audio", _audio_preprocessor.stats)
+    return _audio_preprocessor
+
+
+def close_audio_preprocessor() -> None:
+    global _audio_preprocessor, _audio_preprocessor_configured
+    if _audio_preprocessor is not None:
+        _audio_preprocessor.close()
+    _audio_preprocessor = None
+    _audio_preprocessor_configured = False
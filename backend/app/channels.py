@@ -0,0 +1,313 @@
+import hashlib
+import hmac
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+
+import httpx
+
+from backend.app import metrics
+from backend.app.http_io import dumps, loads
+from backend.app.job_queue import RetriableJobError, get_job_queue, register_job_handler
+from backend.app.settings import get_setting
+from backend.app.tools import get_http_client
+
+# Job kinds of the channel gateway. Incoming messages are queued with the
+# conversation as ordering key, so one user's messages are answered one at a
+# time in arrival order by whichever worker claims them; replies are queued
+# separately so a failed delivery is retried without re-running the turn.
+CHANNEL_MESSAGE_JOB = "channel_message"
+CHANNEL_REPLY_JOB = "channel_reply"
+OUTBOX_SIZE = 100  # Replies kept per channel in stub delivery mode
+
+channel_stats: Dict[str, int] = {
+    "webhooks_received": 0,
+    "webhooks_rejected": 0,
+    "messages_queued": 0,
+    "duplicate_messages": 0,
+    "replies_sent": 0,
+    "reply_failures": 0,
+}
+
+
+@dataclass
+class InboundMessage:
+    sender_id: str  # The user's id on the channel
+    message_id: str  # Platform message id; redelivered webhooks reuse it
+    text: str
+
+
+def _hmac_sha256(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class ChannelAdapter:
+    """
+    Translates one messaging platform's webhooks into `InboundMessage`s and
+    sends replies through its API. Subclasses implement `verify`, `parse` and
+    `reply_request`. With stub delivery (CHANNEL_DELIVERY = "stub", for local
+    testing) replies are kept in `outbox` instead of being sent.
+    """
+
+    name = ""
+    max_text_length = 2000
+
+    def __init__(self, secret: str = "", access_token: str = "", stub: bool = True):
+        self.secret = secret
+        self.access_token = access_token
+        self.outbox: Optional[deque] = deque(maxlen=OUTBOX_SIZE) if stub else None
+
+    def verify(self, headers: Dict[str, str], body: bytes) -> bool:
+        """Whether the webhook was signed by the platform (always True without a secret)."""
+        raise NotImplementedError
+
+    def handshake(self, params: Dict[str, str]) -> Optional[str]:
+        """The response to a subscription check (GET on the webhook URL), or None to refuse it."""
+        return None
+
+    def parse(self, payload: Dict[str, Any]) -> List[InboundMessage]:
+        """The text messages in a webhook payload; other events are ignored."""
+        raise NotImplementedError
+
+    def reply_request(self, recipient_id: str, text: str) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """URL, JSON body and headers of the API call sending `text` to `recipient_id`."""
+        raise NotImplementedError
+
+    def split(self, text: str) -> List[str]:
+        """`text` cut into messages within the platform's length limit, in sending order."""
+        return [
+            text[start : start + self.max_text_length]
+            for start in range(0, len(text), self.max_text_length)
+        ] or [""]
+
+    async def send(self, recipient_id: str, text: str) -> None:
+        """Sends one message; longer replies are split first and sent as one job per piece."""
+        if self.outbox is not None:
+            self.outbox.append({"recipient_id": recipient_id, "text": text})
+            return
+
+        url, body, headers = self.reply_request(recipient_id, text)
+        try:
+            response = await get_http_client().post(
+                url, content=dumps(body), headers={"Content-Type": "application/json", **headers}
+            )
+        except httpx.RequestError as e:
+            raise RetriableJobError(f"{self.name} send failed: {e}")
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RetriableJobError(f"{self.name} API returned {response.status_code}")
+        if response.status_code >= 400:
+            raise ValueError(
+                f"{self.name} API rejected the reply: {response.status_code} {response.text[:200]}"
+            )
+
+
+class MessengerAdapter(ChannelAdapter):
+    """Facebook Messenger (page webhooks, Send API)."""
+
+    name = "messenger"
+    api_url = "https://graph.facebook.com/v19.0/me/messages"
+
+    def __init__(self, verify_token: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.verify_token = verify_token
+
+    def verify(self, headers: Dict[str, str], body: bytes) -> bool:
+        if not self.secret:
+            return True
+        signature = headers.get("x-hub-signature-256", "")
+        return hmac.compare_digest(signature, "sha256=" + _hmac_sha256(self.secret, body))
+
+    def handshake(self, params: Dict[str, str]) -> Optional[str]:
+        if (
+            params.get("hub.mode") == "subscribe"
+            and self.verify_token
+            and hmac.compare_digest(params.get("hub.verify_token", ""), self.verify_token)
+        ):
+            return params.get("hub.challenge", "")
+        return None
+
+    def parse(self, payload: Dict[str, Any]) -> List[InboundMessage]:
+        messages = []
+        for entry in payload.get("entry", []):
+            for event in entry.get("messaging", []):
+                message = event.get("message") or {}
+                if message.get("text") and not message.get("is_echo"):
+                    messages.append(
+                        InboundMessage(str(event["sender"]["id"]), message["mid"], message["text"])
+                    )
+        return messages
+
+    def reply_request(self, recipient_id: str, text: str):
+        return (
+            f"{self.api_url}?access_token={self.access_token}",
+            {"recipient": {"id": recipient_id}, "messaging_type": "RESPONSE", "message": {"text": text}},
+            {},
+        )
+
+
+class ZaloAdapter(ChannelAdapter):
+    """Zalo Official Account (OA webhooks, consultation message API)."""
+
+    name = "zalo"
+    api_url = "https://openapi.zalo.me/v3.0/oa/message/cs"
+
+    def __init__(self, app_id: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.app_id = app_id
+
+    def verify(self, headers: Dict[str, str], body: bytes) -> bool:
+        if not self.secret:
+            return True
+        # mac = sha256(app_id + raw body + timestamp + OA secret key)
+        try:
+            timestamp = str(loads(body).get("timestamp", ""))
+        except ValueError:
+            return False
+        expected = hashlib.sha256(
+            self.app_id.encode("utf-8") + body + (timestamp + self.secret).encode("utf-8")
+        ).hexdigest()
+        return hmac.compare_digest(headers.get("x-zevent-signature", ""), "mac=" + expected)
+
+    def parse(self, payload: Dict[str, Any]) -> List[InboundMessage]:
+        if payload.get("event_name") != "user_send_text":
+            return []
+        message = payload.get("message") or {}
+        if not message.get("text"):
+            return []
+        return [InboundMessage(str(payload["sender"]["id"]), message["msg_id"], message["text"])]
+
+    def reply_request(self, recipient_id: str, text: str):
+        return (
+            self.api_url,
+            {"recipient": {"user_id": recipient_id}, "message": {"text": text}},
+            {"access_token": self.access_token},
+        )
+
+
+class WebAdapter(ChannelAdapter):
+    """
+    The web widget (or any in-house client): `{"user_id", "message_id", "text"}`
+    webhooks signed with an HMAC-SHA256 of the body in X-Webhook-Signature;
+    replies are POSTed, signed the same way, to WEB_CHANNEL_REPLY_URL.
+    """
+
+    name = "web"
+    max_text_length = 10000
+
+    def __init__(self, reply_url: str = "", **kwargs):
+        super().__init__(**kwargs)
+        self.reply_url = reply_url
+
+    def verify(self, headers: Dict[str, str], body: bytes) -> bool:
+        if not self.secret:
+            return True
+        return hmac.compare_digest(headers.get("x-webhook-signature", ""), _hmac_sha256(self.secret, body))
+
+    def parse(self, payload: Dict[str, Any]) -> List[InboundMessage]:
+        items = payload.get("messages", [payload])
+        return [
+            InboundMessage(str(item["user_id"]), str(item["message_id"]), item["text"])
+            for item in items
+            if item.get("text")
+        ]
+
+    def reply_request(self, recipient_id: str, text: str):
+        body = {"user_id": recipient_id, "text": text}
+        headers = {"X-Webhook-Signature": _hmac_sha256(self.secret, dumps(body))} if self.secret else {}
+        return self.reply_url, body, headers
+
+
+def build_channel_adapters() -> Dict[str, ChannelAdapter]:
+    """Adapters for the channels listed in CHANNELS_ENABLED."""
+    stub = str(get_setting("CHANNEL_DELIVERY", "stub")).lower() == "stub"
+    factories = {
+        "messenger": lambda: MessengerAdapter(
+            secret=get_setting("MESSENGER_APP_SECRET", ""),
+            access_token=get_setting("MESSENGER_PAGE_ACCESS_TOKEN", ""),
+            verify_token=get_setting("MESSENGER_VERIFY_TOKEN", ""),
+            stub=stub,
+        ),
+        "zalo": lambda: ZaloAdapter(
+            secret=get_setting("ZALO_OA_SECRET_KEY", ""),
+            access_token=get_setting("ZALO_OA_ACCESS_TOKEN", ""),
+            app_id=get_setting("ZALO_APP_ID", ""),
+            stub=stub,
+        ),
+        "web": lambda: WebAdapter(
+            secret=get_setting("WEB_CHANNEL_SECRET", ""),
+            reply_url=get_setting("WEB_CHANNEL_REPLY_URL", ""),
+            stub=stub,
+        ),
+    }
+    adapters = {}
+    for name in str(get_setting("CHANNELS_ENABLED", "")).split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in factories:
+            raise ValueError(f"Unknown channel '{name}'. Use one of {sorted(factories)}.")
+        adapters[name] = factories[name]()
+    return adapters
+
+
+_channel_adapters: Optional[Dict[str, ChannelAdapter]] = None
+_channel_adapters_lock = threading.Lock()
+
+
+def get_channel_adapters() -> Dict[str, ChannelAdapter]:
+    """The enabled channel adapters of this worker process, built on first use."""
+    global _channel_adapters
+    with _channel_adapters_lock:
+        if _channel_adapters is None:
+            _channel_adapters = build_channel_adapters()
+            metrics.register("channels", lambda: dict(channel_stats))
+    return _channel_adapters
+
+
+def close_channel_adapters() -> None:
+    global _channel_adapters
+    _channel_adapters = None
+
+
+def conversation_id(channel: str, sender_id: str) -> str:
+    """Session id of a channel user; ids of different platforms may collide."""
+    return f"{channel}:{sender_id}"
+
+
+async def enqueue_reply(
+    channel: str, recipient_id: str, text: str, ordering_key: str, idempotency_key: str
+) -> List[Dict[str, Any]]:
+    """
+    Queues `text` as one reply job per piece the platform accepts. A failed
+    delivery is retried on its own, so pieces already sent are not sent again;
+    the shared ordering key holds the later pieces back until it succeeds.
+    """
+    adapter = get_channel_adapters().get(channel)
+    if adapter is None:
+        raise ValueError(f"Channel '{channel}' is not enabled.")
+    return [
+        await get_job_queue().enqueue(
+            CHANNEL_REPLY_JOB,
+            {"channel": channel, "recipient_id": recipient_id, "text": piece},
+            ordering_key=ordering_key,
+            idempotency_key=f"{idempotency_key}:{number}",
+        )
+        for number, piece in enumerate(adapter.split(text))
+    ]
+
+
+async def run_channel_reply_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    adapter = get_channel_adapters().get(payload["channel"])
+    if adapter is None:
+        raise ValueError(f"Channel '{payload['channel']}' is not enabled.")
+    try:
+        await adapter.send(payload["recipient_id"], payload["text"])
+    except Exception:
+        channel_stats["reply_failures"] += 1
+        raise
+    channel_stats["replies_sent"] += 1
+    return {"sent": True}
+
+
+register_job_handler(CHANNEL_REPLY_JOB, run_channel_reply_job)
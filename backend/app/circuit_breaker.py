@@ -0,0 +1,110 @@
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome and latency of recent LLM calls and stops sending calls
+    to a provider that is failing or too slow.
+
+    The circuit opens when, over the last `window_size` calls (and at least
+    `min_calls`), the error rate reaches `error_rate_threshold` or the p95
+    latency exceeds `p95_latency_ms_threshold`. While open, `allow()` is False
+    and callers serve a degraded answer. After `open_seconds` one probe call
+    is let through (half-open): success closes the circuit, failure reopens it.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 20,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        p95_latency_ms_threshold: float = 15000.0,
+        open_seconds: float = 30.0,
+    ):
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.p95_latency_ms_threshold = p95_latency_ms_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls: deque = deque(maxlen=window_size)  # (succeeded, latency_ms)
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected_calls = 0
+        self.last_trip_reason: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (claims the probe slot when half-open)."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected_calls += 1
+                return False
+            self.state = HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected_calls += 1
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def release_probe(self) -> None:
+        """Frees the half-open probe slot after a call that ended without an outcome
+        (cancelled, or failed before reaching the provider)."""
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record(self, succeeded: bool, latency_ms: float) -> None:
+        if self.state == HALF_OPEN:
+            self._probe_in_flight = False
+            if succeeded and latency_ms <= self.p95_latency_ms_threshold:
+                print("Circuit breaker: probe call succeeded, closing the circuit.")
+                self.state = CLOSED
+                self._calls.clear()
+            else:
+                self._open("probe call failed" if not succeeded else "probe call too slow")
+            return
+
+        self._calls.append((succeeded, latency_ms))
+        if self.state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        error_rate = self._error_rate()
+        p95_ms = self._p95_latency_ms()
+        if error_rate >= self.error_rate_threshold:
+            self._open(f"error rate {error_rate:.0%}")
+        elif p95_ms > self.p95_latency_ms_threshold:
+            self._open(f"p95 latency {p95_ms:.0f}ms")
+
+    def _open(self, reason: str) -> None:
+        print(f"Circuit breaker: opening for {self.open_seconds}s ({reason}).")
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+        self.last_trip_reason = reason
+
+    def _error_rate(self) -> float:
+        if not self._calls:
+            return 0.0
+        return sum(1 for succeeded, _ in self._calls if not succeeded) / len(self._calls)
+
+    def _p95_latency_ms(self) -> float:
+        latencies = sorted(latency for _, latency in self._calls)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "window_calls": len(self._calls),
+            "window_error_rate": round(self._error_rate(), 4),
+            "window_p95_latency_ms": round(self._p95_latency_ms(), 3),
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected_calls,
+            "last_trip_reason": self.last_trip_reason,
+        }
@@ -0,0 +1,103 @@
+import asyncio
+import re
+import unicodedata
+from typing import Dict, Any, Callable, Coroutine
+
+_CANCELLED = object()  # Leader result marker: the call was abandoned, elect a new leader
+
+
+def normalize_prompt(message: str) -> str:
+    """
+    Canonical form used to detect identical prompts: Unicode NFC, case-folded,
+    punctuation removed and whitespace collapsed ("Hủy vé!" == "hủy  vé").
+    """
+    text = unicodedata.normalize("NFC", message).casefold()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class SingleFlight:
+    """
+    Shares one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key (the leader) runs the call; callers arriving while
+    it is in flight (followers) wait for its result instead of starting their own.
+    Followers wait at most `wait_window_s`: past that they run the call
+    themselves, so coalescing never adds more than the window to a request's
+    latency. If the leader's call raises, its followers get the same exception
+    rather than all retrying a struggling provider at once; if the leader is
+    cancelled, one follower becomes the new leader for the rest. A follower's
+    copy of the result has no "usage" and is marked "coalesced", so the shared
+    call is accounted once, to the leader. Results are only shared while in
+    flight, never cached.
+    """
+
+    def __init__(self, wait_window_s: float):
+        self.wait_window_s = wait_window_s
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.wait_timeouts = 0
+        self.leader_failures = 0
+
+    async def run(
+        self,
+        key: str,
+        call: Callable[[], Coroutine[Any, Any, Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        pending = self._inflight.get(key)
+        while pending is not None:
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.shield(pending), timeout=self.wait_window_s
+                )
+            except asyncio.TimeoutError:
+                if pending.done():  # The leader's own call timed out
+                    raise
+                self.wait_timeouts += 1
+                return await call()
+            if result is not _CANCELLED:
+                self.coalesced += 1
+                return self._copy_result(result)
+            # The first follower to get here leads the call; the others follow it.
+            pending = self._inflight.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await call()
+        except Exception as e:
+            self.leader_failures += 1
+            future.set_exception(e)
+            future.exception()  # Retrieved here: a leader without followers logs nothing
+            raise
+        except BaseException:
+            self.leader_failures += 1
+            future.set_result(_CANCELLED)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        # Callers mutate their response dicts; give each follower its own copy.
+        copied = dict(result)
+        copied.pop("usage", None)  # Tokens are spent (and budgeted) once, by the leader
+        copied["coalesced"] = True
+        if "function_call" in copied:
+            function_call = dict(copied["function_call"])
+            function_call["args"] = dict(function_call.get("args", {}))
+            copied["function_call"] = function_call
+        return copied
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leader_calls": self.leaders,
+            "coalesced_requests": self.coalesced,
+            "wait_timeouts": self.wait_timeouts,
+            "leader_failures": self.leader_failures,
+        }
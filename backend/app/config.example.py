@@ -11,8 +11,281 @@ MODEL_NAME = "gemini-2.5-pro-preview-05-06"  # Or your desired model
 MOCK_API_BASE_URL = "http://localhost:8000"
 
 # Active LLM Provider Configuration
-# Valid values: "VERTEX_AI", "OPENAI", "ANTHROPIC" (when other agents are implemented)
+# Valid values: "VERTEX_AI", "FAKE", "OPENAI", "ANTHROPIC" (when other agents are implemented)
 # For the POC, this should typically be "VERTEX_AI".
+# "FAKE" uses a scripted offline agent (no credentials) for benchmarks and tests.
+# Settings read through `settings.get_setting` can be overridden by environment variables of the same name.
 ACTIVE_LLM_PROVIDER = "VERTEX_AI"
 
+# Simulated model round-trip latency for the "FAKE" provider
+FAKE_LLM_LATENCY_MS = 0.0
+FAKE_LLM_JITTER_MS = 0.0
+
+# LLM fixture transport for the Vertex AI agent: "off" (live calls), "record"
+# (live calls saved to LLM_FIXTURE_PATH) or "replay" (served offline from the file)
+LLM_FIXTURE_MODE = "off"
+LLM_FIXTURE_PATH = "llm_fixtures.jsonl"
+LLM_FIXTURE_REPLAY_LATENCY = False  # Replay with the latency observed while recording
+
+# LLM calls taking longer than LLM_TIMEOUT_SECONDS fail. A circuit breaker stops
+# calling the provider when, over the last CIRCUIT_WINDOW_SIZE calls (at least
+# CIRCUIT_MIN_CALLS), the error rate or p95 latency crosses its threshold, and
+# probes it again after CIRCUIT_OPEN_SECONDS. Meanwhile (and whenever a call
+# fails) turns are answered in degraded mode: FAQ retrieval plus a scripted
+# change-booking flow.
+LLM_TIMEOUT_SECONDS = 20.0
+DEGRADED_MODE_ENABLED = True
+CIRCUIT_WINDOW_SIZE = 20
+CIRCUIT_MIN_CALLS = 5
+CIRCUIT_ERROR_RATE_THRESHOLD = 0.5
+CIRCUIT_P95_LATENCY_MS = 15000.0
+CIRCUIT_OPEN_SECONDS = 30.0
+
+# Shadow traffic for evaluating another model before switching MODEL_NAME: a
+# SHADOW_SAMPLE_RATE share (0 = off) of successful LLM calls is mirrored in the
+# background to SHADOW_PROVIDER/SHADOW_MODEL_NAME (empty: the active provider
+# and its default model). Users never wait for shadow calls; at most
+# SHADOW_MAX_CONCURRENCY run at once (others are dropped) and the candidate's
+# function calls are only compared, never executed. Latency, tokens and
+# agreement are in the "shadow" section of GET /metrics and, per call, in
+# SHADOW_LOG_PATH (JSONL, when set; see `python -m backend.app.shadow report`).
+SHADOW_SAMPLE_RATE = 0.0
+SHADOW_PROVIDER = ""
+SHADOW_MODEL_NAME = ""
+SHADOW_MAX_CONCURRENCY = 4
+SHADOW_TIMEOUT_SECONDS = 30.0
+SHADOW_LOG_PATH = ""
+
+# History entries are stored as compact records; the vertexai Content objects
+# built from them for Gemini calls are cached (LRU) for this many entries.
+CONTENT_CACHE_SIZE = 4096
+
+# Share one in-flight LLM call between concurrent, identical first-turn prompts
+# (empty history, text only). Followers wait at most COALESCE_WAIT_SECONDS.
+COALESCE_IDENTICAL_PROMPTS = True
+COALESCE_WAIT_SECONDS = 15.0
+
+# FAQ knowledge base: faq_data.json, or the memory-mapped index built from help
+# center pages, policies and exports by `python -m backend.app.faq_ingest`
+# when FAQ_INDEX_PATH is set (e.g. "faq_index.bin").
+FAQ_INDEX_PATH = ""
+
+# Turns are tagged with the detected language of the user's message ("en" or
+# "vi"). With FAQ_DIRECT_ANSWERS, when the model asks for get_faq_answer and the
+# user's message is a direct FAQ hit (one best entry scoring at least
+# FAQ_DIRECT_ANSWER_MIN_SCORE keywords) with a curated answer in that language
+# ("localized_answers" in faq_data.json, `answer_<lang>` CSV columns), the
+# answer is sent as is, without the follow-up LLM call that would summarize
+# and translate it (see the "localization" metrics section).
+FAQ_DIRECT_ANSWERS = False
+FAQ_DIRECT_ANSWER_MIN_SCORE = 1
+
+# Prompt variants for A/B tests (see GET /prompts): name -> {"version",
+# "weight", "system_instruction", "follow_up_prompt", "generation_configs":
+# {"initial": {...}, "follow_up": {...}}} with temperature, top_p, top_k,
+# max_output_tokens and stop_sequences. Users are split by a hash of their
+# user_id and PROMPT_EXPERIMENT_SALT in proportion to the weights; the first
+# variant is the control. Empty uses the baseline prompts (no system
+# instruction, model defaults).
+PROMPT_VARIANTS = {}
+# PROMPT_VARIANTS = {
+#     "baseline": {"version": "1", "weight": 0.9},
+#     "concise": {
+#         "version": "1",
+#         "weight": 0.1,
+#         "system_instruction": "You are Vexere's support assistant. Answer in at most three short sentences.",
+#         "follow_up_prompt": "Reply to the user briefly using the tool result.",
+#         "generation_configs": {"follow_up": {"temperature": 0.2, "max_output_tokens": 256}},
+#     },
+# }
+PROMPT_EXPERIMENT_SALT = "prompts"
+
+# Speculative FAQ retrieval: "off", "parallel" (retrieve the FAQ answer while the
+# first LLM call runs; used if the model asks get_faq_answer a similar question)
+# or "inject" (also add the top FAQ_SPECULATION_TOP_K entries to the first prompt)
+SPECULATIVE_FAQ_MODE = "off"
+FAQ_SPECULATION_SIMILARITY = 0.5  # Word overlap (0-1) needed to reuse the result
+FAQ_SPECULATION_TOP_K = 2
+
+# Where conversation sessions (history + tool-flow state) are kept:
+# "memory" (single worker only), "sqlite" (all workers on one host share
+# SESSION_DB_PATH) or "redis" (several nodes; requires the `redis` package).
+SESSION_STORE = "memory"
+SESSION_DB_PATH = "sessions.db"
+SESSION_REDIS_URL = "redis://localhost:6379/0"
+SESSION_TTL_SECONDS = 0  # Redis only; 0 keeps sessions until deleted
+
+# Token usage and estimated cost per user and tenant per day (see GET /usage):
+# "memory" or "sqlite" (shared by all workers on a host through USAGE_DB_PATH).
+# Daily budgets (0 = unlimited): past BUDGET_SOFT_LIMIT_RATIO of a budget the
+# BUDGET_SOFT_ACTION applies, once it is used up the BUDGET_HARD_ACTION applies.
+# Actions: "none", "truncate" (send only the last BUDGET_TRUNCATED_HISTORY_MESSAGES
+# history entries), "cheap_model" (use BUDGET_FALLBACK_MODEL) or "refuse".
+USAGE_STORE = "memory"
+USAGE_DB_PATH = "usage.db"
+USER_DAILY_TOKEN_BUDGET = 0
+TENANT_DAILY_TOKEN_BUDGET = 0
+USER_DAILY_COST_BUDGET_USD = 0.0
+TENANT_DAILY_COST_BUDGET_USD = 0.0
+BUDGET_SOFT_LIMIT_RATIO = 0.8
+BUDGET_SOFT_ACTION = "truncate"
+BUDGET_HARD_ACTION = "refuse"
+BUDGET_FALLBACK_MODEL = "gemini-2.5-flash"
+BUDGET_TRUNCATED_HISTORY_MESSAGES = 8
+# USD per 1M (prompt, completion) tokens, matched by model name prefix
+MODEL_PRICES_PER_1M_TOKENS = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+# Admin endpoints (/usage, /prompts, /debug/*, channel outboxes) require this value in the X-Admin-Key header; empty disables them
+ADMIN_API_KEY = ""
+
+# HTTP I/O: request bodies above MAX_REQUEST_BODY_BYTES (base64 media included)
+# are refused with 413. JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES
+# are compressed with the first RESPONSE_COMPRESSION encoding the client accepts
+# ("br" requires the `brotli` package; empty disables compression). JSON is
+# encoded and parsed with orjson when it is installed.
+MAX_REQUEST_BODY_BYTES = 16 * 1024 * 1024
+RESPONSE_COMPRESSION = "br,gzip"
+RESPONSE_COMPRESSION_MIN_BYTES = 1024
+
+# Request profiling (off unless PROFILING_ENABLED): requests with the header
+# `X-Profile: 1` (plus X-Admin-Key when ADMIN_API_KEY is set) and a random
+# PROFILE_SAMPLE_RATE share of all requests are profiled, one at a time, into
+# PROFILE_OUTPUT_DIR (see GET /debug/profiles). PROFILER = "sampling" writes
+# collapsed stacks for flamegraph.pl/speedscope; "cprofile" writes pstats files.
+# Memory: POST /debug/tracemalloc/start, .../snapshot, GET .../diff.
+PROFILING_ENABLED = False
+PROFILER = "sampling"
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_SAMPLE_INTERVAL_MS = 2.0
+PROFILE_OUTPUT_DIR = "profiles"
+PROFILE_MAX_FILES = 50
+
+# Conversation analytics (off while ANALYTICS_DIR is empty): one record per
+# /chat turn (timings, tool calls, token counts, outcome, hashed user id) is
+# buffered (at most ANALYTICS_BUFFER_SIZE records; more are dropped and counted)
+# and written in batches by a background task to JSONL files in ANALYTICS_DIR,
+# one set per worker. Files rotate at ANALYTICS_ROTATE_BYTES or after
+# ANALYTICS_ROTATE_SECONDS; rotated files are compacted to Parquet when
+# ANALYTICS_COMPACT is set and `pyarrow` is installed. Query with
+# `python -m backend.app.analytics report --dir <ANALYTICS_DIR>`.
+ANALYTICS_DIR = ""
+ANALYTICS_BUFFER_SIZE = 10000
+ANALYTICS_BATCH_SIZE = 500
+ANALYTICS_FLUSH_SECONDS = 1.0
+ANALYTICS_ROTATE_BYTES = 64 * 1024 * 1024
+ANALYTICS_ROTATE_SECONDS = 3600.0
+ANALYTICS_COMPACT = True
+ANALYTICS_USER_SALT = ""  # Set a secret value so hashed user ids cannot be guessed
+
+# Message guard (off unless MESSAGE_GUARD_ENABLED): local checks before any LLM
+# call. Empty messages (without image/audio), messages over MESSAGE_MAX_CHARS,
+# prompt-injection and abusive phrasing, off-topic requests (keyword score of
+# at least OFF_TOPIC_THRESHOLD, no bus/ticket terms) and a message repeated by
+# the same user within DUPLICATE_MESSAGE_WINDOW_SECONDS (answered with the
+# previous reply) get an instant canned reply. The estimated LLM calls and
+# tokens saved are in the "message_guard" section of GET /metrics.
+MESSAGE_GUARD_ENABLED = False
+MESSAGE_MAX_CHARS = 2000
+OFF_TOPIC_THRESHOLD = 2.0
+DUPLICATE_MESSAGE_WINDOW_SECONDS = 5.0
+
+# Voice message preprocessing (off unless AUDIO_PREPROCESSING): /chat audio is
+# decoded, downmixed to mono, trimmed of leading/trailing silence (20 ms frames
+# below AUDIO_SILENCE_THRESHOLD_DB dBFS, keeping AUDIO_SILENCE_PAD_MS around the
+# speech), capped at AUDIO_MAX_SECONDS, resampled to 16 kHz and re-encoded, in a
+# pool of AUDIO_PREPROCESS_WORKERS processes. With ffmpeg (AUDIO_FFMPEG_PATH)
+# any format is accepted and the output is Opus in Ogg; without it only WAV is
+# processed (output: 16-bit WAV) and other formats are sent unchanged. Bytes
+# and audio seconds saved are in the "audio" section of GET /metrics.
+AUDIO_PREPROCESSING = False
+AUDIO_PREPROCESS_WORKERS = 2
+AUDIO_PREPROCESS_TIMEOUT_SECONDS = 10.0
+AUDIO_MAX_SECONDS = 60.0
+AUDIO_SILENCE_THRESHOLD_DB = -40.0
+AUDIO_SILENCE_PAD_MS = 200
+AUDIO_FFMPEG_PATH = "ffmpeg"
+AUDIO_OPUS_BITRATE_KBPS = 24
+
+# Fault injection for resilience tests and benchmarks (off while FAULT_INJECTION
+# is empty): per target, "llm" (the LLM agent), "booking_http" (the tools'
+# booking API client) and "session_store", a "latency" distribution in ms
+# ("fixed": ms; "uniform": low, high; "exponential": mean; "lognormal": median,
+# sigma) and faults drawn by probability ("faults") or from a scripted
+# "schedule" of "ok"/fault entries (cycled while "repeat"). Faults: "timeout"
+# (waits "timeout_ms", default 30000), "error_429", "error_5xx"; for the LLM
+# also malformed responses "empty_candidates", "empty_parts" and
+# "part_without_content"; for the booking API "malformed_json". Counts are in
+# the "faults" section of GET /metrics. Example:
+# FAULT_INJECTION = {
+#     "llm": {"latency": {"distribution": "lognormal", "median": 400, "sigma": 0.7},
+#             "faults": {"error_429": 0.02, "timeout": 0.01, "empty_candidates": 0.01}},
+#     "booking_http": {"faults": {"error_5xx": 0.05}},
+#     "session_store": {"schedule": ["ok"] * 99 + ["timeout"], "timeout_ms": 2000},
+# }
+FAULT_INJECTION = {}
+FAULT_INJECTION_SEED = 0
+
+# Timeout for the pooled HTTP client used by tools (e.g. the mock Vexere API)
+TOOL_HTTP_TIMEOUT_SECONDS = 5.0
+TOOL_HTTP_RETRIES = 1  # Retries of booking changes after a network error or 5xx
+
+# Booking lookups (get_booking_details, and the booking ID check of the change
+# flow) are cached per worker: found bookings for BOOKING_CACHE_TTL_SECONDS,
+# unknown ids for BOOKING_CACHE_MISS_TTL_SECONDS. A successful change drops its
+# booking from this worker's cache. With BOOKING_PREFETCH the user's recent
+# bookings are loaded when the change flow starts, to check the booking ID they
+# send next (and suggest theirs if it is not found) without another API call.
+BOOKING_CACHE_TTL_SECONDS = 60.0
+BOOKING_CACHE_MISS_TTL_SECONDS = 10.0
+BOOKING_PREFETCH = True
+
+# Queue booking changes as durable jobs instead of calling the API inside the
+# chat request: the turn answers "processing" and the result is reported on the
+# user's next turn (or polled at /jobs/{job_id}). Failed attempts are retried
+# with exponential backoff; jobs still failing after JOB_MAX_ATTEMPTS are kept
+# in the dead_letters table.
+BOOKING_CHANGES_ASYNC = False
+JOB_QUEUE_DB_PATH = "jobs.db"
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_SECONDS = 1.0
+JOB_LEASE_SECONDS = 60.0  # A job running longer is assumed lost and run again
+JOB_WORKER_CONCURRENCY = 4
+JOB_POLL_INTERVAL_SECONDS = 0.5
+
+# Channel gateway: POST /channels/{channel}/webhook for each channel in
+# CHANNELS_ENABLED ("messenger", "zalo", "web"; comma-separated). Webhooks are
+# verified and acknowledged at once; messages run through the job queue above
+# (JOB_QUEUE_DB_PATH, shared by all workers), one at a time per user in arrival
+# order, and replies are sent back through the platform's API. With
+# CHANNEL_DELIVERY = "stub" replies are only kept in memory (see
+# GET /channels/{channel}/outbox) for local testing; use "live" to send them.
+# An empty secret disables signature checks for that channel.
+CHANNELS_ENABLED = ""
+CHANNEL_DELIVERY = "stub"
+MESSENGER_APP_SECRET = ""
+MESSENGER_VERIFY_TOKEN = ""
+MESSENGER_PAGE_ACCESS_TOKEN = ""
+ZALO_APP_ID = ""
+ZALO_OA_SECRET_KEY = ""
+ZALO_OA_ACCESS_TOKEN = ""
+WEB_CHANNEL_SECRET = ""
+WEB_CHANNEL_REPLY_URL = ""
+
+# Local mock of the Vexere booking API (/mock_vexere/*): "stateless" (format
+# checks only, ids containing "FAIL" are rejected) or "stateful" (seeded trips
+# and bookings in SQLite with seat capacity, optimistic locking and idempotency
+# keys). Use a file for MOCK_VEXERE_DB_PATH when running several workers.
+MOCK_VEXERE_MODE = "stateless"
+MOCK_VEXERE_DB_PATH = ":memory:"
+MOCK_VEXERE_BOOKINGS = 500  # Seeded as VX10000, VX10001, ...
+MOCK_VEXERE_DAYS = 7  # Days of seeded departures, starting 2025-12-25
+MOCK_VEXERE_SEAT_CAPACITY = 40
+MOCK_VEXERE_LATENCY_MS = 0.0  # Injected per request
+MOCK_VEXERE_ERROR_RATE = 0.0  # Share of requests answered with HTTP 503
+MOCK_VEXERE_SEED = 0
+
 # Add other configurations here as needed
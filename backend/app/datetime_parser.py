@@ -0,0 +1,246 @@
+import re
+import unicodedata
+from datetime import date as Date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# Vietnam has no daylight saving time, so a fixed offset is exact.
+VIETNAM_TZ = timezone(timedelta(hours=7), "Asia/Ho_Chi_Minh")
+CANONICAL_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_CANONICAL = re.compile(
+    r"\b(\d{4})-(\d{1,2})-(\d{1,2})(?:[ t]+|\s*,\s*)(\d{1,2}):(\d{2})(?::(\d{2}))?\b"
+)
+_NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/-](\d{1,2})(?:[/-](\d{4}|\d{2}))?\b")
+_ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+_VI_DATE = re.compile(r"\bngay (\d{1,2}) thang (\d{1,2})(?: nam (\d{4}))?\b")
+
+_MONTHS = {
+    "jan": 1, "january": 1, "feb": 2, "february": 2, "mar": 3, "march": 3,
+    "apr": 4, "april": 4, "may": 5, "jun": 6, "june": 6, "jul": 7, "july": 7,
+    "aug": 8, "august": 8, "sep": 9, "sept": 9, "september": 9, "oct": 10,
+    "october": 10, "nov": 11, "november": 11, "dec": 12, "december": 12,
+}
+_MONTH_NAMES = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_ORDINAL = r"(\d{1,2})(?:st|nd|rd|th)?"
+_MONTH_DAY = re.compile(rf"\b({_MONTH_NAMES})\.? {_ORDINAL}(?:,? (\d{{4}}))?\b")
+_DAY_MONTH = re.compile(rf"\b{_ORDINAL}(?: of)? ({_MONTH_NAMES})\.?(?:,? (\d{{4}}))?\b")
+
+# Relative days; "mốt" (day after tomorrow) is matched before accents are removed
+# because without accents it reads as "một" (one).
+_RELATIVE_DAYS = [
+    (re.compile(r"\b(?:the )?day after tomorrow\b|\bngay kia\b"), 2),
+    (re.compile(r"\btomorrow\b|\b(?:ngay )?mai\b"), 1),
+    (re.compile(r"\btoday\b|\btonight\b|\bhom nay\b|\b(?:toi|dem|chieu|sang|trua) nay\b"), 0),
+]
+_DAY_AFTER_TOMORROW_VI = re.compile(r"\b(?:ngày )?mốt\b")
+
+_WEEKDAYS = [
+    (re.compile(r"\b(?:mon|monday)\b|\bthu (?:hai|2)\b|\bt2\b"), 0),
+    (re.compile(r"\b(?:tue|tues|tuesday)\b|\bthu (?:ba|3)\b|\bt3\b"), 1),
+    (re.compile(r"\b(?:wed|wednesday)\b|\bthu (?:tu|4)\b|\bt4\b"), 2),
+    (re.compile(r"\b(?:thu|thur|thurs|thursday)\b(?! (?:hai|ba|tu|nam|sau|bay|\d))|\bthu (?:nam|5)\b|\bt5\b"), 3),
+    (re.compile(r"\b(?:fri|friday)\b|\bthu (?:sau|6)\b|\bt6\b"), 4),
+    (re.compile(r"\b(?:sat|saturday)\b|\bthu (?:bay|7)\b|\bt7\b"), 5),
+    (re.compile(r"\b(?:sun|sunday)\b|\bchu nhat\b|\bcn\b"), 6),
+]
+_NEXT_WEEK = re.compile(r"\bnext\b|\btuan (?:sau|toi)\b")
+
+_IN_DURATION = re.compile(
+    r"\bin (\d{1,3}) (hour|hours|hr|hrs|minute|minutes|min|mins)\b"
+    r"|\b(?:sau |trong )?(\d{1,3}) (tieng|gio|phut) nua\b"
+)
+
+_EN_TIME = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(a\.?m\.?|p\.?m\.?)(?=\W|$)")
+_VI_TIME = re.compile(
+    r"\b(\d{1,2})\s*(?:h|g|gio|:)\s*(?:(\d{1,2})\s*(?:p|phut)?|(ruoi)|kem\s*(\d{1,2})\s*(?:p|phut)?)?(?=\W|$)"
+)
+_BARE_HOUR = re.compile(
+    r"\b(?:at|luc|vao luc|vao|morning|afternoon|evening|tonight|night) (\d{1,2})\b(?![/-]\d)"
+)
+_NOON = re.compile(r"\bnoon\b|\bmidday\b|\b12h trua\b")
+_MIDNIGHT = re.compile(r"\bmidnight\b|\bnua dem\b")
+
+_PM_WORDS = re.compile(r"\b(?:afternoon|evening|tonight|chieu|toi)\b")
+_NIGHT_WORDS = re.compile(r"\b(?:night|dem|khuya)\b")
+_NOON_WORDS = re.compile(r"\btrua\b")
+_AM_WORDS = re.compile(r"\b(?:morning|sang)\b")
+
+
+def _strip_accents(text: str) -> str:
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(char for char in decomposed if unicodedata.category(char) != "Mn")
+
+
+def _safe_datetime(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> Optional[datetime]:
+    try:
+        return datetime(year, month, day, hour, minute, tzinfo=VIETNAM_TZ)
+    except ValueError:
+        return None
+
+
+def _find_date(text: str, original: str, now: datetime) -> Tuple[Optional[Tuple[int, int, int]], bool, str]:
+    """
+    ((year, month, day) or None, whether the year was given, text without the date).
+    A date without a year is returned with the current year; the caller rolls it forward.
+    """
+    match = _ISO_DATE.search(text)
+    if match:
+        year, month, day = (int(group) for group in match.groups())
+        return (year, month, day), True, text[: match.start()] + " " + text[match.end():]
+
+    for pattern in (_VI_DATE, _NUMERIC_DATE):
+        match = pattern.search(text)
+        if match:
+            day, month = int(match.group(1)), int(match.group(2))
+            year_text = match.group(3)
+            year = now.year
+            if year_text:
+                year = int(year_text) + (2000 if len(year_text) == 2 else 0)
+            return (year, month, day), bool(year_text), text[: match.start()] + " " + text[match.end():]
+
+    for pattern, month_group, day_group in ((_MONTH_DAY, 1, 2), (_DAY_MONTH, 2, 1)):
+        match = pattern.search(text)
+        if match:
+            month = _MONTHS[match.group(month_group)]
+            day = int(match.group(day_group))
+            year_text = match.group(3)
+            year = int(year_text) if year_text else now.year
+            return (year, month, day), bool(year_text), text[: match.start()] + " " + text[match.end():]
+
+    if _DAY_AFTER_TOMORROW_VI.search(original):
+        target = now + timedelta(days=2)
+        return (target.year, target.month, target.day), True, text
+    for pattern, offset in _RELATIVE_DAYS:
+        match = pattern.search(text)
+        if match:
+            target = now + timedelta(days=offset)
+            # Keep period words such as "sang mai" / "toi nay" for the time step
+            return (target.year, target.month, target.day), True, text
+
+    for pattern, weekday in _WEEKDAYS:
+        match = pattern.search(text)
+        if match:
+            days_ahead = (weekday - now.weekday()) % 7
+            if _NEXT_WEEK.search(text):
+                days_ahead = 7 - now.weekday() + weekday
+            target = now + timedelta(days=days_ahead)
+            return (target.year, target.month, target.day), True, text[: match.start()] + " " + text[match.end():]
+
+    return None, False, text
+
+
+def _find_time(text: str) -> Optional[Tuple[int, int]]:
+    """(hour, minute) on a 24-hour clock, applying period words (sáng/chiều/tối, am/pm, ...)."""
+    if _NOON.search(text):
+        return 12, 0
+    if _MIDNIGHT.search(text):
+        return 0, 0
+
+    period = None
+    match = _EN_TIME.search(text)
+    if match:
+        hour, minute = int(match.group(1)), int(match.group(2) or 0)
+        period = "pm" if match.group(3).startswith("p") else "am"
+    else:
+        match = _VI_TIME.search(text)
+        if match:
+            hour = int(match.group(1))
+            minute = int(match.group(2) or 0)
+            if match.group(3):  # "8 giờ rưỡi"
+                minute = 30
+            elif match.group(4):  # "8 giờ kém 15" = 7:45
+                hour, minute = hour - 1, 60 - int(match.group(4))
+        else:
+            match = _BARE_HOUR.search(text)
+            if not match:
+                return None
+            hour, minute = int(match.group(1)), 0
+
+    if period is None:
+        if _PM_WORDS.search(text):
+            period = "pm"
+        elif _NIGHT_WORDS.search(text):
+            period = "night"
+        elif _NOON_WORDS.search(text):
+            period = "noon"
+        elif _AM_WORDS.search(text):
+            period = "am"
+
+    if period == "pm" and hour < 12:
+        hour += 12
+    elif period == "night" and 6 <= hour < 12:
+        hour += 12
+    elif period == "night" and hour == 12:
+        hour = 0
+    elif period == "noon" and hour < 6:
+        hour += 12
+    elif period == "am" and hour == 12:
+        hour = 0
+
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        return None
+    return hour, minute
+
+
+def parse_booking_time(
+    text: str, now: Optional[datetime] = None, travel_day: Optional[Date] = None
+) -> Optional[str]:
+    """
+    Converts a free-form Vietnamese or English date/time ("8h sáng mai",
+    "tomorrow 2pm", "31/12 14:30", "thứ 2 tuần sau 9h", "in 2 hours") to
+    "YYYY-MM-DD HH:MM:SS" in Vietnam time, or returns None if it has no
+    unambiguous date and time.
+
+    Relative words are resolved against `now` (default: the current time in
+    Vietnam). Dates are read day-first. A date without a year means its next
+    occurrence, since departures lie ahead. A time without a date is on
+    `travel_day` (the booking's departure date, when known), otherwise its
+    next occurrence.
+    """
+    if not text:
+        return None
+    now = (now or datetime.now(VIETNAM_TZ)).astimezone(VIETNAM_TZ)
+    original = text.lower()
+    normalized = " ".join(_strip_accents(original).split())
+
+    match = _CANONICAL.search(normalized)
+    if match:
+        year, month, day, hour, minute = (int(group) for group in match.groups()[:5])
+        second = int(match.group(6) or 0)
+        parsed = _safe_datetime(year, month, day, hour, minute)
+        if parsed is None or second > 59:
+            return None
+        return parsed.replace(second=second).strftime(CANONICAL_FORMAT)
+
+    duration = _IN_DURATION.search(normalized)
+    if duration:
+        amount = int(duration.group(1) or duration.group(3))
+        unit = duration.group(2) or duration.group(4)
+        minutes = amount if unit.startswith("m") or unit == "phut" else amount * 60
+        return (now + timedelta(minutes=minutes)).replace(second=0).strftime(CANONICAL_FORMAT)
+
+    date, year_given, rest = _find_date(normalized, original, now)
+    time_of_day = _find_time(rest)
+    if time_of_day is None:
+        return None
+    hour, minute = time_of_day
+
+    if date is None and travel_day is not None:
+        return datetime(travel_day.year, travel_day.month, travel_day.day, hour, minute).strftime(
+            CANONICAL_FORMAT
+        )
+    if date is None:
+        parsed = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if parsed <= now:
+            parsed += timedelta(days=1)
+        return parsed.strftime(CANONICAL_FORMAT)
+
+    parsed = _safe_datetime(*date, hour, minute)
+    if parsed is None:
+        return None
+    if not year_given and parsed <= now:
+        parsed = _safe_datetime(date[0] + 1, date[1], date[2], hour, minute)
+        if parsed is None:
+            return None
+    return parsed.strftime(CANONICAL_FORMAT)
@@ -0,0 +1,95 @@
+import re
+from typing import Dict, Any, Tuple
+
+from backend.app import metrics
+from backend.app import tools
+from backend.app.language import DEFAULT_LANGUAGE
+from backend.app.settings import get_setting
+
+BOOKING_ID_PATTERN = re.compile(r"\b([A-Z]{2,}[A-Z0-9-]*\d[A-Z0-9-]*)\b")
+CHANGE_INTENT_PATTERN = re.compile(
+    r"change (?:my |the )?(?:booking|ticket|trip|bus)?\s*(?:time|date)"
+    r"|reschedule|đổi (?:giờ|ngày|vé|lịch)|doi (?:gio|ngay|ve|lich)",
+    re.IGNORECASE,
+)
+CANCEL_FLOW_PATTERN = re.compile(r"^\s*(?:cancel|stop|never ?mind|thôi|hủy bỏ|huy bo)\b", re.IGNORECASE)
+
+LIMITED_MODE_NOTICE = (
+    "Our assistant is running in limited mode right now. I can answer common "
+    "questions (cancellation, payment, luggage, support) or help you change a booking time."
+)
+
+# Turns answered without the LLM, by reason
+degraded_turns: Dict[str, int] = {"full_turn": 0, "tool_follow_up": 0}
+metrics.register("degraded_mode", lambda: dict(degraded_turns))
+
+
+def describe_tool_result(result: Dict[str, Any]) -> str:
+    """Reply built from a tool result when the follow-up LLM call is unavailable."""
+    degraded_turns["tool_follow_up"] += 1
+    for key in ("answer", "next_action_prompt", "message", "error"):
+        if result.get(key):
+            return str(result[key])
+    return "I've processed that action. How else can I help?"
+
+
+async def answer_without_llm(
+    user_id: str,
+    message: str,
+    tool_state: Dict[str, Any],
+    turn_key: str,
+    language: str = DEFAULT_LANGUAGE,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Deterministic answer for a turn while the LLM is unavailable (circuit open,
+    timeout or provider error): the change-booking flow is driven by fixed
+    prompts and pattern matching, everything else is answered from FAQ retrieval
+    (in the user's `language` when the FAQ entry has a curated translation).
+    Returns the reply and the new tool-flow state (the same shape the LLM path uses,
+    so the conversation can continue on either path).
+    """
+    degraded_turns["full_turn"] += 1
+    stage = tool_state.get("stage") if tool_state.get("flow_name") == "change_booking" else None
+
+    if stage and CANCEL_FLOW_PATTERN.search(message):
+        return "Okay, I've stopped the booking change. How else can I help?", {}
+
+    if stage == "awaiting_booking_id":
+        match = BOOKING_ID_PATTERN.search(message.upper())
+        if not match:
+            return "Please provide your booking ID (for example VX12345).", tool_state
+        result = await tools.provide_booking_id_for_change(match.group(1), user_id=user_id)
+        if result.get("status") != "booking_id_received":
+            return result.get("message", "Please provide a valid booking ID."), tool_state
+        new_state = dict(tool_state, collected_booking_id=result["booking_id"], stage="awaiting_new_time")
+        return result["next_action_prompt"], new_state
+
+    if stage == "awaiting_new_time":
+        booking_id = tool_state.get("collected_booking_id", "")
+        new_time = await tools.resolve_booking_time(booking_id, message)
+        if new_time is None:
+            return (
+                "I couldn't read a date and time in that. Please send the new departure time, "
+                "for example 31/12 14:30 or 'tomorrow 2pm'.",
+                tool_state,
+            )
+        if get_setting("BOOKING_CHANGES_ASYNC", False):
+            result = await tools.submit_booking_time_change(
+                user_id, booking_id, new_time, turn_key=turn_key
+            )
+        else:
+            result = await tools.confirm_booking_time_change(booking_id, new_time)
+        return result.get("message") or "Your booking change request has been processed.", {}
+
+    if CHANGE_INTENT_PATTERN.search(message):
+        result = tools.initiate_change_booking_time_flow()
+        tools.prefetch_user_bookings(user_id)
+        return result["next_action_prompt"], {
+            "flow_name": "change_booking",
+            "stage": "awaiting_booking_id",
+        }
+
+    matches = tools.search_faq(message, top_k=1)
+    if matches:
+        return matches[0]["localized_answers"].get(language) or matches[0]["answer"], tool_state
+    return LIMITED_MODE_NOTICE, tool_state
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import random
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from vertexai.generative_models import (
+    Part,
+)  # Responses carry the same raw parts as VertexAIAgent's
+
+from backend.app.datetime_parser import parse_booking_time
+from backend.app.messages import Message, as_message
+from backend.app.settings import get_setting
+from backend.app.speculation import FAQ_CONTEXT_HEADER, USER_MESSAGE_HEADER
+from backend.app.vertex_agent import VEXERE_TOOL_NAMES
+
+TIME_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+BOOKING_ID_PATTERN = re.compile(r"\b([A-Z]{2,}[A-Z0-9-]*\d[A-Z0-9-]*)\b")
+CHANGE_INTENT_KEYWORDS = [
+    "change my booking time",
+    "change the time",
+    "change my ticket time",
+    "reschedule",
+    "đổi giờ",
+]
+FAQ_KEYWORDS = [
+    "cancel",
+    "payment",
+    "pay for",
+    "luggage",
+    "baggage",
+    "support",
+    "contact",
+    "hủy vé",
+    "thanh toán",
+    "hành lý",
+    "hỗ trợ",
+]
+
+
+class FakeLLMAgent:
+    """
+    A deterministic, offline stand-in for VertexAIAgent.
+    It implements the same `get_gemini_response` interface and follows a small
+    rule-based script (FAQ lookups and the change-booking flow), so the full
+    `/chat` orchestration can be exercised by benchmarks and tests without
+    Vertex AI credentials. An artificial latency simulates the model round trip.
+    """
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        jitter_ms: Optional[float] = None,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = (
+            latency_ms
+            if latency_ms is not None
+            else get_setting("FAKE_LLM_LATENCY_MS", 0.0)
+        )
+        self.jitter_ms = (
+            jitter_ms
+            if jitter_ms is not None
+            else get_setting("FAKE_LLM_JITTER_MS", 0.0)
+        )
+        self._random = random.Random(seed)
+        self.model = "fake-llm"  # Truthy, like an initialized GenerativeModel
+        self.model_name = "fake-llm"
+        self.tool_names = VEXERE_TOOL_NAMES  # Scripts the same tools as VertexAIAgent
+        self.init_error = None
+        self.call_count = 0
+        self.last_model_name = self.model_name
+        self.last_system_instruction: Optional[str] = None
+        self.last_generation_config: Optional[Dict[str, Any]] = None
+        print(f"Fake LLM Agent initialized with latency: {self.latency_ms}ms")
+
+    def is_ready(self) -> bool:
+        return True
+
+    async def _simulate_latency(self) -> None:
+        delay_ms = self.latency_ms
+        if self.jitter_ms:
+            delay_ms += self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+
+    async def get_gemini_response(
+        self,
+        chat_history: List[Message],
+        user_message: str,
+        image_base64: Optional[str] = None,
+        image_mime_type: Optional[str] = None,
+        audio_base64: Optional[str] = None,
+        audio_mime_type: Optional[str] = None,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Returns a scripted response in the same format as VertexAIAgent:
+        a "text" or a "function_call" together with the "raw_model_response_part".
+        The prompt options are only recorded; `max_output_tokens` truncates texts.
+        """
+        self.call_count += 1
+        self.last_model_name = model_name or self.model_name
+        self.last_system_instruction = system_instruction
+        self.last_generation_config = generation_config
+        await self._simulate_latency()
+        chat_history = [as_message(item) for item in chat_history]
+        response = self._scripted_response(
+            chat_history, user_message, image_base64, audio_base64
+        )
+        max_output_tokens = (generation_config or {}).get("max_output_tokens")
+        if max_output_tokens and len(response.get("text", "")) > max_output_tokens * 4:
+            response = self._text(response["text"][: max_output_tokens * 4])
+        if "error" not in response:
+            response["usage"] = self._estimate_usage(chat_history, user_message, response)
+        return response
+
+    def _scripted_response(
+        self,
+        chat_history: List[Message],
+        user_message: str,
+        image_base64: Optional[str],
+        audio_base64: Optional[str],
+    ) -> Dict[str, Any]:
+        if not user_message and not chat_history and not (image_base64 or audio_base64):
+            return {"error": "Cannot send an empty message to the model."}
+
+        if chat_history and chat_history[-1].role == "function":
+            return self._text(self._summarize_tool_result(chat_history[-1]))
+
+        if image_base64 or audio_base64:
+            kind = "image" if image_base64 else "voice message"
+            return self._text(
+                f"I've received your {kind}. How can I help you with it?"
+            )
+
+        injected_answer = None
+        if user_message.startswith(FAQ_CONTEXT_HEADER):
+            injected_answer, user_message = self._split_faq_context(user_message)
+
+        called_tools = self._called_tool_names(chat_history)
+        message_lower = user_message.lower()
+
+        if "provide_booking_id_for_change" in called_tools:
+            # Like the real model, pass free-form times ("tomorrow 2pm") through as written.
+            time_match = TIME_PATTERN.search(user_message)
+            new_time = time_match.group(0) if time_match else None
+            if new_time is None and parse_booking_time(user_message):
+                new_time = user_message
+            if new_time:
+                return self._function_call(
+                    "confirm_booking_time_change",
+                    {
+                        "booking_id": self._last_booking_id(chat_history),
+                        "new_time": new_time,
+                    },
+                )
+
+        booking_id_match = BOOKING_ID_PATTERN.search(user_message)
+        if booking_id_match and "initiate_change_booking_time_flow" in called_tools:
+            return self._function_call(
+                "provide_booking_id_for_change",
+                {"booking_id": booking_id_match.group(1)},
+            )
+
+        if any(keyword in message_lower for keyword in CHANGE_INTENT_KEYWORDS):
+            return self._function_call("initiate_change_booking_time_flow", {})
+
+        if any(keyword in message_lower for keyword in FAQ_KEYWORDS):
+            if injected_answer:  # Answer from the injected snippet in one round trip
+                return self._text(injected_answer)
+            return self._function_call("get_faq_answer", {"question": user_message})
+
+        return self._text("Hello! I can answer Vexere FAQs or help you change a booking.")
+
+    @staticmethod
+    def _estimate_usage(
+        chat_history: List[Message], user_message: str, response: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """Token usage in the same shape as VertexAIAgent, estimated at ~4 characters per token."""
+        prompt_chars = len(user_message) + sum(
+            len(message.text if message.text is not None else message.payload)
+            for message in chat_history
+        )
+        completion_chars = len(response.get("text") or json.dumps(response.get("function_call")))
+        prompt_tokens = prompt_chars // 4 + 1
+        completion_tokens = completion_chars // 4 + 1
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    @staticmethod
+    def _split_faq_context(message: str) -> Tuple[Optional[str], str]:
+        """(first injected FAQ answer, original user message) of an "[FAQ context]" message."""
+        context, _, user_message = message.partition(f"\n{USER_MESSAGE_HEADER}\n")
+        for line in context.splitlines():
+            if line.startswith("A: "):
+                return line[len("A: "):], user_message
+        return None, user_message
+
+    @staticmethod
+    def _text(text: str) -> Dict[str, Any]:
+        return {"text": text, "raw_model_response_part": Part.from_text(text)}
+
+    @staticmethod
+    def _function_call(name: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "function_call": {"name": name, "args": args},
+            "raw_model_response_part": Part.from_dict(
+                {"function_call": {"name": name, "args": args}}
+            ),
+        }
+
+    @staticmethod
+    def _called_tool_names(chat_history: List[Message]) -> List[str]:
+        return [message.name for message in chat_history if message.is_function_call]
+
+    @staticmethod
+    def _last_booking_id(chat_history: List[Message]) -> str:
+        for message in reversed(chat_history):
+            if message.is_function_call and message.name == "provide_booking_id_for_change":
+                return str(message.data().get("booking_id", ""))
+        return ""
+
+    @staticmethod
+    def _summarize_tool_result(function_message: Message) -> str:
+        response = function_message.data() if function_message.is_function_response else {}
+        result = (response or {}).get("content", {})
+        for key in ("answer", "next_action_prompt", "message", "error"):
+            if result.get(key):
+                return str(result[key])
+        return "I've processed that action. How else can I help?"
@@ -0,0 +1,216 @@
+import json
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Dict, Any, Optional
+
+# Binary FAQ index written by `faq_ingest` and read through mmap, so a worker
+# "loads" tens of thousands of chunks without parsing or copying them:
+#
+#   header      magic, version, counts, then (offset, length) of each section
+#   chunks      uint32 offsets into chunk_blob: id, question, answer, source and
+#               localized answers (a JSON object, or empty) per chunk
+#   chunk_blob  UTF-8 text
+#   keywords    uint32 offsets into keyword_blob, keywords sorted by UTF-8 bytes
+#   kw_blob     UTF-8 keywords
+#   postings    uint32 offsets into posting_ids, one range per keyword
+#   posting_ids uint32 chunk numbers, ascending
+#
+# All integers are little-endian and sections are 4-byte aligned.
+INDEX_MAGIC = b"VXFAQIDX"
+INDEX_VERSION = 2
+CHUNK_FIELDS = ("id", "question", "answer", "source", "localized_answers")
+SECTIONS = ("chunks", "chunk_blob", "keywords", "keyword_blob", "postings", "posting_ids")
+_HEADER = struct.Struct("<8sIIII" + "II" * len(SECTIONS))
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased NFC words; ingestion and lookups must tokenize alike."""
+    return _WORD_RE.findall(unicodedata.normalize("NFC", text).lower())
+
+
+def normalize_keyword(keyword: str) -> str:
+    return " ".join(tokenize(keyword))
+
+
+def _uint32_bytes(values: Iterable[int]) -> bytes:
+    values = list(values)
+    return struct.pack(f"<{len(values)}I", *values)
+
+
+def _offsets_and_blob(strings: Iterable[str]):
+    offsets, parts, position = [0], [], 0
+    for string in strings:
+        encoded = string.encode("utf-8")
+        parts.append(encoded)
+        position += len(encoded)
+        offsets.append(position)
+    return _uint32_bytes(offsets), b"".join(parts)
+
+
+def write_index(path: str, chunks: List[Dict[str, Any]]) -> int:
+    """
+    Writes `chunks` ({"id", "question", "answer", "source", "keywords" and
+    optionally "localized_answers"}) as an index file, atomically (a running worker keeps its mapping of the old
+    file). Returns the file size.
+    """
+    postings: Dict[bytes, List[int]] = {}
+    max_keyword_words = 1
+    for number, chunk in enumerate(chunks):
+        for keyword in {normalize_keyword(keyword) for keyword in chunk.get("keywords", [])}:
+            if keyword:
+                postings.setdefault(keyword.encode("utf-8"), []).append(number)
+                max_keyword_words = max(max_keyword_words, keyword.count(" ") + 1)
+    keywords = sorted(postings)
+
+    chunk_offsets, chunk_blob = _offsets_and_blob(
+        json.dumps(chunk[field], ensure_ascii=False) if field == "localized_answers" and chunk.get(field)
+        else str(chunk.get(field) or "")
+        for chunk in chunks
+        for field in CHUNK_FIELDS
+    )
+    keyword_offsets, keyword_blob = _offsets_and_blob(keyword.decode("utf-8") for keyword in keywords)
+    posting_offsets, position = [0], 0
+    for keyword in keywords:
+        position += len(postings[keyword])
+        posting_offsets.append(position)
+    posting_ids = _uint32_bytes(number for keyword in keywords for number in postings[keyword])
+    sections = [
+        chunk_offsets,
+        chunk_blob,
+        keyword_offsets,
+        keyword_blob,
+        _uint32_bytes(posting_offsets),
+        posting_ids,
+    ]
+
+    layout, offset = [], _HEADER.size
+    for data in sections:
+        layout += [offset, len(data)]
+        offset += len(data) + (-len(data) % 4)
+    header = _HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(chunks), len(keywords), max_keyword_words, *layout)
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header)
+        for data in sections:
+            f.write(data + b"\0" * (-len(data) % 4))
+    os.replace(temporary_path, path)
+    return offset
+
+
+class FaqIndex:
+    """
+    Read-only view of an index file. Opening it maps the file and reads the
+    header; chunks and postings are decoded only when a search touches them.
+    `search` matches the question's word n-grams against chunk keywords and
+    ranks chunks by matched keywords, like `tools.search_faq` on faq_data.json.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # Identifies the file that was mapped: a re-ingest replaces it (see write_index).
+            self.file_id = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, self.chunk_count, self.keyword_count, self.max_keyword_words, *layout = (
+            _HEADER.unpack_from(view)
+        )
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            view.release()
+            self._mmap.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} FAQ index.")
+        sections = {
+            name: view[layout[2 * i] : layout[2 * i] + layout[2 * i + 1]]
+            for i, name in enumerate(SECTIONS)
+        }
+        self._chunk_offsets = sections["chunks"].cast("I")
+        self._chunk_blob = sections["chunk_blob"]
+        self._keyword_offsets = sections["keywords"].cast("I")
+        self._keyword_blob = sections["keyword_blob"]
+        self._posting_offsets = sections["postings"].cast("I")
+        self._posting_ids = sections["posting_ids"].cast("I")
+        # Every view must be released before the mapping can be closed.
+        self._views = [
+            self._chunk_offsets,
+            self._keyword_offsets,
+            self._posting_offsets,
+            self._posting_ids,
+            *sections.values(),
+            view,
+        ]
+
+    def __len__(self) -> int:
+        return self.chunk_count
+
+    def _keyword(self, number: int) -> bytes:
+        return bytes(self._keyword_blob[self._keyword_offsets[number] : self._keyword_offsets[number + 1]])
+
+    def _find_keyword(self, keyword: bytes) -> int:
+        low, high = 0, self.keyword_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._keyword(middle) < keyword:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < self.keyword_count and self._keyword(low) == keyword else -1
+
+    def chunk(self, number: int) -> Dict[str, str]:
+        base = number * len(CHUNK_FIELDS)
+        offsets = self._chunk_offsets
+        return {
+            field: bytes(self._chunk_blob[offsets[base + i] : offsets[base + i + 1]]).decode("utf-8")
+            for i, field in enumerate(CHUNK_FIELDS)
+        }
+
+    def search(self, question: str, top_k: int = 1) -> List[Dict[str, Any]]:
+        """Up to `top_k` chunks as {"id", "question", "answer", "localized_answers", "score"}, best first."""
+        words = tokenize(question)
+        scores: Counter = Counter()
+        seen = set()
+        for size in range(1, self.max_keyword_words + 1):
+            for start in range(len(words) - size + 1):
+                gram = " ".join(words[start : start + size])
+                if gram in seen:
+                    continue
+                seen.add(gram)
+                number = self._find_keyword(gram.encode("utf-8"))
+                if number >= 0:
+                    for position in range(self._posting_offsets[number], self._posting_offsets[number + 1]):
+                        scores[self._posting_ids[position]] += 1
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+        results = []
+        for number, score in best:
+            chunk = self.chunk(number)
+            results.append(
+                {
+                    "id": chunk["id"],
+                    "question": chunk["question"],
+                    "answer": chunk["answer"],
+                    "localized_answers": json.loads(chunk["localized_answers"] or "{}"),
+                    "score": score,
+                }
+            )
+        return results
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+
+def open_index(path: str) -> Optional[FaqIndex]:
+    """The index at `path`, or None (with a warning) when it is missing or invalid."""
+    try:
+        return FaqIndex(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Warning: FAQ index {path} could not be opened: {e}")
+        return None
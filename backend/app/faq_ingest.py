@@ -0,0 +1,478 @@
+"""
+Incremental ingestion of knowledge-base documents into the FAQ index.
+
+Reads Markdown, HTML, CSV (help-center exports), JSON (faq_data.json format)
+and plain-text sources, splits them into chunks (one per heading section or
+CSV row, long sections split at paragraph boundaries), extracts keywords by
+TF-IDF where a source gives none, drops chunks whose content was already seen
+(content hash) and writes the memory-mapped index read by `get_faq_answer`
+(set FAQ_INDEX_PATH). Sources are processed in parallel across cores; on a
+re-run only sources whose content changed are processed again, the others
+come from a cache next to the index.
+
+Run from the project root:
+    python -m backend.app.faq_ingest docs/help-center backend/app/faq_data.json \
+        --index faq_index.bin
+"""
+
+import argparse
+import csv
+import hashlib
+import heapq
+import io
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.app.faq_index import INDEX_VERSION, normalize_keyword, open_index, tokenize, write_index
+
+SUPPORTED_EXTENSIONS = (".md", ".markdown", ".html", ".htm", ".csv", ".json", ".txt")
+DEFAULT_CHUNK_CHARS = 1500
+DEFAULT_KEYWORDS_PER_CHUNK = 8
+LOCALIZED_ANSWER_COLUMN = re.compile(r"^answer_[a-z]{2}$")  # CSV, e.g. "answer_vi"
+QUESTION_TERM_WEIGHT = 3  # Heading/question words say more about a chunk than body words
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be been but by can could do does for from has have how i if in into is it
+    its me my no not of on or our please so than that the their them then there these they this to
+    up was we were what when where which who why will with would you your yes also about any all
+    và là của có cho các được không những một này với để khi thì đã sẽ đang ở trong tại bạn tôi
+    chúng ta như theo nếu hoặc hay làm gì nào bao nhiêu vui lòng xin cảm ơn rồi cũng vì nên
+    """.split()
+)
+
+csv.field_size_limit(16 * 1024 * 1024)
+
+
+# --- Parsing and chunking ---
+
+
+def split_markdown_sections(text: str) -> List[Tuple[str, str]]:
+    """(heading, body) per Markdown heading; text before the first heading has no heading."""
+    sections, heading, lines = [], "", []
+    for line in text.splitlines():
+        match = re.match(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$", line)
+        if match:
+            if any(part.strip() for part in lines):
+                sections.append((heading, "\n".join(lines).strip()))
+            heading, lines = match.group(1), []
+        else:
+            lines.append(line)
+    if any(part.strip() for part in lines):
+        sections.append((heading, "\n".join(lines).strip()))
+    return sections
+
+
+class _HtmlSections(HTMLParser):
+    """Collects (heading, body) sections of an HTML page; h1-h3 start a section."""
+
+    HEADINGS = ("h1", "h2", "h3")
+    SKIPPED = ("script", "style", "nav", "footer", "header", "noscript")
+    BLOCKS = ("p", "div", "li", "br", "tr", "section", "article", "h4", "h5", "h6")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[Tuple[str, str]] = []
+        self._heading, self._heading_parts, self._body = "", [], []
+        self._in_heading = False
+        self._skip_depth = 0
+
+    def _flush(self) -> None:
+        body = re.sub(r"[ \t]+", " ", "".join(self._body))
+        body = re.sub(r"\s*\n\s*", "\n\n", body).strip()
+        if body:
+            self.sections.append((self._heading, body))
+        self._body = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skip_depth += 1
+        elif tag in self.HEADINGS and not self._skip_depth:
+            self._flush()
+            self._in_heading, self._heading_parts = True, []
+        elif tag in self.BLOCKS:
+            self._body.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.HEADINGS and self._in_heading:
+            self._in_heading = False
+            self._heading = " ".join("".join(self._heading_parts).split())
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        (self._heading_parts if self._in_heading else self._body).append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def split_html_sections(text: str) -> List[Tuple[str, str]]:
+    parser = _HtmlSections()
+    parser.feed(text)
+    parser.close()
+    return parser.sections
+
+
+def split_long_text(text: str, max_chars: int) -> List[str]:
+    """Splits `text` at paragraph (then sentence) boundaries into pieces of at most ~max_chars."""
+    pieces, current = [], ""
+    paragraphs = [paragraph.strip() for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+    for paragraph in paragraphs:
+        parts = [paragraph] if len(paragraph) <= max_chars else re.split(r"(?<=[.!?])\s+", paragraph)
+        for number, part in enumerate(parts):
+            separator = " " if number else "\n\n"  # Sentences of one paragraph stay on one line
+            if current and len(current) + len(separator) + len(part) > max_chars:
+                pieces.append(current)
+                current = ""
+            current = f"{current}{separator}{part}" if current else part
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _csv_value(row: Dict[str, str], *names: str) -> str:
+    for name in names:
+        if row.get(name):
+            return row[name].strip()
+    return ""
+
+
+def read_entries(path: str, data: bytes, max_chars: int) -> List[Dict[str, Any]]:
+    """
+    The chunks of one source as {"id", "question", "answer", "keywords"}, plus
+    "localized_answers" ({language: answer}) from JSON entries and CSV
+    `answer_<language>` columns.
+    """
+    text = data.decode("utf-8-sig", errors="replace")
+    extension = os.path.splitext(path)[1].lower()
+    base_id = os.path.basename(path)
+
+    if extension == ".json":
+        return [
+            {
+                "id": str(item.get("id") or f"{base_id}#{number}"),
+                "question": item.get("question", ""),
+                "answer": item.get("answer", ""),
+                "keywords": list(item.get("keywords") or []),
+                "localized_answers": dict(item.get("localized_answers") or {}),
+            }
+            for number, item in enumerate(json.loads(text))
+            if item.get("answer")
+        ]
+    if extension == ".csv":
+        entries = []
+        rows = csv.DictReader(io.StringIO(text))
+        for number, row in enumerate(rows):
+            row = {(key or "").strip().lower(): value or "" for key, value in row.items()}
+            answer = _csv_value(row, "answer", "body", "content", "text")
+            if not answer:
+                continue
+            keywords = _csv_value(row, "keywords", "tags")
+            entries.append(
+                {
+                    "id": _csv_value(row, "id") or f"{base_id}#{number}",
+                    "question": _csv_value(row, "question", "title", "subject"),
+                    "answer": answer,
+                    "keywords": [keyword.strip() for keyword in re.split(r"[;,|]", keywords) if keyword.strip()],
+                    "localized_answers": {
+                        key[len("answer_") :]: value.strip()
+                        for key, value in row.items()
+                        if LOCALIZED_ANSWER_COLUMN.match(key) and value.strip()
+                    },
+                }
+            )
+        return entries
+
+    if extension in (".html", ".htm"):
+        sections = split_html_sections(text)
+    elif extension in (".md", ".markdown"):
+        sections = split_markdown_sections(text)
+    else:
+        sections = [("", text)]
+    entries = []
+    for heading, body in sections:
+        for piece in split_long_text(body, max_chars):
+            entries.append(
+                {"id": f"{base_id}#{len(entries)}", "question": heading, "answer": piece, "keywords": []}
+            )
+    return entries
+
+
+def term_counts(question: str, answer: str) -> Dict[str, int]:
+    """Candidate keywords (non-stopword words and word pairs) with their weighted counts."""
+    counts: Counter = Counter()
+    for text, weight in ((question, QUESTION_TERM_WEIGHT), (answer, 1)):
+        words = tokenize(text)
+        for index, word in enumerate(words):
+            if word in STOPWORDS or len(word) < 2 or word.isdigit():
+                continue
+            counts[word] += weight
+            if index + 1 < len(words):
+                following = words[index + 1]
+                if following not in STOPWORDS and len(following) > 1 and not following.isdigit():
+                    counts[f"{word} {following}"] += weight
+    return dict(counts)
+
+
+def process_source(path: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> Dict[str, Any]:
+    """Reads, hashes and chunks one source (runs in a worker process)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    chunks = read_entries(path, data, max_chars)
+    for chunk in chunks:
+        chunk["terms"] = term_counts(chunk["question"], chunk["answer"])
+    return {"path": path, "sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data), "chunks": chunks}
+
+
+def select_keywords(chunks: List[Dict[str, Any]], per_chunk: int) -> None:
+    """Sets the keywords of chunks without manual ones to their top TF-IDF terms."""
+    document_frequency: Counter = Counter()
+    for chunk in chunks:
+        document_frequency.update(chunk["terms"].keys())
+    total = len(chunks)
+    idf = {term: math.log((1 + total) / (1 + count)) for term, count in document_frequency.items()}
+    for chunk in chunks:
+        if chunk["keywords"]:
+            continue
+        terms = chunk["terms"]
+        chunk["keywords"] = heapq.nlargest(per_chunk, terms, key=lambda term: (terms[term] * idf[term], term))
+
+
+def content_hash(chunk: Dict[str, Any]) -> str:
+    return hashlib.sha1(normalize_keyword(chunk["answer"]).encode("utf-8")).hexdigest()
+
+
+# --- Incremental cache ---
+
+
+class IngestCache:
+    """
+    Chunks of each processed source with its size, mtime and content hash
+    (SQLite). A cache written for another index version is discarded, so every
+    source is read again.
+    """
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path)
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS sources")
+            self._connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+            "mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL, chunks TEXT NOT NULL)"
+        )
+
+    def entries(self) -> Dict[str, Tuple[int, int, str, str]]:
+        rows = self._connection.execute("SELECT path, size, mtime_ns, sha256, chunks FROM sources")
+        return {row[0]: row[1:] for row in rows}
+
+    def chunks(self, path: str) -> List[Dict[str, Any]]:
+        row = self._connection.execute("SELECT chunks FROM sources WHERE path = ?", (path,)).fetchone()
+        return json.loads(row[0])
+
+    def put(self, path: str, size: int, mtime_ns: int, sha256: str, chunks: List[Dict[str, Any]]) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, sha256, json.dumps(chunks, ensure_ascii=False)),
+        )
+
+    def touch(self, path: str, size: int, mtime_ns: int) -> None:
+        self._connection.execute(
+            "UPDATE sources SET size = ?, mtime_ns = ? WHERE path = ?", (size, mtime_ns, path)
+        )
+
+    def remove(self, path: str) -> None:
+        self._connection.execute("DELETE FROM sources WHERE path = ?", (path,))
+
+    def commit(self) -> None:
+        self._connection.commit()
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def find_sources(paths: List[str]) -> List[str]:
+    """Supported files under `paths` (files or directories), sorted."""
+    found = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in os.walk(path):
+                found.update(
+                    os.path.join(directory, name)
+                    for name in names
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS)
+                )
+        elif os.path.isfile(path):
+            found.add(path)
+        else:
+            raise FileNotFoundError(f"Source {path} does not exist.")
+    return sorted(os.path.abspath(path) for path in found)
+
+
+def ingest(
+    paths: List[str],
+    index_path: str,
+    workers: Optional[int] = None,
+    max_chars: int = DEFAULT_CHUNK_CHARS,
+    keywords_per_chunk: int = DEFAULT_KEYWORDS_PER_CHUNK,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Brings the index at `index_path` up to date with `paths`; returns run statistics."""
+    started = time.perf_counter()
+    sources = find_sources(paths)
+    cache = IngestCache(f"{index_path}.cache.db")
+    try:
+        cached = cache.entries()
+        changed = []
+        for path in sources:
+            stat = os.stat(path)
+            entry = cached.get(path)
+            if force or not entry or entry[:2] != (stat.st_size, stat.st_mtime_ns):
+                changed.append(path)  # New, or size/mtime differ: read it and compare hashes
+        source_set = set(sources)
+        removed = [path for path in cached if path not in source_set]
+
+        results = []
+        if changed:
+            if workers == 1 or len(changed) == 1:
+                results = [process_source(path, max_chars) for path in changed]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(
+                        pool.map(
+                            process_source,
+                            changed,
+                            [max_chars] * len(changed),
+                            chunksize=max(1, len(changed) // (4 * (workers or os.cpu_count() or 1))),
+                        )
+                    )
+        processed_at = time.perf_counter()
+
+        sources_changed = 0
+        for result in results:
+            stat = os.stat(result["path"])
+            entry = cached.get(result["path"])
+            if entry and entry[2] == result["sha256"] and not force:
+                cache.touch(result["path"], stat.st_size, stat.st_mtime_ns)  # Touched, same content
+            else:
+                cache.put(result["path"], stat.st_size, stat.st_mtime_ns, result["sha256"], result["chunks"])
+                sources_changed += 1
+        for path in removed:
+            cache.remove(path)
+        cache.commit()
+
+        stats: Dict[str, Any] = {
+            "sources": len(sources),
+            "sources_processed": len(results),
+            "sources_changed": sources_changed,
+            "sources_removed": len(removed),
+            "bytes_processed": sum(result["bytes"] for result in results),
+            "processing_seconds": round(processed_at - started, 3),
+        }
+        if not (sources_changed or removed or force) and os.path.exists(index_path):
+            stats.update({"index_written": False, "total_seconds": round(time.perf_counter() - started, 3)})
+            return stats
+
+        chunks, seen, duplicates = [], set(), 0
+        for path in sources:
+            source = os.path.relpath(path)
+            for chunk in cache.chunks(path):
+                digest = content_hash(chunk)
+                if digest in seen:
+                    duplicates += 1
+                    continue
+                seen.add(digest)
+                chunk["source"] = source
+                chunks.append(chunk)
+        select_keywords(chunks, keywords_per_chunk)
+        stats.update(
+            {
+                "index_written": True,
+                "chunks": len(chunks),
+                "duplicate_chunks": duplicates,
+                "index_bytes": write_index(index_path, chunks),
+                "total_seconds": round(time.perf_counter() - started, 3),
+            }
+        )
+        return stats
+    finally:
+        cache.close()
+
+
+def measure_index(index_path: str, probes: int = 200) -> Dict[str, Any]:
+    """Time to open the index and to search it with chunk questions."""
+    started = time.perf_counter()
+    index = open_index(index_path)
+    open_ms = (time.perf_counter() - started) * 1000
+    if index is None:
+        return {}
+    try:
+        step = max(1, len(index) // probes)
+        questions = []
+        for number in range(0, len(index), step):
+            chunk = index.chunk(number)
+            questions.append(chunk["question"] or chunk["answer"][:80])
+        timings = []
+        for question in questions[:probes]:
+            started = time.perf_counter()
+            index.search(question, top_k=1)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    finally:
+        index.close()
+    timings.sort()
+    return {
+        "open_ms": round(open_ms, 3),
+        "search_us_p50": round(timings[len(timings) // 2], 1) if timings else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sources", nargs="+", help="Files or directories to ingest.")
+    parser.add_argument("--index", default="faq_index.bin", help="Index file (the cache is <index>.cache.db).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes parsing changed sources.")
+    parser.add_argument("--chunk-chars", type=int, default=DEFAULT_CHUNK_CHARS)
+    parser.add_argument("--keywords-per-chunk", type=int, default=DEFAULT_KEYWORDS_PER_CHUNK)
+    parser.add_argument("--force", action="store_true", help="Reprocess every source.")
+    args = parser.parse_args()
+
+    stats = ingest(
+        args.sources, args.index, args.workers, args.chunk_chars, args.keywords_per_chunk, args.force
+    )
+    seconds = max(stats["processing_seconds"], 1e-9)
+    print(
+        f"{stats['sources']} sources: {stats['sources_processed']} processed "
+        f"({stats['sources_changed']} changed), {stats['sources_removed']} removed"
+    )
+    if stats["sources_processed"]:
+        print(
+            f"Throughput: {stats['sources_processed'] / seconds:.1f} sources/s, "
+            f"{stats['bytes_processed'] / seconds / 1_000_000:.2f} MB/s"
+        )
+    if not stats["index_written"]:
+        print(f"{args.index} is up to date.")
+        return
+    print(
+        f"Wrote {stats['chunks']} chunks ({stats['duplicate_chunks']} duplicates dropped) to {args.index}: "
+        f"{stats['index_bytes']} bytes in {stats['total_seconds']} s "
+        f"({stats['chunks'] / max(stats['total_seconds'], 1e-9):.0f} chunks/s)"
+    )
+    measured = measure_index(args.index)
+    if measured:
+        print(f"Index opens in {measured['open_ms']} ms; search p50 {measured['search_us_p50']} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import asyncio
+import math
+import random
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+from backend.app import metrics
+from backend.app.http_io import loads
+from backend.app.settings import get_setting
+
+# Components that can be wrapped, and the faults each of them can produce.
+FAULT_KINDS_BY_TARGET = {
+    "llm": ("timeout", "error_429", "error_5xx", "empty_candidates", "empty_parts", "part_without_content"),
+    "booking_http": ("timeout", "error_429", "error_5xx", "malformed_json"),
+    "session_store": ("timeout", "error_5xx"),
+}
+LATENCY_DISTRIBUTIONS = {
+    "fixed": ("ms",),
+    "uniform": ("low", "high"),
+    "exponential": ("mean",),
+    "lognormal": ("median", "sigma"),
+}
+# Gemini responses the SDK can return but the agent must survive
+MALFORMED_LLM_RESPONSES = {
+    "empty_candidates": {"candidates": []},
+    "empty_parts": {"candidates": [{"content": {"role": "model", "parts": []}}]},
+    "part_without_content": {"candidates": [{"content": {"role": "model", "parts": [{}]}}]},
+}
+
+
+class FaultInjector:
+    """
+    Decides, for each call to one wrapped component, the injected latency
+    (sampled from `latency`, e.g. {"distribution": "lognormal", "median": 300,
+    "sigma": 0.8} in ms) and the fault, if any: either the next entry of a
+    scripted `schedule` ("ok" or a fault kind; restarted when `repeat` is set)
+    or drawn at random from `faults` (fault kind -> probability). A "timeout"
+    waits `timeout_ms` before failing, so callers with shorter deadlines
+    time out themselves.
+    """
+
+    def __init__(
+        self,
+        target: str,
+        latency: Optional[Dict[str, Any]] = None,
+        faults: Optional[Dict[str, float]] = None,
+        schedule: Optional[List[str]] = None,
+        repeat: bool = True,
+        timeout_ms: float = 30000.0,
+        seed: int = 0,
+    ):
+        if target not in FAULT_KINDS_BY_TARGET:
+            raise ValueError(
+                f"Unknown fault injection target '{target}'. Valid values: {', '.join(FAULT_KINDS_BY_TARGET)}"
+            )
+        kinds = FAULT_KINDS_BY_TARGET[target]
+        for kind in list(faults or {}) + [entry for entry in schedule or [] if entry != "ok"]:
+            if kind not in kinds:
+                raise ValueError(f"Fault '{kind}' is not supported for '{target}'. Valid values: {', '.join(kinds)}")
+        if sum((faults or {}).values()) > 1:
+            raise ValueError(f"Fault probabilities for '{target}' add up to more than 1.")
+        if latency is not None:
+            distribution = latency.get("distribution", "fixed")
+            if distribution not in LATENCY_DISTRIBUTIONS:
+                raise ValueError(
+                    f"Unknown latency distribution '{distribution}'. Valid values: {', '.join(LATENCY_DISTRIBUTIONS)}"
+                )
+            missing = [name for name in LATENCY_DISTRIBUTIONS[distribution] if name not in latency]
+            if missing:
+                raise ValueError(f"Latency distribution '{distribution}' for '{target}' needs {missing}.")
+        self.target = target
+        self.latency = latency
+        self.faults = dict(faults or {})
+        self.schedule = list(schedule or [])
+        self.repeat = repeat
+        self.timeout_ms = timeout_ms
+        self._random = random.Random(f"{seed}:{target}")
+        self._calls = 0
+        self.injected = {kind: 0 for kind in kinds}
+        self.added_latency_ms = 0.0
+
+    def sample_latency_ms(self) -> float:
+        if not self.latency:
+            return 0.0
+        distribution = self.latency.get("distribution", "fixed")
+        if distribution == "fixed":
+            return float(self.latency["ms"])
+        if distribution == "uniform":
+            return self._random.uniform(self.latency["low"], self.latency["high"])
+        if distribution == "exponential":
+            return self._random.expovariate(1.0 / self.latency["mean"]) if self.latency["mean"] > 0 else 0.0
+        return self._random.lognormvariate(math.log(self.latency["median"]), self.latency["sigma"])
+
+    def next_fault(self) -> Optional[str]:
+        """The fault for the next call, or None to let it through."""
+        call = self._calls
+        self._calls += 1
+        if self.schedule and (self.repeat or call < len(self.schedule)):
+            entry = self.schedule[call % len(self.schedule)]
+            return None if entry == "ok" else entry
+        roll = self._random.random()
+        for kind, probability in self.faults.items():
+            if roll < probability:
+                return kind
+            roll -= probability
+        return None
+
+    async def apply(self) -> Optional[str]:
+        """Waits the sampled latency (plus `timeout_ms` for a timeout) and returns the fault, if any."""
+        delay_ms = self.sample_latency_ms()
+        fault = self.next_fault()
+        if fault is not None:
+            self.injected[fault] += 1
+        if fault == "timeout":
+            delay_ms += self.timeout_ms
+        if delay_ms > 0:
+            self.added_latency_ms += delay_ms
+            await asyncio.sleep(delay_ms / 1000.0)
+        return fault
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self._calls,
+            "injected": dict(self.injected),
+            "added_latency_ms": round(self.added_latency_ms, 1),
+        }
+
+
+class FaultInjectingAgent:
+    """Wraps an LLM agent (VertexAIAgent or FakeLLMAgent); other attributes are the agent's."""
+
+    def __init__(self, agent: Any, injector: FaultInjector):
+        self.agent = agent
+        self.injector = injector
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.agent, name)
+
+    async def get_gemini_response(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        fault = await self.injector.apply()
+        if fault is None:
+            return await self.agent.get_gemini_response(*args, **kwargs)
+        if fault in MALFORMED_LLM_RESPONSES:
+            # Parsed like a real response, so the agent's handling is what gets tested
+            from vertexai.generative_models import GenerationResponse
+
+            from backend.app.vertex_agent import parse_gemini_response
+
+            return parse_gemini_response(GenerationResponse.from_dict(MALFORMED_LLM_RESPONSES[fault]))
+        status = {"timeout": "504 Deadline Exceeded", "error_429": "429 Resource exhausted"}.get(
+            fault, "503 Service Unavailable"
+        )
+        return {
+            "error": f"An error occurred while communicating with the AI model: {status} (injected fault)",
+            "provider_error": True,
+        }
+
+
+class FaultInjectingTransport(httpx.AsyncBaseTransport):
+    """httpx transport for the booking API client: injected faults, else the real transport."""
+
+    def __init__(self, injector: FaultInjector, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.injector = injector
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        fault = await self.injector.apply()
+        if fault is None:
+            return await self.inner.handle_async_request(request)
+        if fault == "timeout":
+            raise httpx.ReadTimeout("Read timed out (injected fault)", request=request)
+        if fault == "malformed_json":
+            return httpx.Response(200, content=b'{"success": tr', request=request)
+        status_code = 429 if fault == "error_429" else 503
+        return httpx.Response(
+            status_code,
+            json={"success": False, "message": f"HTTP {status_code} (injected fault)"},
+            request=request,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class FaultInjectingSessionStore:
+    """Wraps a session store; load and save may be delayed or fail."""
+
+    def __init__(self, store: Any, injector: FaultInjector):
+        self.store = store
+        self.injector = injector
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.store, name)
+
+    async def _inject(self, operation: str) -> None:
+        fault = await self.injector.apply()
+        if fault == "timeout":
+            raise TimeoutError(f"Session store {operation} timed out (injected fault)")
+        if fault is not None:
+            raise ConnectionError(f"Session store unavailable during {operation} (injected fault)")
+
+    async def load(self, user_id: str) -> Any:
+        await self._inject("load")
+        return await self.store.load(user_id)
+
+    async def save(self, user_id: str, record: Any) -> int:
+        await self._inject("save")
+        return await self.store.save(user_id, record)
+
+
+def parse_fault_plan(plan: Any, seed: int = 0) -> Dict[str, FaultInjector]:
+    """
+    Injectors from the FAULT_INJECTION setting: a dict of target ("llm",
+    "booking_http", "session_store") to {"latency", "faults", "schedule",
+    "repeat", "timeout_ms"} (or the same as a JSON string, e.g. from the
+    environment). Empty means no fault injection.
+    """
+    if isinstance(plan, (str, bytes)):
+        plan = loads(plan) if plan.strip() else {}
+    return {
+        target: FaultInjector(target, seed=seed, **definition)
+        for target, definition in (plan or {}).items()
+    }
+
+
+_fault_injectors: Optional[Dict[str, FaultInjector]] = None
+
+
+def get_fault_injector(target: str) -> Optional[FaultInjector]:
+    """This worker's injector for `target`, or None when FAULT_INJECTION does not cover it."""
+    global _fault_injectors
+    if _fault_injectors is None:
+        _fault_injectors = parse_fault_plan(
+            get_setting("FAULT_INJECTION", {}), seed=get_setting("FAULT_INJECTION_SEED", 0)
+        )
+        if _fault_injectors:
+            print(f"Fault injection enabled for: {', '.join(_fault_injectors)}")
+            metrics.register(
+                "faults", lambda: {target: injector.stats() for target, injector in _fault_injectors.items()}
+            )
+    return _fault_injectors.get(target)
+
+
+def wrap_agent(agent: Any) -> Any:
+    injector = get_fault_injector("llm")
+    return FaultInjectingAgent(agent, injector) if injector and agent is not None else agent
+
+
+def wrap_session_store(store: Any) -> Any:
+    injector = get_fault_injector("session_store")
+    return FaultInjectingSessionStore(store, injector) if injector else store
+
+
+def booking_http_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """The transport for the tools' HTTP client; None keeps httpx's default."""
+    injector = get_fault_injector("booking_http")
+    return FaultInjectingTransport(injector) if injector else None
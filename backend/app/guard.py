@@ -0,0 +1,227 @@
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, Tuple
+
+from backend.app import metrics
+from backend.app.coalescing import normalize_prompt
+from backend.app.language import DEFAULT_LANGUAGE
+from backend.app.settings import get_setting
+
+GUARD_REASONS = ("empty", "too_long", "injection", "abusive", "off_topic", "duplicate")
+
+# Canned replies by reason and language; "duplicate" repeats the previous reply instead.
+CANNED_RESPONSES: Dict[str, Dict[str, str]] = {
+    "empty": {
+        "en": "Please type your question about your Vexere booking or trip.",
+        "vi": "Bạn vui lòng nhập câu hỏi về vé hoặc chuyến đi của bạn trên Vexere.",
+    },
+    "too_long": {
+        "en": "Your message is too long. Please send a shorter question about your booking or trip.",
+        "vi": "Tin nhắn của bạn quá dài. Bạn vui lòng gửi câu hỏi ngắn hơn về vé hoặc chuyến đi.",
+    },
+    "injection": {
+        "en": "I can only help with Vexere bookings: FAQs (cancellation, payment, luggage, support) and changing a booking time.",
+        "vi": "Mình chỉ hỗ trợ các vấn đề về vé Vexere: câu hỏi thường gặp (hủy vé, thanh toán, hành lý, hỗ trợ) và đổi giờ vé.",
+    },
+    "abusive": {
+        "en": "I'm here to help with your Vexere booking. Please keep the conversation respectful.",
+        "vi": "Mình luôn sẵn sàng hỗ trợ bạn về vé Vexere. Bạn vui lòng giữ lời lẽ lịch sự nhé.",
+    },
+    "off_topic": {
+        "en": "Sorry, I can only help with Vexere bus tickets: FAQs (cancellation, payment, luggage, support) and changing a booking time.",
+        "vi": "Xin lỗi, mình chỉ hỗ trợ về vé xe Vexere: câu hỏi thường gặp (hủy vé, thanh toán, hành lý, hỗ trợ) và đổi giờ vé.",
+    },
+}
+
+INJECTION_PATTERN = re.compile(
+    r"\b(?:ignore|disregard|forget|override)\b.{0,30}\b(?:previous|prior|above|earlier|all|your|system)\s+"
+    r"(?:instructions?|rules|prompts?|guidelines)\b"
+    r"|\b(?:system|developer|hidden|initial)\s+(?:prompt|instructions)\b"
+    r"|\b(?:reveal|show|print|repeat|leak)\b.{0,30}\b(?:your|the)\s+(?:prompt|instructions|rules)\b"
+    r"|\byou\s+are\s+now\b|\bjailbreak|\bdeveloper\s+mode\b|\bDAN\s+mode\b|\bdo\s+anything\s+now\b"
+    r"|\bpretend\s+(?:to\s+be|you\s+are)\b"
+    r"|bỏ\s+qua.{0,30}(?:hướng\s+dẫn|chỉ\s+dẫn|quy\s+tắc|lệnh)"
+    r"|(?:tiết\s+lộ|cho\s+xem).{0,30}(?:prompt|hướng\s+dẫn|chỉ\s+dẫn)",
+    re.IGNORECASE,
+)
+ABUSIVE_PATTERN = re.compile(
+    r"\b(?:fuck\w*|shit|bitch|asshole|bastard|cunt|motherfucker|dickhead)\b"
+    r"|\b(?:địt|đụ|đéo|đĩ|lồn|cặc|vcl|vkl|dmm|đmm|đm|clgt)\b",
+    re.IGNORECASE,
+)
+
+# Lightweight off-topic classifier: weighted terms for requests the assistant
+# cannot serve, against terms of its domain (buses, tickets, bookings). A
+# message is off-topic when its score reaches the threshold and it has no
+# domain term or booking ID at all (greetings and small talk score 0).
+OFF_TOPIC_TERMS: Dict[str, float] = {
+    "write": 1.0, "poem": 2.0, "story": 1.5, "essay": 2.0, "song": 1.5, "lyrics": 2.0,
+    "code": 1.5, "python": 2.0, "javascript": 2.0, "sql": 2.0, "function": 1.0, "program": 1.0,
+    "recipe": 2.0, "cook": 1.5, "homework": 2.0, "math": 1.5, "equation": 2.0, "solve": 1.0,
+    "stock": 1.5, "stocks": 1.5, "bitcoin": 2.0, "crypto": 2.0, "invest": 1.5,
+    "weather": 1.5, "football": 1.5, "movie": 1.5, "game": 1.0, "politics": 2.0, "president": 1.5,
+    "translate": 1.5, "joke": 1.5, "girlfriend": 1.5, "boyfriend": 1.5, "horoscope": 2.0,
+    "thơ": 2.0, "bài": 0.5, "văn": 1.0, "nấu": 1.5, "món": 1.0, "toán": 1.5, "lập": 0.5, "trình": 0.5,
+    "chứng": 0.5, "khoán": 1.5, "bóng": 1.0, "đá": 0.5, "phim": 1.5, "dịch": 1.0, "truyện": 1.5,
+}
+DOMAIN_TERMS = frozenset(
+    """
+    vexere bus buses coach ticket tickets booking bookings book booked seat seats trip trips
+    route routes depart departure arrive arrival schedule reschedule cancel cancellation refund
+    payment pay luggage baggage operator station pickup dropoff time date change support help
+    vé xe chuyến giờ ngày đặt hủy đổi hoàn tiền thanh toán hành lý nhà ghế bến hỗ trợ lịch
+    """.split()
+)
+OFF_TOPIC_THRESHOLD = 2.0
+_WORD_RE = re.compile(r"\w+")
+_BOOKING_ID_RE = re.compile(r"\b[A-Z]{2,}[A-Z0-9-]*\d[A-Z0-9-]*\b")
+DUPLICATE_USERS_TRACKED = 10000
+
+
+def off_topic_score(message: str) -> float:
+    """Weight of off-topic terms, or 0.0 when the message mentions the assistant's domain."""
+    if _BOOKING_ID_RE.search(message):
+        return 0.0
+    score = 0.0
+    for word in _WORD_RE.findall(message.lower()):
+        if word in DOMAIN_TERMS:
+            return 0.0
+        score += OFF_TOPIC_TERMS.get(word, 0.0)
+    return score
+
+
+@dataclass
+class GuardDecision:
+    reason: str
+    response: str
+
+
+class MessageGuard:
+    """
+    Local checks run on a `/chat` message before any LLM call: empty and
+    oversized messages, prompt-injection and abusive phrasing (regexes),
+    off-topic requests (keyword classifier) and the same message repeated by a
+    user within `duplicate_window_s` (answered with the previous reply).
+    Blocked turns get an instant canned reply; the LLM calls and tokens they
+    would have used are estimated from the allowed turns.
+    """
+
+    def __init__(
+        self,
+        max_chars: int = 2000,
+        duplicate_window_s: float = 5.0,
+        off_topic_threshold: float = OFF_TOPIC_THRESHOLD,
+    ):
+        self.max_chars = max_chars
+        self.duplicate_window_s = duplicate_window_s
+        self.off_topic_threshold = off_topic_threshold
+        # user_id -> (normalized message, reply, time); least recently used first
+        self._last_turns: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self.checked = 0
+        self.blocked = {reason: 0 for reason in GUARD_REASONS}
+        self._allowed_turns = 0
+        self._allowed_llm_calls = 0
+        self._allowed_tokens = 0
+
+    def check(
+        self,
+        user_id: str,
+        message: str,
+        has_attachments: bool = False,
+        in_flow: bool = False,
+        language: str = DEFAULT_LANGUAGE,
+    ) -> Optional[GuardDecision]:
+        """The decision for a blocked message, or None to let it through.
+        `in_flow` (a tool flow awaits the user's answer) skips the off-topic and
+        duplicate checks."""
+        self.checked += 1
+        reason = self._blocking_reason(user_id, message, has_attachments, in_flow)
+        if reason is None:
+            return None
+        self.blocked[reason] += 1
+        if reason == "duplicate":
+            return GuardDecision(reason, self._last_turns[user_id][1])
+        responses = CANNED_RESPONSES[reason]
+        return GuardDecision(reason, responses.get(language, responses[DEFAULT_LANGUAGE]))
+
+    def _blocking_reason(
+        self, user_id: str, message: str, has_attachments: bool, in_flow: bool
+    ) -> Optional[str]:
+        if not message:
+            return None if has_attachments else "empty"
+        if len(message) > self.max_chars:
+            return "too_long"
+        if INJECTION_PATTERN.search(message):
+            return "injection"
+        if ABUSIVE_PATTERN.search(message):
+            return "abusive"
+        if not in_flow and not has_attachments and off_topic_score(message) >= self.off_topic_threshold:
+            return "off_topic"
+        last = self._last_turns.get(user_id)
+        if (
+            last is not None
+            and not in_flow  # Within a flow a repeated answer ("yes", a time) is a new step
+            and not has_attachments
+            and time.monotonic() - last[2] < self.duplicate_window_s
+            and last[0] == normalize_prompt(message)
+        ):
+            return "duplicate"
+        return None
+
+    def record_reply(
+        self, user_id: str, message: str, reply: Optional[str], llm_calls: int, tokens: int
+    ) -> None:
+        """
+        Records an allowed turn: its LLM usage (for the savings estimate) and
+        its reply, replayed for a repeat of the message (None for failed turns).
+        """
+        self._allowed_turns += 1
+        self._allowed_llm_calls += llm_calls
+        self._allowed_tokens += tokens
+        if reply is None:
+            self._last_turns.pop(user_id, None)
+        elif self.duplicate_window_s > 0 and message:
+            self._last_turns[user_id] = (normalize_prompt(message), reply, time.monotonic())
+            self._last_turns.move_to_end(user_id)
+            while len(self._last_turns) > DUPLICATE_USERS_TRACKED:
+                self._last_turns.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        blocked = sum(self.blocked.values())
+        turns = self._allowed_turns or 1
+        return {
+            "checked": self.checked,
+            "blocked": blocked,
+            "blocked_by_reason": dict(self.blocked),
+            # Blocked turns would have cost what an average allowed turn costs.
+            "estimated_llm_calls_saved": round(blocked * self._allowed_llm_calls / turns, 1),
+            "estimated_tokens_saved": round(blocked * self._allowed_tokens / turns),
+        }
+
+
+def build_message_guard() -> Optional[MessageGuard]:
+    """The guard configured by the MESSAGE_GUARD_* settings, or None when disabled."""
+    if not get_setting("MESSAGE_GUARD_ENABLED", False):
+        return None
+    return MessageGuard(
+        max_chars=get_setting("MESSAGE_MAX_CHARS", 2000),
+        duplicate_window_s=get_setting("DUPLICATE_MESSAGE_WINDOW_SECONDS", 5.0),
+        off_topic_threshold=get_setting("OFF_TOPIC_THRESHOLD", OFF_TOPIC_THRESHOLD),
+    )
+
+
+_message_guard: Optional[MessageGuard] = None
+_message_guard_configured = False
+
+
+def get_message_guard() -> Optional[MessageGuard]:
+    """This worker's message guard, or None when MESSAGE_GUARD_ENABLED is off."""
+    global _message_guard, _message_guard_configured
+    if not _message_guard_configured:
+        _message_guard_configured = True
+        _message_guard = build_message_guard()
+        if _message_guard is not None:
+            metrics.register("message_guard", _message_guard.stats)
+    return _message_guard
@@ -0,0 +1,232 @@
+import gzip
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+
+from backend.app import metrics
+
+try:
+    import orjson  # Optional dependency: several times faster than the json module
+except ImportError:
+    orjson = None
+
+try:
+    import brotli  # Optional dependency: enables "br" response compression
+except ImportError:
+    brotli = None
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the json module handles them
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parses JSON from bytes or str (orjson.JSONDecodeError is a json.JSONDecodeError)."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with `dumps` (the app's default response class)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class FastJSONRequest(Request):
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = loads(await self.body())
+        return self._json
+
+
+class FastJSONRoute(APIRoute):
+    """Route class parsing JSON request bodies with `loads` before pydantic validation."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def fast_json_handler(request: Request):
+            return await handler(FastJSONRequest(request.scope, request.receive))
+
+        return fast_json_handler
+
+
+# --- Request body size cap and response compression (ASGI middlewares) ---
+
+io_stats: Dict[str, Any] = {
+    "bodies_rejected_too_large": 0,
+    "responses_compressed": {"br": 0, "gzip": 0},
+    "compressed_bytes_in": 0,
+    "compressed_bytes_out": 0,
+}
+metrics.register("http_io", lambda: {**io_stats, "orjson": orjson is not None, "brotli": brotli is not None})
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # Brotli's higher qualities cost far more CPU for JSON this small
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class BodySizeLimitMiddleware:
+    """
+    Rejects request bodies larger than `max_bytes` with 413: up front from the
+    Content-Length header, otherwise while the body streams in (chunked uploads),
+    so an oversized body is never buffered in full.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    io_stats["bodies_rejected_too_large"] += 1
+                    response = FastJSONResponse(
+                        status_code=413, content={"detail": "Request body too large"}
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def capped_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    io_stats["bodies_rejected_too_large"] += 1
+                    # Raised inside the route's body parsing; FastAPI answers it.
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, capped_receive, send)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """`Accept-Encoding` codings mapped to their q-values."""
+    codings: Dict[str, float] = {}
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(header: str, preferred: List[str]) -> Optional[str]:
+    """The first of `preferred` the client accepts (highest q-value wins), or None."""
+    accepted = parse_accept_encoding(header)
+    best, best_quality = None, 0.0
+    for coding in preferred:
+        quality = accepted.get(coding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete (non-streamed) JSON and text responses of at least
+    `minimum_size` bytes with the best encoding in `encodings` ("br" needs the
+    brotli package) that the client accepts. Streamed responses pass through.
+    """
+
+    def __init__(self, app, encodings: List[str], minimum_size: int = 1024):
+        self.app = app
+        self.encodings = [
+            encoding for encoding in encodings if encoding == "gzip" or (encoding == "br" and brotli)
+        ]
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept, self.encodings) if accept else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = {name.lower(): value for name, value in start_message["headers"]}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or b"content-encoding" in headers
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            io_stats["responses_compressed"][encoding] += 1
+            io_stats["compressed_bytes_in"] += len(body)
+            io_stats["compressed_bytes_out"] += len(compressed)
+            new_headers = [
+                (name, value)
+                for name, value in start_message["headers"]
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"),
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, compressing_send)
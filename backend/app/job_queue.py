@@ -0,0 +1,430 @@
+import asyncio
+import json
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Callable, Coroutine
+
+from backend.app import metrics
+from backend.app.settings import get_setting
+
+JobHandler = Callable[[Dict[str, Any]], Coroutine[Any, Any, Dict[str, Any]]]
+
+# Handlers by job kind, registered by the modules that enqueue those jobs.
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(kind: str, handler: JobHandler) -> None:
+    JOB_HANDLERS[kind] = handler
+
+
+class RetriableJobError(Exception):
+    """Raised by a handler for a transient failure; the job is retried with backoff."""
+
+
+_JOB_COLUMNS = (
+    "job_id",
+    "kind",
+    "user_id",
+    "ordering_key",
+    "idempotency_key",
+    "payload",
+    "status",
+    "attempts",
+    "max_attempts",
+    "next_run_at",
+    "result",
+    "last_error",
+    "notified",
+    "created_at",
+    "updated_at",
+)
+
+
+# Outcomes are recorded only by the attempt that holds the job: once a lease
+# expires the job may be claimed again, and the earlier attempt's late result
+# must not overwrite the new one.
+_CURRENT_ATTEMPT = "job_id = ? AND status = 'running' AND attempts = ?"
+
+class JobQueue:
+    """
+    Durable queue of slow side effects (booking mutations) in a SQLite file.
+
+    A job is enqueued with an idempotency key (enqueuing the same key again
+    returns the existing job) and an ordering key: jobs sharing an ordering key
+    (e.g. the same booking) run one at a time in enqueue order. Handlers that
+    raise RetriableJobError are retried with exponential backoff; after
+    `max_attempts` the job is marked "dead" and copied to the dead_letters
+    table. Finished jobs stay queryable and are handed to the chat once
+    (`take_finished`) so the user hears about the result on their next turn.
+
+    Several worker processes may share the file: claiming a job is an atomic
+    status update, and jobs whose lease expired (worker crashed mid-job) are
+    picked up again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 5,
+        retry_base_seconds: float = 1.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                kind TEXT NOT NULL,
+                user_id TEXT,
+                ordering_key TEXT,
+                idempotency_key TEXT UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                next_run_at REAL NOT NULL,
+                lease_until REAL,
+                result TEXT,
+                last_error TEXT,
+                notified INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_due ON jobs (status, next_run_at);
+            CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, notified);
+            CREATE TABLE IF NOT EXISTS dead_letters (
+                job_id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                last_error TEXT,
+                failed_at REAL NOT NULL
+            );
+            """
+        )
+        self.wakeup = asyncio.Event()  # Set on enqueue so a local worker starts right away
+
+    # --- Synchronous SQLite operations (run in a thread by the async API) ---
+
+    def _row_to_job(self, row: Any) -> Dict[str, Any]:
+        job = dict(zip(_JOB_COLUMNS, row))
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["notified"] = bool(job["notified"])
+        return job
+
+    def _select_jobs(self, where: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE {where} ORDER BY seq",
+                params,
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def _enqueue_sync(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: Optional[str],
+        ordering_key: Optional[str],
+        idempotency_key: Optional[str],
+    ) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO jobs (job_id, kind, user_id, ordering_key, idempotency_key, payload, "
+                "status, max_attempts, next_run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?, ?, ?, ?) "
+                "ON CONFLICT(idempotency_key) DO NOTHING",
+                (
+                    job_id,
+                    kind,
+                    user_id,
+                    ordering_key,
+                    idempotency_key,
+                    json.dumps(payload, ensure_ascii=False),
+                    self.max_attempts,
+                    now,
+                    now,
+                    now,
+                ),
+            )
+        if idempotency_key is not None:  # The existing job if the key was used before
+            return self._select_jobs("idempotency_key = ?", (idempotency_key,))[0]
+        return self._select_jobs("job_id = ?", (job_id,))[0]
+
+    def _claim_sync(self, limit: int) -> List[Dict[str, Any]]:
+        """Marks up to `limit` due jobs as running (with a lease) and returns them."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died mid-run become due again when the lease ends.
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'queued', updated_at = ? "
+                    "WHERE status = 'running' AND lease_until < ?",
+                    (now, now),
+                )
+                rows = self._connection.execute(
+                    "SELECT job_id FROM jobs AS j WHERE status = 'queued' AND next_run_at <= ? "
+                    "AND NOT EXISTS (SELECT 1 FROM jobs AS earlier "
+                    "WHERE earlier.ordering_key = j.ordering_key "
+                    "AND earlier.status IN ('queued', 'running') AND earlier.seq < j.seq) "
+                    "ORDER BY seq LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                job_ids = [row[0] for row in rows]
+                for job_id in job_ids:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                        "lease_until = ?, updated_at = ? WHERE job_id = ?",
+                        (now + self.lease_seconds, now, job_id),
+                    )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        if not job_ids:
+            return []
+        placeholders = ", ".join("?" for _ in job_ids)
+        return self._select_jobs(f"job_id IN ({placeholders})", tuple(job_ids))
+
+    def _complete_sync(self, job: Dict[str, Any], result: Dict[str, Any]) -> str:
+        """Marks the job succeeded; returns the new status ("lease_lost" if re-claimed)."""
+        with self._lock:
+            updated = self._connection.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, lease_until = NULL, "
+                f"updated_at = ? WHERE {_CURRENT_ATTEMPT}",
+                (json.dumps(result, ensure_ascii=False), time.time(), job["job_id"], job["attempts"]),
+            )
+        return "succeeded" if updated.rowcount == 1 else "lease_lost"
+
+    def _fail_sync(self, job: Dict[str, Any], error: str, retriable: bool) -> str:
+        """Schedules a retry, or dead-letters the job; returns the new status ("lease_lost" if re-claimed)."""
+        now = time.time()
+        with self._lock:
+            if retriable and job["attempts"] < job["max_attempts"]:
+                delay = self.retry_base_seconds * (2 ** (job["attempts"] - 1))
+                delay *= random.uniform(0.8, 1.2)  # Jitter keeps retries from lining up
+                updated = self._connection.execute(
+                    "UPDATE jobs SET status = 'queued', next_run_at = ?, last_error = ?, "
+                    f"lease_until = NULL, updated_at = ? WHERE {_CURRENT_ATTEMPT}",
+                    (now + delay, error, now, job["job_id"], job["attempts"]),
+                )
+                return "queued" if updated.rowcount == 1 else "lease_lost"
+            updated = self._connection.execute(
+                "UPDATE jobs SET status = 'dead', last_error = ?, lease_until = NULL, "
+                f"updated_at = ? WHERE {_CURRENT_ATTEMPT}",
+                (error, now, job["job_id"], job["attempts"]),
+            )
+            if updated.rowcount != 1:
+                return "lease_lost"
+            self._connection.execute(
+                "INSERT OR REPLACE INTO dead_letters VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job["job_id"],
+                    job["kind"],
+                    json.dumps(job["payload"], ensure_ascii=False),
+                    job["attempts"],
+                    error,
+                    now,
+                ),
+            )
+            return "dead"
+
+    def _take_finished_sync(self, user_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._connection.execute(
+                    f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE user_id = ? "
+                    "AND notified = 0 AND status IN ('succeeded', 'dead') ORDER BY seq",
+                    (user_id,),
+                ).fetchall()
+                self._connection.executemany(
+                    "UPDATE jobs SET notified = 1 WHERE job_id = ?",
+                    [(row[0],) for row in rows],
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        return [self._row_to_job(row) for row in rows]
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status = dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+                ).fetchall()
+            )
+            dead_letters = self._connection.execute(
+                "SELECT COUNT(*) FROM dead_letters"
+            ).fetchone()[0]
+        return {"jobs_by_status": by_status, "dead_letters": dead_letters}
+
+    # --- Async API ---
+
+    async def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        user_id: Optional[str] = None,
+        ordering_key: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        job = await asyncio.to_thread(
+            self._enqueue_sync, kind, payload, user_id, ordering_key, idempotency_key
+        )
+        self.wakeup.set()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        jobs = await asyncio.to_thread(self._select_jobs, "job_id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    async def claim(self, limit: int) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._claim_sync, limit)
+
+    async def run_job(self, job: Dict[str, Any]) -> str:
+        """Runs a claimed job with its handler and records the outcome; returns the new status."""
+        handler = JOB_HANDLERS.get(job["kind"])
+        if handler is None:
+            return await asyncio.to_thread(
+                self._fail_sync, job, f"No handler for job kind '{job['kind']}'.", False
+            )
+        try:
+            result = await handler(job["payload"])
+        except RetriableJobError as e:
+            status = await asyncio.to_thread(self._fail_sync, job, str(e), True)
+            print(f"Job {job['job_id']} ({job['kind']}) attempt {job['attempts']} failed: {e} -> {status}")
+            return status
+        except Exception as e:
+            print(f"Job {job['job_id']} ({job['kind']}) failed permanently: {e}")
+            return await asyncio.to_thread(self._fail_sync, job, str(e), False)
+        status = await asyncio.to_thread(self._complete_sync, job, result)
+        if status == "lease_lost":
+            print(
+                f"Job {job['job_id']} ({job['kind']}) attempt {job['attempts']} "
+                "finished after its lease was taken over; result dropped."
+            )
+        return status
+
+    async def take_finished(self, user_id: str) -> List[Dict[str, Any]]:
+        """Finished jobs of a user that have not been reported yet (each is returned once)."""
+        return await asyncio.to_thread(self._take_finished_sync, user_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._stats_sync)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class JobWorker:
+    """Background task of a worker process that claims and runs due jobs."""
+
+    MAX_BACKOFF_S = 30.0
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        concurrency: int = 4,
+        poll_interval_s: float = 0.5,
+        stop_timeout_s: float = 10.0,
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval_s = poll_interval_s
+        self.stop_timeout_s = stop_timeout_s
+        self.task: Optional[asyncio.Task] = None
+        self.running: set = set()  # run_job tasks in flight
+        self.claim_errors = 0
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        running = self.running
+        while True:
+            free_slots = self.concurrency - len(running)
+            try:
+                jobs = await self.queue.claim(free_slots) if free_slots > 0 else []
+            except Exception as e:
+                # E.g. "database is locked": keep the worker alive and back off.
+                self.claim_errors += 1
+                backoff_s = min(self.poll_interval_s * 2 ** min(self.claim_errors, 10), self.MAX_BACKOFF_S)
+                print(f"Claiming jobs failed ({e!r}); retrying in {backoff_s:.1f}s.")
+                await asyncio.sleep(backoff_s)
+                continue
+            self.claim_errors = 0
+            for job in jobs:
+                task = asyncio.create_task(self.queue.run_job(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+            if not jobs:
+                self.queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.queue.wakeup.wait(), self.poll_interval_s)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def stop(self) -> None:
+        """
+        Stops claiming, then gives running jobs `stop_timeout_s` to finish before
+        cancelling them (a cancelled job is claimed again when its lease ends).
+        Afterwards no job touches the queue, so it can be closed.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        if self.running:
+            _, pending = await asyncio.wait(set(self.running), timeout=self.stop_timeout_s)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """The job queue of this worker process, opened on first use."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                get_setting("JOB_QUEUE_DB_PATH", "jobs.db"),
+                max_attempts=get_setting("JOB_MAX_ATTEMPTS", 5),
+                retry_base_seconds=get_setting("JOB_RETRY_BASE_SECONDS", 1.0),
+                lease_seconds=get_setting("JOB_LEASE_SECONDS", 60.0),
+            )
+            metrics.register("job_queue", _job_queue.stats)
+    return _job_queue
+
+
+async def close_job_queue() -> None:
+    global _job_queue
+    if _job_queue is not None:
+        await _job_queue.close()
+        _job_queue = None
@@ -0,0 +1,96 @@
+import re
+import unicodedata
+from typing import Dict, Any
+
+from backend.app import metrics
+
+SUPPORTED_LANGUAGES = ("en", "vi")
+DEFAULT_LANGUAGE = "en"  # Also the language of the base FAQ "answer" texts
+
+# Letters that only occur in Vietnamese among the supported languages
+# (precomposed, after NFC normalization).
+VIETNAMESE_LETTERS = frozenset(
+    "ăâđêôơưáàảãạắằẳẵặấầẩẫậéèẻẽẹếềểễệíìỉĩịóòỏõọốồổỗộớờởỡợúùủũụứừửữựýỳỷỹỵ"
+)
+# Frequent Vietnamese words typed without diacritics ("doi gio ve") and
+# frequent English words; words common to both (e.g. "can", "ban") are left out.
+UNACCENTED_VIETNAMESE_WORDS = frozenset(
+    """
+    toi minh ve gio doi huy khong duoc xe nao lam sao bao nhieu muon dat chuyen hanh ly
+    thanh toan tro giup cua voi nhe nha oi roi chua nhu nay kia ngay mai hom qua chieu
+    sang dum phai biet lien he tong dai hoan tien
+    """.split()
+)
+ENGLISH_WORDS = frozenset(
+    """
+    the is are my i me how what when where why can could do does to you your a an for and
+    please ticket tickets want change cancel booking time bus help with of in on it this
+    that need would like pay payment luggage support hello hi thanks thank
+    """.split()
+)
+_WORD_RE = re.compile(r"\w+")
+
+# Turns by detected language, and FAQ replies sent without the LLM follow-up call
+localization_stats: Dict[str, Any] = {
+    "turns": 0,
+    "turns_by_language": {language: 0 for language in SUPPORTED_LANGUAGES},
+    "faq_tool_turns": 0,
+    "direct_faq_answers": 0,
+    "direct_faq_answers_by_language": {language: 0 for language in SUPPORTED_LANGUAGES},
+}
+
+
+def detect_language(text: str) -> str:
+    """
+    "vi" or "en" for a chat message, from letters and words only Vietnamese
+    (with or without diacritics) or English use; mixed messages go to the
+    side with more words, ties to Vietnamese if it has Vietnamese letters.
+    Messages without any signal (e.g. a booking ID) are DEFAULT_LANGUAGE.
+    """
+    words = _WORD_RE.findall(unicodedata.normalize("NFC", text).lower())
+    vietnamese = english = 0
+    has_vietnamese_letters = False
+    for word in words:
+        if not VIETNAMESE_LETTERS.isdisjoint(word):
+            vietnamese += 1
+            has_vietnamese_letters = True
+        elif word in UNACCENTED_VIETNAMESE_WORDS:
+            vietnamese += 1
+        elif word in ENGLISH_WORDS:
+            english += 1
+    if vietnamese > english or (vietnamese == english and has_vietnamese_letters):
+        return "vi"
+    return DEFAULT_LANGUAGE
+
+
+def record_turn_language(language: str) -> None:
+    localization_stats["turns"] += 1
+    localization_stats["turns_by_language"][language] += 1
+
+
+def record_faq_turn(language: str, answered_directly: bool) -> None:
+    """Counts a turn whose model call asked for get_faq_answer."""
+    localization_stats["faq_tool_turns"] += 1
+    if answered_directly:
+        localization_stats["direct_faq_answers"] += 1
+        localization_stats["direct_faq_answers_by_language"][language] += 1
+
+
+def localization_report() -> Dict[str, Any]:
+    turns = localization_stats["turns"]
+    faq_turns = localization_stats["faq_tool_turns"]
+    direct = localization_stats["direct_faq_answers"]
+    return {
+        "turns": turns,
+        "turns_by_language": dict(localization_stats["turns_by_language"]),
+        "faq_tool_turns": faq_turns,
+        "direct_faq_answers": direct,
+        "direct_faq_answers_by_language": dict(localization_stats["direct_faq_answers_by_language"]),
+        # Share of turns answered from a curated answer in the user's language
+        # instead of a follow-up LLM call summarizing (translating) the tool result
+        "served_without_translation_rate": round(direct / turns, 4) if turns else 0.0,
+        "faq_direct_answer_rate": round(direct / faq_turns, 4) if faq_turns else 0.0,
+    }
+
+
+metrics.register("localization", localization_report)
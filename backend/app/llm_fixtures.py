@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Dict, Any, Optional
+
+from vertexai.generative_models import (
+    Content,
+    GenerationResponse,
+    Tool,
+)
+
+from backend.app.settings import get_setting
+
+FIXTURE_MODES = ("off", "record", "replay")
+
+
+class FixtureMismatchError(Exception):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+class LiveTransport:
+    """Sends requests straight to the Gemini model (the default behaviour)."""
+
+    serves_offline = False
+
+    def generate_content(
+        self,
+        model: Any,
+        contents: List[Content],
+        tools: List[Tool],
+        generation_config: Optional[Dict[str, Any]] = None,
+        system_instruction: Optional[str] = None,  # Already set on `model`
+    ) -> GenerationResponse:
+        return model.generate_content(contents, tools=tools, generation_config=generation_config)
+
+
+def _normalize_text(value: Any) -> Any:
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip()
+    if isinstance(value, dict):
+        return {key: _normalize_text(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize_text(item) for item in value]
+    return value
+
+
+def normalized_request(
+    contents: List[Content], tools: List[Tool], **options: Any
+) -> Dict[str, Any]:
+    """
+    A canonical, JSON-serializable view of a Gemini request.
+    Whitespace in strings is collapsed so cosmetic prompt edits do not invalidate fixtures.
+    The system instruction and generation config are included only when set, so
+    fixtures recorded without them stay valid.
+    """
+    request = {
+        "contents": _normalize_text([content.to_dict() for content in contents]),
+        "tools": _normalize_text([tool.to_dict() for tool in tools]),
+    }
+    for name, value in options.items():
+        if value:
+            request[name] = _normalize_text(value)
+    return request
+
+
+def fixture_key(contents: List[Content], tools: List[Tool], **options: Any) -> str:
+    """Stable hash of history + current message + tool declarations (+ prompt options)."""
+    canonical = json.dumps(
+        normalized_request(contents, tools, **options),
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _last_user_text(request: Dict[str, Any]) -> str:
+    for content in reversed(request["contents"]):
+        if content.get("role") == "user":
+            for part in content.get("parts", []):
+                if "text" in part:
+                    return part["text"]
+    return ""
+
+
+class RecordReplayTransport:
+    """
+    Records Gemini request/response pairs to a JSONL fixture file, or replays them.
+
+    Each line holds one entry: the request key, a short summary of the request
+    (for humans reading diffs and mismatch reports), the serialized response and
+    the live latency observed while recording, so fixture files double as a
+    latency baseline.
+    In "record" mode requests go through `inner` and are appended to the file.
+    In "replay" mode responses are served from the file without network access;
+    an unknown request raises FixtureMismatchError.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        path: str,
+        inner: Optional[LiveTransport] = None,
+        replay_latency: bool = False,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unsupported fixture mode: {mode}")
+        self.mode = mode
+        self.path = path
+        self.inner = inner or LiveTransport()
+        self.replay_latency = replay_latency
+        self.serves_offline = mode == "replay"
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(
+                    json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+                )
+            self.entries[entry["key"]] = entry
+
+    def generate_content(
+        self, model: Any, contents: List[Content], tools: List[Tool], **options: Any
+    ) -> GenerationResponse:
+        request = normalized_request(contents, tools, **options)
+        key = fixture_key(contents, tools, **options)
+        entry = self.entries.get(key)
+
+        if self.mode == "replay":
+            if entry is None:
+                self.misses += 1
+                raise FixtureMismatchError(self._mismatch_report(key, request))
+            self.hits += 1
+            if self.replay_latency and entry.get("latency_ms"):
+                time.sleep(entry["latency_ms"] / 1000.0)
+            return GenerationResponse.from_dict(entry["response"])
+
+        if entry is not None:  # Record mode: keep existing recordings stable
+            self.hits += 1
+            return GenerationResponse.from_dict(entry["response"])
+
+        started = time.perf_counter()
+        response = self.inner.generate_content(model, contents, tools, **options)
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.misses += 1
+        self._append(
+            {
+                "key": key,
+                "summary": {
+                    "turns": len(request["contents"]),
+                    "last_user_text": _last_user_text(request)[:200],
+                },
+                "latency_ms": round(latency_ms, 1),
+                "response": response.to_dict(),
+            }
+        )
+        return response
+
+    def _mismatch_report(self, key: str, request: Dict[str, Any]) -> str:
+        last_text = _last_user_text(request)
+        similar = [
+            entry["key"][:12]
+            for entry in self.entries.values()
+            if entry.get("summary", {}).get("last_user_text") == last_text[:200]
+        ]
+        report = (
+            f"No recorded LLM response for request {key[:12]} "
+            f"({len(request['contents'])} turns, last user text: {last_text[:80]!r}) "
+            f"in {self.path}."
+        )
+        if similar:
+            report += (
+                f" Entries with the same last user text but different history/tools: "
+                f"{', '.join(similar)}."
+            )
+        return report + " Re-record with LLM_FIXTURE_MODE=record."
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def build_transport() -> Any:
+    """Creates the transport selected by the LLM_FIXTURE_MODE / LLM_FIXTURE_PATH settings."""
+    mode = str(get_setting("LLM_FIXTURE_MODE", "off")).lower()
+    if mode not in FIXTURE_MODES:
+        raise ValueError(
+            f"Unsupported LLM_FIXTURE_MODE '{mode}'. Valid values: {', '.join(FIXTURE_MODES)}"
+        )
+    if mode == "off":
+        return LiveTransport()
+    path = get_setting("LLM_FIXTURE_PATH", "llm_fixtures.jsonl")
+    print(f"LLM fixture transport enabled: mode={mode}, path={path}")
+    return RecordReplayTransport(
+        mode=mode,
+        path=path,
+        replay_latency=get_setting("LLM_FIXTURE_REPLAY_LATENCY", False),
+    )
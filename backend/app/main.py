@@ -1,16 +1,20 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from fastapi.datastructures import Default
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse
+import asyncio
+import hmac
+import os
 import re
+import time
 import json  # For serializing tool results for Gemini
-from typing import List, Dict, Any, Callable, Coroutine
-
-# Vertex AI and Google Cloud specific imports
-from vertexai.generative_models import (
-    Content,
-    Part,
-)  # Use these for constructing history
+from typing import List, Dict, Any, Callable, Coroutine, Optional
 
 # Project-specific imports
+from .settings import get_setting
 from .models import (
     ChatMessageInput,
     ChatMessageOutput,
@@ -18,9 +22,96 @@ from .models import (
     MockVexereApiResponse,
 )
 from . import tools
-from .ai_agents_manager import ai_manager  # Import the central AI manager instance
-
-app = FastAPI(title="Vexere Chatbot POC Backend - Centralized AI Agent")
+from . import metrics
+from . import turn_trace
+from .ai_agents_manager import get_ai_manager  # Per-worker central AI manager
+from .audio import close_audio_preprocessor, get_audio_preprocessor
+from .analytics import close_analytics_exporter, get_analytics_exporter, tool_succeeded
+from .session_store import (
+    SessionConflictError,
+    close_session_store,
+    get_session_store,
+)
+from .http_io import (
+    BodySizeLimitMiddleware,
+    CompressionMiddleware,
+    FastJSONResponse,
+    FastJSONRoute,
+    loads,
+)
+from .channels import (
+    CHANNEL_MESSAGE_JOB,
+    channel_stats,
+    close_channel_adapters,
+    conversation_id,
+    enqueue_reply,
+    get_channel_adapters,
+)
+from .degraded import answer_without_llm, describe_tool_result
+from .guard import get_message_guard
+from .messages import Message
+from .language import detect_language, record_faq_turn, record_turn_language
+from .job_queue import JobWorker, close_job_queue, get_job_queue, register_job_handler
+from .mock_vexere import close_mock_vexere_service, get_mock_vexere_service
+from .profiling import (
+    TRACEMALLOC_KEY_TYPES,
+    ProfilingMiddleware,
+    list_profiles,
+    memory_diagnostics,
+)
+from .prompts import get_prompt_registry
+from .shadow import close_shadow_traffic
+from .speculation import faq_speculator
+from .usage import (
+    BUDGET_EXCEEDED_MESSAGE,
+    DEFAULT_TENANT,
+    close_usage_accountant,
+    get_usage_accountant,
+    truncate_history,
+    usage_day,
+)
+from .warmup import warmup_state
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Each worker process owns its agent manager; sessions live in the shared store.
+    # Both are created by a background warm-up so the server starts serving
+    # (and passes liveness checks) before the slow Vertex AI initialization ends.
+    warmup_state.start()
+    get_analytics_exporter()  # Starts the background writer when ANALYTICS_DIR is set
+    job_worker = None
+    if get_setting("BOOKING_CHANGES_ASYNC", False) or get_channel_adapters():
+        # Runs queued booking changes and channel messages; several workers may
+        # share the queue file.
+        job_worker = JobWorker(
+            get_job_queue(),
+            concurrency=get_setting("JOB_WORKER_CONCURRENCY", 4),
+            poll_interval_s=get_setting("JOB_POLL_INTERVAL_SECONDS", 0.5),
+        )
+        job_worker.start()
+    yield
+    if job_worker is not None:
+        await job_worker.stop()
+        await close_job_queue()
+    await close_session_store()
+    await tools.close_http_client()
+    await close_mock_vexere_service()
+    await close_usage_accountant()
+    close_channel_adapters()
+    await close_analytics_exporter()
+    close_audio_preprocessor()
+    await close_shadow_traffic()
+
+
+app = FastAPI(
+    title="Vexere Chatbot POC Backend - Centralized AI Agent",
+    lifespan=lifespan,
+    # A Default() placeholder keeps FastAPI's pydantic dump_json fast path for
+    # routes with a response_model (/chat); other routes render with orjson.
+    default_response_class=Default(FastJSONResponse),
+)
+app.router.route_class = FastJSONRoute  # Must be set before the routes below are declared
 
 # CORS Configuration
 origins = [
@@ -37,13 +128,38 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if get_setting("PROFILING_ENABLED", False):
+    # Not installed at all otherwise, so profiling costs nothing when disabled.
+    app.add_middleware(
+        ProfilingMiddleware,
+        output_dir=get_setting("PROFILE_OUTPUT_DIR", "profiles"),
+        profiler=get_setting("PROFILER", "sampling"),
+        sample_rate=get_setting("PROFILE_SAMPLE_RATE", 0.0),
+        interval_ms=get_setting("PROFILE_SAMPLE_INTERVAL_MS", 2.0),
+        max_files=get_setting("PROFILE_MAX_FILES", 50),
+    )
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=[
+        encoding.strip()
+        for encoding in str(get_setting("RESPONSE_COMPRESSION", "br,gzip")).split(",")
+        if encoding.strip()
+    ],
+    minimum_size=get_setting("RESPONSE_COMPRESSION_MIN_BYTES", 1024),
+)
+# Added last, so it runs first: oversized bodies are refused before anything reads them.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=get_setting("MAX_REQUEST_BODY_BYTES", 16 * 1024 * 1024),
+)
 
-# --- Global Stores ---
-conversation_histories: Dict[
-    str, List[Content]  # History will be List[vertexai.generative_models.Content]
-] = {}
-active_tool_states: Dict[str, Dict[str, Any]] = {}
 
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    # FastAPI's default handler echoes the offending input, which for /chat can be
+    # the whole request including megabytes of base64 media.
+    errors = [{key: value for key, value in error.items() if key != "input"} for error in exc.errors()]
+    return FastJSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
 
 # --- Tool Mapping ---
 AVAILABLE_TOOLS: Dict[str, Callable[..., Coroutine[Any, Any, Dict[str, Any]]]] = {
@@ -51,9 +167,44 @@ AVAILABLE_TOOLS: Dict[str, Callable[..., Coroutine[Any, Any, Dict[str, Any]]]] =
     "initiate_change_booking_time_flow": tools.initiate_change_booking_time_flow,
     "provide_booking_id_for_change": tools.provide_booking_id_for_change,
     "confirm_booking_time_change": tools.confirm_booking_time_change,
+    "get_booking_details": tools.get_booking_details,
 }
 
 
+def describe_finished_job(job: Dict[str, Any]) -> str:
+    """User-facing summary of a finished booking change job."""
+    if job["status"] == "succeeded":
+        return (job["result"] or {}).get("message") or "Your booking change has been processed."
+    return (
+        f"Sorry, I couldn't complete the change of booking {job['payload'].get('booking_id')} "
+        "because the booking service is unavailable. Please try again later."
+    )
+
+
+async def merge_turn_into_session(
+    session_store,
+    user_id: str,
+    turn_messages: List[Message],
+    tool_state: Dict[str, Any],
+    attempts: int = 3,
+) -> bool:
+    """
+    Appends a turn to the latest stored session after a save conflict.
+    Used when the turn changed a booking and cannot just be sent again.
+    Returns False if every attempt conflicted too.
+    """
+    for _ in range(attempts):
+        latest = await session_store.load(user_id)
+        latest.history = latest.history + turn_messages
+        latest.tool_state = tool_state
+        try:
+            await session_store.save(user_id, latest)
+            return True
+        except SessionConflictError:
+            continue
+    return False
+
+
 async def run_sync_tool(
     tool_func: Callable[..., Dict[str, Any]], *args, **kwargs
 ) -> Dict[str, Any]:
@@ -64,6 +215,10 @@ async def run_sync_tool(
 @app.post("/mock_vexere/change_booking", response_model=MockVexereApiResponse)
 async def mock_change_booking_endpoint(payload: ChangeBookingTimePayload):
     print(f"[Mock Vexere API] Received change booking request: {payload}")
+    service = get_mock_vexere_service()
+    injected_error = await service.inject_faults()
+    if injected_error is not None:
+        return FastJSONResponse(status_code=503, content=injected_error.model_dump())
     if not payload.booking_id:
         return MockVexereApiResponse(success=False, message="Booking ID is required.")
     if not payload.new_time:
@@ -73,6 +228,9 @@ async def mock_change_booking_endpoint(payload: ChangeBookingTimePayload):
             success=False,
             message="Invalid new_time format. Please use YYYY-MM-DD HH:MM:SS.",
         )
+    if service.stateful:
+        # Seeded bookings and seat capacity (MOCK_VEXERE_MODE=stateful)
+        return await service.change_booking(payload)
     if "FAIL" in payload.booking_id.upper():
         return MockVexereApiResponse(
             success=False,
@@ -89,41 +247,196 @@ async def mock_change_booking_endpoint(payload: ChangeBookingTimePayload):
     )
 
 
+@app.get("/mock_vexere/bookings/{booking_id}")
+async def mock_get_booking_endpoint(booking_id: str):
+    service = get_mock_vexere_service()
+    injected_error = await service.inject_faults()
+    if injected_error is not None:
+        return FastJSONResponse(status_code=503, content=injected_error.model_dump())
+    booking = await service.booking_details(booking_id)
+    if booking is None:
+        raise HTTPException(status_code=404, detail=f"Booking {booking_id} was not found.")
+    return booking
+
+
+@app.get("/mock_vexere/users/{user_id}/bookings")
+async def mock_list_user_bookings_endpoint(user_id: str):
+    service = get_mock_vexere_service()
+    injected_error = await service.inject_faults()
+    if injected_error is not None:
+        return FastJSONResponse(status_code=503, content=injected_error.model_dump())
+    return {"user_id": user_id, "bookings": await service.user_bookings(user_id)}
+
+
+@app.get("/mock_vexere/trips")
+async def mock_list_trips_endpoint(route: str):
+    service = get_mock_vexere_service()
+    if not service.stateful:
+        raise HTTPException(
+            status_code=404, detail="Trips are only kept with MOCK_VEXERE_MODE=stateful."
+        )
+    return {"route": route, "trips": await service.trips(route)}
+
+
 # --- Chat Endpoint ---
 @app.post("/chat", response_model=ChatMessageOutput)
 async def chat_handler(chat_input: ChatMessageInput):
+    await warmup_state.wait()  # Requests arriving during warm-up wait for it
+    turn_started = time.perf_counter()
     user_id = chat_input.user_id
     user_message_text = chat_input.message.strip()
 
-    current_history = conversation_histories.get(user_id, [])
-    current_tool_state = active_tool_states.get(user_id, {})
+    # Sessions are loaded from the shared store and written back with the
+    # version they were read at, so any worker can serve any turn.
+    session_store = get_session_store()
+    session = await session_store.load(user_id)
+    current_history = session.history  # List[Message], see messages.py
+    turn_history_start = len(current_history)  # This turn's messages follow
+    tools.clear_booking_change_requested()
+    current_tool_state = session.tool_state
+    ai_manager = get_ai_manager()
     bot_response_text = "I'm sorry, I encountered an issue processing your request."
+    tenant_id = chat_input.tenant_id or DEFAULT_TENANT
+    # Language of the user's message, for curated FAQ answers in that language
+    language = detect_language(user_message_text)
+    record_turn_language(language)
+
+    # Local pre-LLM checks: empty, oversized, injection, abusive, off-topic and
+    # repeated messages get an instant canned reply without any model call.
+    message_guard = get_message_guard()
+    if message_guard is not None:
+        decision = message_guard.check(
+            user_id,
+            user_message_text,
+            has_attachments=bool(chat_input.image_base64 or chat_input.audio_base64),
+            in_flow=bool(current_tool_state),
+            language=language,
+        )
+        if decision is not None:
+            print(f"Guard blocked message from user {user_id}: {decision.reason}")
+            analytics = get_analytics_exporter()
+            if analytics is not None:
+                analytics.record(
+                    {
+                        "ts": time.time(),
+                        "user_id": user_id,
+                        "tenant": tenant_id,
+                        "language": language,
+                        "intent": "blocked",
+                        "outcome": f"blocked:{decision.reason}",
+                        "latency_ms": round((time.perf_counter() - turn_started) * 1000, 3),
+                    }
+                )
+            return ChatMessageOutput(
+                bot_response=decision.response,
+                session_state={
+                    "history_length": len(current_history),
+                    "active_tool_state_keys": list(current_tool_state.keys()),
+                },
+            )
 
-    if not ai_manager.active_agent:
+    # Daily token/cost budgets: over the soft limit the history sent to the model
+    # is truncated or a cheaper model is used; over the limit the turn is refused.
+    usage_accountant = get_usage_accountant()
+    budget = await usage_accountant.check(user_id, tenant_id)
+    model_override = None
+    if budget.action == "refuse":
+        print(f"Refusing turn for user {user_id}: {budget.reason} exhausted.")
+        analytics = get_analytics_exporter()
+        if analytics is not None:
+            analytics.record(
+                {
+                    "ts": time.time(),
+                    "user_id": user_id,
+                    "tenant": tenant_id,
+                    "intent": "refused",
+                    "outcome": "refused",
+                    "latency_ms": round((time.perf_counter() - turn_started) * 1000, 3),
+                    "budget_action": budget.action,
+                }
+            )
+        return ChatMessageOutput(
+            bot_response=BUDGET_EXCEEDED_MESSAGE,
+            session_state={
+                "history_length": len(current_history),
+                "active_tool_state_keys": list(current_tool_state.keys()),
+            },
+        )
+    # Only the history sent to the model is truncated; the session keeps all of it.
+    model_history_start = 0
+    if budget.action == "truncate":
+        model_history_start = len(current_history) - len(
+            truncate_history(current_history, usage_accountant.truncate_messages)
+        )
+    elif budget.action == "cheap_model":
+        model_override = usage_accountant.fallback_model
+    turn_usages: List[Dict[str, Any]] = []  # Token usage of this turn's LLM calls
+
+    # The user's prompt variant (system instruction, follow-up prompt and
+    # generation settings); per-variant outcomes are compared on GET /prompts.
+    prompt_registry = get_prompt_registry()
+    prompt_variant = prompt_registry.assign(user_id)
+    llm_latency_ms = 0.0
+    tool_called = degraded = failed = conflict = False
+    turn_tool_calls: List[Dict[str, Any]] = []  # For the analytics export
+
+    booking_changes_async = get_setting("BOOKING_CHANGES_ASYNC", False)
+    # Results of booking changes queued on earlier turns are reported on this one.
+    job_notices = []
+    if booking_changes_async:
+        job_notices = [
+            describe_finished_job(job)
+            for job in await get_job_queue().take_finished(user_id)
+        ]
+
+    # Without the LLM, answer from FAQ retrieval and the scripted booking flow.
+    degraded_mode_enabled = get_setting("DEGRADED_MODE_ENABLED", True)
+    turn_key = f"{user_id}:{session.version}"  # Identifies this turn for queued jobs
+
+    if not ai_manager.active_agent and not degraded_mode_enabled:
         bot_response_text = "Error: The AI Agent service is not available. Please check backend configuration."
         return ChatMessageOutput(
             bot_response=bot_response_text, session_state=current_tool_state
         )
 
+    # Voice messages are trimmed, downsampled and re-encoded off the event loop.
+    audio_base64, audio_mime_type = chat_input.audio_base64, chat_input.audio_mime_type
+    audio_preprocessor = get_audio_preprocessor()
+    if audio_preprocessor is not None and audio_base64 and audio_mime_type:
+        audio_base64, audio_mime_type = await audio_preprocessor.process(
+            audio_base64, audio_mime_type
+        )
+
+    # Optional speculative FAQ retrieval, running concurrently with LLM call 1
+    speculation = None
+    if not (chat_input.image_base64 or chat_input.audio_base64):
+        speculation = await faq_speculator.begin(user_message_text)
+    answered_directly = False
+
     try:
         print(f"\n--- Turn for User: {user_id} ---")
         print(f"User message: {user_message_text}")
 
         # LLM Call 1: Get initial response or function call
+        # (in "inject" mode the message carries FAQ snippets; history keeps the plain text)
+        llm_started = time.perf_counter()
         llm_response_data = await ai_manager.get_agent_response(
-            chat_history=current_history,
-            user_message=user_message_text,
+            chat_history=current_history[model_history_start:],
+            user_message=(
+                speculation.model_message if speculation else user_message_text
+            ),
             image_base64=chat_input.image_base64,
             image_mime_type=chat_input.image_mime_type,
-            audio_base64=chat_input.audio_base64,
-            audio_mime_type=chat_input.audio_mime_type,
+            audio_base64=audio_base64,
+            audio_mime_type=audio_mime_type,
+            model_name=model_override,
+            system_instruction=prompt_variant.system_instruction or None,
+            generation_config=prompt_variant.generation_config("initial"),
         )
+        llm_latency_ms += (time.perf_counter() - llm_started) * 1000
+        turn_usages.append(llm_response_data.get("usage"))
 
-        # Add user's turn to history, including any multimodal parts
-        user_turn_parts = []
-        if user_message_text:
-            user_turn_parts.append(Part.from_text(user_message_text))
-
+        # Add user's turn to history
         # For this POC, `main.py`'s history only stores the text of user messages.
         # `VertexAIAgent` sends the full message (text + image/audio, if any) to Gemini for the current turn.
         if chat_input.image_base64 and chat_input.image_mime_type:
@@ -134,15 +447,29 @@ async def chat_handler(chat_input: ChatMessageInput):
             # Audio data is processed by VertexAIAgent for the current call
             pass
 
-        if user_turn_parts:  # Ensure we have something to add
-            current_history.append(Content(role="user", parts=user_turn_parts))
+        if user_message_text:  # Ensure we have something to add
+            current_history.append(Message.user_text(user_message_text))
         # If only image/audio was sent with no text, current_history might not get a user text part here.
         # This is acceptable if VertexAIAgent correctly formed the multimodal input.
 
-        if "error" in llm_response_data:
+        if (
+            "error" in llm_response_data
+            and llm_response_data.get("llm_unavailable")
+            and degraded_mode_enabled
+        ):
+            print(f"LLM unavailable ({llm_response_data['error']}); answering in degraded mode.")
+            turn_trace.mark_degraded()
+            degraded = True
+            bot_response_text, current_tool_state = await answer_without_llm(
+                user_id, user_message_text, current_tool_state, turn_key, language
+            )
+            current_history.append(Message.model_text(bot_response_text))
+
+        elif "error" in llm_response_data:
+            failed = True
             bot_response_text = llm_response_data["error"]
             # Optionally add error to history if it's an LLM error, not a system one
-            # current_history.append(Content(role="model", parts=[Part.from_text(f"LLM Error: {bot_response_text}")]))
+            # current_history.append(Message.model_text(f"LLM Error: {bot_response_text}"))
 
         elif "function_call" in llm_response_data:
             fc_data = llm_response_data["function_call"]
@@ -153,22 +480,18 @@ async def chat_handler(chat_input: ChatMessageInput):
             )  # Get the raw Part
 
             print(f"LLM requested Function Call: {tool_name} with args: {tool_args}")
+            turn_trace.record_tool_call(tool_name, tool_args)
+            tool_called = True
 
             if raw_model_part_fc:
-                current_history.append(Content(role="model", parts=[raw_model_part_fc]))
+                current_history.append(Message.from_part("model", raw_model_part_fc))
             else:  # Fallback if raw part isn't passed (should not happen with updated vertex_agent.py)
-                current_history.append(
-                    Content(
-                        role="model",
-                        parts=[
-                            Part(function_call={"name": tool_name, "args": tool_args})
-                        ],
-                    )
-                )
+                current_history.append(Message.function_call(tool_name, tool_args))
 
             tool_result_content: Dict[str, Any] = {
                 "error": f"Tool {tool_name} execution failed."
             }
+            tool_started = time.perf_counter()
             if tool_name in AVAILABLE_TOOLS:
                 actual_tool_function = AVAILABLE_TOOLS[tool_name]
                 final_tool_args = dict(tool_args)
@@ -183,17 +506,39 @@ async def chat_handler(chat_input: ChatMessageInput):
                         ]
 
                 try:
-                    print(
-                        f"Executing tool: {tool_name} with final args: {final_tool_args}"
-                    )
-                    if tool_name == "confirm_booking_time_change":
-                        tool_result_content = await actual_tool_function(
-                            **final_tool_args
+                    precomputed_result = None
+                    if tool_name == "get_faq_answer":
+                        precomputed_result = await faq_speculator.take(
+                            speculation, str(final_tool_args.get("question", ""))
                         )
-                    else:  # Sync tools
-                        tool_result_content = await run_sync_tool(
-                            actual_tool_function, **final_tool_args
+                    if precomputed_result is not None:
+                        print(f"Using speculative FAQ result for: {final_tool_args}")
+                        tool_result_content = precomputed_result
+                    else:
+                        print(
+                            f"Executing tool: {tool_name} with final args: {final_tool_args}"
                         )
+                        if (
+                            tool_name == "confirm_booking_time_change"
+                            and booking_changes_async
+                        ):
+                            # Queued: the turn answers "processing" without waiting for the API
+                            tool_result_content = await tools.submit_booking_time_change(
+                                user_id, turn_key=turn_key, **final_tool_args
+                            )
+                        elif tool_name == "provide_booking_id_for_change":
+                            # Validated against the bookings prefetched for this user
+                            tool_result_content = await actual_tool_function(
+                                user_id=user_id, **final_tool_args
+                            )
+                        elif tool_name in ("confirm_booking_time_change", "get_booking_details"):
+                            tool_result_content = await actual_tool_function(
+                                **final_tool_args
+                            )
+                        else:  # Sync tools
+                            tool_result_content = await run_sync_tool(
+                                actual_tool_function, **final_tool_args
+                            )
                     print(f"Tool {tool_name} result: {tool_result_content}")
 
                     if (
@@ -204,6 +549,8 @@ async def chat_handler(chat_input: ChatMessageInput):
                             "flow_name": "change_booking",
                             "stage": "awaiting_booking_id",
                         }
+                        # Load the user's bookings while they look up the booking ID
+                        tools.prefetch_user_bookings(user_id)
                     elif (
                         tool_name == "provide_booking_id_for_change"
                         and tool_result_content.get("status") == "booking_id_received"
@@ -220,67 +567,163 @@ async def chat_handler(chat_input: ChatMessageInput):
                         "error": f"Error during {tool_name}: {str(e)}"
                     }
 
-            function_response_part_for_history = Part.from_function_response(
-                name=tool_name, response={"content": tool_result_content}
+            turn_tool_calls.append(
+                {
+                    "name": tool_name,
+                    "ok": tool_succeeded(tool_result_content),
+                    "ms": round((time.perf_counter() - tool_started) * 1000, 3),
+                }
             )
             current_history.append(
-                Content(role="function", parts=[function_response_part_for_history])
+                Message.function_response(tool_name, {"content": tool_result_content})
             )
 
-            print(
-                f"Sending tool result back to LLM. History length: {len(current_history)}"
-            )
-            # LLM Call 2: Get final response after tool execution
-            final_llm_response_data = await ai_manager.get_agent_response(
-                chat_history=current_history,  # History now includes the function response
-                user_message="Based on the tool's output, what should I say to the user?",
-            )
-
-            if "error" in final_llm_response_data:
-                bot_response_text = final_llm_response_data["error"]
-            elif "text" in final_llm_response_data:
-                bot_response_text = final_llm_response_data["text"]
-                raw_model_part_text = final_llm_response_data.get(
-                    "raw_model_response_part"
-                )
-                if raw_model_part_text:
-                    current_history.append(
-                        Content(role="model", parts=[raw_model_part_text])
-                    )
-                else:  # Fallback
-                    current_history.append(
-                        Content(role="model", parts=[Part.from_text(bot_response_text)])
-                    )
+            direct_answer = None
+            if tool_name == "get_faq_answer":
+                if get_setting("FAQ_DIRECT_ANSWERS", False) and "answer" in tool_result_content:
+                    direct_answer = tools.direct_faq_answer(user_message_text, language)
+                record_faq_turn(language, direct_answer is not None)
+
+            if direct_answer is not None:
+                # A curated answer in the user's language: no follow-up call to summarize (translate) it.
+                print(f"Answering from the curated FAQ answer ({language}).")
+                bot_response_text = direct_answer
+                current_history.append(Message.model_text(bot_response_text))
             else:
-                bot_response_text = "I've processed that action. How else can I help?"
-                current_history.append(
-                    Content(role="model", parts=[Part.from_text(bot_response_text)])
+                print(
+                    f"Sending tool result back to LLM. History length: {len(current_history)}"
                 )
+                # LLM Call 2: Get final response after tool execution
+                follow_up_started = time.perf_counter()
+                final_llm_response_data = await ai_manager.get_agent_response(
+                    # History now includes the function response
+                    chat_history=current_history[model_history_start:],
+                    user_message=prompt_variant.follow_up_prompt,
+                    model_name=model_override,
+                    system_instruction=prompt_variant.system_instruction or None,
+                    generation_config=prompt_variant.generation_config("follow_up"),
+                )
+                turn_usages.append(final_llm_response_data.get("usage"))
+                follow_up_ms = (time.perf_counter() - follow_up_started) * 1000
+                llm_latency_ms += follow_up_ms
+                faq_speculator.record_follow_up_latency(follow_up_ms)
+
+                if (
+                    "error" in final_llm_response_data
+                    and final_llm_response_data.get("llm_unavailable")
+                    and degraded_mode_enabled
+                ):
+                    # The tool already ran; report its result without the LLM.
+                    turn_trace.mark_degraded()
+                    degraded = True
+                    bot_response_text = describe_tool_result(tool_result_content)
+                    current_history.append(Message.model_text(bot_response_text))
+                elif "error" in final_llm_response_data:
+                    failed = True
+                    bot_response_text = final_llm_response_data["error"]
+                elif "text" in final_llm_response_data:
+                    bot_response_text = final_llm_response_data["text"]
+                    raw_model_part_text = final_llm_response_data.get(
+                        "raw_model_response_part"
+                    )
+                    if raw_model_part_text:
+                        current_history.append(Message.from_part("model", raw_model_part_text))
+                    else:  # Fallback
+                        current_history.append(Message.model_text(bot_response_text))
+                else:
+                    bot_response_text = "I've processed that action. How else can I help?"
+                    current_history.append(Message.model_text(bot_response_text))
 
         elif "text" in llm_response_data:
+            answered_directly = True
             bot_response_text = llm_response_data["text"]
             raw_model_part_text = llm_response_data.get("raw_model_response_part")
             if raw_model_part_text:
-                current_history.append(
-                    Content(role="model", parts=[raw_model_part_text])
-                )
+                current_history.append(Message.from_part("model", raw_model_part_text))
             else:  # Fallback
-                current_history.append(
-                    Content(role="model", parts=[Part.from_text(bot_response_text)])
-                )
+                current_history.append(Message.model_text(bot_response_text))
 
         else:
             bot_response_text = "The AI agent returned an unexpected response format."
-            current_history.append(
-                Content(role="model", parts=[Part.from_text(bot_response_text)])
-            )
+            current_history.append(Message.model_text(bot_response_text))
 
     except Exception as e:
         print(f"Critical error in chat_handler: {e}")
+        failed = True
         bot_response_text = f"A system error occurred: {str(e)}"
+    finally:
+        faq_speculator.finish(speculation, answered_directly)
 
-    conversation_histories[user_id] = current_history
-    active_tool_states[user_id] = current_tool_state
+    session.history = current_history
+    session.tool_state = current_tool_state
+    try:
+        await session_store.save(user_id, session)
+    except SessionConflictError as e:
+        # Another request for this user finished first; don't overwrite its turn.
+        print(f"Session conflict for user {user_id}: {e}")
+        if tools.booking_change_requested():
+            # The booking was already changed: keep this turn and report its
+            # outcome rather than asking for a resend that would change it again.
+            conflict = not await merge_turn_into_session(
+                session_store, user_id, current_history[turn_history_start:], current_tool_state
+            )
+        else:
+            conflict = True
+            bot_response_text = "Your conversation was updated by another request at the same time. Please send your message again."
+    await usage_accountant.record(
+        user_id,
+        tenant_id,
+        model_override or getattr(ai_manager.active_agent, "model_name", ""),
+        turn_usages,
+    )
+    prompt_registry.record_turn(
+        prompt_variant,
+        latency_ms=(time.perf_counter() - turn_started) * 1000,
+        llm_latency_ms=llm_latency_ms,
+        llm_calls=len(turn_usages),
+        output_tokens=sum((usage or {}).get("completion_tokens", 0) for usage in turn_usages),
+        tool_called=tool_called,
+        degraded=degraded,
+        error=failed,
+    )
+    usages = [usage for usage in turn_usages if usage]
+    if message_guard is not None:
+        message_guard.record_reply(
+            user_id,
+            user_message_text,
+            None if failed or conflict else bot_response_text,
+            llm_calls=len(turn_usages),
+            tokens=sum(usage.get("total_tokens", 0) for usage in usages),
+        )
+    analytics = get_analytics_exporter()
+    if analytics is not None:
+        analytics.record(
+            {
+                "ts": time.time(),
+                "user_id": user_id,
+                "tenant": tenant_id,
+                "language": language,
+                "prompt_variant": prompt_variant.label,
+                "intent": turn_tool_calls[0]["name"] if turn_tool_calls else "text",
+                "outcome": (
+                    "conflict" if conflict else "error" if failed else "degraded" if degraded else "ok"
+                ),
+                "latency_ms": round((time.perf_counter() - turn_started) * 1000, 3),
+                "llm_latency_ms": round(llm_latency_ms, 3),
+                "llm_calls": len(turn_usages),
+                "prompt_tokens": sum(usage.get("prompt_tokens", 0) for usage in usages),
+                "completion_tokens": sum(usage.get("completion_tokens", 0) for usage in usages),
+                "total_tokens": sum(usage.get("total_tokens", 0) for usage in usages),
+                "tool_calls": turn_tool_calls,
+                "budget_action": budget.action,
+                "history_length": len(current_history),
+                "has_image": bool(chat_input.image_base64),
+                "has_audio": bool(chat_input.audio_base64),
+            }
+        )
+
+    if job_notices:
+        bot_response_text = "\n\n".join(job_notices + [bot_response_text])
 
     print(f"Bot response to user {user_id}: {bot_response_text}")
 
@@ -293,15 +736,265 @@ async def chat_handler(chat_input: ChatMessageInput):
     )
 
 
+@app.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str):
+    """Status of a queued booking change (queued, running, succeeded or dead)."""
+    if not get_setting("BOOKING_CHANGES_ASYNC", False):
+        raise HTTPException(status_code=404, detail="Booking changes are not queued.")
+    job = await get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} was not found.")
+    return {
+        "job_id": job["job_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job["result"],
+        "last_error": job["last_error"],
+    }
+
+
+# --- Channel Gateway (Messenger, Zalo, web widget) ---
+# Webhooks are verified, queued and acknowledged right away (platforms expect an
+# answer within seconds); the job worker runs the turns and queues the replies.
+def get_channel_adapter(channel: str):
+    adapter = get_channel_adapters().get(channel)
+    if adapter is None:
+        raise HTTPException(status_code=404, detail=f"Channel '{channel}' is not enabled.")
+    return adapter
+
+
+@app.get("/channels/{channel}/webhook")
+async def channel_handshake_endpoint(channel: str, request: Request):
+    """Subscription check of the platform (e.g. Messenger's hub.challenge)."""
+    challenge = get_channel_adapter(channel).handshake(dict(request.query_params))
+    if challenge is None:
+        raise HTTPException(status_code=403, detail="Webhook verification failed.")
+    return PlainTextResponse(challenge)
+
+
+@app.post("/channels/{channel}/webhook")
+async def channel_webhook_endpoint(channel: str, request: Request):
+    adapter = get_channel_adapter(channel)
+    body = await request.body()
+    channel_stats["webhooks_received"] += 1
+    if not adapter.verify({name.lower(): value for name, value in request.headers.items()}, body):
+        channel_stats["webhooks_rejected"] += 1
+        raise HTTPException(status_code=401, detail="Invalid webhook signature.")
+    try:
+        messages = adapter.parse(loads(body))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        channel_stats["webhooks_rejected"] += 1
+        raise HTTPException(status_code=400, detail=f"Malformed webhook payload: {e}")
+
+    queue = get_job_queue()
+    received_at = time.time()
+    for message in messages:
+        user_id = conversation_id(channel, message.sender_id)
+        job = await queue.enqueue(
+            CHANNEL_MESSAGE_JOB,
+            {
+                "channel": channel,
+                "user_id": user_id,
+                "sender_id": message.sender_id,
+                "message_id": message.message_id,
+                "text": message.text,
+            },
+            ordering_key=user_id,  # One turn at a time per conversation, in arrival order
+            idempotency_key=f"{channel}:{message.message_id}",  # Redelivered webhooks
+        )
+        if job["created_at"] < received_at:
+            channel_stats["duplicate_messages"] += 1
+        else:
+            channel_stats["messages_queued"] += 1
+    return {"status": "accepted", "messages": len(messages)}
+
+
+async def run_channel_message_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs the chat turn of a channel message and queues the reply."""
+    output = await chat_handler(
+        ChatMessageInput(
+            user_id=payload["user_id"], tenant_id=payload["channel"], message=payload["text"]
+        )
+    )
+    reply_jobs = await enqueue_reply(
+        payload["channel"],
+        payload["sender_id"],
+        output.bot_response,
+        ordering_key=f"reply:{payload['user_id']}",
+        idempotency_key=f"reply:{payload['channel']}:{payload['message_id']}",
+    )
+    return {"reply_job_ids": [job["job_id"] for job in reply_jobs]}
+
+
+register_job_handler(CHANNEL_MESSAGE_JOB, run_channel_message_job)
+
+
+def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Admin endpoints need ADMIN_API_KEY in the X-Admin-Key header; they are off while it is unset."""
+    expected = get_setting("ADMIN_API_KEY", "")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_API_KEY.")
+    if not hmac.compare_digest(x_admin_key or "", expected):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Key.")
+
+
+def require_key_type(key_type: str = "lineno") -> str:
+    if key_type not in TRACEMALLOC_KEY_TYPES:
+        raise HTTPException(
+            status_code=400, detail=f"key_type must be one of {', '.join(TRACEMALLOC_KEY_TYPES)}."
+        )
+    return key_type
+
+
+@app.get("/usage", dependencies=[Depends(require_admin)])
+async def usage_endpoint(
+    scope: str = "user",
+    day: Optional[str] = None,
+    key: Optional[str] = None,
+    limit: int = 50,
+):
+    """
+    Token usage and estimated cost per user or tenant for one day (default: today,
+    Vietnam time): the `limit` heaviest consumers, or a single `key`.
+    """
+    if scope not in ("user", "tenant"):
+        raise HTTPException(status_code=400, detail="scope must be 'user' or 'tenant'.")
+    return await get_usage_accountant().report(day or usage_day(), scope, key, limit)
+
+
+@app.get("/prompts", dependencies=[Depends(require_admin)])
+async def prompts_endpoint():
+    """
+    Prompt variants and their turn outcomes since this worker started: latency,
+    output tokens and tool-call rate, compared with the first (control) variant.
+    """
+    registry = get_prompt_registry()
+    return {
+        "definitions": [variant.describe() for variant in registry.variants],
+        **registry.report(),
+    }
+
+
+@app.get("/channels/{channel}/outbox", dependencies=[Depends(require_admin)])
+async def channel_outbox_endpoint(channel: str):
+    """Replies kept by a channel with CHANNEL_DELIVERY = "stub" (local testing)."""
+    adapter = get_channel_adapter(channel)
+    if adapter.outbox is None:
+        raise HTTPException(status_code=404, detail="Replies are sent, not kept (CHANNEL_DELIVERY=live).")
+    return {"channel": channel, "replies": list(adapter.outbox)}
+
+
+# --- Diagnostics (admin) ---
+@app.get("/debug/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles_endpoint():
+    """Request profiles written by the profiling middleware, newest first."""
+    return {"profiles": list_profiles(get_setting("PROFILE_OUTPUT_DIR", "profiles"))}
+
+
+@app.get("/debug/profiles/{name}", dependencies=[Depends(require_admin)])
+async def get_profile_endpoint(name: str):
+    output_dir = get_setting("PROFILE_OUTPUT_DIR", "profiles")
+    if name not in list_profiles(output_dir):  # Also keeps paths inside the directory
+        raise HTTPException(status_code=404, detail=f"Profile {name} was not found.")
+    return FileResponse(os.path.join(output_dir, name), filename=name)
+
+
+@app.post("/debug/tracemalloc/start", dependencies=[Depends(require_admin)])
+async def tracemalloc_start_endpoint(frames: int = 1):
+    """Starts tracing allocations (`frames` deep tracebacks); slows the process until stopped."""
+    return memory_diagnostics.start(frames)
+
+
+@app.post("/debug/tracemalloc/stop", dependencies=[Depends(require_admin)])
+async def tracemalloc_stop_endpoint():
+    return memory_diagnostics.stop()
+
+
+@app.post("/debug/tracemalloc/snapshot", dependencies=[Depends(require_admin)])
+async def tracemalloc_snapshot_endpoint(
+    key_type: str = Depends(require_key_type), limit: int = 20, filter: Optional[str] = None
+):
+    """Takes a snapshot; returns its id (for diffs) and its largest allocation sites."""
+    # Snapshots walk every traced allocation: keep them off the event loop.
+    try:
+        snapshot_id = await asyncio.to_thread(memory_diagnostics.take_snapshot)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    top = await asyncio.to_thread(memory_diagnostics.top, snapshot_id, key_type, limit, filter)
+    return {"snapshot_id": snapshot_id, **memory_diagnostics.status(), "top": top}
+
+
+@app.get("/debug/tracemalloc/diff", dependencies=[Depends(require_admin)])
+async def tracemalloc_diff_endpoint(
+    before: int,
+    after: int,
+    key_type: str = Depends(require_key_type),
+    limit: int = 20,
+    filter: Optional[str] = None,
+):
+    """Allocation growth between two snapshots, e.g. `filter=session_store`."""
+    try:
+        diff = await asyncio.to_thread(memory_diagnostics.diff, before, after, key_type, limit, filter)
+        return {"diff": diff}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: warm-up finished and the AI agent and session store are usable."""
+    status = warmup_state.status()
+    return FastJSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Operational counters registered by backend components (coalescing, ...)."""
+    # Snapshots are plain JSON values, so skip jsonable_encoder's per-value walk.
+    return FastJSONResponse(await metrics.snapshot())
+
+
 @app.get("/")
 async def root():
     return {"message": "Vexere Chatbot POC Backend (Centralized AI Agent) is running!"}
 
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
 
+    parser = argparse.ArgumentParser(description="Run the Vexere Chatbot POC backend.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes. More than one requires a shared session store.",
+    )
+    args = parser.parse_args()
+
+    if args.workers > 1 and str(get_setting("SESSION_STORE", "memory")).lower() == "memory":
+        # Workers inherit the environment, so they all open the same SQLite file.
+        print(
+            "Multiple workers need a shared session store; using SESSION_STORE=sqlite."
+        )
+        os.environ["SESSION_STORE"] = "sqlite"
+    if args.workers > 1 and str(get_setting("USAGE_STORE", "memory")).lower() == "memory":
+        os.environ["USAGE_STORE"] = "sqlite"  # Budgets must see every worker's usage
+
     print(
-        "Starting Uvicorn server for Vexere Chatbot POC Backend (Centralized AI Agent)..."
+        f"Starting Uvicorn server for Vexere Chatbot POC Backend (Centralized AI Agent) "
+        f"with {args.workers} worker(s)..."
+    )
+    print("Run from the project root: python -m backend.app.main --workers 4")
+    uvicorn.run(
+        "backend.app.main:app", host=args.host, port=args.port, workers=args.workers
     )
-    print("Run: uvicorn backend.app.main:app --reload --port 8000 --app-dir .")
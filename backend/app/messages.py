@@ -0,0 +1,123 @@
+import functools
+from typing import List, Dict, Any, NamedTuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from vertexai.generative_models import Content
+
+from backend.app.http_io import dumps as _encode, loads
+from backend.app.settings import get_setting
+
+
+class Message(NamedTuple):
+    """
+    One conversation history entry, kept compact in sessions instead of a
+    protobuf-backed vertexai `Content`:
+
+    - text:              role "user" or "model", `text` set
+    - function call:     role "model", `name` set, `payload` = JSON args
+    - function response: role "function", `name` set, `payload` = JSON response
+    - anything else (several parts, inline data, extra part fields): `payload`
+      = the JSON list of part dicts, kept as is
+
+    `to_dict`/`from_dict` use the `Content.to_dict()` layout, so stored sessions
+    are unchanged; `Content` objects are only built at the provider boundary
+    (see `to_content`).
+    """
+
+    role: str
+    text: Optional[str] = None
+    name: Optional[str] = None
+    payload: Optional[bytes] = None
+
+    @classmethod
+    def user_text(cls, text: str) -> "Message":
+        return cls("user", text=text)
+
+    @classmethod
+    def model_text(cls, text: str) -> "Message":
+        return cls("model", text=text)
+
+    @classmethod
+    def function_call(cls, name: str, args: Dict[str, Any]) -> "Message":
+        return cls("model", name=name, payload=_encode(args))
+
+    @classmethod
+    def function_response(cls, name: str, response: Dict[str, Any]) -> "Message":
+        return cls("function", name=name, payload=_encode(response))
+
+    @property
+    def is_function_call(self) -> bool:
+        return self.name is not None and self.role != "function"
+
+    @property
+    def is_function_response(self) -> bool:
+        return self.name is not None and self.role == "function"
+
+    def data(self) -> Any:
+        """The decoded payload: call args, function response, or raw part dicts."""
+        return loads(self.payload) if self.payload is not None else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The entry in `Content.to_dict()` layout."""
+        if self.text is not None:
+            part: Dict[str, Any] = {"text": self.text}
+        elif self.is_function_call:
+            part = {"function_call": {"name": self.name, "args": self.data()}}
+        elif self.is_function_response:
+            part = {"function_response": {"name": self.name, "response": self.data()}}
+        else:
+            return {"role": self.role, "parts": self.data() or []}
+        return {"role": self.role, "parts": [part]}
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any]) -> "Message":
+        """Parses a `Content.to_dict()` entry, using the compact forms where they fit."""
+        role = item.get("role", "user")
+        parts = item.get("parts", [])
+        if len(parts) == 1 and len(parts[0]) == 1:
+            (kind, value), = parts[0].items()
+            if kind == "text":
+                return cls(role, text=value)
+            if kind == "function_call" and set(value) <= {"name", "args"}:
+                return cls(role, name=value["name"], payload=_encode(value.get("args", {})))
+            if kind == "function_response" and set(value) <= {"name", "response"}:
+                return cls(role, name=value["name"], payload=_encode(value.get("response", {})))
+        return cls(role, payload=_encode(parts))
+
+    @classmethod
+    def from_part(cls, role: str, part: Any) -> "Message":
+        """A history entry for a single vertexai `Part` (e.g. a model's raw response part)."""
+        return cls.from_dict({"role": role, "parts": [part.to_dict()]})
+
+
+def as_message(item: Any) -> Message:
+    """`item` as a Message; vertexai `Content` objects (from older callers) are converted."""
+    if isinstance(item, Message):
+        return item
+    return Message.from_dict(item.to_dict())
+
+
+@functools.lru_cache(maxsize=get_setting("CONTENT_CACHE_SIZE", 4096))
+def _content_for(message: Message) -> "Content":
+    from vertexai.generative_models import Content  # Deferred: slow SDK import
+
+    return Content.from_dict(message.to_dict())
+
+
+def to_content(item: Any) -> "Content":
+    """
+    The vertexai `Content` for a history entry. Conversions are cached per message
+    (messages are immutable), so the two LLM calls of a tool turn, and the next
+    turns of the conversation, reuse them instead of rebuilding protobufs.
+    """
+    if not isinstance(item, Message):
+        return item  # Already a Content
+    return _content_for(item)
+
+
+def history_to_dicts(history: List[Any]) -> List[Dict[str, Any]]:
+    return [as_message(item).to_dict() for item in history]
+
+
+def history_from_dicts(items: List[Dict[str, Any]]) -> List[Message]:
+    return [Message.from_dict(item) for item in items]
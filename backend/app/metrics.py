@@ -0,0 +1,22 @@
+import inspect
+from typing import Callable, Dict, Any
+
+# Components register a snapshot function under a section name; the `/metrics`
+# endpoint in main.py returns all sections. Snapshots must be cheap and
+# JSON-serializable; a snapshot that does I/O is a coroutine function (run its
+# blocking part with asyncio.to_thread).
+_snapshot_providers: Dict[str, Callable[[], Any]] = {}
+
+
+def register(section: str, snapshot_fn: Callable[[], Any]) -> None:
+    """Registers (or replaces) the snapshot function for a metrics section."""
+    _snapshot_providers[section] = snapshot_fn
+
+
+async def snapshot() -> Dict[str, Any]:
+    """Collects the current values of all registered metrics sections."""
+    sections = {}
+    for section, fn in list(_snapshot_providers.items()):
+        value = fn()
+        sections[section] = await value if inspect.isawaitable(value) else value
+    return sections
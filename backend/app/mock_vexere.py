@@ -0,0 +1,461 @@
+import asyncio
+import json
+import random
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.app.models import ChangeBookingTimePayload, MockVexereApiResponse
+from backend.app.settings import get_setting
+
+MOCK_VEXERE_MODES = ("stateless", "stateful")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIME_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+
+# Seeded schedule: every route departs at the same times on each day.
+SEED_ROUTES = ["HCM-DALAT", "HCM-NHATRANG", "HCM-VUNGTAU", "HANOI-SAPA"]
+SEED_FIRST_DAY = datetime(2025, 12, 25)
+SEED_DEPARTURE_HOURS = [6, 8, 10, 12, 14, 16, 18, 20, 22]
+SEED_DEPARTURE_MINUTE = 30
+SEED_FIRST_BOOKING_NUMBER = 10000
+NON_CHANGEABLE_EVERY = 10  # Every 10th seeded booking is also issued as non-changeable "VXFAIL…"
+BOOKINGS_PER_USER = 3  # Seeded bookings attributed to each user id
+BOOKING_ID_FORMAT = re.compile(r"^[A-Z]{2,}[A-Z0-9-]*\d[A-Z0-9-]*$", re.IGNORECASE)
+
+
+def seeded_booking_id(index: int) -> str:
+    return f"VX{SEED_FIRST_BOOKING_NUMBER + index}"
+
+
+def seeded_non_changeable_booking_id(index: int, bookings: int) -> str:
+    index = (index % bookings) // NON_CHANGEABLE_EVERY * NON_CHANGEABLE_EVERY
+    return f"VXFAIL{SEED_FIRST_BOOKING_NUMBER + index}"
+
+
+def seeded_user_booking_ids(user_id: str, bookings: int) -> List[str]:
+    """The seeded bookings attributed to a user: consecutive ids from a hash of the user id."""
+    first = zlib.crc32(user_id.encode("utf-8")) % bookings
+    return [seeded_booking_id((first + i) % bookings) for i in range(min(BOOKINGS_PER_USER, bookings))]
+
+
+def _seeded_trip(index: int, days: int) -> Tuple[str, int, int]:
+    """(route, day offset, departure slot) of the i-th seeded booking."""
+    route_count = len(SEED_ROUTES)
+    return (
+        SEED_ROUTES[index % route_count],
+        (index // route_count) % days,
+        (index // (route_count * days)) % len(SEED_DEPARTURE_HOURS),
+    )
+
+
+def _departure_time(day: int, slot: int) -> str:
+    departure = SEED_FIRST_DAY + timedelta(
+        days=day, hours=SEED_DEPARTURE_HOURS[slot], minutes=SEED_DEPARTURE_MINUTE
+    )
+    return departure.strftime(TIME_FORMAT)
+
+
+def seeded_change_request(
+    index: int, bookings: int, days: int, to_first_departure: bool = False
+) -> Tuple[str, str]:
+    """
+    A valid change for a seeded booking: (booking id, the next departure on the
+    same route and day). Benchmarks and tests use it to build requests that the
+    stateful service accepts while seats last. With `to_first_departure` every
+    booking of a route targets the same departure, to exhaust its seats.
+    """
+    index %= bookings
+    _, day, slot = _seeded_trip(index, days)
+    if to_first_departure:
+        return seeded_booking_id(index), _departure_time(0, 0)
+    return seeded_booking_id(index), _departure_time(day, (slot + 1) % len(SEED_DEPARTURE_HOURS))
+
+
+class MockVexereService:
+    """
+    Local stand-in for the Vexere booking API behind `/mock_vexere/*`.
+
+    "stateless" mode keeps the original behaviour (format checks only; ids
+    containing "FAIL" are rejected). "stateful" mode keeps seeded trips and
+    bookings in SQLite: a change moves the booking's seats to another departure
+    of the same route if it has capacity left, in one transaction, so concurrent
+    sessions contend for seats as they would on the real API. Changes may carry
+    the booking version they were based on (`expected_version`, optimistic
+    locking) and an `idempotency_key` (a retried request returns the first
+    response instead of being applied twice).
+
+    Latency and transient errors can be injected in both modes.
+    """
+
+    def __init__(
+        self,
+        mode: str = "stateless",
+        db_path: str = ":memory:",
+        bookings: int = 500,
+        days: int = 7,
+        seat_capacity: int = 40,
+        latency_ms: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        if mode not in MOCK_VEXERE_MODES:
+            raise ValueError(
+                f"Unsupported MOCK_VEXERE_MODE '{mode}'. Valid values: {', '.join(MOCK_VEXERE_MODES)}"
+            )
+        self.mode = mode
+        self.bookings = bookings
+        self.days = days
+        self.seat_capacity = seat_capacity
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        if self.stateful:
+            self._connection = sqlite3.connect(
+                db_path, check_same_thread=False, isolation_level=None, timeout=10
+            )
+            if db_path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            self._create_schema()
+            self._seed()
+
+    @property
+    def stateful(self) -> bool:
+        return self.mode == "stateful"
+
+    def _create_schema(self) -> None:
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS trips (
+                trip_id TEXT PRIMARY KEY,
+                route TEXT NOT NULL,
+                departure_time TEXT NOT NULL,
+                capacity INTEGER NOT NULL,
+                seats_taken INTEGER NOT NULL,
+                UNIQUE (route, departure_time)
+            );
+            CREATE TABLE IF NOT EXISTS bookings (
+                booking_id TEXT PRIMARY KEY,
+                trip_id TEXT NOT NULL REFERENCES trips (trip_id),
+                seats INTEGER NOT NULL,
+                changeable INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                version INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                idempotency_key TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            """
+        )
+
+    def _seed(self) -> None:
+        """Creates the seeded schedule and bookings once per database (safe for several workers)."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if self._connection.execute("SELECT COUNT(*) FROM trips").fetchone()[0]:
+                    self._connection.execute("COMMIT")
+                    return
+                for route in SEED_ROUTES:
+                    for day in range(self.days):
+                        for slot in range(len(SEED_DEPARTURE_HOURS)):
+                            departure = _departure_time(day, slot)
+                            self._connection.execute(
+                                "INSERT INTO trips VALUES (?, ?, ?, ?, 0)",
+                                (f"{route}@{departure}", route, departure, self.seat_capacity),
+                            )
+                for index in range(self.bookings):
+                    route, day, slot = _seeded_trip(index, self.days)
+                    trip_id = f"{route}@{_departure_time(day, slot)}"
+                    seats = 1 + index % 2
+                    issued = [(seeded_booking_id(index), 1)]
+                    if index % NON_CHANGEABLE_EVERY == 0:
+                        issued.append((seeded_non_changeable_booking_id(index, self.bookings), 0))
+                    for booking_id, changeable in issued:
+                        self._connection.execute(
+                            "INSERT INTO bookings VALUES (?, ?, ?, ?, 'CONFIRMED', 1)",
+                            (booking_id, trip_id, seats, changeable),
+                        )
+                        self._connection.execute(
+                            "UPDATE trips SET seats_taken = seats_taken + ? WHERE trip_id = ?",
+                            (seats, trip_id),
+                        )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    async def inject_faults(self) -> Optional[MockVexereApiResponse]:
+        """Applies the configured latency; returns an error response for an injected failure."""
+        if self.latency_ms > 0:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+        if self.error_rate > 0 and self._random.random() < self.error_rate:
+            return MockVexereApiResponse(
+                success=False, message="Booking service temporarily unavailable."
+            )
+        return None
+
+    def _get_booking_sync(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT b.booking_id, b.seats, b.changeable, b.status, b.version, "
+                "t.trip_id, t.route, t.departure_time "
+                "FROM bookings b JOIN trips t ON t.trip_id = b.trip_id WHERE b.booking_id = ?",
+                (booking_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        keys = (
+            "booking_id",
+            "seats",
+            "changeable",
+            "status",
+            "version",
+            "trip_id",
+            "route",
+            "departure_time",
+        )
+        booking = dict(zip(keys, row))
+        booking["changeable"] = bool(booking["changeable"])
+        return booking
+
+    async def get_booking(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get_booking_sync, booking_id)
+
+    def _stateless_booking(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Stateless mode keeps no bookings: any well-formed id exists and ids
+        containing "FAIL" cannot be changed, as in `/change_booking`. Seeded ids
+        also get their seeded trip (changes are not remembered).
+        """
+        if not BOOKING_ID_FORMAT.match(booking_id):
+            return None
+        booking = {
+            "booking_id": booking_id,
+            "status": "CONFIRMED",
+            "changeable": "FAIL" not in booking_id.upper(),
+        }
+        number = booking_id[2:]
+        if booking_id.upper().startswith("VX") and number.isdigit():
+            index = int(number) - SEED_FIRST_BOOKING_NUMBER
+            if 0 <= index < self.bookings:
+                route, day, slot = _seeded_trip(index, self.days)
+                booking.update(seats=1 + index % 2, route=route, departure_time=_departure_time(day, slot))
+        return booking
+
+    async def booking_details(self, booking_id: str) -> Optional[Dict[str, Any]]:
+        """The booking in either mode, or None if it does not exist."""
+        if self.stateful:
+            return await self.get_booking(booking_id)
+        return self._stateless_booking(booking_id)
+
+    async def user_bookings(self, user_id: str) -> List[Dict[str, Any]]:
+        """The user's recent bookings (seeded ones, see `seeded_user_booking_ids`)."""
+        found = []
+        for booking_id in seeded_user_booking_ids(user_id, self.bookings):
+            booking = await self.booking_details(booking_id)
+            if booking is not None:
+                found.append(booking)
+        return found
+
+    def _change_booking_sync(self, payload: ChangeBookingTimePayload) -> MockVexereApiResponse:
+        request = json.dumps(
+            {
+                "booking_id": payload.booking_id,
+                "new_time": payload.new_time,
+                "expected_version": payload.expected_version,
+            },
+            sort_keys=True,
+        )
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so the checks below and the
+            # seat moves are atomic even across processes sharing the file.
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if payload.idempotency_key:
+                    stored = self._connection.execute(
+                        "SELECT request, response FROM idempotency_keys WHERE idempotency_key = ?",
+                        (payload.idempotency_key,),
+                    ).fetchone()
+                    if stored is not None:
+                        self._connection.execute("COMMIT")
+                        if stored[0] != request:
+                            return MockVexereApiResponse(
+                                success=False,
+                                message="Idempotency key was already used for a different request.",
+                                data={"error_code": "IDEMPOTENCY_KEY_REUSED"},
+                            )
+                        return MockVexereApiResponse(**json.loads(stored[1]))
+
+                response = self._apply_change(payload)
+                if payload.idempotency_key:
+                    self._connection.execute(
+                        "INSERT INTO idempotency_keys VALUES (?, ?, ?, ?)",
+                        (
+                            payload.idempotency_key,
+                            request,
+                            response.model_dump_json(),
+                            time.time(),
+                        ),
+                    )
+                self._connection.execute("COMMIT")
+                return response
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _apply_change(self, payload: ChangeBookingTimePayload) -> MockVexereApiResponse:
+        """Validates and applies a change inside the caller's transaction."""
+
+        def rejected(code: str, message: str) -> MockVexereApiResponse:
+            return MockVexereApiResponse(
+                success=False, message=message, data={"error_code": code}
+            )
+
+        booking = self._connection.execute(
+            "SELECT b.trip_id, b.seats, b.changeable, b.version, t.route "
+            "FROM bookings b JOIN trips t ON t.trip_id = b.trip_id WHERE b.booking_id = ?",
+            (payload.booking_id,),
+        ).fetchone()
+        if booking is None:
+            return rejected("BOOKING_NOT_FOUND", f"Booking {payload.booking_id} was not found.")
+        trip_id, seats, changeable, version, route = booking
+        if not changeable:
+            return rejected(
+                "NOT_CHANGEABLE",
+                f"Failed to change booking for {payload.booking_id}. Reason: Ticket not eligible for change.",
+            )
+        if payload.expected_version is not None and payload.expected_version != version:
+            return rejected(
+                "VERSION_CONFLICT",
+                f"Booking {payload.booking_id} was modified by another request "
+                f"(version {version}, expected {payload.expected_version}).",
+            )
+
+        target = self._connection.execute(
+            "SELECT trip_id FROM trips WHERE route = ? AND departure_time = ?",
+            (route, payload.new_time),
+        ).fetchone()
+        if target is None:
+            return rejected(
+                "NO_SUCH_TRIP", f"There is no {route} departure at {payload.new_time}."
+            )
+        target_trip_id = target[0]
+        if target_trip_id != trip_id:
+            has_seats = self._connection.execute(
+                "SELECT 1 FROM trips WHERE trip_id = ? AND seats_taken + ? <= capacity",
+                (target_trip_id, seats),
+            ).fetchone()
+            if has_seats is None:
+                return rejected(
+                    "SOLD_OUT",
+                    f"The {route} departure at {payload.new_time} has no seats left.",
+                )
+
+        # Seats move only once the booking itself accepted the change.
+        accepted = self._connection.execute(
+            "UPDATE bookings SET trip_id = ?, version = version + 1 "
+            "WHERE booking_id = ? AND changeable = 1 AND version = ?",
+            (target_trip_id, payload.booking_id, version),
+        )
+        if accepted.rowcount != 1:
+            return rejected(
+                "VERSION_CONFLICT", f"Booking {payload.booking_id} was modified by another request."
+            )
+        if target_trip_id != trip_id:
+            self._connection.execute(
+                "UPDATE trips SET seats_taken = seats_taken + ? WHERE trip_id = ?",
+                (seats, target_trip_id),
+            )
+            self._connection.execute(
+                "UPDATE trips SET seats_taken = seats_taken - ? WHERE trip_id = ?",
+                (seats, trip_id),
+            )
+        return MockVexereApiResponse(
+            success=True,
+            message=f"Successfully changed booking {payload.booking_id} to new time: {payload.new_time}.",
+            data={
+                "booking_id": payload.booking_id,
+                "new_time": payload.new_time,
+                "status": "CONFIRMED",
+                "trip_id": target_trip_id,
+                "seats": seats,
+                "version": version + 1,
+            },
+        )
+
+    async def change_booking(self, payload: ChangeBookingTimePayload) -> MockVexereApiResponse:
+        if not TIME_PATTERN.match(payload.new_time):
+            return MockVexereApiResponse(
+                success=False,
+                message="Invalid new_time format. Please use YYYY-MM-DD HH:MM:SS.",
+            )
+        return await asyncio.to_thread(self._change_booking_sync, payload)
+
+    def _trips_sync(self, route: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT trip_id, departure_time, capacity, seats_taken FROM trips "
+                "WHERE route = ? ORDER BY departure_time",
+                (route,),
+            ).fetchall()
+        return [
+            {
+                "trip_id": trip_id,
+                "departure_time": departure_time,
+                "capacity": capacity,
+                "seats_available": capacity - seats_taken,
+            }
+            for trip_id, departure_time, capacity, seats_taken in rows
+        ]
+
+    async def trips(self, route: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._trips_sync, route)
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            with self._lock:
+                self._connection.close()
+            self._connection = None
+
+
+def build_mock_vexere_service() -> MockVexereService:
+    """Creates the service configured by the MOCK_VEXERE_* settings."""
+    return MockVexereService(
+        mode=str(get_setting("MOCK_VEXERE_MODE", "stateless")).lower(),
+        db_path=get_setting("MOCK_VEXERE_DB_PATH", ":memory:"),
+        bookings=get_setting("MOCK_VEXERE_BOOKINGS", 500),
+        days=get_setting("MOCK_VEXERE_DAYS", 7),
+        seat_capacity=get_setting("MOCK_VEXERE_SEAT_CAPACITY", 40),
+        latency_ms=get_setting("MOCK_VEXERE_LATENCY_MS", 0.0),
+        error_rate=get_setting("MOCK_VEXERE_ERROR_RATE", 0.0),
+        seed=get_setting("MOCK_VEXERE_SEED", 0),
+    )
+
+
+_mock_vexere_service: Optional[MockVexereService] = None
+_mock_vexere_lock = threading.Lock()
+
+
+def get_mock_vexere_service() -> MockVexereService:
+    """The mock booking service of this worker process, created on first use."""
+    global _mock_vexere_service
+    with _mock_vexere_lock:
+        if _mock_vexere_service is None:
+            _mock_vexere_service = build_mock_vexere_service()
+    return _mock_vexere_service
+
+
+async def close_mock_vexere_service() -> None:
+    global _mock_vexere_service
+    if _mock_vexere_service is not None:
+        await _mock_vexere_service.close()
+        _mock_vexere_service = None
@@ -1,11 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 
 
 class ChatMessageInput(BaseModel):
+    # Validated once per request, often with megabytes of base64 media: don't
+    # intern message text or media in pydantic's string cache (keys only), and
+    # keep the input out of error messages.
+    model_config = ConfigDict(cache_strings="keys", hide_input_in_errors=True)
+
     user_id: str  # To identify the user session
+    tenant_id: Optional[str] = None  # Partner/channel the user belongs to, for usage budgets
     message: str
-    session_state: Optional[Dict[str, Any]] = {}  # To maintain conversation state
+    session_state: Optional[Dict[str, Any]] = Field(default_factory=dict)  # To maintain conversation state
     image_base64: Optional[str] = None  # Base64 encoded image data
     image_mime_type: Optional[str] = None  # e.g., "image/png", "image/jpeg"
     audio_base64: Optional[str] = None  # Base64 encoded audio data
@@ -20,6 +26,8 @@ class ChatMessageOutput(BaseModel):
 class ChangeBookingTimePayload(BaseModel):
     booking_id: str
     new_time: str  # Expected format: "YYYY-MM-DD HH:MM:SS"
+    expected_version: Optional[int] = None  # Reject the change if the booking has moved on
+    idempotency_key: Optional[str] = None  # Retries with the same key are applied once
 
 
 class MockVexereApiResponse(BaseModel):
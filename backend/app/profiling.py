@@ -0,0 +1,256 @@
+import asyncio
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from backend.app import metrics
+from backend.app.settings import get_setting
+
+PROFILERS = ("sampling", "cprofile")
+SNAPSHOTS_KEPT = 10  # tracemalloc snapshots held for diffing
+TRACEMALLOC_KEY_TYPES = ("lineno", "filename", "traceback")  # Groupings accepted by Snapshot.statistics
+
+profiling_stats: Dict[str, int] = {"profiles_written": 0, "skipped_busy": 0}
+
+
+class StackSampler:
+    """
+    Statistical profiler: a thread records the stack of `thread_id` (the event
+    loop) every `interval_s` and counts identical stacks. Everything the loop
+    runs meanwhile is sampled, including other requests' coroutines, so
+    profile under representative load or with a single client.
+    """
+
+    def __init__(self, thread_id: int, interval_s: float = 0.002):
+        self.thread_id = thread_id
+        self.interval_s = interval_s
+        self.counts: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+
+
+def folded_stacks(counts: Counter) -> str:
+    """Collapsed-stack text ("outer;inner count" per line), read by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests that carry `X-Profile: 1` (with the admin key in
+    X-Admin-Key when ADMIN_API_KEY is set) plus a random `sample_rate` share of
+    all requests, and writes one file per request to `output_dir`:
+    collapsed stacks (`.folded`, "sampling") or cProfile stats (`.prof`,
+    "cprofile", for snakeviz or flameprof). The file name is returned in the
+    X-Profile-Id header. One request is profiled at a time; others run
+    untouched. Only installed when PROFILING_ENABLED is set.
+    """
+
+    def __init__(
+        self,
+        app,
+        output_dir: str = "profiles",
+        profiler: str = "sampling",
+        sample_rate: float = 0.0,
+        interval_ms: float = 2.0,
+        max_files: int = 50,
+    ):
+        if profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}'. Use one of {PROFILERS}.")
+        self.app = app
+        self.output_dir = output_dir
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.interval_s = interval_ms / 1000.0
+        self.max_files = max_files
+        self._busy = False
+        metrics.register("profiling", lambda: dict(profiling_stats))
+
+    def _requested(self, scope) -> bool:
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") not in (b"1", b"true"):
+            return False
+        admin_key = get_setting("ADMIN_API_KEY", "")
+        return not admin_key or hmac.compare_digest(
+            headers.get(b"x-admin-key", b""), admin_key.encode("utf-8")
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            (self.sample_rate > 0 and random.random() < self.sample_rate) or self._requested(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+        if self._busy:
+            profiling_stats["skipped_busy"] += 1
+            await self.app(scope, receive, send)
+            return
+
+        self._busy = True
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 1_000_000:06d}-{scope['method']}-{slug}"
+        name += ".folded" if self.profiler == "sampling" else ".prof"
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message["headers"], (b"x-profile-id", name.encode())]}
+            await send(message)
+
+        if self.profiler == "sampling":
+            profiler = StackSampler(threading.get_ident(), self.interval_s)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            if self.profiler == "sampling":
+                output: Any = folded_stacks(profiler.stop())
+            else:
+                profiler.disable()
+                output = profiler
+            self._busy = False
+            await asyncio.to_thread(self._write, name, output)
+
+    def _write(self, name: str, output: Any) -> None:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, name)
+        if isinstance(output, cProfile.Profile):
+            output.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(output)
+        profiling_stats["profiles_written"] += 1
+        for old_name in list_profiles(self.output_dir)[self.max_files :]:
+            os.remove(os.path.join(self.output_dir, old_name))
+
+
+def list_profiles(output_dir: str) -> List[str]:
+    """Profile file names, newest first."""
+    if not os.path.isdir(output_dir):
+        return []
+    return sorted(
+        (name for name in os.listdir(output_dir) if name.endswith((".folded", ".prof"))),
+        reverse=True,
+    )
+
+
+class MemoryDiagnostics:
+    """
+    tracemalloc control for the admin endpoints: start tracing, take numbered
+    snapshots and diff two of them (e.g. before and after a load test, to find
+    what keeps growing in session storage). Tracing slows allocations, so it is
+    off until started and should be stopped afterwards.
+    """
+
+    def __init__(self):
+        self.snapshots: Dict[int, tracemalloc.Snapshot] = {}
+        self._next_id = 1
+
+    def start(self, frames: int = 1) -> Dict[str, Any]:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        tracemalloc.stop()
+        self.snapshots.clear()
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": current,
+            "peak_traced_bytes": peak,
+            "snapshots": sorted(self.snapshots),
+        }
+
+    def take_snapshot(self) -> int:
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not tracing; start it first.")
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            )
+        )
+        snapshot_id = self._next_id
+        self._next_id += 1
+        self.snapshots[snapshot_id] = snapshot
+        while len(self.snapshots) > SNAPSHOTS_KEPT:
+            del self.snapshots[min(self.snapshots)]
+        return snapshot_id
+
+    def _get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        if snapshot_id not in self.snapshots:
+            raise KeyError(f"Snapshot {snapshot_id} was not found.")
+        return self.snapshots[snapshot_id]
+
+    @staticmethod
+    def _filtered(snapshot: tracemalloc.Snapshot, path_filter: Optional[str]) -> tracemalloc.Snapshot:
+        if not path_filter:
+            return snapshot
+        return snapshot.filter_traces((tracemalloc.Filter(True, f"*{path_filter}*"),))
+
+    def top(
+        self, snapshot_id: int, key_type: str = "lineno", limit: int = 20, path_filter: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        stats = self._filtered(self._get(snapshot_id), path_filter).statistics(key_type)
+        return [
+            {"location": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+            for stat in stats[:limit]
+        ]
+
+    def diff(
+        self,
+        before_id: int,
+        after_id: int,
+        key_type: str = "lineno",
+        limit: int = 20,
+        path_filter: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Largest allocation changes from snapshot `before_id` to `after_id`."""
+        before = self._filtered(self._get(before_id), path_filter)
+        after = self._filtered(self._get(after_id), path_filter)
+        return [
+            {
+                "location": str(stat.traceback),
+                "size_diff_bytes": stat.size_diff,
+                "size_bytes": stat.size,
+                "count_diff": stat.count_diff,
+            }
+            for stat in after.compare_to(before, key_type)[:limit]
+        ]
+
+
+memory_diagnostics = MemoryDiagnostics()
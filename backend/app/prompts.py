@@ -0,0 +1,232 @@
+import hashlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from backend.app import metrics
+from backend.app.http_io import loads
+from backend.app.settings import get_setting
+
+# LLM calls of a `/chat` turn that a prompt variant configures: the first call
+# with the user's message, and the call after a tool ran.
+CALL_ROUTES = ("initial", "follow_up")
+GENERATION_CONFIG_KEYS = (
+    "temperature",
+    "top_p",
+    "top_k",
+    "max_output_tokens",
+    "stop_sequences",
+)
+DEFAULT_FOLLOW_UP_PROMPT = "Based on the tool's output, what should I say to the user?"
+LATENCY_WINDOW = 1000  # Recent turns per variant kept for latency percentiles
+
+
+@dataclass
+class PromptVariant:
+    """
+    One versioned prompt configuration: the system instruction sent with every
+    call, the follow-up prompt sent after a tool ran, and generation settings
+    (GENERATION_CONFIG_KEYS) per call route. An empty system instruction or
+    generation config leaves the model's defaults in place.
+    """
+
+    name: str
+    version: str = "1"
+    weight: float = 1.0  # Share of users relative to the other variants
+    system_instruction: str = ""
+    follow_up_prompt: str = DEFAULT_FOLLOW_UP_PROMPT
+    generation_configs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        for route, config in self.generation_configs.items():
+            if route not in CALL_ROUTES:
+                raise ValueError(
+                    f"Prompt variant '{self.name}': unknown route '{route}'. Valid values: {', '.join(CALL_ROUTES)}"
+                )
+            unknown = sorted(set(config) - set(GENERATION_CONFIG_KEYS))
+            if unknown:
+                raise ValueError(
+                    f"Prompt variant '{self.name}': unsupported generation settings {unknown}."
+                )
+        if self.weight < 0:
+            raise ValueError(f"Prompt variant '{self.name}': weight must not be negative.")
+
+    @property
+    def label(self) -> str:
+        """Name and version, e.g. "short@2"; stats are kept per label."""
+        return f"{self.name}@{self.version}"
+
+    def generation_config(self, route: str) -> Optional[Dict[str, Any]]:
+        return self.generation_configs.get(route) or None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "weight": self.weight,
+            "system_instruction": self.system_instruction,
+            "follow_up_prompt": self.follow_up_prompt,
+            "generation_configs": self.generation_configs,
+        }
+
+
+# The prompts used before variants existed: no system instruction, the model's
+# default generation settings.
+BASELINE_VARIANT = PromptVariant(name="baseline")
+
+
+class VariantStats:
+    """Per-variant turn outcomes, compared on GET /prompts."""
+
+    def __init__(self):
+        self.turns = 0
+        self.llm_calls = 0
+        self.tool_call_turns = 0
+        self.degraded_turns = 0
+        self.error_turns = 0
+        self.output_tokens = 0
+        self.latency_ms_total = 0.0
+        self.llm_latency_ms_total = 0.0
+        self._latencies: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def record(
+        self,
+        latency_ms: float,
+        llm_latency_ms: float,
+        llm_calls: int,
+        output_tokens: int,
+        tool_called: bool,
+        degraded: bool,
+        error: bool,
+    ) -> None:
+        self.turns += 1
+        self.llm_calls += llm_calls
+        self.tool_call_turns += tool_called
+        self.degraded_turns += degraded
+        self.error_turns += error
+        self.output_tokens += output_tokens
+        self.latency_ms_total += latency_ms
+        self.llm_latency_ms_total += llm_latency_ms
+        self._latencies.append(latency_ms)
+
+    def _percentile(self, fraction: float) -> float:
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return 0.0
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    def summary(self) -> Dict[str, Any]:
+        turns = self.turns or 1
+        return {
+            "turns": self.turns,
+            "mean_latency_ms": round(self.latency_ms_total / turns, 3),
+            "p50_latency_ms": round(self._percentile(0.5), 3),
+            "p95_latency_ms": round(self._percentile(0.95), 3),
+            "mean_llm_latency_ms": round(self.llm_latency_ms_total / turns, 3),
+            "mean_llm_calls": round(self.llm_calls / turns, 4),
+            "mean_output_tokens": round(self.output_tokens / turns, 2),
+            "tool_call_rate": round(self.tool_call_turns / turns, 4),
+            "degraded_rate": round(self.degraded_turns / turns, 4),
+            "error_rate": round(self.error_turns / turns, 4),
+        }
+
+
+def assignment_bucket(user_id: str, salt: str) -> float:
+    """A stable number in [0, 1) for `user_id`: the same user always gets the same variant."""
+    digest = hashlib.sha256(f"{salt}:{user_id}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class PromptRegistry:
+    """
+    The configured prompt variants and the traffic split between them. Users
+    are assigned by a salted hash of their user_id in proportion to the
+    variant weights, so a conversation keeps its variant across turns and
+    workers; changing `salt` reshuffles everyone. The first variant is the
+    control the others are compared against.
+    """
+
+    def __init__(self, variants: List[PromptVariant], salt: str = "prompts"):
+        if not variants:
+            raise ValueError("At least one prompt variant is required.")
+        labels = [variant.label for variant in variants]
+        if len(set(labels)) != len(labels):
+            raise ValueError(f"Duplicate prompt variants: {labels}")
+        if not any(variant.weight > 0 for variant in variants):
+            raise ValueError("At least one prompt variant needs a positive weight.")
+        self.variants = variants
+        self.salt = salt
+        self.stats: Dict[str, VariantStats] = {variant.label: VariantStats() for variant in variants}
+
+    @property
+    def control(self) -> PromptVariant:
+        return self.variants[0]
+
+    def assign(self, user_id: str) -> PromptVariant:
+        total = sum(variant.weight for variant in self.variants)
+        point = assignment_bucket(user_id, self.salt) * total
+        for variant in self.variants:
+            if variant.weight <= 0:
+                continue
+            point -= variant.weight
+            if point < 0:
+                return variant
+        return [variant for variant in self.variants if variant.weight > 0][-1]
+
+    def record_turn(self, variant: PromptVariant, **outcome: Any) -> None:
+        """Adds one turn's outcome (see VariantStats.record) to the variant's stats."""
+        self.stats[variant.label].record(**outcome)
+
+    def report(self) -> Dict[str, Any]:
+        """Variant stats, each with its latency and output-token change relative to the control."""
+        control = self.stats[self.control.label].summary()
+        variants = []
+        for variant in self.variants:
+            summary = self.stats[variant.label].summary()
+            if variant is not self.control and summary["turns"] and control["turns"]:
+                for key in ("mean_latency_ms", "p95_latency_ms", "mean_output_tokens", "tool_call_rate"):
+                    if control[key]:
+                        summary[f"{key}_vs_control"] = round(summary[key] / control[key] - 1, 4)
+            variants.append({"variant": variant.label, "weight": variant.weight, **summary})
+        return {"control": self.control.label, "salt": self.salt, "variants": variants}
+
+
+def parse_variants(definitions: Any) -> List[PromptVariant]:
+    """
+    Variants from the PROMPT_VARIANTS setting: a dict of name to
+    {"version", "weight", "system_instruction", "follow_up_prompt",
+    "generation_configs"} (or the same as a JSON string, e.g. from the
+    environment). Empty means the baseline prompts only.
+    """
+    if isinstance(definitions, (str, bytes)):
+        definitions = loads(definitions) if definitions.strip() else {}
+    if not definitions:
+        return [BASELINE_VARIANT]
+    return [
+        PromptVariant(name=name, **definition)
+        for name, definition in definitions.items()
+    ]
+
+
+def build_prompt_registry() -> PromptRegistry:
+    """Creates the registry from the PROMPT_VARIANTS / PROMPT_EXPERIMENT_SALT settings."""
+    return PromptRegistry(
+        parse_variants(get_setting("PROMPT_VARIANTS", {})),
+        salt=str(get_setting("PROMPT_EXPERIMENT_SALT", "prompts")),
+    )
+
+
+_prompt_registry: Optional[PromptRegistry] = None
+
+
+def get_prompt_registry() -> PromptRegistry:
+    """The prompt registry of this worker process, created on first use."""
+    global _prompt_registry
+    if _prompt_registry is None:
+        _prompt_registry = build_prompt_registry()
+        metrics.register("prompts", _prompt_registry.report)
+        print(
+            "Prompt variants: "
+            + ", ".join(f"{variant.label} (weight {variant.weight:g})" for variant in _prompt_registry.variants)
+        )
+    return _prompt_registry
@@ -0,0 +1,255 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from backend.app.faults import wrap_session_store
+from backend.app.http_io import dumps, loads
+from backend.app.messages import (
+    Message,
+    as_message,
+    history_from_dicts,
+    history_to_dicts,
+)  # History is stored as serialized Content dicts
+from backend.app.settings import get_setting
+
+SESSION_STORE_BACKENDS = ("memory", "sqlite", "redis")
+
+
+class SessionConflictError(Exception):
+    """Raised when a session was saved by another request since it was loaded."""
+
+
+@dataclass
+class SessionRecord:
+    """A user's conversation history and tool-flow state at a given version."""
+
+    history: List[Message] = field(default_factory=list)
+    tool_state: Dict[str, Any] = field(default_factory=dict)
+    version: int = 0  # 0 means the session has never been saved
+
+
+def serialize_history(history: List[Message]) -> str:
+    return dumps(history_to_dicts(history)).decode("utf-8")
+
+
+def deserialize_history(data: str) -> List[Message]:
+    return history_from_dicts(loads(data))
+
+
+class InMemorySessionStore:
+    """
+    Process-local store (the original behaviour). Fine for a single worker;
+    use the sqlite or redis backend when running several workers.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionRecord] = {}
+
+    async def load(self, user_id: str) -> SessionRecord:
+        stored = self._sessions.get(user_id)
+        if stored is None:
+            return SessionRecord()
+        # Hand out copies so an unsaved turn never leaks into the stored session.
+        return SessionRecord(
+            history=list(stored.history),
+            tool_state=dict(stored.tool_state),
+            version=stored.version,
+        )
+
+    async def save(self, user_id: str, record: SessionRecord) -> int:
+        stored = self._sessions.get(user_id)
+        stored_version = stored.version if stored else 0
+        if stored_version != record.version:
+            raise SessionConflictError(
+                f"Session {user_id} is at version {stored_version}, expected {record.version}."
+            )
+        record.version += 1
+        self._sessions[user_id] = SessionRecord(
+            history=[as_message(item) for item in record.history],
+            tool_state=dict(record.tool_state),
+            version=record.version,
+        )
+        return record.version
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteSessionStore:
+    """
+    Session store shared by all worker processes on a host through a SQLite file
+    (WAL mode). Every write carries the version it was based on; a write based
+    on a stale version is rejected with SessionConflictError.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                user_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                history TEXT NOT NULL,
+                tool_state TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+
+    def _load_sync(self, user_id: str) -> SessionRecord:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT version, history, tool_state FROM sessions WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+        if row is None:
+            return SessionRecord()
+        version, history, tool_state = row
+        return SessionRecord(
+            history=deserialize_history(history),
+            tool_state=loads(tool_state),
+            version=version,
+        )
+
+    def _save_sync(self, user_id: str, record: SessionRecord) -> int:
+        history = serialize_history(record.history)
+        tool_state = dumps(record.tool_state).decode("utf-8")
+        new_version = record.version + 1
+        with self._lock:
+            if record.version == 0:
+                cursor = self._connection.execute(
+                    "INSERT INTO sessions (user_id, version, history, tool_state, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?) ON CONFLICT(user_id) DO NOTHING",
+                    (user_id, new_version, history, tool_state, time.time()),
+                )
+            else:
+                cursor = self._connection.execute(
+                    "UPDATE sessions SET version = ?, history = ?, tool_state = ?, updated_at = ? "
+                    "WHERE user_id = ? AND version = ?",
+                    (new_version, history, tool_state, time.time(), user_id, record.version),
+                )
+        if cursor.rowcount != 1:
+            raise SessionConflictError(
+                f"Session {user_id} was modified concurrently (expected version {record.version})."
+            )
+        record.version = new_version
+        return new_version
+
+    async def load(self, user_id: str) -> SessionRecord:
+        return await asyncio.to_thread(self._load_sync, user_id)
+
+    async def save(self, user_id: str, record: SessionRecord) -> int:
+        return await asyncio.to_thread(self._save_sync, user_id, record)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+# Atomic compare-and-set of a session hash: fails unless the stored version
+# (0 when absent) matches the version the write was based on.
+_REDIS_SAVE_SCRIPT = """
+local current = tonumber(redis.call('HGET', KEYS[1], 'version') or '0')
+if current ~= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', tonumber(ARGV[1]) + 1, 'data', ARGV[2])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+
+class RedisSessionStore:
+    """
+    Session store shared across nodes through Redis (requires the `redis` package).
+    Uses the same version-checked writes as SQLiteSessionStore via a Lua script.
+    """
+
+    def __init__(self, url: str, ttl_seconds: int = 0):
+        import redis.asyncio as redis_asyncio  # Optional dependency
+
+        self._redis = redis_asyncio.from_url(url)
+        self._save_script = self._redis.register_script(_REDIS_SAVE_SCRIPT)
+        self.ttl_seconds = ttl_seconds
+
+    async def load(self, user_id: str) -> SessionRecord:
+        stored = await self._redis.hgetall(f"session:{user_id}")
+        if not stored:
+            return SessionRecord()
+        data = loads(stored[b"data"])
+        return SessionRecord(
+            history=history_from_dicts(data["history"]),
+            tool_state=data["tool_state"],
+            version=int(stored[b"version"]),
+        )
+
+    async def save(self, user_id: str, record: SessionRecord) -> int:
+        data = dumps(
+            {
+                "history": history_to_dicts(record.history),
+                "tool_state": record.tool_state,
+            }
+        )
+        saved = await self._save_script(
+            keys=[f"session:{user_id}"], args=[record.version, data, self.ttl_seconds]
+        )
+        if not saved:
+            raise SessionConflictError(
+                f"Session {user_id} was modified concurrently (expected version {record.version})."
+            )
+        record.version += 1
+        return record.version
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+def build_session_store() -> Any:
+    """Creates the store selected by the SESSION_STORE setting."""
+    backend = str(get_setting("SESSION_STORE", "memory")).lower()
+    if backend == "memory":
+        return InMemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore(get_setting("SESSION_DB_PATH", "sessions.db"))
+    if backend == "redis":
+        return RedisSessionStore(
+            get_setting("SESSION_REDIS_URL", "redis://localhost:6379/0"),
+            ttl_seconds=get_setting("SESSION_TTL_SECONDS", 0),
+        )
+    raise ValueError(
+        f"Unsupported SESSION_STORE '{backend}'. Valid values: {', '.join(SESSION_STORE_BACKENDS)}"
+    )
+
+
+_session_store: Optional[Any] = None
+
+
+def get_session_store() -> Any:
+    """The session store of this worker process, created on first use."""
+    global _session_store
+    if _session_store is None:
+        _session_store = build_session_store()
+        print(f"Session store initialized: {type(_session_store).__name__}")
+        _session_store = wrap_session_store(_session_store)  # FAULT_INJECTION
+    return _session_store
+
+
+async def close_session_store() -> None:
+    global _session_store
+    if _session_store is not None:
+        await _session_store.close()
+        _session_store = None
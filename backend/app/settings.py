@@ -0,0 +1,37 @@
+import importlib.util
+import os
+from typing import Any
+
+# Import configuration. config.py is local (see config.example.py); without it
+# the defaults in config.example.py apply, still overridable per environment.
+try:
+    from backend.app import config as app_config
+except ImportError:
+    _spec = importlib.util.spec_from_file_location(
+        "backend.app.config_example", os.path.join(os.path.dirname(__file__), "config.example.py")
+    )
+    app_config = importlib.util.module_from_spec(_spec)
+    _spec.loader.exec_module(app_config)
+
+
+def get_setting(name: str, default: Any = None) -> Any:
+    """
+    Returns a configuration value by name.
+    An environment variable with the same name takes precedence over `config.py`,
+    so benchmarks, tests and extra worker processes can override settings without
+    editing the config file. Settings missing from both fall back to `default`.
+
+    Environment values are strings; they are coerced to the type of `default`
+    when `default` is a bool, int or float.
+    """
+    env_value = os.environ.get(name)
+    if env_value is None:
+        return getattr(app_config, name, default)
+
+    if isinstance(default, bool):
+        return env_value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(env_value)
+    if isinstance(default, float):
+        return float(env_value)
+    return env_value
@@ -0,0 +1,330 @@
+"""
+Shadow traffic: a sampled share of LLM calls is mirrored to a candidate model
+or provider to compare latency and behavior before switching MODEL_NAME.
+
+Mirrored calls run as background tasks after the primary call has answered,
+so users never wait for them; at most SHADOW_MAX_CONCURRENCY run at once and
+calls beyond that are dropped. The candidate's answer is only compared with
+the primary's (function calls are recorded, never executed). Comparisons are
+appended to SHADOW_LOG_PATH (JSONL) and summarized in GET /metrics.
+
+Compare offline from the project root:
+    python -m backend.app.shadow report --file shadow.jsonl
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Set
+
+from backend.app import metrics
+from backend.app.http_io import dumps, loads
+from backend.app.settings import app_config, get_setting
+from backend.benchmarks.common import percentile
+
+AGREEMENTS = ("same_call", "same_tool", "different_tool", "both_text", "different_action", "candidate_error")
+RECENT_COMPARISONS = 1000  # Kept in memory for the metrics summary
+
+
+def response_action(response: Dict[str, Any]) -> str:
+    """The action an agent response takes: "error", "function_call" or "text"."""
+    if "error" in response:
+        return "error"
+    return "function_call" if "function_call" in response else "text"
+
+
+def compare_responses(primary: Dict[str, Any], candidate: Dict[str, Any]) -> str:
+    """How the candidate's answer agrees with the primary's (one of AGREEMENTS)."""
+    primary_action, candidate_action = response_action(primary), response_action(candidate)
+    if candidate_action == "error":
+        return "candidate_error"
+    if primary_action != candidate_action:
+        return "different_action"
+    if primary_action == "text":
+        return "both_text"
+    primary_call, candidate_call = primary["function_call"], candidate["function_call"]
+    if primary_call["name"] != candidate_call["name"]:
+        return "different_tool"
+    return "same_call" if primary_call.get("args") == candidate_call.get("args") else "same_tool"
+
+
+def _side(provider: str, model: str, response: Dict[str, Any], latency_ms: float) -> Dict[str, Any]:
+    side = {
+        "provider": provider,
+        "model": model,
+        "latency_ms": round(latency_ms, 3),
+        "action": response_action(response),
+        "tool": (response.get("function_call") or {}).get("name"),
+        "usage": response.get("usage"),
+    }
+    if "error" in response:
+        side["error"] = str(response["error"])[:200]
+    return side
+
+
+class ShadowTraffic:
+    """
+    Mirrors a `sample_rate` share of successful LLM calls to `agent` (the
+    candidate, any object with the agents' `get_gemini_response`). `mirror`
+    returns at once; each mirrored call is a background task bounded by
+    `timeout_s`, and calls are dropped while `max_concurrency` are running.
+    """
+
+    def __init__(
+        self,
+        agent: Any,
+        provider_name: str,
+        model_name: str = "",
+        sample_rate: float = 0.0,
+        max_concurrency: int = 4,
+        timeout_s: float = 30.0,
+        log_path: str = "",
+        seed: Optional[int] = None,
+    ):
+        self.agent = agent
+        self.provider_name = provider_name
+        self.model_name = model_name or getattr(agent, "model_name", "")
+        self.sample_rate = sample_rate
+        self.max_concurrency = max_concurrency
+        self.timeout_s = timeout_s
+        self.log_path = log_path
+        self._random = random.Random(seed)
+        self._tasks: Set[asyncio.Task] = set()
+        self._log_lock = threading.Lock()
+        self._recent: deque = deque(maxlen=RECENT_COMPARISONS)
+        self.sampled = 0
+        self.dropped_overload = 0
+        self.completed = 0
+        self.log_errors = 0
+
+    def mirror(
+        self,
+        request: Dict[str, Any],
+        primary_response: Dict[str, Any],
+        primary_provider: str,
+        primary_model: str,
+        primary_latency_ms: float,
+    ) -> bool:
+        """
+        Starts a shadow call for this primary call if it is sampled and a slot
+        is free. `request` holds the `get_gemini_response` arguments
+        (chat_history, user_message, attachments, system_instruction,
+        generation_config); the primary's model_name override is not mirrored.
+        """
+        if "error" in primary_response or self._random.random() >= self.sample_rate:
+            return False
+        self.sampled += 1
+        if len(self._tasks) >= self.max_concurrency:
+            self.dropped_overload += 1
+            return False
+        # The caller goes on to extend its history; the shadow call sees it as it was.
+        request = dict(request, chat_history=list(request.get("chat_history") or []))
+        primary = _side(primary_provider, primary_model, primary_response, primary_latency_ms)
+        task = asyncio.create_task(self._shadow_call(request, primary_response, primary))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _shadow_call(
+        self, request: Dict[str, Any], primary_response: Dict[str, Any], primary: Dict[str, Any]
+    ) -> None:
+        kwargs = {key: value for key, value in request.items() if value is not None and key != "model_name"}
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self.agent.get_gemini_response(**kwargs), timeout=self.timeout_s)
+        except asyncio.TimeoutError:
+            response = {"error": f"No response within {self.timeout_s:g}s."}
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        latency_ms = (time.perf_counter() - started) * 1000
+        comparison = {
+            "ts": round(time.time(), 3),
+            "history_length": len(kwargs.get("chat_history", [])),
+            "agreement": compare_responses(primary_response, response),
+            "primary": primary,
+            "candidate": _side(self.provider_name, self.model_name, response, latency_ms),
+        }
+        self.completed += 1
+        self._recent.append(comparison)
+        if self.log_path:
+            try:
+                await asyncio.to_thread(self._append, dumps(comparison) + b"\n")
+            except OSError as e:
+                self.log_errors += 1
+                print(f"Shadow traffic: could not write {self.log_path}: {e}")
+
+    def _append(self, line: bytes) -> None:
+        with self._log_lock:
+            with open(self.log_path, "ab") as log_file:
+                log_file.write(line)
+
+    async def drain(self) -> None:
+        """Waits for the shadow calls in flight (tests and benchmarks)."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "candidate": f"{self.provider_name}/{self.model_name}",
+            "sample_rate": self.sample_rate,
+            "sampled": self.sampled,
+            "dropped_overload": self.dropped_overload,
+            "in_flight": len(self._tasks),
+            "completed": self.completed,
+            "log_errors": self.log_errors,
+            "recent": summarize_comparisons(self._recent),
+        }
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await self.drain()
+
+
+def _side_summary(sides: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(side["latency_ms"] for side in sides)
+    tokens = [(side.get("usage") or {}).get("total_tokens") or 0 for side in sides]
+    return {
+        "p50_latency_ms": round(percentile(latencies, 50), 3),
+        "p95_latency_ms": round(percentile(latencies, 95), 3),
+        "mean_total_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+    }
+
+
+def summarize_comparisons(comparisons: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Per candidate ("provider/model"): comparisons, agreement counts, latency
+    and tokens of both sides, and agreement rates: on the action (text vs
+    function call) and on the tool for calls where the primary used one.
+    Latency and tokens only count calls the candidate answered.
+    """
+    by_candidate: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for comparison in comparisons:
+        candidate = comparison["candidate"]
+        by_candidate[f"{candidate['provider']}/{candidate['model']}"].append(comparison)
+
+    summary = {}
+    for candidate, rows in sorted(by_candidate.items()):
+        agreements = Counter(row["agreement"] for row in rows)
+        answered = [row for row in rows if row["agreement"] != "candidate_error"]
+        primary_calls = [row for row in answered if row["primary"]["action"] == "function_call"]
+        same_tool = sum(1 for row in primary_calls if row["agreement"] in ("same_call", "same_tool"))
+        same_action = len(answered) - agreements["different_action"]
+        summary[candidate] = {
+            "comparisons": len(rows),
+            "agreement": {agreement: agreements[agreement] for agreement in AGREEMENTS},
+            "action_agreement_rate": round(same_action / len(answered), 4) if answered else None,
+            "tool_agreement_rate": round(same_tool / len(primary_calls), 4) if primary_calls else None,
+            "primary": _side_summary([row["primary"] for row in answered]),
+            "candidate": _side_summary([row["candidate"] for row in answered]),
+        }
+    return summary
+
+
+def read_comparisons(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as log_file:
+        for line in log_file:
+            if line.strip():
+                yield loads(line)
+
+
+def build_shadow_traffic() -> Optional[ShadowTraffic]:
+    """The mirror configured by the SHADOW_* settings, or None while SHADOW_SAMPLE_RATE is 0."""
+    sample_rate = get_setting("SHADOW_SAMPLE_RATE", 0.0)
+    if sample_rate <= 0:
+        return None
+    from backend.app.ai_agents_manager import create_agent
+
+    provider_name = get_setting("SHADOW_PROVIDER", "") or get_setting(
+        "ACTIVE_LLM_PROVIDER", app_config.ACTIVE_LLM_PROVIDER
+    )
+    model_name = get_setting("SHADOW_MODEL_NAME", "")
+    transport = None
+    if provider_name == "VERTEX_AI":
+        from backend.app.llm_fixtures import LiveTransport
+
+        # Never recorded into (or replayed from) the primary model's fixture file
+        transport = LiveTransport()
+    try:
+        agent = create_agent(provider_name, model_name or None, transport=transport)
+    except Exception as e:
+        # Shadow traffic is an experiment: it must never keep the app from serving.
+        print(f"Shadow traffic disabled: could not create the {provider_name} candidate agent: {e}")
+        return None
+    return ShadowTraffic(
+        agent,
+        provider_name,
+        model_name=model_name,
+        sample_rate=sample_rate,
+        max_concurrency=get_setting("SHADOW_MAX_CONCURRENCY", 4),
+        timeout_s=get_setting("SHADOW_TIMEOUT_SECONDS", 30.0),
+        log_path=get_setting("SHADOW_LOG_PATH", ""),
+    )
+
+
+_shadow_traffic: Optional[ShadowTraffic] = None
+_shadow_traffic_configured = False
+
+
+def get_shadow_traffic() -> Optional[ShadowTraffic]:
+    """This worker's shadow traffic mirror, or None when SHADOW_SAMPLE_RATE is 0."""
+    global _shadow_traffic, _shadow_traffic_configured
+    if not _shadow_traffic_configured:
+        _shadow_traffic_configured = True
+        _shadow_traffic = build_shadow_traffic()
+        if _shadow_traffic is not None:
+            metrics.register("shadow", _shadow_traffic.stats)
+            print(
+                f"Shadow traffic: {_shadow_traffic.sample_rate:.1%} of LLM calls mirrored to "
+                f"{_shadow_traffic.provider_name}/{_shadow_traffic.model_name}"
+            )
+    return _shadow_traffic
+
+
+async def close_shadow_traffic() -> None:
+    global _shadow_traffic, _shadow_traffic_configured
+    if _shadow_traffic is not None:
+        await _shadow_traffic.close()
+    _shadow_traffic = None
+    _shadow_traffic_configured = False
+
+
+def _print_summary(summary: Dict[str, Any]) -> None:
+    for candidate, row in summary.items():
+        print(f"{candidate}: {row['comparisons']} comparisons")
+        print(f"  agreement: {row['agreement']}")
+        print(
+            f"  action agreement: {row['action_agreement_rate']}, "
+            f"tool agreement: {row['tool_agreement_rate']}"
+        )
+        print(f"  {'':<10} {'p50 ms':>10} {'p95 ms':>10} {'tokens':>10}")
+        for side in ("primary", "candidate"):
+            stats = row[side]
+            print(
+                f"  {side:<10} {stats['p50_latency_ms']:>10.1f} {stats['p95_latency_ms']:>10.1f} "
+                f"{stats['mean_total_tokens']:>10.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=("report",))
+    parser.add_argument("--file", default=get_setting("SHADOW_LOG_PATH", "") or "shadow.jsonl")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        parser.error(f"{args.file} does not exist.")
+    summary = summarize_comparisons(read_comparisons(args.file))
+    if args.json:
+        print(dumps(summary).decode("utf-8"))
+    else:
+        _print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
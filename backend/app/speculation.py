@@ -0,0 +1,190 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional
+
+from backend.app import metrics
+from backend.app import tools
+from backend.app.coalescing import normalize_prompt
+from backend.app.settings import get_setting
+
+SPECULATION_MODES = ("off", "parallel", "inject")
+FAQ_CONTEXT_HEADER = "[FAQ context]"
+USER_MESSAGE_HEADER = "[User message]"
+
+
+MIN_CONTAINED_WORDS = 2  # A shorter prompt counts as contained only with at least this many words
+
+
+def prompt_similarity(a: str, b: str) -> float:
+    """
+    Jaccard similarity of the normalized word sets of two prompts; 1.0 if the
+    words of one (at least MIN_CONTAINED_WORDS of them) all occur in the other.
+    """
+    words_a, words_b = set(normalize_prompt(a).split()), set(normalize_prompt(b).split())
+    if not words_a or not words_b:
+        return 0.0
+    shorter, longer = sorted((words_a, words_b), key=len)
+    if len(shorter) >= MIN_CONTAINED_WORDS and shorter <= longer:
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def build_faq_context_message(user_message: str, snippets: List[Dict[str, Any]]) -> str:
+    """Prepends the top FAQ snippets to the user's message for the first model call."""
+    lines = [
+        f"{FAQ_CONTEXT_HEADER} The following FAQ entries may answer the user's message. "
+        "If one does, answer from it directly without calling get_faq_answer."
+    ]
+    for snippet in snippets:
+        lines.append(f"Q: {snippet['question']}")
+        lines.append(f"A: {snippet['answer']}")
+    lines.append(USER_MESSAGE_HEADER)
+    lines.append(user_message)
+    return "\n".join(lines)
+
+
+@dataclass
+class SpeculativeFaq:
+    """Per-turn speculation: a background retrieval task and/or injected snippets."""
+
+    user_message: str
+    started_at: float
+    task: Optional[asyncio.Task] = None
+    snippets: Optional[List[Dict[str, Any]]] = None
+    used: bool = False
+
+    @property
+    def model_message(self) -> str:
+        """The text to send to the model for the first call of the turn."""
+        if self.snippets:
+            return build_faq_context_message(self.user_message, self.snippets)
+        return self.user_message
+
+
+class FaqSpeculator:
+    """
+    Speculative FAQ retrieval for `/chat` turns, selected by SPECULATIVE_FAQ_MODE:
+
+    - "parallel": retrieval on the raw user message runs concurrently with the
+      first model call; if the model then calls get_faq_answer with a similar
+      question, the precomputed result is used instead of running the tool.
+    - "inject": additionally, the top-k FAQ snippets are added to the first
+      prompt, so the model can answer most FAQ questions in one round trip.
+    """
+
+    def __init__(self, mode: str, similarity_threshold: float, top_k: int):
+        if mode not in SPECULATION_MODES:
+            raise ValueError(
+                f"Unsupported SPECULATIVE_FAQ_MODE '{mode}'. Valid values: {', '.join(SPECULATION_MODES)}"
+            )
+        self.mode = mode
+        self.similarity_threshold = similarity_threshold
+        self.top_k = top_k
+        self.speculations = 0
+        self.hits = 0
+        self.misses_not_requested = 0
+        self.misses_dissimilar = 0
+        self.time_saved_ms = 0.0
+        self.injected_turns = 0
+        self.single_round_trip_answers = 0
+        self._follow_up_latency_total_ms = 0.0
+        self._follow_up_calls = 0
+
+    async def begin(self, user_message: str) -> Optional[SpeculativeFaq]:
+        """
+        Starts speculation for a turn. In inject mode this waits for the FAQ
+        search, which runs in a worker thread.
+        """
+        if self.mode == "off" or not user_message:
+            return None
+        self.speculations += 1
+        speculation = SpeculativeFaq(
+            user_message=user_message, started_at=time.perf_counter()
+        )
+        speculation.task = asyncio.create_task(self._retrieve(user_message))
+        # Unused speculation may fail unobserved; retrieve its exception to keep the log clean.
+        speculation.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        if self.mode == "inject":
+            snippets = await asyncio.to_thread(tools.search_faq, user_message, top_k=self.top_k)
+            if snippets:
+                speculation.snippets = snippets
+                self.injected_turns += 1
+        return speculation
+
+    @staticmethod
+    async def _retrieve(question: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        result = await asyncio.to_thread(tools.get_faq_answer, question)
+        return {"result": result, "duration_ms": (time.perf_counter() - started) * 1000}
+
+    async def take(
+        self, speculation: Optional[SpeculativeFaq], question: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The precomputed get_faq_answer result if the model asked a question
+        similar to the user's message, otherwise None (the tool runs normally).
+        """
+        if speculation is None or speculation.task is None:
+            return None
+        if prompt_similarity(question, speculation.user_message) < self.similarity_threshold:
+            self.misses_dissimilar += 1
+            speculation.task.cancel()
+            speculation.used = True
+            return None
+        waited_from = time.perf_counter()
+        speculation.used = True
+        try:
+            retrieved = await speculation.task
+        except Exception as e:
+            print(f"Speculative FAQ retrieval failed, running the tool instead: {e}")
+            return None
+        waited_ms = (time.perf_counter() - waited_from) * 1000
+        self.hits += 1
+        self.time_saved_ms += max(0.0, retrieved["duration_ms"] - waited_ms)
+        return retrieved["result"]
+
+    def record_follow_up_latency(self, latency_ms: float) -> None:
+        """Latency of a second model call (after a tool), used to estimate inject-mode savings."""
+        self._follow_up_latency_total_ms += latency_ms
+        self._follow_up_calls += 1
+
+    def finish(self, speculation: Optional[SpeculativeFaq], answered_directly: bool) -> None:
+        """Ends a turn's speculation; `answered_directly` means no tool call was needed."""
+        if speculation is None:
+            return
+        if speculation.snippets and answered_directly:
+            self.single_round_trip_answers += 1
+        if not speculation.used and speculation.task is not None:
+            self.misses_not_requested += 1
+            speculation.task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        avg_follow_up_ms = (
+            self._follow_up_latency_total_ms / self._follow_up_calls
+            if self._follow_up_calls
+            else 0.0
+        )
+        return {
+            "mode": self.mode,
+            "speculations": self.speculations,
+            "hits": self.hits,
+            "misses_not_requested": self.misses_not_requested,
+            "misses_dissimilar": self.misses_dissimilar,
+            "hit_rate": round(self.hits / self.speculations, 4) if self.speculations else 0.0,
+            "retrieval_time_saved_ms": round(self.time_saved_ms, 3),
+            "injected_turns": self.injected_turns,
+            "single_round_trip_answers": self.single_round_trip_answers,
+            # Each single-round-trip answer skips a tool call and a follow-up model call.
+            "estimated_round_trip_time_saved_ms": round(
+                self.single_round_trip_answers * avg_follow_up_ms, 3
+            ),
+        }
+
+
+faq_speculator = FaqSpeculator(
+    mode=str(get_setting("SPECULATIVE_FAQ_MODE", "off")).lower(),
+    similarity_threshold=get_setting("FAQ_SPECULATION_SIMILARITY", 0.5),
+    top_k=get_setting("FAQ_SPECULATION_TOP_K", 2),
+)
+metrics.register("faq_speculation", faq_speculator.stats)
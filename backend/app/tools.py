@@ -1,23 +1,145 @@
+import asyncio
+import contextvars
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import quote
 import re  # For simple time format validation
 import httpx  # For making HTTP calls from tools
 
 # Import configuration
-from backend.app import config as app_config
+from backend.app.settings import app_config, get_setting
+from backend.app import metrics
+from backend.app.datetime_parser import CANONICAL_FORMAT, parse_booking_time
+from backend.app.faq_index import FaqIndex, open_index
+from backend.app.faults import booking_http_transport
+from backend.app.language import DEFAULT_LANGUAGE
+from backend.app.job_queue import (
+    RetriableJobError,
+    get_job_queue,
+    register_job_handler,
+)
 
-# Load FAQ data
+# FAQ data is loaded on first use (or during startup warm-up), not at import.
 FAQ_DATA_PATH = os.path.join(os.path.dirname(__file__), "faq_data.json")
-try:
-    with open(FAQ_DATA_PATH, "r", encoding="utf-8") as f:
-        faq_data: List[Dict[str, Any]] = json.load(f)
-except FileNotFoundError:
-    faq_data = []
-    print(f"Warning: {FAQ_DATA_PATH} not found. FAQ tool will not work.")
-except json.JSONDecodeError:
-    faq_data = []
-    print(f"Warning: Error decoding {FAQ_DATA_PATH}. FAQ tool will not work.")
+_faq_data: Optional[List[Dict[str, Any]]] = None
+_faq_data_lock = threading.Lock()
+
+
+def load_faq_data() -> List[Dict[str, Any]]:
+    """Returns the FAQ entries, reading faq_data.json the first time."""
+    global _faq_data
+    with _faq_data_lock:
+        if _faq_data is None:
+            try:
+                with open(FAQ_DATA_PATH, "r", encoding="utf-8") as f:
+                    _faq_data = json.load(f)
+            except FileNotFoundError:
+                _faq_data = []
+                print(f"Warning: {FAQ_DATA_PATH} not found. FAQ tool will not work.")
+            except json.JSONDecodeError:
+                _faq_data = []
+                print(f"Warning: Error decoding {FAQ_DATA_PATH}. FAQ tool will not work.")
+        return _faq_data
+
+
+# An ingested FAQ index (see faq_ingest.py) replaces faq_data.json when
+# FAQ_INDEX_PATH is set; it is memory-mapped on first use and reopened when a
+# re-ingest replaces the file.
+_faq_index: Optional[FaqIndex] = None
+_faq_index_lock = threading.Lock()
+
+
+def load_faq_index() -> Optional[FaqIndex]:
+    """The ingested FAQ index, or None when FAQ_INDEX_PATH is unset or unreadable."""
+    global _faq_index
+    path = get_setting("FAQ_INDEX_PATH", "")
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+        file_id = (stat.st_ino, stat.st_mtime_ns)
+    except OSError:
+        file_id = None  # Keep serving the mapped index until a new file appears
+    with _faq_index_lock:
+        if (
+            _faq_index is None
+            or _faq_index.path != path
+            or (file_id is not None and file_id != _faq_index.file_id)
+        ):
+            # The previous index is not closed: searches still running on it
+            # hold their own reference, and the mapping goes when they finish.
+            _faq_index = open_index(path)
+        return _faq_index
+
+
+def faq_available() -> bool:
+    if get_setting("FAQ_INDEX_PATH", ""):
+        return bool(load_faq_index())
+    return bool(load_faq_data())
+
+
+# Shared HTTP connection pool for tools calling external APIs. httpx clients are
+# bound to the event loop they were first used on, so keep one per loop.
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Returns the pooled AsyncClient for the running event loop."""
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=get_setting("TOOL_HTTP_TIMEOUT_SECONDS", 5.0),
+            transport=booking_http_transport(),  # FAULT_INJECTION, if configured
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def search_faq(question: str, top_k: int = 1) -> List[Dict[str, Any]]:
+    """
+    Returns up to `top_k` FAQ entries whose keywords appear in the question,
+    best first, as {"id", "question", "answer", "localized_answers", "score"}
+    (score = matched keywords; localized_answers maps a language code to a
+    curated translation of the answer).
+    Entries with equal scores keep their order in faq_data.json (or the index).
+    """
+    if get_setting("FAQ_INDEX_PATH", ""):
+        index = load_faq_index()
+        return index.search(question, top_k) if index is not None else []
+    question_lower = question.lower()
+    matches = []
+    for item in load_faq_data():
+        match_count = 0
+        for keyword in item.get("keywords", []):
+            if keyword.lower() in question_lower:
+                match_count += 1
+        if match_count > 0 and item.get("answer"):
+            matches.append(
+                {
+                    "id": item.get("id"),
+                    "question": item.get("question"),
+                    "answer": item.get("answer"),
+                    "localized_answers": item.get("localized_answers") or {},
+                    "score": match_count,
+                }
+            )
+    matches.sort(key=lambda match: match["score"], reverse=True)
+    return matches[:top_k]
 
 
 def get_faq_answer(question: str) -> Dict[str, str]:
@@ -29,31 +151,194 @@ def get_faq_answer(question: str) -> Dict[str, str]:
     If the user asks "How do I cancel my ticket?", call this tool with question="How do I cancel my ticket?".
     The tool will return {"answer": "You can cancel..."} or {"error": "FAQ unavailable"}.
     """
-    question_lower = question.lower()
-    best_match_answer = None
-    highest_match_count = 0
-
-    if not faq_data:
+    if not faq_available():
         return {"error": "I'm sorry, my FAQ knowledge base is currently unavailable."}
 
-    for item in faq_data:
-        match_count = 0
-        for keyword in item.get("keywords", []):
-            if keyword.lower() in question_lower:
-                match_count += 1
-
-        if match_count > highest_match_count:
-            highest_match_count = match_count
-            best_match_answer = item.get("answer")
-
-    if best_match_answer and highest_match_count > 0:
-        return {"answer": best_match_answer}
+    best_matches = search_faq(question, top_k=1)
+    if best_matches:
+        return {"answer": best_matches[0]["answer"]}
 
     return {
         "answer": "I'm sorry, I couldn't find an answer to that specific question in my current knowledge base. Could you try rephrasing or asking something else?"
     }
 
 
+def direct_faq_answer(question: str, language: str) -> Optional[str]:
+    """
+    The curated answer in `language` when `question` is a direct FAQ hit (one
+    best entry scoring at least FAQ_DIRECT_ANSWER_MIN_SCORE), so it can be sent
+    as is instead of having the model summarize (translate) it. None otherwise.
+    """
+    matches = search_faq(question, top_k=2)
+    if not matches or matches[0]["score"] < get_setting("FAQ_DIRECT_ANSWER_MIN_SCORE", 1):
+        return None
+    if len(matches) > 1 and matches[1]["score"] == matches[0]["score"]:
+        return None  # Ambiguous: let the model pick
+    best = matches[0]
+    if language in best["localized_answers"]:
+        return best["localized_answers"][language]
+    return best["answer"] if language == DEFAULT_LANGUAGE else None
+
+
+class BookingCache:
+    """
+    Read-through TTL cache of booking lookups, per worker process: found
+    bookings are kept for `ttl_s`, unknown ids for `miss_ttl_s`; at most
+    `max_entries` ids (least recently used are dropped). A successful change
+    invalidates its booking. Also keeps each user's recent booking ids from the
+    flow-start prefetch, to suggest them when an id is not found.
+    """
+
+    def __init__(self, ttl_s: float = 60.0, miss_ttl_s: float = 10.0, max_entries: int = 10000):
+        self.ttl_s = ttl_s
+        self.miss_ttl_s = miss_ttl_s
+        self.max_entries = max_entries
+        # booking_id -> (expires at, details or None for an unknown id)
+        self._entries: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._user_bookings: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self.counts = {"hits": 0, "misses": 0, "invalidations": 0, "prefetched_users": 0}
+
+    def get(self, booking_id: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """(cached, details); details is None for an id known not to exist."""
+        entry = self._entries.get(booking_id)
+        if entry is None or entry[0] <= time.monotonic():
+            self.counts["misses"] += 1
+            return False, None
+        self._entries.move_to_end(booking_id)
+        self.counts["hits"] += 1
+        return True, entry[1]
+
+    def put(self, booking_id: str, details: Optional[Dict[str, Any]]) -> None:
+        ttl_s = self.ttl_s if details is not None else self.miss_ttl_s
+        self._entries[booking_id] = (time.monotonic() + ttl_s, details)
+        self._entries.move_to_end(booking_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, booking_id: str) -> None:
+        if self._entries.pop(booking_id, None) is not None:
+            self.counts["invalidations"] += 1
+
+    def put_user_bookings(self, user_id: str, bookings: List[Dict[str, Any]]) -> None:
+        self.counts["prefetched_users"] += 1
+        for booking in bookings:
+            self.put(booking["booking_id"], booking)
+        self._user_bookings[user_id] = (
+            time.monotonic() + self.ttl_s,
+            [booking["booking_id"] for booking in bookings],
+        )
+        self._user_bookings.move_to_end(user_id)
+        while len(self._user_bookings) > self.max_entries:
+            self._user_bookings.popitem(last=False)
+
+    def user_bookings(self, user_id: str) -> List[str]:
+        entry = self._user_bookings.get(user_id)
+        return list(entry[1]) if entry and entry[0] > time.monotonic() else []
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counts["hits"] + self.counts["misses"]
+        return {
+            **self.counts,
+            "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+_booking_cache: Optional[BookingCache] = None
+# user_id -> running prefetch of the user's bookings
+_prefetch_tasks: Dict[str, "asyncio.Task[None]"] = {}
+
+
+def get_booking_cache() -> BookingCache:
+    """The booking cache of this worker process, created on first use."""
+    global _booking_cache
+    if _booking_cache is None:
+        _booking_cache = BookingCache(
+            ttl_s=get_setting("BOOKING_CACHE_TTL_SECONDS", 60.0),
+            miss_ttl_s=get_setting("BOOKING_CACHE_MISS_TTL_SECONDS", 10.0),
+        )
+        metrics.register("booking_cache", _booking_cache.stats)
+    return _booking_cache
+
+
+def describe_booking(booking: Dict[str, Any]) -> str:
+    """One-line summary of a booking, for the user."""
+    summary = f"Booking {booking['booking_id']}"
+    if booking.get("route") and booking.get("departure_time"):
+        summary += f": {booking['route']} departing {booking['departure_time']}"
+    if booking.get("seats"):
+        summary += f", {booking['seats']} seat(s)"
+    summary += f", {booking.get('status', 'CONFIRMED')}"
+    if not booking.get("changeable", True):
+        summary += " (this ticket cannot be changed)"
+    return summary + "."
+
+
+async def get_booking_details(booking_id: str) -> Dict[str, Any]:
+    """
+    Looks up a booking in the Vexere system.
+    Call this tool when the user asks about a booking (its route, departure time, seats or whether it can be changed).
+    Args:
+        booking_id (str): The booking ID (e.g., "VX12345").
+    Returns:
+        {"found": True, "booking": {...}, "message": "Booking VX12345: ..."},
+        {"found": False, "message": "Booking VX12345 was not found."} or
+        {"error": "..."} when the booking service is unavailable.
+    """
+    booking_id = (booking_id or "").strip()
+    if not booking_id:
+        return {"found": False, "message": "Booking ID is invalid or missing."}
+    cache = get_booking_cache()
+    cached, booking = cache.get(booking_id)
+    if not cached:
+        base_url = get_setting("MOCK_API_BASE_URL", app_config.MOCK_API_BASE_URL)
+        try:
+            response = await get_http_client().get(f"{base_url}/mock_vexere/bookings/{quote(booking_id, safe='')}")
+        except httpx.RequestError as e:
+            print(f"Error looking up booking {booking_id}: {e}")
+            return {"error": f"Network error when looking up booking {booking_id}."}
+        if response.status_code == 404:
+            booking = None
+        elif response.status_code != 200:
+            return {"error": f"The booking service returned {response.status_code}."}
+        else:
+            booking = response.json()
+        cache.put(booking_id, booking)
+    if booking is None:
+        return {"found": False, "message": f"Booking {booking_id} was not found."}
+    return {"found": True, "booking": booking, "message": describe_booking(booking)}
+
+
+def prefetch_user_bookings(user_id: str) -> None:
+    """
+    Starts loading the user's recent bookings into the booking cache in the
+    background (BOOKING_PREFETCH), so the id they send next is validated, or
+    alternatives suggested, without waiting for the booking API.
+    """
+    if not get_setting("BOOKING_PREFETCH", True) or user_id in _prefetch_tasks:
+        return
+    task = asyncio.create_task(_prefetch_user_bookings(user_id))
+    _prefetch_tasks[user_id] = task
+    task.add_done_callback(lambda _: _prefetch_tasks.pop(user_id, None))
+
+
+async def _prefetch_user_bookings(user_id: str) -> None:
+    base_url = get_setting("MOCK_API_BASE_URL", app_config.MOCK_API_BASE_URL)
+    try:
+        response = await get_http_client().get(f"{base_url}/mock_vexere/users/{quote(user_id, safe='')}/bookings")
+        response.raise_for_status()
+        get_booking_cache().put_user_bookings(user_id, response.json().get("bookings", []))
+    except Exception as e:  # Only an optimization: the lookup falls back to the API
+        print(f"Prefetching bookings of user {user_id} failed: {e!r}")
+
+
+async def wait_for_prefetch(user_id: str) -> None:
+    """Waits for a running prefetch of the user's bookings (bounded by the HTTP timeout)."""
+    task = _prefetch_tasks.get(user_id)
+    if task is not None:
+        await asyncio.wait({task}, timeout=get_setting("TOOL_HTTP_TIMEOUT_SECONDS", 5.0))
+
+
 def initiate_change_booking_time_flow() -> Dict[str, str]:
     """
     Initiates the flow for changing a booking time.
@@ -69,17 +354,21 @@ def initiate_change_booking_time_flow() -> Dict[str, str]:
     }
 
 
-def provide_booking_id_for_change(booking_id: str) -> Dict[str, str]:
+async def provide_booking_id_for_change(
+    booking_id: str, user_id: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Processes the booking ID provided by the user during the 'change booking time' flow.
     Call this tool after the user has provided their booking ID in response to a prompt.
     Args:
         booking_id (str): The booking ID provided by the user (e.g., "VX12345").
     Returns:
-        If booking_id is valid (non-empty string):
-        {"status": "booking_id_received", "booking_id": "VX12345", "next_action_prompt": "What is the new date and time...?"}
-        If booking_id is invalid:
-        {"status": "error", "message": "Booking ID is invalid or missing."}
+        If booking_id exists and can be changed:
+        {"status": "booking_id_received", "booking_id": "VX12345", "booking": {...}, "next_action_prompt": "What is the new date and time...?"}
+        If booking_id is missing, unknown or not changeable:
+        {"status": "error", "message": "...", "suggested_booking_ids": [...]}
+    `user_id` (set by the application, not the model) selects the recent
+    bookings prefetched when the flow started, suggested for an unknown id.
     """
     if (
         not booking_id
@@ -91,26 +380,55 @@ def provide_booking_id_for_change(booking_id: str) -> Dict[str, str]:
             "message": "Booking ID is invalid or missing. Please provide a valid booking ID.",
         }
 
-    # In a real scenario, you might validate the booking_id format here.
-    return {
+    booking_id = booking_id.strip()
+    if user_id:
+        await wait_for_prefetch(user_id)
+    lookup = await get_booking_details(booking_id)
+    if lookup.get("found") is False:
+        result: Dict[str, Any] = {
+            "status": "error",
+            "message": f"I couldn't find booking {booking_id}. Please check the booking ID.",
+        }
+        suggestions = get_booking_cache().user_bookings(user_id) if user_id else []
+        if suggestions:
+            result["suggested_booking_ids"] = suggestions
+            result["message"] += f" Your recent bookings: {', '.join(suggestions)}."
+        return result
+    booking = lookup.get("booking")
+    if booking is not None and not booking.get("changeable", True):
+        return {
+            "status": "error",
+            "booking": booking,
+            "message": f"Booking {booking_id} is not eligible for a time change. Please provide another booking ID.",
+        }
+
+    # If the lookup failed (booking service unavailable) the id is checked at confirmation.
+    result = {
         "status": "booking_id_received",
         "booking_id": booking_id,
-        "next_action_prompt": "What is the new date and time you'd like? (Please use YYYY-MM-DD HH:MM:SS format, e.g., 2025-12-31 14:30:00)",
+        "next_action_prompt": "What is the new date and time you'd like? (e.g., 2025-12-31 14:30, 31/12 14:30 or 'tomorrow 2pm')",
     }
+    if booking is not None:
+        result["booking"] = booking
+    return result
 
 
-async def confirm_booking_time_change(booking_id: str, new_time: str) -> Dict[str, Any]:
+async def resolve_booking_time(booking_id: str, text: str) -> Optional[str]:
     """
-    Attempts to confirm the booking time change by calling the mock Vexere API.
-    Call this tool after the user has provided both the booking ID and the new desired time.
-    Args:
-        booking_id (str): The booking ID for the ticket to be changed (e.g., "VX12345").
-        new_time (str): The new desired time in 'YYYY-MM-DD HH:MM:SS' format (e.g., "2025-12-31 14:30:00").
-    Returns:
-        A dictionary with the result of the API call, e.g.,
-        {"success": True, "message": "Successfully changed booking...", "data": {"status": "CONFIRMED"}} or
-        {"success": False, "message": "Failed to change booking..."}
+    The canonical time for a free-form new time, or None if it has none. A
+    time without a date ("14:30", "8h tối") is on the booking's departure day.
     """
+    if not text or re.match(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$", text):
+        return text or None
+    travel_day = None
+    departure = ((await get_booking_details(booking_id)).get("booking") or {}).get("departure_time")
+    if departure:
+        travel_day = datetime.strptime(departure, CANONICAL_FORMAT).date()
+    return parse_booking_time(text, travel_day=travel_day)
+
+
+def _validate_booking_change(booking_id: str, new_time: str) -> Optional[Dict[str, Any]]:
+    """The error result for an incomplete or malformed change request, otherwise None."""
     if not booking_id:
         return {
             "success": False,
@@ -128,46 +446,179 @@ async def confirm_booking_time_change(booking_id: str, new_time: str) -> Dict[st
             "success": False,
             "message": "Invalid new_time format. Please use YYYY-MM-DD HH:MM:SS.",
         }
+    return None
 
-    api_url = f"{app_config.MOCK_API_BASE_URL}/mock_vexere/change_booking"
-    payload = {"booking_id": booking_id, "new_time": new_time}
 
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(api_url, json=payload)
-            response.raise_for_status()
-            api_result = response.json()
+# Set once a turn has sent (or queued) a booking change, so the chat handler
+# knows the turn cannot simply be discarded on a session save conflict.
+_booking_change_requested: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "booking_change_requested", default=False
+)
+
+
+def booking_change_requested() -> bool:
+    """Whether the current turn has sent or queued a booking change."""
+    return _booking_change_requested.get()
+
+
+def clear_booking_change_requested() -> None:
+    """Called at the start of each chat turn."""
+    _booking_change_requested.set(False)
+
+
+async def _post_booking_change(
+    booking_id: str, new_time: str, idempotency_key: str
+) -> httpx.Response:
+    base_url = get_setting("MOCK_API_BASE_URL", app_config.MOCK_API_BASE_URL)
+    client = get_http_client()  # Pooled: connections are reused across tool calls
+    return await client.post(
+        f"{base_url}/mock_vexere/change_booking",
+        json={
+            "booking_id": booking_id,
+            "new_time": new_time,
+            "idempotency_key": idempotency_key,
+        },
+    )
+
+
+async def confirm_booking_time_change(booking_id: str, new_time: str) -> Dict[str, Any]:
+    """
+    Attempts to confirm the booking time change by calling the mock Vexere API.
+    Call this tool after the user has provided both the booking ID and the new desired time.
+    Args:
+        booking_id (str): The booking ID for the ticket to be changed (e.g., "VX12345").
+        new_time (str): The new desired time, canonically 'YYYY-MM-DD HH:MM:SS' (e.g., "2025-12-31 14:30:00").
+            Free-form Vietnamese or English times ("8h sáng mai", "tomorrow 2pm", "31/12 14:30")
+            are normalized first.
+    Returns:
+        A dictionary with the result of the API call, e.g.,
+        {"success": True, "message": "Successfully changed booking...", "data": {"status": "CONFIRMED"}} or
+        {"success": False, "message": "Failed to change booking..."}
+    """
+    # Normalize free-form times locally instead of spending a turn asking to reformat.
+    new_time = await resolve_booking_time(booking_id, new_time) or new_time
+    invalid = _validate_booking_change(booking_id, new_time)
+    if invalid:
+        return invalid
+
+    # One key per confirmation: a retry after a lost response is not applied twice.
+    idempotency_key = uuid.uuid4().hex
+    _booking_change_requested.set(True)
+    retries = get_setting("TOOL_HTTP_RETRIES", 1)
+    try:
+        for attempt in range(retries + 1):
+            try:
+                response = await _post_booking_change(booking_id, new_time, idempotency_key)
+            except httpx.TransportError:
+                if attempt == retries:
+                    raise
+                continue
+            if response.status_code < 500 or attempt == retries:
+                break
             print(
-                f"[Tool: confirm_booking_time_change] Received response from mock API: {api_result}"
+                f"Mock Vexere API returned {response.status_code}, retrying with the same idempotency key."
             )
-            return api_result
-        except httpx.RequestError as e:
-            print(f"Error calling mock Vexere API: {e}")
+        response.raise_for_status()
+        api_result = response.json()
+        print(
+            f"[Tool: confirm_booking_time_change] Received response from mock API: {api_result}"
+        )
+        if api_result.get("success"):
+            get_booking_cache().invalidate(booking_id)
+        return api_result
+    except httpx.RequestError as e:
+        print(f"Error calling mock Vexere API: {e}")
+        return {
+            "success": False,
+            "message": f"Network error when trying to change booking: {str(e)}",
+        }
+    except httpx.HTTPStatusError as e:
+        print(
+            f"HTTP error from mock Vexere API: {e.response.status_code} - {e.response.text}"
+        )
+        try:
+            error_details = e.response.json()
             return {
                 "success": False,
-                "message": f"Network error when trying to change booking: {str(e)}",
+                "message": f"Failed to change booking: {error_details.get('message', e.response.text)}",
             }
-        except httpx.HTTPStatusError as e:
-            print(
-                f"HTTP error from mock Vexere API: {e.response.status_code} - {e.response.text}"
-            )
-            try:
-                error_details = e.response.json()
-                return {
-                    "success": False,
-                    "message": f"Failed to change booking: {error_details.get('message', e.response.text)}",
-                }
-            except json.JSONDecodeError:
-                return {
-                    "success": False,
-                    "message": f"Failed to change booking: {e.response.status_code} - Error message not in JSON format.",
-                }
-        except Exception as e:
-            print(f"Unexpected error during API call: {e}")
+        except json.JSONDecodeError:
             return {
                 "success": False,
-                "message": f"An unexpected error occurred while attempting to change booking: {str(e)}",
+                "message": f"Failed to change booking: {e.response.status_code} - Error message not in JSON format.",
             }
+    except Exception as e:
+        print(f"Unexpected error during API call: {e}")
+        return {
+            "success": False,
+            "message": f"An unexpected error occurred while attempting to change booking: {str(e)}",
+        }
+
+
+async def submit_booking_time_change(
+    user_id: str, booking_id: str, new_time: str, turn_key: str
+) -> Dict[str, Any]:
+    """
+    Asynchronous variant of confirm_booking_time_change (BOOKING_CHANGES_ASYNC):
+    queues the change as a durable job and returns {"status": "processing", ...}
+    right away. The job worker calls the API (retrying transient failures) and the
+    outcome is reported to the user on their next turn.
+    `turn_key` identifies the chat turn, so a duplicate delivery of the same turn
+    does not queue the change twice.
+    """
+    # Normalize free-form times locally instead of spending a turn asking to reformat.
+    new_time = await resolve_booking_time(booking_id, new_time) or new_time
+    invalid = _validate_booking_change(booking_id, new_time)
+    if invalid:
+        return invalid
+
+    _booking_change_requested.set(True)
+    job = await get_job_queue().enqueue(
+        "change_booking",
+        {
+            "booking_id": booking_id,
+            "new_time": new_time,
+            # Sent on every attempt, so a retry after a lost response is applied once upstream
+            "idempotency_key": uuid.uuid4().hex,
+        },
+        user_id=user_id,
+        ordering_key=f"booking:{booking_id}",  # Changes to one booking apply in order
+        idempotency_key=f"change_booking:{turn_key}:{booking_id}:{new_time}",
+    )
+    print(f"[Tool: submit_booking_time_change] Queued job {job['job_id']} for {booking_id}")
+    return {
+        "status": "processing",
+        "job_id": job["job_id"],
+        "message": f"Your request to change booking {booking_id} to {new_time} is being processed. "
+        "I'll let you know the result as soon as it's done.",
+    }
+
+
+async def run_booking_change_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: applies a queued booking change through the Vexere API."""
+    try:
+        response = await _post_booking_change(
+            payload["booking_id"], payload["new_time"], payload["idempotency_key"]
+        )
+    except httpx.TransportError as e:
+        raise RetriableJobError(f"Network error: {e}")
+    if response.status_code >= 500:
+        raise RetriableJobError(f"Vexere API returned {response.status_code}")
+    try:
+        api_result = response.json()
+    except json.JSONDecodeError:
+        api_result = {}
+    if response.status_code >= 400:
+        return {
+            "success": False,
+            "message": f"Failed to change booking: {api_result.get('message', response.status_code)}",
+        }
+    if api_result.get("success"):
+        get_booking_cache().invalidate(payload["booking_id"])
+    return api_result
+
+
+register_job_handler("change_booking", run_booking_change_job)
 
 
 # Placeholder functions for future Image & Voice processing capabilities
@@ -0,0 +1,76 @@
+import contextlib
+import contextvars
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Iterator, Optional
+
+USAGE_KEYS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+@dataclass
+class TurnTrace:
+    """
+    What happened inside one `/chat` turn: the LLM calls made (latency and
+    token usage), the tools the model asked for and whether the turn was
+    answered in degraded mode. Collected only while a trace is active
+    (see `trace_turn`), e.g. by the evaluation runner; normal requests skip it.
+    """
+
+    llm_calls: List[Dict[str, Any]] = field(default_factory=list)
+    tool_calls: List[Dict[str, Any]] = field(default_factory=list)
+    degraded: bool = False
+
+    def usage(self) -> Dict[str, int]:
+        """Token usage summed over the turn's LLM calls."""
+        totals = {key: 0 for key in USAGE_KEYS}
+        for call in self.llm_calls:
+            for key in USAGE_KEYS:
+                totals[key] += call.get("usage", {}).get(key, 0)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "degraded": self.degraded,
+            "usage": self.usage(),
+        }
+
+
+_current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar(
+    "turn_trace", default=None
+)
+
+
+@contextlib.contextmanager
+def trace_turn() -> Iterator[TurnTrace]:
+    """Collects a TurnTrace for the `/chat` turn awaited inside the block."""
+    trace = TurnTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def record_llm_call(latency_ms: float, response: Dict[str, Any]) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.llm_calls.append(
+            {
+                "latency_ms": round(latency_ms, 3),
+                "usage": dict(response.get("usage") or {}),
+                "error": response.get("error"),
+            }
+        )
+
+
+def record_tool_call(name: str, args: Dict[str, Any]) -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.tool_calls.append({"name": name, "args": dict(args)})
+
+
+def mark_degraded() -> None:
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.degraded = True
@@ -0,0 +1,333 @@
+import asyncio
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from backend.app import metrics
+from backend.app.datetime_parser import VIETNAM_TZ
+from backend.app.messages import Message
+from backend.app.settings import get_setting
+
+USAGE_STORE_BACKENDS = ("memory", "sqlite")
+BUDGET_ACTIONS = ("none", "truncate", "cheap_model", "refuse")
+DEFAULT_TENANT = "default"
+BUDGET_EXCEEDED_MESSAGE = (
+    "You've reached today's usage limit for the assistant. Please try again tomorrow, "
+    "or contact Vexere customer support for help with your booking."
+)
+
+# USD per 1M tokens (prompt, completion); models missing here are costed at 0.
+# Override with MODEL_PRICES_PER_1M_TOKENS in config.py.
+DEFAULT_MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+}
+
+# requests, prompt_tokens, completion_tokens, total_tokens, cost_usd
+USAGE_FIELDS = ("requests", "prompt_tokens", "completion_tokens", "total_tokens", "cost_usd")
+
+
+def usage_day(now: Optional[datetime] = None) -> str:
+    """Accounting day (Vietnam time), e.g. "2025-12-20"."""
+    return (now or datetime.now(VIETNAM_TZ)).astimezone(VIETNAM_TZ).strftime("%Y-%m-%d")
+
+
+def model_price(model_name: str, prices: Dict[str, Tuple[float, float]]) -> Tuple[float, float]:
+    """Price of the longest configured name that prefixes `model_name` (versioned names share a price)."""
+    for name in sorted(prices, key=len, reverse=True):
+        if model_name.startswith(name):
+            return tuple(prices[name])  # type: ignore[return-value]
+    return 0.0, 0.0
+
+
+def truncate_history(history: List[Message], max_messages: int) -> List[Message]:
+    """
+    The last `max_messages` history entries or fewer, starting at a user text
+    turn so a function call is never separated from its response.
+    """
+    if len(history) <= max_messages:
+        return history
+    for start in range(len(history) - max_messages, len(history)):
+        if history[start].role == "user" and history[start].text is not None:
+            return history[start:]
+    return []
+
+
+class InMemoryUsageStore:
+    """Process-local usage totals (lost on restart; fine for a single worker)."""
+
+    def __init__(self):
+        # (day, scope, key) -> [requests, prompt, completion, total, cost]
+        self._totals: Dict[Tuple[str, str, str], List[float]] = {}
+
+    async def add(self, day: str, scope: str, key: str, values: List[float]) -> None:
+        totals = self._totals.setdefault((day, scope, key), [0, 0, 0, 0, 0.0])
+        for index, value in enumerate(values):
+            totals[index] += value
+
+    async def get(self, day: str, scope: str, key: str) -> List[float]:
+        return list(self._totals.get((day, scope, key), [0, 0, 0, 0, 0.0]))
+
+    async def top(self, day: str, scope: str, limit: int) -> List[Tuple[str, List[float]]]:
+        rows = [
+            (key, list(values))
+            for (row_day, row_scope, key), values in self._totals.items()
+            if row_day == day and row_scope == scope
+        ]
+        rows.sort(key=lambda row: row[1][3], reverse=True)
+        return rows[:limit]
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteUsageStore:
+    """
+    Usage totals shared by all worker processes on a host: one row per
+    (day, scope, key), updated with an upsert, so the table stays small.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=10
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS usage (
+                day TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                key TEXT NOT NULL,
+                requests INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                total_tokens INTEGER NOT NULL,
+                cost_usd REAL NOT NULL,
+                PRIMARY KEY (day, scope, key)
+            ) WITHOUT ROWID
+            """
+        )
+
+    def _add_sync(self, day: str, scope: str, key: str, values: List[float]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(day, scope, key) DO UPDATE SET "
+                "requests = requests + excluded.requests, "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "total_tokens = total_tokens + excluded.total_tokens, "
+                "cost_usd = cost_usd + excluded.cost_usd",
+                (day, scope, key, *values),
+            )
+
+    def _get_sync(self, day: str, scope: str, key: str) -> List[float]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(USAGE_FIELDS)} FROM usage WHERE day = ? AND scope = ? AND key = ?",
+                (day, scope, key),
+            ).fetchone()
+        return list(row) if row else [0, 0, 0, 0, 0.0]
+
+    def _top_sync(self, day: str, scope: str, limit: int) -> List[Tuple[str, List[float]]]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT key, {', '.join(USAGE_FIELDS)} FROM usage WHERE day = ? AND scope = ? "
+                "ORDER BY total_tokens DESC LIMIT ?",
+                (day, scope, limit),
+            ).fetchall()
+        return [(row[0], list(row[1:])) for row in rows]
+
+    async def add(self, day: str, scope: str, key: str, values: List[float]) -> None:
+        await asyncio.to_thread(self._add_sync, day, scope, key, values)
+
+    async def get(self, day: str, scope: str, key: str) -> List[float]:
+        return await asyncio.to_thread(self._get_sync, day, scope, key)
+
+    async def top(self, day: str, scope: str, limit: int) -> List[Tuple[str, List[float]]]:
+        return await asyncio.to_thread(self._top_sync, day, scope, limit)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def usage_dict(values: List[float]) -> Dict[str, Any]:
+    usage = dict(zip(USAGE_FIELDS, values))
+    usage["cost_usd"] = round(usage["cost_usd"], 6)
+    return usage
+
+
+@dataclass
+class BudgetDecision:
+    """What to do with a turn given the user's and tenant's usage today."""
+
+    action: str  # One of BUDGET_ACTIONS
+    used_fraction: float  # Highest share of any configured budget already used
+    reason: Optional[str] = None
+
+
+class UsageAccountant:
+    """
+    Accounts LLM token usage (from the agents' "usage") and estimated cost per
+    user and per tenant per day, and applies daily budgets before each turn.
+
+    A budget of 0 is unlimited. Once `soft_ratio` of any budget is used the
+    `soft_action` applies (truncate the history sent to the model, or switch
+    to `fallback_model`); once a budget is exhausted, `hard_action` applies
+    (by default the turn is refused without calling the model).
+    """
+
+    def __init__(
+        self,
+        store: Any,
+        user_daily_tokens: int = 0,
+        tenant_daily_tokens: int = 0,
+        user_daily_cost_usd: float = 0.0,
+        tenant_daily_cost_usd: float = 0.0,
+        soft_ratio: float = 0.8,
+        soft_action: str = "truncate",
+        hard_action: str = "refuse",
+        fallback_model: str = "gemini-2.5-flash",
+        truncate_messages: int = 8,
+        prices: Optional[Dict[str, Tuple[float, float]]] = None,
+    ):
+        for action in (soft_action, hard_action):
+            if action not in BUDGET_ACTIONS:
+                raise ValueError(
+                    f"Unsupported budget action '{action}'. Valid values: {', '.join(BUDGET_ACTIONS)}"
+                )
+        self.store = store
+        self.limits = {
+            "user": (user_daily_tokens, user_daily_cost_usd),
+            "tenant": (tenant_daily_tokens, tenant_daily_cost_usd),
+        }
+        self.soft_ratio = soft_ratio
+        self.soft_action = soft_action
+        self.hard_action = hard_action
+        self.fallback_model = fallback_model
+        self.truncate_messages = truncate_messages
+        self.prices = prices if prices is not None else DEFAULT_MODEL_PRICES
+        self.decisions = {action: 0 for action in BUDGET_ACTIONS}
+        self.recorded_calls = 0
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit for limits in self.limits.values() for limit in limits)
+
+    async def check(self, user_id: str, tenant_id: str) -> BudgetDecision:
+        decision = BudgetDecision("none", 0.0)
+        if self.enabled:
+            day = usage_day()
+            for scope, key in (("user", user_id), ("tenant", tenant_id)):
+                token_limit, cost_limit = self.limits[scope]
+                used = await self.store.get(day, scope, key)
+                for name, used_value, limit in (
+                    ("tokens", used[3], token_limit),
+                    ("cost", used[4], cost_limit),
+                ):
+                    if limit and used_value / limit > decision.used_fraction:
+                        decision = BudgetDecision(
+                            "none", used_value / limit, f"{scope} {key}: daily {name} budget"
+                        )
+            if decision.used_fraction >= 1.0:
+                decision.action = self.hard_action
+            elif decision.used_fraction >= self.soft_ratio:
+                decision.action = self.soft_action
+        self.decisions[decision.action] += 1
+        return decision
+
+    async def record(
+        self, user_id: str, tenant_id: str, model_name: str, usages: List[Dict[str, Any]]
+    ) -> None:
+        """Adds the token usage of a turn's LLM calls to the user's and tenant's daily totals."""
+        usages = [usage for usage in usages if usage]
+        if not usages:
+            return
+        prompt_price, completion_price = model_price(model_name, self.prices)
+        prompt_tokens = sum(usage.get("prompt_tokens", 0) for usage in usages)
+        completion_tokens = sum(usage.get("completion_tokens", 0) for usage in usages)
+        values = [
+            len(usages),
+            prompt_tokens,
+            completion_tokens,
+            sum(usage.get("total_tokens", 0) for usage in usages),
+            (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000,
+        ]
+        day = usage_day()
+        await self.store.add(day, "user", user_id, values)
+        await self.store.add(day, "tenant", tenant_id, values)
+        self.recorded_calls += len(usages)
+
+    async def report(self, day: str, scope: str, key: Optional[str], limit: int) -> Dict[str, Any]:
+        if key is not None:
+            rows = [(key, await self.store.get(day, scope, key))]
+        else:
+            rows = await self.store.top(day, scope, limit)
+        token_limit, cost_limit = self.limits[scope]
+        return {
+            "day": day,
+            "scope": scope,
+            "daily_token_budget": token_limit,
+            "daily_cost_budget_usd": cost_limit,
+            "usage": [{"key": row_key, **usage_dict(values)} for row_key, values in rows],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budgets_enabled": self.enabled,
+            "recorded_llm_calls": self.recorded_calls,
+            "budget_decisions": dict(self.decisions),
+        }
+
+
+def build_usage_accountant() -> UsageAccountant:
+    """Creates the accountant and store selected by the USAGE_* and *_BUDGET settings."""
+    backend = str(get_setting("USAGE_STORE", "memory")).lower()
+    if backend == "memory":
+        store = InMemoryUsageStore()
+    elif backend == "sqlite":
+        store = SQLiteUsageStore(get_setting("USAGE_DB_PATH", "usage.db"))
+    else:
+        raise ValueError(
+            f"Unsupported USAGE_STORE '{backend}'. Valid values: {', '.join(USAGE_STORE_BACKENDS)}"
+        )
+    return UsageAccountant(
+        store,
+        user_daily_tokens=get_setting("USER_DAILY_TOKEN_BUDGET", 0),
+        tenant_daily_tokens=get_setting("TENANT_DAILY_TOKEN_BUDGET", 0),
+        user_daily_cost_usd=get_setting("USER_DAILY_COST_BUDGET_USD", 0.0),
+        tenant_daily_cost_usd=get_setting("TENANT_DAILY_COST_BUDGET_USD", 0.0),
+        soft_ratio=get_setting("BUDGET_SOFT_LIMIT_RATIO", 0.8),
+        soft_action=str(get_setting("BUDGET_SOFT_ACTION", "truncate")).lower(),
+        hard_action=str(get_setting("BUDGET_HARD_ACTION", "refuse")).lower(),
+        fallback_model=get_setting("BUDGET_FALLBACK_MODEL", "gemini-2.5-flash"),
+        truncate_messages=get_setting("BUDGET_TRUNCATED_HISTORY_MESSAGES", 8),
+        prices=get_setting("MODEL_PRICES_PER_1M_TOKENS", None),
+    )
+
+
+_usage_accountant: Optional[UsageAccountant] = None
+
+
+def get_usage_accountant() -> UsageAccountant:
+    """The usage accountant of this worker process, created on first use."""
+    global _usage_accountant
+    if _usage_accountant is None:
+        _usage_accountant = build_usage_accountant()
+        metrics.register("usage", _usage_accountant.stats)
+        print(f"Usage accounting initialized: {type(_usage_accountant.store).__name__}")
+    return _usage_accountant
+
+
+async def close_usage_accountant() -> None:
+    global _usage_accountant
+    if _usage_accountant is not None:
+        await _usage_accountant.store.close()
+        _usage_accountant = None
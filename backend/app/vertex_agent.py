@@ -1,3 +1,4 @@
+import asyncio
 import base64  # For decoding image/audio data
 import vertexai
 from vertexai.generative_models import (
@@ -6,21 +7,35 @@ from vertexai.generative_models import (
     Tool,
     FunctionDeclaration,
     Content,
+    GenerationResponse,
 )
 from typing import List, Dict, Any, Optional
 
 # Import configuration
-from backend.app import config as app_config
-
-# Initialize Vertex AI
-try:
-    vertexai.init(project=app_config.PROJECT_ID, location=app_config.LOCATION)
-except Exception as e:
-    print(
-        f"Error initializing Vertex AI: {e}. Ensure Application Default Credentials are set up."
-    )
-    # Allow the application to continue so other parts can be tested if Vertex AI is not critical for them.
-    # However, the agent will not work.
+from backend.app.settings import app_config
+from backend.app.llm_fixtures import FixtureMismatchError, build_transport
+from backend.app.messages import Message, to_content
+
+# Vertex AI is initialized on first agent construction rather than at import,
+# so importing the app stays fast and the failure can be reported by /readyz.
+_vertex_ai_init_error: Optional[str] = None
+_vertex_ai_initialized = False
+
+
+def init_vertex_ai() -> Optional[str]:
+    """Initializes the Vertex AI SDK once. Returns the error message if it failed."""
+    global _vertex_ai_initialized, _vertex_ai_init_error
+    if not _vertex_ai_initialized:
+        _vertex_ai_initialized = True
+        try:
+            vertexai.init(project=app_config.PROJECT_ID, location=app_config.LOCATION)
+        except Exception as e:
+            _vertex_ai_init_error = f"Error initializing Vertex AI: {e}. Ensure Application Default Credentials are set up."
+            print(_vertex_ai_init_error)
+            # Allow the application to continue so other parts can be tested if Vertex AI is not critical for them.
+            # However, the agent will not work.
+    return _vertex_ai_init_error
+
 
 # --- Tool Definitions for Gemini (remain the same as before) ---
 
@@ -72,42 +87,139 @@ confirm_booking_time_change_func = FunctionDeclaration(
             },
             "new_time": {
                 "type": "string",
-                "description": "The new desired date and time for the booking, in 'YYYY-MM-DD HH:MM:SS' format (e.g., '2025-12-31 14:30:00'), previously collected from the user.",
+                "description": "The new desired date and time for the booking, previously collected from the user. Preferably in 'YYYY-MM-DD HH:MM:SS' format (e.g., '2025-12-31 14:30:00'); the user's own wording (e.g., '8h sáng mai', 'tomorrow 2pm', '31/12 14:30') is also accepted and converted by the tool, so do not ask the user to reformat it.",
             },
         },
         "required": ["booking_id", "new_time"],
     },
 )
 
+get_booking_details_func = FunctionDeclaration(
+    name="get_booking_details",
+    description="Looks up a booking in the Vexere system: its route, departure time, number of seats, status and whether its time can be changed. Use this tool when the user asks about an existing booking (e.g., 'When does my bus VX12345 leave?', 'Can I still change booking VX12345?').",
+    parameters={
+        "type": "object",
+        "properties": {
+            "booking_id": {
+                "type": "string",
+                "description": "The booking ID (e.g., VX12345) to look up.",
+            }
+        },
+        "required": ["booking_id"],
+    },
+)
+
 vexere_tool_config = Tool(
     function_declarations=[
         get_faq_answer_func,
         initiate_change_booking_time_flow_func,
         provide_booking_id_for_change_func,
         confirm_booking_time_change_func,
+        get_booking_details_func,
     ]
 )
 
+# Names of the declared tools, used to tell requests with different tool sets apart.
+VEXERE_TOOL_NAMES = sorted(
+    declaration["name"]
+    for declaration in vexere_tool_config.to_dict()["function_declarations"]
+)
+
 # --- Agent Logic ---
 
 
+def parse_gemini_response(response: GenerationResponse) -> Dict[str, Any]:
+    """
+    The agent's result for a Gemini response: a "function_call" or "text"
+    with the "raw_model_response_part" and token "usage", or a fallback text
+    for an empty or malformed response.
+    """
+    if not response.candidates or not response.candidates[0].content.parts:
+        print("[VertexAIAgent] Warning: Gemini response is empty or malformed.")
+        return {
+            "text": "I'm sorry, I encountered an issue processing your request with the AI model."
+        }
+
+    model_response_part = response.candidates[0].content.parts[0]
+    usage_metadata = response.usage_metadata
+    usage = {
+        "prompt_tokens": usage_metadata.prompt_token_count,
+        "completion_tokens": usage_metadata.candidates_token_count,
+        "total_tokens": usage_metadata.total_token_count,
+    }
+
+    if model_response_part.function_call:
+        function_call = model_response_part.function_call
+        return {
+            "function_call": {
+                "name": function_call.name,
+                "args": {key: val for key, val in function_call.args.items()},
+            },
+            "raw_model_response_part": model_response_part,
+            "usage": usage,
+        }
+    # `Part.text` raises for a part without text, so check the raw part first.
+    elif model_response_part.to_dict().get("text"):
+        return {
+            "text": model_response_part.text,
+            "raw_model_response_part": model_response_part,
+            "usage": usage,
+        }
+    else:
+        print(
+            "[VertexAIAgent] Warning: Gemini response part has no text or function call."
+        )
+        return {
+            "text": "I received an unusual response from the AI model. Please try again."
+        }
+
+
 class VertexAIAgent:
-    def __init__(self, model_name: str = app_config.MODEL_NAME):
+    def __init__(self, model_name: str = app_config.MODEL_NAME, transport: Any = None):
+        # The transport performs the actual generate_content call: live by default,
+        # or record/replay of LLM fixtures (see llm_fixtures.py).
+        self.transport = transport or build_transport()
+        self.model_name = model_name
+        self.tool_names = VEXERE_TOOL_NAMES
+        self.init_error = init_vertex_ai()
         try:
             self.model = GenerativeModel(model_name)
             print(f"Vertex AI Agent initialized with model: {model_name}")
         except Exception as e:
             print(f"Failed to initialize GenerativeModel ({model_name}): {e}")
+            self.init_error = (
+                self.init_error or f"Failed to initialize GenerativeModel ({model_name}): {e}"
+            )
             self.model = None
+        self._models_by_name = {(model_name, None): self.model}
+
+    def _model_for(self, model_name: Optional[str], system_instruction: Optional[str] = None) -> Any:
+        """
+        The GenerativeModel for `model_name` (default: the agent's model) and
+        `system_instruction`, created once: the instruction is fixed per model.
+        """
+        if self.model is None:
+            return None  # Replayed fixtures do not need a model
+        key = (model_name or self.model_name, system_instruction or None)
+        if key not in self._models_by_name:
+            self._models_by_name[key] = GenerativeModel(key[0], system_instruction=key[1])
+        return self._models_by_name[key]
+
+    def is_ready(self) -> bool:
+        """True when requests can be served (a live model, or replayed fixtures)."""
+        return bool(self.model) or self.transport.serves_offline
 
     async def get_gemini_response(
         self,
-        chat_history: List[Content],
+        chat_history: List[Message],
         user_message: str,
         image_base64: Optional[str] = None,
         image_mime_type: Optional[str] = None,
         audio_base64: Optional[str] = None,
         audio_mime_type: Optional[str] = None,
+        model_name: Optional[str] = None,
+        system_instruction: Optional[str] = None,
+        generation_config: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Sends the user message, history, and optional multimodal data to Gemini and gets a response.
@@ -115,13 +227,16 @@ class VertexAIAgent:
         The chat_history should be complete up to the point *before* this new user_message.
         If user_message is an internal prompt after a tool call, chat_history should already contain
         [..., user_prompt_that_led_to_tool_call, model_tool_call_request, function_tool_execution_result]
+        `model_name` selects another Gemini model for this call (e.g. a cheaper one for users over budget).
+        `system_instruction` and `generation_config` come from the user's prompt variant (see prompts.py).
         """
-        if not self.model:
+        if not self.model and not self.transport.serves_offline:
             return {
                 "error": "Gemini model not initialized. Please check Vertex AI setup."
             }
 
-        messages_for_gemini = list(chat_history)
+        # History entries become Content objects only here (cached per message).
+        messages_for_gemini = [to_content(item) for item in chat_history]
 
         # Construct parts for the current user message
         current_user_parts = []
@@ -168,47 +283,32 @@ class VertexAIAgent:
             return {"error": "No messages to send to Gemini."}
 
         try:
-            response = self.model.generate_content(
+            options: Dict[str, Any] = {}
+            if system_instruction:
+                options["system_instruction"] = system_instruction
+            if generation_config:
+                options["generation_config"] = generation_config
+            # The SDK call blocks: run it off the event loop so other requests
+            # keep being served and callers' timeouts can fire.
+            response = await asyncio.to_thread(
+                self.transport.generate_content,
+                self._model_for(model_name, system_instruction),
                 messages_for_gemini,
-                tools=[vexere_tool_config],
+                [vexere_tool_config],
+                **options,
             )
 
             print("[VertexAIAgent] Received response from Gemini.")
+            return parse_gemini_response(response)
 
-            if not response.candidates or not response.candidates[0].content.parts:
-                print("[VertexAIAgent] Warning: Gemini response is empty or malformed.")
-                return {
-                    "text": "I'm sorry, I encountered an issue processing your request with the AI model."
-                }
-
-            model_response_part = response.candidates[0].content.parts[0]
-
-            if model_response_part.function_call:
-                function_call = model_response_part.function_call
-                return {
-                    "function_call": {
-                        "name": function_call.name,
-                        "args": {key: val for key, val in function_call.args.items()},
-                    },
-                    "raw_model_response_part": model_response_part,
-                }
-            elif model_response_part.text:
-                return {
-                    "text": model_response_part.text,
-                    "raw_model_response_part": model_response_part,
-                }
-            else:
-                print(
-                    "[VertexAIAgent] Warning: Gemini response part has no text or function call."
-                )
-                return {
-                    "text": "I received an unusual response from the AI model. Please try again."
-                }
-
+        except FixtureMismatchError as e:
+            print(f"[VertexAIAgent] No recorded response: {e}")
+            return {"error": f"No recorded LLM response for this request: {str(e)}"}
         except Exception as e:
             print(f"[VertexAIAgent] Error during Gemini API call: {e}")
             return {
-                "error": f"An error occurred while communicating with the AI model: {str(e)}"
+                "error": f"An error occurred while communicating with the AI model: {str(e)}",
+                "provider_error": True,  # Counts against the provider (circuit breaker)
             }
 
 
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Dict, Any, Optional
+
+from backend.app import tools
+from backend.app.ai_agents_manager import get_ai_manager
+from backend.app.session_store import get_session_store
+
+# Checks that must pass before the worker reports ready. The FAQ index is
+# reported too, but a missing FAQ file only degrades the FAQ tool.
+REQUIRED_CHECKS = ("session_store", "agent")
+
+
+class WarmupState:
+    """
+    Tracks the background warm-up started by the FastAPI lifespan.
+
+    The app starts accepting connections immediately (so liveness probes pass);
+    the slow work — importing the Vertex AI SDK and creating the model handle,
+    loading the FAQ index, opening the HTTP pool — runs in the background and
+    `/readyz` reports when it is done and whether each step succeeded.
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.checks: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+
+    def start(self) -> None:
+        self.started_at = time.monotonic()
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        self.checks["session_store"] = await self._check(get_session_store)
+        # The agent manager import/initialization is blocking; keep it off the event loop.
+        self.checks["agent"] = await self._check(self._init_agent, in_thread=True)
+        self.checks["faq_index"] = await self._check(self._load_faq, in_thread=True)
+        self.checks["http_pool"] = await self._check(tools.get_http_client)
+        self.completed_at = time.monotonic()
+        print(
+            f"Warm-up finished in {self.completed_at - self.started_at:.2f}s: {self.checks}"
+        )
+
+    @staticmethod
+    async def _check(step: Any, in_thread: bool = False) -> str:
+        # A step fails by raising or by returning an error message string.
+        try:
+            error = await asyncio.to_thread(step) if in_thread else step()
+        except Exception as e:
+            return f"error: {e}"
+        return f"error: {error}" if isinstance(error, str) else "ok"
+
+    @staticmethod
+    def _init_agent() -> Optional[str]:
+        return get_ai_manager().readiness_error()
+
+    @staticmethod
+    def _load_faq() -> Optional[str]:
+        return None if tools.faq_available() else "FAQ data is unavailable."
+
+    @property
+    def ready(self) -> bool:
+        return self.completed_at is not None and all(
+            self.checks.get(name) == "ok" for name in REQUIRED_CHECKS
+        )
+
+    async def wait(self) -> None:
+        """Waits for an in-progress warm-up, so early requests don't redo or race it."""
+        if self.task is not None and not self.task.done():
+            await asyncio.shield(self.task)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_complete": self.completed_at is not None,
+            "warmup_seconds": (
+                round(self.completed_at - self.started_at, 3)
+                if self.completed_at is not None and self.started_at is not None
+                else None
+            ),
+            "checks": self.checks,
+        }
+
+
+warmup_state = WarmupState()
@@ -0,0 +1,445 @@
+"""
+Offline load test for the `/chat` and `/mock_vexere/change_booking` endpoints.
+
+The backend runs in-process under uvicorn with the scripted "FAKE" LLM provider,
+so no Vertex AI credentials are needed and results are reproducible.
+Scripted multi-turn conversations (FAQ, change-booking happy path, change-booking
+failure path via "FAIL" ids, multimodal) are driven concurrently over HTTP.
+The mock Vexere API runs in stateful mode by default, so booking changes use
+seeded bookings and contend for seat capacity ("seat_contention" moves many
+bookings to the same departure until it sells out).
+Throughput, p50/p95/p99 latency and memory growth per 1k sessions are written
+as JSON so runs can be compared across commits. With `--faults` the LLM, the
+booking API client and the session store get injected latency and failures
+(see backend/app/faults.py), and a per-second timeline of requests, errors and
+p99 latency shows how the pipeline recovers.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_chat --sessions 200 --concurrency 32 \
+        --llm-latency-ms 50 --output bench_chat.json
+    python -m backend.benchmarks.bench_chat --faults \
+        '{"llm": {"faults": {"error_5xx": 0.05, "empty_candidates": 0.01}}}'
+"""
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+import wave
+import zlib
+from typing import List, Dict, Any, Callable
+
+import httpx
+
+from backend.app.mock_vexere import (
+    seeded_change_request,
+    seeded_non_changeable_booking_id,
+)
+from backend.app.settings import get_setting
+from backend.benchmarks.common import (
+    BackgroundServer,
+    summarize_latencies,
+    wait_until_ready,
+    write_results,
+)
+
+# A 1x1 transparent PNG, enough to exercise the multimodal request path.
+SAMPLE_IMAGE_BASE64 = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+SYSTEM_ERROR_MARKERS = ("A system error occurred", "An unexpected error occurred")
+
+
+def _sample_audio_base64(seconds: float = 0.5, sample_rate: int = 16000) -> str:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _booking_suffix(user_id: str) -> int:
+    # Stable across runs, unlike hash() which is salted per process.
+    return zlib.crc32(user_id.encode("utf-8")) % 100000
+
+
+def _seeded_change(user_id: str, to_first_departure: bool = False) -> Any:
+    # Valid for the stateful mock API; the stateless one accepts any id and time.
+    return seeded_change_request(
+        _booking_suffix(user_id),
+        get_setting("MOCK_VEXERE_BOOKINGS", 500),
+        get_setting("MOCK_VEXERE_DAYS", 7),
+        to_first_departure=to_first_departure,
+    )
+
+
+def _failing_booking_id(user_id: str) -> str:
+    return seeded_non_changeable_booking_id(
+        _booking_suffix(user_id), get_setting("MOCK_VEXERE_BOOKINGS", 500)
+    )
+
+
+def _chat(user_id: str, message: str, **extra: Any) -> Dict[str, Any]:
+    return {"path": "/chat", "json": {"user_id": user_id, "message": message, **extra}}
+
+
+def faq_conversation(user_id: str) -> List[Dict[str, Any]]:
+    return [
+        _chat(user_id, "How do I cancel my ticket?"),
+        _chat(user_id, "What payment methods do you accept?"),
+        _chat(user_id, "Thanks!"),
+    ]
+
+
+def change_booking_ok_conversation(user_id: str) -> List[Dict[str, Any]]:
+    booking_id, new_time = _seeded_change(user_id)
+    return [
+        _chat(user_id, "I want to change my booking time"),
+        _chat(user_id, f"My booking ID is {booking_id}"),
+        _chat(user_id, f"Please move it to {new_time}"),
+    ]
+
+
+def change_booking_fail_conversation(user_id: str) -> List[Dict[str, Any]]:
+    _, new_time = _seeded_change(user_id)
+    return [
+        _chat(user_id, "I want to change my booking time"),
+        _chat(user_id, f"My booking ID is {_failing_booking_id(user_id)}"),
+        _chat(user_id, f"Please move it to {new_time}"),
+    ]
+
+
+def multimodal_conversation(user_id: str) -> List[Dict[str, Any]]:
+    return [
+        _chat(
+            user_id,
+            "What does this ticket say?",
+            image_base64=SAMPLE_IMAGE_BASE64,
+            image_mime_type="image/png",
+        ),
+        _chat(
+            user_id,
+            "",
+            audio_base64=_sample_audio_base64(),
+            audio_mime_type="audio/wav",
+        ),
+    ]
+
+
+def mock_api_requests(user_id: str) -> List[Dict[str, Any]]:
+    booking_id, new_time = _seeded_change(user_id)
+    return [
+        {
+            "path": "/mock_vexere/change_booking",
+            "json": {"booking_id": booking_id, "new_time": new_time},
+        },
+        {
+            "path": "/mock_vexere/change_booking",
+            "json": {"booking_id": _failing_booking_id(user_id), "new_time": new_time},
+        },
+    ]
+
+
+def seat_contention_requests(user_id: str) -> List[Dict[str, Any]]:
+    booking_id, new_time = _seeded_change(user_id, to_first_departure=True)
+    return [
+        {
+            "path": "/mock_vexere/change_booking",
+            "json": {
+                "booking_id": booking_id,
+                "new_time": new_time,
+                "idempotency_key": user_id,
+            },
+        },
+    ]
+
+
+SCENARIOS: Dict[str, Callable[[str], List[Dict[str, Any]]]] = {
+    "faq": faq_conversation,
+    "change_booking_ok": change_booking_ok_conversation,
+    "change_booking_fail": change_booking_fail_conversation,
+    "multimodal": multimodal_conversation,
+    "mock_api": mock_api_requests,
+    "seat_contention": seat_contention_requests,
+}
+
+
+def _is_rejected(body: Dict[str, Any]) -> bool:
+    # A business failure of the mock API (sold out, not changeable, ...), not an error.
+    return body.get("success") is False
+
+
+def _is_error(status_code: int, body: Dict[str, Any]) -> bool:
+    if status_code != 200:
+        return True
+    bot_response = body.get("bot_response", "")
+    return any(marker in bot_response for marker in SYSTEM_ERROR_MARKERS)
+
+
+async def run_sessions(
+    base_url: str,
+    scenario_names: List[str],
+    sessions: int,
+    concurrency: int,
+    run_label: str,
+    timeline: bool = False,
+) -> Dict[str, Any]:
+    """
+    Runs `sessions` conversations, cycling through the scenarios, with bounded
+    concurrency. With `timeline`, requests are also summarized per second of the run.
+    """
+    events: List[Any] = []  # (seconds since start, latency ms, error)
+    latencies: Dict[str, List[float]] = {name: [] for name in scenario_names}
+    errors: Dict[str, int] = {name: 0 for name in scenario_names}
+    rejected: Dict[str, int] = {name: 0 for name in scenario_names}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+
+        async def run_one(index: int) -> None:
+            scenario = scenario_names[index % len(scenario_names)]
+            user_id = f"bench-{run_label}-{scenario}-{index}"
+            async with semaphore:
+                for request in SCENARIOS[scenario](user_id):
+                    request_started = time.perf_counter()
+                    try:
+                        response = await client.post(request["path"], json=request["json"])
+                        status_code = response.status_code
+                        body = response.json()
+                    except httpx.TransportError:  # e.g. a connection dropped after a server error
+                        status_code, body = 0, {}
+                    except ValueError:  # e.g. a plain-text 500 page
+                        body = {}
+                    latency_ms = (time.perf_counter() - request_started) * 1000
+                    latencies[scenario].append(latency_ms)
+                    error = _is_error(status_code, body)
+                    if error:
+                        errors[scenario] += 1
+                    elif _is_rejected(body):
+                        rejected[scenario] += 1
+                    events.append((request_started - started, latency_ms, error))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_one(i) for i in range(sessions)))
+        duration = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    results = {
+        "overall": {
+            "sessions": sessions,
+            "requests": len(all_latencies),
+            "errors": sum(errors.values()),
+            "duration_s": round(duration, 3),
+            "throughput_rps": round(len(all_latencies) / duration, 2) if duration else 0.0,
+            "latency_ms": summarize_latencies(all_latencies),
+        },
+        "scenarios": {
+            name: {
+                "requests": len(latencies[name]),
+                "errors": errors[name],
+                "rejected": rejected[name],
+                "latency_ms": summarize_latencies(latencies[name]),
+            }
+            for name in scenario_names
+        },
+    }
+    if timeline:
+        seconds: Dict[int, List[Any]] = {}
+        for offset, latency_ms, error in events:
+            seconds.setdefault(int(offset), []).append((latency_ms, error))
+        results["timeline"] = [
+            {
+                "second": second,
+                "requests": len(entries),
+                "errors": sum(1 for _, error in entries if error),
+                "p99_ms": summarize_latencies([latency for latency, _ in entries])["p99"],
+            }
+            for second, entries in sorted(seconds.items())
+        ]
+    return results
+
+
+async def measure_memory(
+    base_url: str, scenario_names: List[str], sessions: int, concurrency: int
+) -> Dict[str, Any]:
+    """Traced memory retained by the backend after `sessions` new conversations."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    await run_sessions(base_url, scenario_names, sessions, concurrency, "memory")
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = current - baseline
+    return {
+        "sessions": sessions,
+        "retained_bytes": retained,
+        "peak_bytes": peak - baseline,
+        "bytes_per_1k_sessions": round(retained / sessions * 1000) if sessions else 0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument(
+        "--memory-sessions",
+        type=int,
+        default=1000,
+        help="Sessions used for the memory growth measurement (0 to skip).",
+    )
+    parser.add_argument(
+        "--speculative-faq",
+        choices=["off", "parallel", "inject"],
+        default="off",
+        help="SPECULATIVE_FAQ_MODE of the backend under test.",
+    )
+    parser.add_argument(
+        "--mock-vexere",
+        choices=["stateless", "stateful"],
+        default="stateful",
+        help="MOCK_VEXERE_MODE of the mock booking API.",
+    )
+    parser.add_argument("--mock-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--mock-error-rate",
+        type=float,
+        default=0.0,
+        help="Share of mock booking API requests failing with HTTP 503.",
+    )
+    parser.add_argument(
+        "--faults",
+        default="",
+        help="FAULT_INJECTION plan for the backend: JSON, or the path of a JSON file.",
+    )
+    parser.add_argument("--fault-seed", type=int, default=0)
+    parser.add_argument(
+        "--shadow-sample-rate",
+        type=float,
+        default=0.0,
+        help="SHADOW_SAMPLE_RATE: share of LLM calls mirrored to a second fake agent.",
+    )
+    parser.add_argument("--shadow-max-concurrency", type=int, default=4)
+    parser.add_argument("--output", default="bench_chat.json")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Keep the backend's per-turn logging."
+    )
+    args = parser.parse_args()
+
+    scenario_names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenario_names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # The provider must be chosen before the app (and its agent manager) is imported.
+    os.environ["ACTIVE_LLM_PROVIDER"] = "FAKE"
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["FAKE_LLM_JITTER_MS"] = str(args.llm_jitter_ms)
+    os.environ["SPECULATIVE_FAQ_MODE"] = args.speculative_faq
+    os.environ["MOCK_VEXERE_MODE"] = args.mock_vexere
+    os.environ["MOCK_VEXERE_LATENCY_MS"] = str(args.mock_latency_ms)
+    os.environ["MOCK_VEXERE_ERROR_RATE"] = str(args.mock_error_rate)
+    os.environ["SHADOW_SAMPLE_RATE"] = str(args.shadow_sample_rate)
+    os.environ["SHADOW_MAX_CONCURRENCY"] = str(args.shadow_max_concurrency)
+    if args.faults:
+        faults = args.faults
+        if os.path.exists(faults):
+            with open(faults, "r", encoding="utf-8") as f:
+                faults = f.read()
+        from backend.app.faults import parse_fault_plan
+
+        try:
+            parse_fault_plan(faults)  # Fail here rather than inside the server
+        except ValueError as e:
+            parser.error(f"--faults: {e}")
+        os.environ["FAULT_INJECTION"] = faults
+        os.environ["FAULT_INJECTION_SEED"] = str(args.fault_seed)
+
+    from backend.app.main import app
+
+    log_target = sys.stdout if args.verbose else open(os.devnull, "w")
+    with BackgroundServer(app) as server:
+        # Tools call the mock Vexere API over HTTP; point them at the benchmark server.
+        os.environ["MOCK_API_BASE_URL"] = server.base_url
+        with contextlib.redirect_stdout(log_target):
+            wait_until_ready(server.base_url)  # Requests would otherwise wait for warm-up
+            results = asyncio.run(
+                run_sessions(
+                    server.base_url,
+                    scenario_names,
+                    args.sessions,
+                    args.concurrency,
+                    "load",
+                    timeline=bool(args.faults),
+                )
+            )
+            # Component counters (coalescing, FAQ speculation hit rate and time saved, ...)
+            results["backend_metrics"] = httpx.get(server.base_url + "/metrics").json()
+            if args.memory_sessions > 0:
+                results["memory"] = asyncio.run(
+                    measure_memory(
+                        server.base_url,
+                        scenario_names,
+                        args.memory_sessions,
+                        args.concurrency,
+                    )
+                )
+
+    document = write_results(args.output, "chat", vars(args), results)
+    overall = document["overall"]
+    print(
+        f"{overall['requests']} requests in {overall['duration_s']}s "
+        f"({overall['throughput_rps']} req/s), errors: {overall['errors']}, "
+        f"latency p50/p95/p99: {overall['latency_ms']['p50']}/"
+        f"{overall['latency_ms']['p95']}/{overall['latency_ms']['p99']} ms"
+    )
+    speculation = document["backend_metrics"].get("faq_speculation", {})
+    if speculation.get("mode", "off") != "off":
+        print(
+            f"FAQ speculation ({speculation['mode']}): hit rate {speculation['hit_rate']}, "
+            f"{speculation['single_round_trip_answers']} single round-trip answers, "
+            f"~{speculation['estimated_round_trip_time_saved_ms']} ms saved"
+        )
+    faults = document["backend_metrics"].get("faults")
+    if faults:
+        for target, stats in faults.items():
+            injected = {kind: count for kind, count in stats["injected"].items() if count}
+            print(f"Faults injected into {target}: {injected or 'none'} over {stats['calls']} calls")
+        breaker = document["backend_metrics"].get("circuit_breaker", {})
+        print(
+            f"Degraded turns: {document['backend_metrics'].get('degraded_mode')}, "
+            f"circuit breaker opened {breaker.get('times_opened', 0)} times"
+        )
+    shadow = document["backend_metrics"].get("shadow")
+    if shadow:
+        print(
+            f"Shadow calls: {shadow['completed']} completed, {shadow['dropped_overload']} dropped "
+            f"of {shadow['sampled']} sampled; agreement: "
+            + ", ".join(
+                f"{candidate}: {row['agreement']}" for candidate, row in shadow["recent"].items()
+            )
+        )
+    if "memory" in document:
+        print(f"Memory growth: {document['memory']['bytes_per_1k_sessions']} bytes per 1k sessions")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
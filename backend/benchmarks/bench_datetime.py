@@ -0,0 +1,57 @@
+"""
+Throughput benchmark of the free-form booking time parser.
+
+Parses every phrase of the test corpus (Vietnamese and English, canonical and
+free-form, including unparseable ones) repeatedly and reports parses per
+second and per-call latency, plus the corpus accuracy of the run.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_datetime --rounds 200 --output bench_datetime.json
+"""
+
+import argparse
+import time
+from typing import List, Dict, Any
+
+from backend.benchmarks.common import summarize_latencies, write_results
+from backend.tests.test_datetime_parser import load_corpus, parse_case
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--output", default="bench_datetime.json")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    correct = sum(parse_case(case) == case["expected"] for case in corpus)
+
+    per_call_us: List[float] = []
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        for case in corpus:
+            call_started = time.perf_counter()
+            parse_case(case)
+            per_call_us.append((time.perf_counter() - call_started) * 1_000_000)
+    duration = time.perf_counter() - started
+
+    results: Dict[str, Any] = {
+        "phrases": len(corpus),
+        "parses": len(per_call_us),
+        "duration_s": round(duration, 3),
+        "parses_per_second": round(len(per_call_us) / duration, 1),
+        "latency_us": summarize_latencies(per_call_us),
+        "corpus_accuracy": round(correct / len(corpus), 4),
+    }
+    write_results(args.output, "datetime_parser", vars(args), results)
+    print(
+        f"{results['parses']} parses in {results['duration_s']}s "
+        f"({results['parses_per_second']} parses/s), p50/p99: "
+        f"{results['latency_us']['p50']}/{results['latency_us']['p99']} us, "
+        f"corpus accuracy {results['corpus_accuracy']:.2%}"
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
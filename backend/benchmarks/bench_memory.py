@@ -0,0 +1,177 @@
+"""
+Memory benchmark of conversation history storage.
+
+Stores the same two-turn conversation (an FAQ tool turn and a plain turn, six
+history entries) for many sessions, once as compact `Message` records (the
+session stores' representation) and once as vertexai `Content` objects (the
+previous one), and reports traced bytes per stored turn. It also reports the
+cost of loading a serialized history from a shared store (SQLite/Redis) in
+each representation, and the transient and retained memory per `/chat`
+request served in-process with the scripted "FAKE" provider.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_memory --sessions 100000 \
+        --baseline-sessions 10000 --requests 2000 --output bench_memory.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import List, Dict, Any, Callable
+
+from backend.app.messages import Message, history_from_dicts
+from backend.benchmarks.common import write_results
+
+TURNS_PER_SESSION = 2
+
+
+def sample_history(index: int) -> List[Message]:
+    """A typical stored conversation: an FAQ question answered through the tool, then thanks."""
+    question = f"How do I cancel my ticket? (session {index})"
+    answer = (
+        "You can cancel your ticket through the Vexere app or website. Navigate to "
+        "'My Bookings', select the ticket you wish to cancel, and follow the prompts."
+    )
+    return [
+        Message.user_text(question),
+        Message.function_call("get_faq_answer", {"question": question}),
+        Message.function_response("get_faq_answer", {"content": {"answer": answer}}),
+        Message.model_text(answer),
+        Message.user_text("Thanks!"),
+        Message.model_text("You're welcome! Anything else I can help with?"),
+    ]
+
+
+def sample_content_history(index: int) -> List[Any]:
+    from vertexai.generative_models import Content
+
+    return [Content.from_dict(message.to_dict()) for message in sample_history(index)]
+
+
+def retained_bytes(build: Callable[[int], Any], sessions: int) -> int:
+    """Traced bytes still held after building `sessions` histories (kept in a dict, like a store)."""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = {f"user-{index}": build(index) for index in range(sessions)}
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del store
+    return retained
+
+
+def measure_storage(sessions: int, baseline_sessions: int) -> Dict[str, Any]:
+    compact = retained_bytes(sample_history, sessions)
+    content = retained_bytes(sample_content_history, baseline_sessions)
+    compact_per_turn = compact / (sessions * TURNS_PER_SESSION)
+    content_per_turn = content / (baseline_sessions * TURNS_PER_SESSION)
+    return {
+        "sessions": sessions,
+        "message_bytes_total": compact,
+        "message_bytes_per_turn": round(compact_per_turn, 1),
+        "content_baseline_sessions": baseline_sessions,
+        "content_bytes_per_turn": round(content_per_turn, 1),
+        "reduction": round(content_per_turn / compact_per_turn, 2) if compact_per_turn else None,
+    }
+
+
+def measure_load(rounds: int) -> Dict[str, Any]:
+    """Microseconds to deserialize one stored history (what the SQLite/Redis stores do per turn)."""
+    from vertexai.generative_models import Content
+
+    serialized = json.dumps([message.to_dict() for message in sample_history(0)])
+    results = {}
+    for name, load in (
+        ("message", lambda: history_from_dicts(json.loads(serialized))),
+        ("content", lambda: [Content.from_dict(item) for item in json.loads(serialized)]),
+    ):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            load()
+        results[f"{name}_load_us"] = round((time.perf_counter() - started) / rounds * 1_000_000, 2)
+    return results
+
+
+async def measure_requests(requests: int) -> Dict[str, Any]:
+    """Transient (peak) and retained traced bytes per in-process `/chat` request."""
+    from backend.app.main import chat_handler, lifespan, app
+    from backend.app.models import ChatMessageInput
+
+    messages = ["How do I cancel my ticket?", "What payment methods do you accept?", "Thanks!"]
+    async with lifespan(app):
+        # Warm up imports, caches and the first session before measuring.
+        await chat_handler(ChatMessageInput(user_id="warmup", message=messages[0]))
+        gc.collect()
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        peaks = []
+        for index in range(requests):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await chat_handler(
+                ChatMessageInput(
+                    user_id=f"user-{index // len(messages)}",
+                    message=messages[index % len(messages)],
+                )
+            )
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+    peaks.sort()
+    return {
+        "requests": requests,
+        "peak_bytes_per_request_p50": peaks[len(peaks) // 2],
+        "peak_bytes_per_request_max": peaks[-1],
+        "retained_bytes_per_request": round(retained / requests, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument(
+        "--baseline-sessions",
+        type=int,
+        default=10000,
+        help="Sessions stored as Content objects for comparison (they are much larger).",
+    )
+    parser.add_argument("--load-rounds", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=2000, help="In-process /chat requests (0 to skip).")
+    parser.add_argument("--output", default="bench_memory.json")
+    args = parser.parse_args()
+
+    os.environ["ACTIVE_LLM_PROVIDER"] = "FAKE"
+    results: Dict[str, Any] = {
+        "storage": measure_storage(args.sessions, args.baseline_sessions),
+        "load": measure_load(args.load_rounds),
+    }
+    if args.requests > 0:
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            results["requests"] = asyncio.run(measure_requests(args.requests))
+
+    document = write_results(args.output, "memory", vars(args), results)
+    storage, load = document["storage"], document["load"]
+    print(
+        f"Stored history: {storage['message_bytes_per_turn']} bytes/turn as Message records "
+        f"({storage['sessions']} sessions) vs {storage['content_bytes_per_turn']} as Content "
+        f"({storage['reduction']}x)"
+    )
+    print(f"History load: {load['message_load_us']} us (Message) vs {load['content_load_us']} us (Content)")
+    if "requests" in document:
+        requests = document["requests"]
+        print(
+            f"Per /chat request: peak {requests['peak_bytes_per_request_p50']} bytes (p50), "
+            f"retained {requests['retained_bytes_per_request']} bytes"
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
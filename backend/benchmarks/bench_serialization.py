@@ -0,0 +1,176 @@
+"""
+Serialization benchmark of the per-request JSON work.
+
+Compares, per request, the previous path (json module parsing, FastAPI's
+standard JSONResponse, json-encoded session histories) with the current one
+(orjson through `backend.app.http_io` when installed): decoding and validating
+`/chat` request bodies (a text turn and a turn with a base64 image), rendering
+the `/metrics` response (`/chat` keeps FastAPI's pydantic `dump_json` path,
+reported for reference) and encoding/decoding a stored
+session history. It also reports the size and cost of compressing a
+`/metrics`-sized response.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_serialization --rounds 20000 \
+        --output bench_serialization.json
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import time
+from typing import Dict, Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend.app import http_io
+from backend.app.http_io import FastJSONResponse, compress, dumps, loads
+from backend.app.messages import Message, history_from_dicts, history_to_dicts
+from backend.app.models import ChatMessageInput, ChatMessageOutput
+from backend.benchmarks.common import write_results
+
+
+def per_call_us(fn: Callable[[], Any], rounds: int, repeats: int = 3) -> float:
+    """Best of `repeats` timings, which filters out noise from other processes and GC."""
+    fn()  # Warm up
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return round(best / rounds * 1_000_000, 2)
+
+
+def compare(before: Callable[[], Any], after: Callable[[], Any], rounds: int) -> Dict[str, Any]:
+    before_us, after_us = per_call_us(before, rounds), per_call_us(after, rounds)
+    return {
+        "before_us": before_us,
+        "after_us": after_us,
+        "speedup": round(before_us / after_us, 2) if after_us else None,
+    }
+
+
+def sample_history(turns: int):
+    history = []
+    for index in range(turns):
+        question = f"Tôi muốn đổi giờ vé VX{10000 + index} sang tối mai được không?"
+        history += [
+            Message.user_text(question),
+            Message.function_call("provide_booking_id_for_change", {"booking_id": f"VX{10000 + index}"}),
+            Message.function_response(
+                "provide_booking_id_for_change",
+                {"content": {"status": "ok", "message": "Booking found. What new time would you like?"}},
+            ),
+            Message.model_text("Bạn muốn đổi sang giờ nào?"),
+        ]
+    return history
+
+
+def measure(rounds: int, image_kb: int, history_turns: int) -> Dict[str, Any]:
+    text_body = json.dumps(
+        {
+            "user_id": "user-1",
+            "tenant_id": "web",
+            "message": "Làm thế nào để hủy vé của tôi?",
+            "session_state": {"flow": "change_booking_time", "booking_id": "VX10001"},
+        }
+    ).encode("utf-8")
+    image_body = json.dumps(
+        {
+            "user_id": "user-1",
+            "message": "What does this ticket say?",
+            "image_base64": base64.b64encode(os.urandom(image_kb * 1024)).decode("ascii"),
+            "image_mime_type": "image/png",
+        }
+    ).encode("utf-8")
+    image_rounds = max(1, rounds // 200)
+
+    output = ChatMessageOutput(
+        bot_response="Bạn có thể hủy vé trong mục 'Vé của tôi' trên ứng dụng hoặc website Vexere.",
+        session_state={"flow": None, "booking_id": None},
+    )
+    history = sample_history(history_turns)
+    stored = dumps(history_to_dicts(history)).decode("utf-8")
+    snapshot = {f"section_{i}": {"hits": i, "misses": i * 2, "ratio": i / 60, "state": "closed"} for i in range(60)}
+    metrics_body = dumps(snapshot)
+    output_adapter = TypeAdapter(ChatMessageOutput)
+
+    results: Dict[str, Any] = {
+        "orjson": http_io.orjson is not None,
+        "request_decode_text": compare(
+            lambda: ChatMessageInput.model_validate(json.loads(text_body)),
+            lambda: ChatMessageInput.model_validate(loads(text_body)),
+            rounds,
+        ),
+        "request_decode_image": compare(
+            lambda: ChatMessageInput.model_validate(json.loads(image_body)),
+            lambda: ChatMessageInput.model_validate(loads(image_body)),
+            image_rounds,
+        ),
+        "metrics_response_encode": compare(
+            lambda: JSONResponse(jsonable_encoder(snapshot)).body,
+            lambda: FastJSONResponse(snapshot).body,
+            rounds // 10 or 1,
+        ),
+        "chat_response_dump_json_us": per_call_us(lambda: output_adapter.dump_json(output), rounds),
+        "history_encode": compare(
+            lambda: json.dumps(history_to_dicts(history), ensure_ascii=False, separators=(",", ":")),
+            lambda: dumps(history_to_dicts(history)).decode("utf-8"),
+            rounds // 10 or 1,
+        ),
+        "history_decode": compare(
+            lambda: history_from_dicts(json.loads(stored)),
+            lambda: history_from_dicts(loads(stored)),
+            rounds // 10 or 1,
+        ),
+    }
+    results["request_decode_image"]["body_bytes"] = len(image_body)
+    compression = {"body_bytes": len(metrics_body)}
+    encodings = ["gzip"] + (["br"] if http_io.brotli is not None else [])
+    for encoding in encodings:
+        compressed = compress(metrics_body, encoding)
+        compression[f"{encoding}_bytes"] = len(compressed)
+        compression[f"{encoding}_us"] = per_call_us(lambda: compress(metrics_body, encoding), rounds // 10 or 1)
+    assert gzip.decompress(compress(metrics_body, "gzip")) == metrics_body
+    results["compression"] = compression
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=20000)
+    parser.add_argument("--image-kb", type=int, default=1024, help="Size of the image in the image request.")
+    parser.add_argument("--history-turns", type=int, default=10)
+    parser.add_argument("--output", default="bench_serialization.json")
+    args = parser.parse_args()
+
+    document = write_results(
+        args.output, "serialization", vars(args), measure(args.rounds, args.image_kb, args.history_turns)
+    )
+    for name in (
+        "request_decode_text",
+        "request_decode_image",
+        "metrics_response_encode",
+        "history_encode",
+        "history_decode",
+    ):
+        result = document[name]
+        print(f"{name}: {result['before_us']} us before, {result['after_us']} us after ({result['speedup']}x)")
+    print(f"/chat response (pydantic dump_json): {document['chat_response_dump_json_us']} us")
+    compression = document["compression"]
+    sizes = ", ".join(
+        f"{key[:-len('_bytes')]} {value}"
+        for key, value in compression.items()
+        if key.endswith("_bytes") and key != "body_bytes"
+    )
+    print(f"Compressed /metrics-sized body ({compression['body_bytes']} bytes): {sizes} bytes")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Startup benchmark: import time of `backend.app.main` and server cold start.
+
+Each measurement runs in a fresh interpreter. The import time is checked against
+a budget (non-zero exit code when exceeded) so it can gate CI; the time until
+`/healthz` (liveness) and `/readyz` (warm-up finished) answer is reported too.
+
+Run from the project root:
+    python -m backend.benchmarks.bench_startup --runs 5 --import-budget-ms 1000
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any
+
+import httpx
+
+from backend.benchmarks.common import free_port, write_results
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import backend.app.main; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def measure_import_ms(env: Dict[str, str]) -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stderr=subprocess.DEVNULL,
+    )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def _wait_for(url: str, started: float, timeout_s: float) -> float:
+    while time.perf_counter() - started < timeout_s:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"{url} did not become available within {timeout_s}s")
+
+
+def measure_cold_start_ms(env: Dict[str, str], timeout_s: float) -> Dict[str, float]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        live_ms = _wait_for(base_url + "/healthz", started, timeout_s)
+        ready_ms = _wait_for(base_url + "/readyz", started, timeout_s)
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return {"live_ms": live_ms, "ready_ms": ready_ms}
+
+
+def _stats(values: List[float]) -> Dict[str, float]:
+    return {
+        "median": round(statistics.median(values), 1),
+        "min": round(min(values), 1),
+        "max": round(max(values), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--provider",
+        default="FAKE",
+        help="LLM provider for the cold-start runs (VERTEX_AI needs credentials to become ready).",
+    )
+    parser.add_argument("--import-budget-ms", type=float, default=1000.0)
+    parser.add_argument("--ready-timeout-s", type=float, default=60.0)
+    parser.add_argument("--output", default="bench_startup.json")
+    args = parser.parse_args()
+
+    env = dict(os.environ, ACTIVE_LLM_PROVIDER=args.provider)
+    import_ms = [measure_import_ms(env) for _ in range(args.runs)]
+    cold_starts = [measure_cold_start_ms(env, args.ready_timeout_s) for _ in range(args.runs)]
+
+    import_stats = _stats(import_ms)
+    results: Dict[str, Any] = {
+        "import_ms": import_stats,
+        "time_to_live_ms": _stats([run["live_ms"] for run in cold_starts]),
+        "time_to_ready_ms": _stats([run["ready_ms"] for run in cold_starts]),
+        "import_budget_ms": args.import_budget_ms,
+        "within_budget": import_stats["median"] <= args.import_budget_ms,
+    }
+    write_results(args.output, "startup", vars(args), results)
+
+    print(
+        f"import backend.app.main: {import_stats['median']} ms (budget {args.import_budget_ms} ms), "
+        f"live after {results['time_to_live_ms']['median']} ms, "
+        f"ready after {results['time_to_ready_ms']['median']} ms"
+    )
+    print(f"Results written to {args.output}")
+    if not results["within_budget"]:
+        print("Import time budget exceeded.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
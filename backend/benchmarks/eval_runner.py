@@ -0,0 +1,325 @@
+"""
+Batch evaluation of multi-turn conversations through the `/chat` orchestration.
+
+Each line of the dataset (JSONL) is one conversation:
+
+    {"conversation_id": "faq-cancel", "tags": ["faq"],
+     "turns": [{"user": "How do I cancel my ticket?",
+                "expected_tool": "get_faq_answer",
+                "expected_args": {"question": "How do I cancel my ticket?"},
+                "expected_response_contains": "cancel"}]}
+
+`expected_tool` is the tool the model should call on that turn (null: answer
+without a tool; omitted: not scored). `expected_args` is matched as a subset,
+ignoring case and surrounding whitespace. Conversations run concurrently
+(turns within one conversation in order) by awaiting the `/chat` handler
+in-process, so each turn's LLM calls, token usage and tool calls are traced.
+The mock Vexere API is served on a local port for the booking tools.
+
+Per-conversation results are appended to a JSONL file as they finish; with
+--resume, conversations already in that file are skipped, so an interrupted
+run against the live provider continues where it stopped. The aggregate
+report (latency, tokens, tool-call accuracy, per tag) covers the whole file.
+
+Run from the project root, offline with the scripted provider:
+    python -m backend.benchmarks.eval_runner \
+        --dataset backend/benchmarks/eval_conversations.jsonl --provider FAKE
+or against Vertex AI (live, or replaying recorded fixtures):
+    python -m backend.benchmarks.eval_runner --provider VERTEX --fixture-mode replay \
+        --fixture-path llm_fixtures.jsonl --concurrency 4 --resume
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+import uuid
+from typing import List, Dict, Any, Optional, Set
+
+from backend.benchmarks.common import free_port, summarize_latencies, write_results
+
+DEFAULT_DATASET = os.path.join(os.path.dirname(__file__), "eval_conversations.jsonl")
+SYSTEM_ERROR_MARKERS = ("A system error occurred", "An unexpected error occurred")
+
+
+def load_dataset(path: str) -> List[Dict[str, Any]]:
+    conversations = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            conversation = json.loads(line)
+            if not conversation.get("conversation_id") or not conversation.get("turns"):
+                raise ValueError(
+                    f"{path}:{line_number}: a conversation needs a conversation_id and turns."
+                )
+            conversations.append(conversation)
+    return conversations
+
+
+def load_completed(results_path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(results_path):
+        return []
+    with open(results_path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split()).lower()
+    return value
+
+
+def args_match(expected: Dict[str, Any], actual: Dict[str, Any]) -> bool:
+    """Whether every expected argument is present in `actual` with the same (normalized) value."""
+    return all(
+        key in actual and _normalize(actual[key]) == _normalize(value)
+        for key, value in expected.items()
+    )
+
+
+def score_turn(turn: Dict[str, Any], response_text: str, tool_calls: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Scores one turn against its expectations (None where nothing was expected)."""
+    actual_tool = tool_calls[0] if tool_calls else None
+    scores: Dict[str, Optional[bool]] = {
+        "tool_name_correct": None,
+        "tool_args_correct": None,
+        "response_correct": None,
+    }
+    if "expected_tool" in turn:
+        scores["tool_name_correct"] = (actual_tool or {}).get("name") == turn["expected_tool"]
+    if turn.get("expected_args") is not None:
+        scores["tool_args_correct"] = bool(scores["tool_name_correct"]) and args_match(
+            turn["expected_args"], actual_tool["args"]
+        )
+    if turn.get("expected_response_contains"):
+        scores["response_correct"] = (
+            _normalize(turn["expected_response_contains"]) in _normalize(response_text)
+        )
+    return scores
+
+
+async def run_conversation(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Plays one conversation through the `/chat` handler, tracing every turn."""
+    from backend.app.main import chat_handler
+    from backend.app.models import ChatMessageInput
+    from backend.app.turn_trace import trace_turn
+
+    # A fresh user per run, so a resumed conversation starts with an empty session.
+    user_id = f"eval-{conversation['conversation_id']}-{uuid.uuid4().hex[:8]}"
+    turns = []
+    for index, turn in enumerate(conversation["turns"]):
+        started = time.perf_counter()
+        with trace_turn() as trace:
+            try:
+                output = await chat_handler(
+                    ChatMessageInput(user_id=user_id, message=turn["user"])
+                )
+                response_text, error = output.bot_response, None
+            except Exception as e:
+                response_text, error = "", str(e)
+        latency_ms = (time.perf_counter() - started) * 1000
+        if error is None and any(marker in response_text for marker in SYSTEM_ERROR_MARKERS):
+            error = response_text
+        turns.append(
+            {
+                "turn": index,
+                "user": turn["user"],
+                "response": response_text,
+                "latency_ms": round(latency_ms, 3),
+                "error": error,
+                **trace.to_dict(),
+                **score_turn(turn, response_text, trace.tool_calls),
+            }
+        )
+    return {
+        "conversation_id": conversation["conversation_id"],
+        "tags": conversation.get("tags", []),
+        "turns": turns,
+    }
+
+
+def _rate(values: List[Optional[bool]]) -> Optional[float]:
+    scored = [value for value in values if value is not None]
+    return round(sum(scored) / len(scored), 4) if scored else None
+
+
+def aggregate(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency, token usage and accuracy over the given conversation results."""
+    turns = [turn for record in records for turn in record["turns"]]
+    usage = {
+        key: sum(turn["usage"][key] for turn in turns)
+        for key in ("prompt_tokens", "completion_tokens", "total_tokens")
+    }
+    return {
+        "conversations": len(records),
+        "turns": len(turns),
+        "errors": sum(1 for turn in turns if turn["error"]),
+        "degraded_turns": sum(1 for turn in turns if turn["degraded"]),
+        "llm_calls": sum(len(turn["llm_calls"]) for turn in turns),
+        "latency_ms": summarize_latencies([turn["latency_ms"] for turn in turns]),
+        "usage": usage,
+        "mean_tokens_per_turn": round(usage["total_tokens"] / len(turns), 1) if turns else 0.0,
+        "tool_name_accuracy": _rate([turn["tool_name_correct"] for turn in turns]),
+        "tool_args_accuracy": _rate([turn["tool_args_correct"] for turn in turns]),
+        "response_accuracy": _rate([turn["response_correct"] for turn in turns]),
+    }
+
+
+def report(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    tags = sorted({tag for record in records for tag in record["tags"]})
+    failures = [
+        {
+            "conversation_id": record["conversation_id"],
+            "turn": turn["turn"],
+            "user": turn["user"],
+            "response": turn["response"],
+            "tool_calls": turn["tool_calls"],
+            "error": turn["error"],
+        }
+        for record in records
+        for turn in record["turns"]
+        if turn["error"]
+        or False in (turn["tool_name_correct"], turn["tool_args_correct"], turn["response_correct"])
+    ]
+    return {
+        "overall": aggregate(records),
+        "tags": {
+            tag: aggregate([record for record in records if tag in record["tags"]])
+            for tag in tags
+        },
+        "failures": failures,
+    }
+
+
+async def run_eval(
+    conversations: List[Dict[str, Any]],
+    results_path: str,
+    concurrency: int = 4,
+    resume: bool = False,
+) -> Dict[str, Any]:
+    """
+    Runs the conversations (skipping completed ones when resuming) with at most
+    `concurrency` in flight, appending each result to `results_path`, and
+    returns the report over every result in that file.
+    """
+    import uvicorn
+
+    from backend.app.main import app, lifespan
+    from backend.app.warmup import warmup_state
+
+    if not resume and os.path.exists(results_path):
+        os.remove(results_path)
+    completed: Set[str] = {record["conversation_id"] for record in load_completed(results_path)}
+    pending = [c for c in conversations if c["conversation_id"] not in completed]
+    semaphore = asyncio.Semaphore(concurrency)
+    write_lock = asyncio.Lock()
+
+    async def run_one(conversation: Dict[str, Any]) -> None:
+        async with semaphore:
+            record = await run_conversation(conversation)
+        async with write_lock:
+            with open(results_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    # The app's lifespan runs here; the server on the same event loop only
+    # serves the mock Vexere API that the booking tools call over HTTP.
+    async with lifespan(app):
+        server = uvicorn.Server(
+            uvicorn.Config(
+                app, host="127.0.0.1", port=free_port(), log_level="warning", lifespan="off"
+            )
+        )
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            if server_task.done():
+                raise RuntimeError("Mock Vexere API server failed to start.")
+            await asyncio.sleep(0.05)
+        previous_base_url = os.environ.get("MOCK_API_BASE_URL")
+        os.environ["MOCK_API_BASE_URL"] = f"http://127.0.0.1:{server.config.port}"
+        try:
+            # Conversations started during warm-up would wait for it and skew latencies.
+            await warmup_state.wait()
+            started = time.perf_counter()
+            await asyncio.gather(*(run_one(conversation) for conversation in pending))
+            duration = time.perf_counter() - started
+        finally:
+            if previous_base_url is None:
+                os.environ.pop("MOCK_API_BASE_URL", None)
+            else:
+                os.environ["MOCK_API_BASE_URL"] = previous_base_url
+            server.should_exit = True
+            await server_task
+
+    results = report(load_completed(results_path))
+    results["run"] = {
+        "executed_conversations": len(pending),
+        "skipped_conversations": len(conversations) - len(pending),
+        "duration_s": round(duration, 3),
+    }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument(
+        "--provider",
+        choices=["FAKE", "VERTEX"],
+        default="FAKE",
+        help="ACTIVE_LLM_PROVIDER: the scripted offline agent or Vertex AI.",
+    )
+    parser.add_argument(
+        "--fixture-mode",
+        choices=["off", "record", "replay"],
+        default="off",
+        help="LLM_FIXTURE_MODE for the VERTEX provider (replay runs offline).",
+    )
+    parser.add_argument("--fixture-path", default="llm_fixtures.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=0, help="Only the first N conversations.")
+    parser.add_argument("--results", default="eval_results.jsonl", help="Per-conversation results (JSONL).")
+    parser.add_argument("--resume", action="store_true", help="Skip conversations already in --results.")
+    parser.add_argument("--output", default="eval_report.json")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Keep the backend's per-turn logging."
+    )
+    args = parser.parse_args()
+
+    conversations = load_dataset(args.dataset)
+    if args.limit > 0:
+        conversations = conversations[: args.limit]
+
+    # The provider must be chosen before the app (and its agent manager) is imported.
+    os.environ["ACTIVE_LLM_PROVIDER"] = args.provider
+    os.environ["LLM_FIXTURE_MODE"] = args.fixture_mode
+    os.environ["LLM_FIXTURE_PATH"] = args.fixture_path
+
+    log_target = sys.stdout if args.verbose else open(os.devnull, "w")
+    with contextlib.redirect_stdout(log_target):
+        results = asyncio.run(
+            run_eval(conversations, args.results, args.concurrency, args.resume)
+        )
+
+    document = write_results(args.output, "eval", vars(args), results)
+    overall = document["overall"]
+    print(
+        f"{overall['conversations']} conversations, {overall['turns']} turns, "
+        f"errors: {overall['errors']}, tool name/args accuracy: "
+        f"{overall['tool_name_accuracy']}/{overall['tool_args_accuracy']}, "
+        f"response accuracy: {overall['response_accuracy']}"
+    )
+    print(
+        f"Latency p50/p95: {overall['latency_ms']['p50']}/{overall['latency_ms']['p95']} ms, "
+        f"tokens: {overall['usage']['total_tokens']} ({overall['mean_tokens_per_turn']} per turn)"
+    )
+    for failure in document["failures"][:10]:
+        print(f"  FAIL {failure['conversation_id']}#{failure['turn']}: {failure['user']!r} -> {failure['tool_calls']}")
+    print(f"Report written to {args.output}, per-conversation results in {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import asyncio
+import glob
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import analytics, main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.analytics import (
+    AnalyticsExporter,
+    hash_user_id,
+    read_turns,
+    summarize_turns,
+    tool_succeeded,
+)
+from backend.app.session_store import InMemorySessionStore
+
+
+def turn(intent, latency_ms, tool_ok=None):
+    record = {"ts": 1.0, "user_id": "u1", "intent": intent, "latency_ms": latency_ms, "outcome": "ok"}
+    if tool_ok is not None:
+        record["tool_calls"] = [{"name": intent, "ok": tool_ok, "ms": 5.0}]
+    return record
+
+
+class TestAnalyticsExporter(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    async def test_batches_rotate_and_the_buffer_is_bounded(self):
+        exporter = AnalyticsExporter(
+            self.tmp_dir.name, buffer_size=50, batch_size=10, flush_interval_s=0.01, rotate_bytes=500, compact=False
+        )
+        exporter.start()
+        for number in range(60):
+            exporter.record(turn("text", float(number)))
+        await asyncio.sleep(0.05)
+        for number in range(5):
+            exporter.record(turn("get_faq_answer", 100.0 + number, tool_ok=number != 0))
+        await exporter.close()
+
+        stats = exporter.stats()
+        self.assertEqual((stats["records_dropped"], stats["records_written"]), (10, 55))
+        self.assertGreater(len(glob.glob(os.path.join(self.tmp_dir.name, "turns-*.jsonl"))), 1)
+        turns = list(read_turns(self.tmp_dir.name))
+        self.assertEqual(len(turns), 55)
+        self.assertEqual(turns[0]["user"], hash_user_id("u1", ""))
+        self.assertNotIn("user_id", turns[0])
+
+        summary = summarize_turns(iter(turns))
+        self.assertEqual(summary["intents"]["text"]["turns"], 50)
+        self.assertEqual(summary["intents"]["text"]["p95_latency_ms"], 47.0)
+        self.assertEqual(summary["tools"]["get_faq_answer"]["failure_rate"], 0.2)
+
+    async def test_parquet_compaction(self):
+        if analytics.pyarrow is None:
+            self.skipTest("pyarrow is not installed")
+        exporter = AnalyticsExporter(self.tmp_dir.name, flush_interval_s=0.01)
+        exporter.start()
+        exporter.record(turn("text", 1.0))
+        exporter.record({"ts": 2.0, "intent": "refused", "outcome": "refused", "latency_ms": 0.5})
+        await exporter.close()
+        self.assertEqual(len(glob.glob(os.path.join(self.tmp_dir.name, "turns-*.parquet"))), 1)
+        self.assertEqual([row["intent"] for row in read_turns(self.tmp_dir.name)], ["text", "refused"])
+
+    def test_tool_succeeded(self):
+        self.assertTrue(tool_succeeded({"answer": "..."}))
+        self.assertFalse(tool_succeeded({"error": "unavailable"}))
+        self.assertFalse(tool_succeeded({"status": "error", "message": "Invalid booking ID."}))
+        self.assertFalse(tool_succeeded({"success": False, "message": "Failed."}))
+
+
+class TestChatExport(unittest.TestCase):
+    def test_chat_turns_are_exported(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+                manager = AIAgentsManager()
+            with mock.patch.dict(
+                os.environ, {"ANALYTICS_DIR": tmp_dir, "ANALYTICS_USER_SALT": "salt"}
+            ), mock.patch.object(main, "get_ai_manager", return_value=manager), mock.patch.object(
+                main, "get_session_store", return_value=InMemorySessionStore()
+            ):
+                with TestClient(main.app) as client:
+                    client.post("/chat", json={"user_id": "alice", "message": "Hello"})
+                    client.post("/chat", json={"user_id": "alice", "message": "How do I cancel my ticket?"})
+            turns = list(read_turns(tmp_dir))
+
+        self.assertEqual([row["intent"] for row in turns], ["text", "get_faq_answer"])
+        faq_turn = turns[1]
+        self.assertEqual(faq_turn["user"], hash_user_id("alice", "salt"))
+        self.assertEqual((faq_turn["outcome"], faq_turn["llm_calls"]), ("ok", 2))
+        self.assertEqual(faq_turn["tool_calls"][0]["name"], "get_faq_answer")
+        self.assertTrue(faq_turn["tool_calls"][0]["ok"])
+        self.assertGreater(faq_turn["total_tokens"], 0)
+        self.assertGreater(faq_turn["latency_ms"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
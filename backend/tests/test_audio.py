@@ -0,0 +1,118 @@
+import base64
+import io
+import math
+import os
+import unittest
+import wave
+from array import array
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.audio import AudioPreprocessor, decode_wav, preprocess_audio
+from backend.app.session_store import InMemorySessionStore
+
+
+def voice_note(rate=44100, channels=2, silence_s=1.0, speech_s=0.5):
+    """A stereo WAV: silence, a 440 Hz tone standing in for speech, silence."""
+    silence = [0] * int(rate * silence_s)
+    tone = [int(8000 * math.sin(2 * math.pi * 440 * i / rate)) for i in range(int(rate * speech_s))]
+    mono = silence + tone + silence
+    frames = array("h", (sample for sample in mono for _ in range(channels)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(frames.tobytes())
+    return buffer.getvalue()
+
+
+class TestPreprocessAudio(unittest.TestCase):
+    def test_wav_is_downmixed_resampled_and_trimmed(self):
+        data = voice_note()
+        result = preprocess_audio(data, "audio/wav", pad_ms=100)
+        self.assertEqual((result["status"], result["mime_type"]), ("processed", "audio/wav"))
+        self.assertAlmostEqual(result["seconds_in"], 2.5, places=2)
+        self.assertAlmostEqual(result["seconds_out"], 0.7, delta=0.03)  # Speech plus 2 x 100 ms
+        samples, rate = decode_wav(result["data"])
+        self.assertEqual(rate, 16000)
+        self.assertLess(len(result["data"]), len(data) / 10)
+
+    def test_duration_cap_and_silent_clips(self):
+        capped = preprocess_audio(voice_note(speech_s=3.0, silence_s=0), "audio/wav", max_seconds=1.0)
+        self.assertAlmostEqual(capped["seconds_out"], 1.0, places=2)
+        silent = preprocess_audio(voice_note(speech_s=0), "audio/x-wav", max_seconds=0.5)
+        self.assertAlmostEqual(silent["seconds_out"], 0.5, places=2)  # Nothing to trim to, only capped
+
+    def test_other_formats_pass_through_without_ffmpeg(self):
+        result = preprocess_audio(b"\x1aE\xdf\xa3webm", "audio/webm", ffmpeg=None)
+        self.assertEqual((result["status"], result["data"]), ("passthrough", b"\x1aE\xdf\xa3webm"))
+
+
+class TestAudioPreprocessor(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.preprocessor = AudioPreprocessor(workers=1, ffmpeg_path="")
+        self.addCleanup(self.preprocessor.close)
+
+    async def test_process_in_pool_and_report_savings(self):
+        original = base64.b64encode(voice_note()).decode()
+        audio_base64, mime_type = await self.preprocessor.process(original, "audio/wav")
+        self.assertEqual(mime_type, "audio/wav")
+        self.assertLess(len(audio_base64), len(original))
+
+        broken = base64.b64encode(b"RIFF not really a wav").decode()
+        self.assertEqual(await self.preprocessor.process(broken, "audio/wav"), (broken, "audio/wav"))
+        stats = self.preprocessor.stats()
+        self.assertEqual((stats["clips"]["processed"], stats["clips"]["failed"]), (1, 1))
+        self.assertGreater(stats["bytes_saved"], 0)
+        self.assertAlmostEqual(stats["audio_seconds_saved"], 1.6, delta=0.05)
+
+
+class TestChatAudio(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        self.preprocessor = AudioPreprocessor(workers=1, ffmpeg_path="")
+        self.addCleanup(self.preprocessor.close)
+        patches = [
+            mock.patch.object(main, "get_ai_manager", return_value=self.manager),
+            mock.patch.object(main, "get_session_store", return_value=InMemorySessionStore()),
+            mock.patch.object(main, "get_audio_preprocessor", return_value=self.preprocessor),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_the_agent_receives_the_normalized_audio(self):
+        agent = self.manager.active_agent
+        calls = []
+        original = agent.get_gemini_response
+
+        async def spy(*args, **kwargs):
+            calls.append(kwargs)
+            return await original(*args, **kwargs)
+
+        audio = base64.b64encode(voice_note(rate=8000, channels=1)).decode()
+        with mock.patch.object(agent, "get_gemini_response", side_effect=spy):
+            with TestClient(main.app) as client:
+                client.post(
+                    "/chat",
+                    json={"user_id": "u1", "message": "", "audio_base64": audio, "audio_mime_type": "audio/wav"},
+                )
+        sent, rate = decode_wav(base64.b64decode(calls[0]["audio_base64"]))
+        self.assertEqual(rate, 16000)
+        self.assertAlmostEqual(len(sent) / rate, 0.9, delta=0.03)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+import httpx
+
+from backend.app import main, tools
+from backend.app.mock_vexere import (
+    MockVexereService,
+    seeded_change_request,
+    seeded_non_changeable_booking_id,
+    seeded_user_booking_ids,
+)
+from backend.app.tools import BookingCache
+
+BOOKINGS, DAYS = 40, 2
+
+
+class TestBookingCache(unittest.TestCase):
+    def test_ttl_misses_and_invalidation(self):
+        cache = BookingCache(ttl_s=60.0, miss_ttl_s=0.0)
+        cache.put("VX1", {"booking_id": "VX1"})
+        cache.put("NOPE1", None)
+        self.assertEqual(cache.get("VX1"), (True, {"booking_id": "VX1"}))
+        self.assertEqual(cache.get("NOPE1"), (False, None))  # Unknown ids expire at once here
+        cache.invalidate("VX1")
+        self.assertEqual(cache.get("VX1"), (False, None))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (1, 2, 1))
+
+        bounded = BookingCache(max_entries=2)
+        for booking_id in ("A1", "B1", "C1"):
+            bounded.put(booking_id, {"booking_id": booking_id})
+        self.assertEqual(bounded.stats()["entries"], 2)
+        self.assertFalse(bounded.get("A1")[0])
+
+
+class TestBookingLookupTools(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = MockVexereService(mode="stateful", bookings=BOOKINGS, days=DAYS)
+        self.requests = []
+        transport = httpx.ASGITransport(app=main.app)
+
+        async def count(request):
+            self.requests.append(request.url.path)
+
+        self.client = httpx.AsyncClient(transport=transport, event_hooks={"request": [count]})
+        patches = [
+            mock.patch.dict(os.environ, {"MOCK_API_BASE_URL": "http://mock"}),
+            mock.patch.object(main, "get_mock_vexere_service", return_value=self.service),
+            mock.patch.object(tools, "get_http_client", return_value=self.client),
+            mock.patch.object(tools, "_booking_cache", BookingCache()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.service.close()
+
+    async def test_lookups_are_cached_until_a_change(self):
+        booking_id, new_time = seeded_change_request(3, BOOKINGS, DAYS)
+        first = await tools.get_booking_details(booking_id)
+        self.assertTrue(first["found"])
+        self.assertIn(first["booking"]["departure_time"], first["message"])
+        await tools.get_booking_details(booking_id)
+        self.assertEqual(len(self.requests), 1)
+        self.assertFalse((await tools.get_booking_details("VX99999"))["found"])
+
+        result = await tools.confirm_booking_time_change(booking_id, new_time)
+        self.assertTrue(result["success"])
+        changed = await tools.get_booking_details(booking_id)  # Invalidated: read again
+        self.assertEqual(changed["booking"]["departure_time"], new_time)
+        self.assertEqual(self.requests.count(f"/mock_vexere/bookings/{booking_id}"), 2)
+
+    async def test_ids_stay_inside_their_path_segment(self):
+        paths = []
+
+        async def record(request):
+            paths.append(request.url.raw_path)
+
+        self.client.event_hooks["request"].append(record)
+        result = await tools.get_booking_details("../users/u1/bookings?x=1")
+        self.assertFalse(result["found"])
+        await tools._prefetch_user_bookings("u1/../../bookings/VX10001")
+        self.assertEqual(
+            paths,
+            [
+                b"/mock_vexere/bookings/..%2Fusers%2Fu1%2Fbookings%3Fx%3D1",
+                b"/mock_vexere/users/u1%2F..%2F..%2Fbookings%2FVX10001/bookings",
+            ],
+        )
+
+    async def test_prefetch_validates_and_suggests_booking_ids(self):
+        tools.prefetch_user_bookings("u1")
+        owned = seeded_user_booking_ids("u1", BOOKINGS)
+
+        accepted = await tools.provide_booking_id_for_change(owned[0], user_id="u1")
+        self.assertEqual(accepted["status"], "booking_id_received")
+        self.assertEqual(self.requests, ["/mock_vexere/users/u1/bookings"])  # Served from the prefetch
+
+        unknown = await tools.provide_booking_id_for_change("VX99999", user_id="u1")
+        self.assertEqual(unknown["status"], "error")
+        self.assertEqual(unknown["suggested_booking_ids"], owned)
+        self.assertIn(owned[0], unknown["message"])
+
+        blocked = await tools.provide_booking_id_for_change(seeded_non_changeable_booking_id(0, BOOKINGS))
+        self.assertIn("not eligible", blocked["message"])
+
+    async def test_lookup_failures_do_not_block_the_flow(self):
+        with mock.patch.object(self.service, "error_rate", 1.0):
+            result = await tools.provide_booking_id_for_change("VX10001", user_id="u1")
+        self.assertEqual(result["status"], "booking_id_received")
+        self.assertNotIn("booking", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import channels, main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.channels import CHANNEL_MESSAGE_JOB, MessengerAdapter, ZaloAdapter
+from backend.app.job_queue import JobQueue
+from backend.app.session_store import InMemorySessionStore
+
+
+def sign(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class TestChannelAdapters(unittest.TestCase):
+    def test_messenger_signature_handshake_and_parsing(self):
+        adapter = MessengerAdapter(secret="app-secret", verify_token="vt")
+        payload = {
+            "object": "page",
+            "entry": [
+                {
+                    "messaging": [
+                        {"sender": {"id": "123"}, "message": {"mid": "m1", "text": "Xin chào"}},
+                        {"sender": {"id": "123"}, "message": {"mid": "m2", "text": "echo", "is_echo": True}},
+                        {"sender": {"id": "123"}, "delivery": {"mids": ["m0"]}},
+                    ]
+                }
+            ],
+        }
+        body = json.dumps(payload).encode()
+        self.assertTrue(adapter.verify({"x-hub-signature-256": "sha256=" + sign("app-secret", body)}, body))
+        self.assertFalse(adapter.verify({"x-hub-signature-256": "sha256=bad"}, body))
+        self.assertEqual(
+            adapter.handshake({"hub.mode": "subscribe", "hub.verify_token": "vt", "hub.challenge": "42"}), "42"
+        )
+        self.assertIsNone(adapter.handshake({"hub.mode": "subscribe", "hub.verify_token": "no"}))
+        self.assertEqual([(m.sender_id, m.message_id) for m in adapter.parse(payload)], [("123", "m1")])
+
+    def test_zalo_signature_covers_app_id_body_and_timestamp(self):
+        adapter = ZaloAdapter(secret="oa-secret", app_id="app")
+        body = json.dumps(
+            {
+                "event_name": "user_send_text",
+                "timestamp": "1700000000000",
+                "sender": {"id": "z1"},
+                "message": {"msg_id": "zm1", "text": "Đổi vé"},
+            }
+        ).encode()
+        mac = hashlib.sha256(b"app" + body + b"1700000000000oa-secret").hexdigest()
+        self.assertTrue(adapter.verify({"x-zevent-signature": "mac=" + mac}, body))
+        self.assertFalse(adapter.verify({"x-zevent-signature": "mac=" + mac}, body + b" "))
+        self.assertEqual(adapter.parse(json.loads(body))[0].text, "Đổi vé")
+
+    def test_replies_are_split_to_the_platform_limit(self):
+        adapter = MessengerAdapter()
+        self.assertEqual([len(piece) for piece in adapter.split("x" * 4500)], [2000, 2000, 500])
+        self.assertEqual(adapter.split(""), [""])
+
+
+class TestChannelReplyDelivery(unittest.IsolatedAsyncioTestCase):
+    async def test_a_failed_piece_is_retried_without_resending_earlier_ones(self):
+        adapter = MessengerAdapter(stub=False)
+        posted = []
+
+        class FlakyClient:
+            async def post(self, url, content, headers):
+                text = json.loads(content)["message"]["text"]
+                posted.append(text[0])
+                failing = text[0] == "b" and posted.count("b") == 1
+                return mock.Mock(status_code=503 if failing else 200, text="")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            queue = JobQueue(os.path.join(tmp_dir, "jobs.db"), retry_base_seconds=0)
+            try:
+                with mock.patch.object(
+                    channels, "get_channel_adapters", return_value={"messenger": adapter}
+                ), mock.patch.object(channels, "get_job_queue", return_value=queue), mock.patch.object(
+                    channels, "get_http_client", return_value=FlakyClient()
+                ):
+                    text = "a" * 2000 + "b" * 2000 + "c" * 10
+                    jobs = await channels.enqueue_reply("messenger", "123", text, "reply:u1", "reply:m1")
+                    again = await channels.enqueue_reply("messenger", "123", text, "reply:u1", "reply:m1")
+                    self.assertEqual([job["job_id"] for job in again], [job["job_id"] for job in jobs])
+
+                    statuses = []
+                    for _ in range(4):  # One piece runs at a time; the retry is due at once
+                        for job in await queue.claim(10):
+                            statuses.append(await queue.run_job(job))
+            finally:
+                await queue.close()
+        self.assertEqual(statuses, ["succeeded", "queued", "succeeded", "succeeded"])
+        self.assertEqual(posted, ["a", "b", "b", "c"])
+
+
+class TestChannelOrderingAcrossWorkers(unittest.IsolatedAsyncioTestCase):
+    async def test_one_message_per_user_runs_at_a_time(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "jobs.db")
+            worker_a, worker_b = JobQueue(path), JobQueue(path)  # Two processes sharing the file
+            try:
+                for index in range(2):
+                    await worker_a.enqueue(CHANNEL_MESSAGE_JOB, {"n": index}, ordering_key="web:u1")
+                await worker_a.enqueue(CHANNEL_MESSAGE_JOB, {"n": 0}, ordering_key="web:u2")
+
+                claimed = await worker_a.claim(1)
+                self.assertEqual(claimed[0]["payload"], {"n": 0})
+                others = await worker_b.claim(10)  # u1's second message waits for the first
+                self.assertEqual([job["ordering_key"] for job in others], ["web:u2"])
+                await asyncio.to_thread(worker_a._complete_sync, claimed[0], {})
+                self.assertEqual((await worker_b.claim(10))[0]["payload"], {"n": 1})
+            finally:
+                await worker_a.close()
+                await worker_b.close()
+
+
+class TestWebhookGateway(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        environment = {
+            "ACTIVE_LLM_PROVIDER": "FAKE",
+            "CHANNELS_ENABLED": "web,messenger",
+            "CHANNEL_DELIVERY": "stub",
+            "WEB_CHANNEL_SECRET": "web-secret",
+            "JOB_QUEUE_DB_PATH": os.path.join(self.tmp_dir.name, "jobs.db"),
+            "JOB_POLL_INTERVAL_SECONDS": "0.05",
+        }
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            manager = AIAgentsManager()
+        self.sessions = InMemorySessionStore()
+        patches = [
+            mock.patch.dict(os.environ, environment),
+            mock.patch.object(main, "get_ai_manager", return_value=manager),
+            mock.patch.object(main, "get_session_store", return_value=self.sessions),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def post_web(self, client, user_id, message_id, text, secret="web-secret"):
+        body = json.dumps({"user_id": user_id, "message_id": message_id, "text": text}).encode()
+        return client.post(
+            "/channels/web/webhook",
+            content=body,
+            headers={"Content-Type": "application/json", "X-Webhook-Signature": sign(secret, body)},
+        )
+
+    def test_messages_are_acknowledged_then_answered_in_order_per_user(self):
+        sent = [
+            ("u1", "m1", "Hello"),
+            ("u2", "m2", "Hello"),
+            ("u1", "m3", "How do I cancel my ticket?"),
+            ("u1", "m4", "Thanks!"),
+        ]
+        with TestClient(main.app) as client:
+            for user_id, message_id, text in sent:
+                response = self.post_web(client, user_id, message_id, text)
+                self.assertEqual(response.json(), {"status": "accepted", "messages": 1})
+            self.assertEqual(self.post_web(client, "u1", "m1", "Hello").status_code, 200)  # Redelivery
+            self.assertEqual(self.post_web(client, "u1", "m5", "Hi", secret="wrong").status_code, 401)
+            self.assertEqual(client.post("/channels/zalo/webhook", json={}).status_code, 404)
+
+            deadline = time.monotonic() + 15
+            outbox = main.get_channel_adapters()["web"].outbox
+            while len(outbox) < len(sent) and time.monotonic() < deadline:
+                time.sleep(0.05)
+            stats = client.get("/metrics").json()["channels"]
+
+        self.assertEqual(len(outbox), len(sent))
+        self.assertEqual([reply["recipient_id"] for reply in outbox].count("u1"), 3)
+        history = asyncio.run(self.sessions.load("web:u1")).history
+        self.assertEqual(
+            [message.text for message in history if message.role == "user"],
+            ["Hello", "How do I cancel my ticket?", "Thanks!"],
+        )
+        self.assertEqual(stats["duplicate_messages"], 1)
+        self.assertEqual(stats["webhooks_rejected"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
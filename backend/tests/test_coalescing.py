@@ -0,0 +1,125 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.coalescing import SingleFlight, normalize_prompt
+from backend.app.fake_agent import FakeLLMAgent
+from vertexai.generative_models import (
+    Content,
+    Part,
+)
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_identical_keys_share_one_call(self):
+        single_flight = SingleFlight(wait_window_s=5)
+        calls = 0
+
+        async def slow_call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"function_call": {"name": "get_faq_answer", "args": {"q": "x"}}}
+
+        results = await asyncio.gather(
+            *(single_flight.run("same", slow_call) for _ in range(10))
+        )
+        self.assertEqual(calls, 1)
+        self.assertEqual(single_flight.stats()["coalesced_requests"], 9)
+        results[1]["function_call"]["args"]["q"] = "mutated"
+        self.assertEqual(results[2]["function_call"]["args"]["q"], "x")
+
+    async def test_followers_stop_waiting_after_the_window(self):
+        single_flight = SingleFlight(wait_window_s=0.01)
+        calls = 0
+
+        async def slow_call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.1)
+            return {"text": "ok"}
+
+        await asyncio.gather(*(single_flight.run("same", slow_call) for _ in range(3)))
+        self.assertEqual(calls, 3)
+        self.assertEqual(single_flight.stats()["wait_timeouts"], 2)
+
+    async def test_followers_share_the_leaders_failure(self):
+        single_flight = SingleFlight(wait_window_s=5)
+        calls = 0
+
+        async def failing_call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            raise ConnectionError("provider overloaded")
+
+        results = await asyncio.gather(
+            *(single_flight.run("same", failing_call) for _ in range(5)), return_exceptions=True
+        )
+        self.assertEqual(calls, 1)  # No retry storm against the failing provider
+        self.assertTrue(all(isinstance(result, ConnectionError) for result in results))
+
+    async def test_one_follower_takes_over_from_a_cancelled_leader(self):
+        single_flight = SingleFlight(wait_window_s=5)
+        calls = 0
+
+        async def slow_call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"text": "ok", "usage": {"total_tokens": 10}}
+
+        leader = asyncio.create_task(single_flight.run("same", slow_call))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(single_flight.run("same", slow_call)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        self.assertEqual(calls, 2)
+        self.assertEqual(sum("usage" in result for result in results), 1)  # Only the new leader's
+
+    def test_normalize_prompt(self):
+        self.assertEqual(normalize_prompt("Hủy vé!"), normalize_prompt("  hủy   VÉ "))
+
+
+class TestManagerCoalescing(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        self.manager.active_agent = FakeLLMAgent(latency_ms=30)
+
+    async def test_first_turn_prompts_are_coalesced(self):
+        self.manager.shadow = mock.Mock()
+        responses = await asyncio.gather(
+            *(
+                self.manager.get_agent_response([], message)
+                for message in ["hủy vé", "Hủy vé!", "hủy vé", "HỦY VÉ"]
+            )
+        )
+        self.assertEqual(self.manager.active_agent.call_count, 1)
+        for response in responses:
+            self.assertEqual(response["function_call"]["name"], "get_faq_answer")
+        # The shared call's tokens are accounted once, to the leader
+        self.assertEqual([bool(response.get("usage")) for response in responses], [True, False, False, False])
+        self.assertEqual(self.manager.shadow.mirror.call_count, 1)
+
+    async def test_stateful_turns_are_never_coalesced(self):
+        history = [Content(role="user", parts=[Part.from_text("Hello")])]
+        await asyncio.gather(
+            *(self.manager.get_agent_response(list(history), "hủy vé") for _ in range(3))
+        )
+        self.assertEqual(self.manager.active_agent.call_count, 3)
+        self.assertEqual(self.manager.coalescing_stats()["skipped_stateful_requests"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import json
+import os
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app import tools
+from backend.app.datetime_parser import VIETNAM_TZ, parse_booking_time
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "datetime_corpus.jsonl")
+# The corpus' relative expressions are written for Saturday 2025-12-20, 10:00 in Vietnam.
+CORPUS_NOW = datetime(2025, 12, 20, 10, 0, tzinfo=VIETNAM_TZ)
+MIN_ACCURACY = 0.98
+
+
+def load_corpus():
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def parse_case(case):
+    """Parses a corpus phrase; cases with a `travel_day` are for a booking departing that day."""
+    travel_day = date.fromisoformat(case["travel_day"]) if "travel_day" in case else None
+    return parse_booking_time(case["text"], now=CORPUS_NOW, travel_day=travel_day)
+
+
+class TestDatetimeParserCorpus(unittest.TestCase):
+    def test_corpus_accuracy(self):
+        corpus = load_corpus()
+        failures = [
+            (case["text"], case["expected"], parse_case(case))
+            for case in corpus
+            if parse_case(case) != case["expected"]
+        ]
+        accuracy = 1 - len(failures) / len(corpus)
+        self.assertGreaterEqual(
+            accuracy,
+            MIN_ACCURACY,
+            "Mismatches (text, expected, got):\n" + "\n".join(map(str, failures)),
+        )
+
+    def test_uses_vietnam_time_for_relative_expressions(self):
+        # 20:00 UTC on the 19th is already 03:00 on the 20th in Vietnam.
+        now_utc = datetime.fromisoformat("2025-12-19T20:00:00+00:00")
+        self.assertEqual(parse_booking_time("tomorrow 9am", now=now_utc), "2025-12-21 09:00:00")
+
+
+class TestToolNormalization(unittest.IsolatedAsyncioTestCase):
+    async def test_confirm_normalizes_free_form_times(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"success": True, "message": "ok"}
+        response.raise_for_status.return_value = None
+        with mock.patch.object(
+            tools, "_post_booking_change", mock.AsyncMock(return_value=response)
+        ) as post, mock.patch.object(
+            tools, "parse_booking_time", lambda text, **kwargs: parse_booking_time(text, now=CORPUS_NOW, **kwargs)
+        ), mock.patch.object(
+            tools, "get_booking_details", mock.AsyncMock(return_value={"found": False})
+        ):
+            await tools.confirm_booking_time_change("VX10001", "8h sáng mai")
+            self.assertEqual(post.call_args.args[:2], ("VX10001", "2025-12-21 08:00:00"))
+            result = await tools.confirm_booking_time_change("VX10001", "whenever")
+        self.assertFalse(result["success"])
+        self.assertEqual(post.call_count, 1)
+
+    async def test_time_only_is_on_the_bookings_travel_day(self):
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"success": True, "message": "ok"}
+        response.raise_for_status.return_value = None
+        booking = {"booking_id": "VX10001", "departure_time": "2025-12-25 06:30:00"}
+        with mock.patch.object(
+            tools, "_post_booking_change", mock.AsyncMock(return_value=response)
+        ) as post, mock.patch.object(
+            tools, "get_booking_details", mock.AsyncMock(return_value={"found": True, "booking": booking})
+        ) as lookup:
+            await tools.confirm_booking_time_change("VX10001", "8h tối")
+            self.assertEqual(post.call_args.args[:2], ("VX10001", "2025-12-25 20:00:00"))
+            await tools.confirm_booking_time_change("VX10001", "2025-12-26 09:00:00")
+            self.assertEqual(post.call_args.args[:2], ("VX10001", "2025-12-26 09:00:00"))
+        lookup.assert_awaited_once_with("VX10001")  # Canonical times need no lookup
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import main, tools
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.circuit_breaker import CircuitBreaker
+from backend.app.degraded import LIMITED_MODE_NOTICE, answer_without_llm
+from backend.app.session_store import InMemorySessionStore
+from backend.app.vertex_agent import VertexAIAgent
+
+FAQ_QUESTION = "What payment methods can I use?"
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_on_error_rate_and_recovers_through_a_probe(self):
+        breaker = CircuitBreaker(window_size=10, min_calls=4, error_rate_threshold=0.5, open_seconds=0.05)
+        for succeeded in (True, False, True, False):
+            self.assertTrue(breaker.allow())
+            breaker.record(succeeded, 100)
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())  # The single half-open probe
+        self.assertFalse(breaker.allow())
+        breaker.record(True, 100)
+        self.assertEqual(breaker.state, "closed")
+        self.assertEqual(breaker.stats()["times_opened"], 1)
+
+    def test_opens_on_p95_latency_and_reopens_after_a_failed_probe(self):
+        breaker = CircuitBreaker(min_calls=3, p95_latency_ms_threshold=1000, open_seconds=0.05)
+        for latency_ms in (200, 3000, 4000):
+            breaker.record(True, latency_ms)
+        self.assertEqual(breaker.state, "open")
+        self.assertIn("p95", breaker.stats()["last_trip_reason"])
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        breaker.record(False, 100)
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.stats()["times_opened"], 2)
+
+
+class TestAnswerWithoutLlm(unittest.IsolatedAsyncioTestCase):
+    async def test_answers_faq_questions_from_retrieval(self):
+        text, state = await answer_without_llm("u1", FAQ_QUESTION, {}, "u1:0")
+        self.assertEqual(text, tools.get_faq_answer(FAQ_QUESTION)["answer"])
+        self.assertEqual(state, {})
+
+        text, _ = await answer_without_llm("u1", "qwerty", {}, "u1:0")
+        self.assertEqual(text, LIMITED_MODE_NOTICE)
+
+    async def test_scripted_change_booking_flow(self):
+        confirm = mock.AsyncMock(return_value={"success": True, "message": "Changed."})
+        with mock.patch.object(tools, "confirm_booking_time_change", confirm):
+            _, state = await answer_without_llm("u1", "I want to change my booking time", {}, "u1:0")
+            self.assertEqual(state["stage"], "awaiting_booking_id")
+
+            _, state = await answer_without_llm("u1", "it's vx10001", state, "u1:1")
+            self.assertEqual(state["collected_booking_id"], "VX10001")
+            self.assertEqual(state["stage"], "awaiting_new_time")
+
+            text, state = await answer_without_llm("u1", "31/12/2025 14:30", state, "u1:2")
+
+        confirm.assert_awaited_once_with("VX10001", "2025-12-31 14:30:00")
+        self.assertEqual(text, "Changed.")
+        self.assertEqual(state, {})
+
+
+class TestChatInDegradedMode(unittest.TestCase):
+    def chat(self, manager, message):
+        with mock.patch.object(main, "get_session_store") as get_store, mock.patch.object(
+            main, "get_ai_manager", return_value=manager
+        ):
+            get_store.return_value = InMemorySessionStore()
+            with TestClient(main.app) as client:
+                return client.post("/chat", json={"user_id": "degraded-user", "message": message}).json()
+
+    def make_manager(self) -> AIAgentsManager:
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            return AIAgentsManager()
+
+    def test_provider_errors_fall_back_to_faq_answers(self):
+        manager = self.make_manager()
+        failing = mock.AsyncMock(side_effect=RuntimeError("provider down"))
+        with mock.patch.object(manager.active_agent, "get_gemini_response", failing):
+            response = self.chat(manager, FAQ_QUESTION)
+        self.assertEqual(response["bot_response"], tools.get_faq_answer(FAQ_QUESTION)["answer"])
+        self.assertEqual(response["session_state"]["history_length"], 2)
+
+    def test_slow_provider_times_out_into_degraded_mode(self):
+        manager = self.make_manager()
+        manager.llm_timeout_s = 0.05
+
+        async def slow_response(*args, **kwargs):
+            await asyncio.sleep(1)
+            return {"text": "too late"}
+
+        with mock.patch.object(manager.active_agent, "get_gemini_response", slow_response):
+            response = self.chat(manager, FAQ_QUESTION)
+        self.assertEqual(response["bot_response"], tools.get_faq_answer(FAQ_QUESTION)["answer"])
+        self.assertEqual(manager.circuit_breaker.stats()["window_calls"], 1)
+
+
+class BlockingTransport:
+    """A provider whose SDK call blocks the calling thread."""
+
+    serves_offline = True
+
+    def generate_content(self, model, contents, tools, **options):
+        time.sleep(0.5)
+        raise AssertionError("should have timed out")
+
+
+class TestProviderFailureAccounting(unittest.IsolatedAsyncioTestCase):
+    def make_manager(self) -> AIAgentsManager:
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            return AIAgentsManager()
+
+    async def test_blocking_provider_calls_time_out_without_blocking_the_loop(self):
+        manager = self.make_manager()
+        manager.active_agent = VertexAIAgent(transport=BlockingTransport())
+        manager.llm_timeout_s = 0.1
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.02)
+
+        started = time.perf_counter()
+        response, _ = await asyncio.gather(manager.get_agent_response([], "hello"), ticker())
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertTrue(response["llm_unavailable"])
+        self.assertLess(max(b - a for a, b in zip(ticks, ticks[1:])), 0.2)
+        self.assertEqual(manager.circuit_breaker.stats()["window_error_rate"], 1.0)
+
+    async def test_local_errors_do_not_count_against_the_provider(self):
+        manager = self.make_manager()
+        local_error = mock.AsyncMock(return_value={"error": "Cannot send an empty message to the model."})
+        with mock.patch.object(manager.active_agent, "get_gemini_response", local_error):
+            response = await manager.get_agent_response([], "")
+        self.assertNotIn("llm_unavailable", response)
+        self.assertEqual(manager.circuit_breaker.stats()["window_calls"], 0)
+
+    async def test_cancelled_probe_frees_the_half_open_slot(self):
+        manager = self.make_manager()
+        manager.coalescing_enabled = False
+        breaker = manager.circuit_breaker
+        breaker.open_seconds = 0
+        breaker._open("test")
+
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(10)
+
+        with mock.patch.object(manager.active_agent, "get_gemini_response", hang):
+            probe = asyncio.create_task(manager.get_agent_response([], "hello"))
+            await asyncio.sleep(0.01)
+            self.assertEqual(breaker.state, "half_open")
+            probe.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await probe
+        self.assertTrue(breaker.allow())
+
+
+if __name__ == "__main__":
+    unittest.main()
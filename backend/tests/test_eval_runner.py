@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app import main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.session_store import InMemorySessionStore
+from backend.benchmarks import eval_runner
+
+CONVERSATIONS = [
+    {
+        "conversation_id": "faq-payment",
+        "tags": ["faq"],
+        "turns": [
+            {
+                "user": "What payment methods do you accept?",
+                "expected_tool": "get_faq_answer",
+                "expected_response_contains": "MoMo",
+            },
+            {"user": "Thanks!", "expected_tool": None},
+        ],
+    },
+    {
+        "conversation_id": "change-booking",
+        "tags": ["change_booking"],
+        "turns": [
+            {"user": "I want to change my booking time", "expected_tool": "initiate_change_booking_time_flow"},
+            {
+                "user": "My booking ID is VX123",
+                "expected_tool": "provide_booking_id_for_change",
+                "expected_args": {"booking_id": "vx123 "},
+            },
+            {
+                "user": "Please move it to 2025-12-31 14:30:00",
+                "expected_tool": "confirm_booking_time_change",
+                "expected_args": {"booking_id": "VX123", "new_time": "2025-12-31 14:30:00"},
+                "expected_response_contains": "successfully",
+            },
+        ],
+    },
+]
+
+
+class TestScoring(unittest.TestCase):
+    def test_score_turn(self):
+        turn = {"user": "x", "expected_tool": "get_faq_answer", "expected_args": {"question": "Refund?"}}
+        good = eval_runner.score_turn(turn, "ok", [{"name": "get_faq_answer", "args": {"question": " refund? "}}])
+        self.assertEqual(good, {"tool_name_correct": True, "tool_args_correct": True, "response_correct": None})
+
+        wrong_tool = eval_runner.score_turn(turn, "ok", [])
+        self.assertFalse(wrong_tool["tool_name_correct"])
+        self.assertFalse(wrong_tool["tool_args_correct"])
+
+        no_tool_expected = eval_runner.score_turn({"user": "hi", "expected_tool": None}, "hello", [])
+        self.assertTrue(no_tool_expected["tool_name_correct"])
+
+    def test_sample_dataset_loads(self):
+        conversations = eval_runner.load_dataset(eval_runner.DEFAULT_DATASET)
+        self.assertGreater(len(conversations), 0)
+
+
+class TestEvalRun(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.results_path = os.path.join(self.tmp_dir.name, "results.jsonl")
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        patches = [
+            mock.patch.object(main, "get_ai_manager", return_value=self.manager),
+            mock.patch.object(main, "get_session_store", return_value=InMemorySessionStore()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_eval(self, conversations, resume=False):
+        return asyncio.run(
+            eval_runner.run_eval(conversations, self.results_path, concurrency=2, resume=resume)
+        )
+
+    def test_traces_turns_and_scores_tool_calls(self):
+        report = self.run_eval(CONVERSATIONS)
+        overall = report["overall"]
+        self.assertEqual((overall["conversations"], overall["turns"], overall["errors"]), (2, 5, 0))
+        self.assertEqual(overall["tool_name_accuracy"], 1.0)
+        self.assertEqual(overall["tool_args_accuracy"], 1.0)
+        self.assertEqual(overall["response_accuracy"], 1.0)
+        self.assertEqual(overall["llm_calls"], 9)  # One call per turn, plus a follow-up per tool call
+        self.assertGreater(overall["usage"]["total_tokens"], 0)
+        self.assertEqual(set(report["tags"]), {"faq", "change_booking"})
+        self.assertEqual(report["failures"], [])
+
+    def test_resume_skips_completed_conversations(self):
+        self.run_eval(CONVERSATIONS[:1])
+        report = self.run_eval(CONVERSATIONS, resume=True)
+        self.assertEqual(report["run"]["executed_conversations"], 1)
+        self.assertEqual(report["run"]["skipped_conversations"], 1)
+        self.assertEqual(report["overall"]["conversations"], 2)
+        with open(self.results_path, "r", encoding="utf-8") as f:
+            ids = [json.loads(line)["conversation_id"] for line in f]
+        self.assertEqual(ids, ["faq-payment", "change-booking"])
+
+
+if __name__ == "__main__":
+    unittest.main()
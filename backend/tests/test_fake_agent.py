@@ -0,0 +1,95 @@
+import unittest
+from typing import List
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+import os
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app.fake_agent import FakeLLMAgent
+from vertexai.generative_models import (
+    Content,
+    Part,
+)  # Use these for constructing history
+
+
+class TestFakeLLMAgent(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.agent = FakeLLMAgent(latency_ms=0, jitter_ms=0)
+
+    async def test_faq_question_requests_faq_tool(self):
+        response = await self.agent.get_gemini_response([], "How do I cancel my ticket?")
+        self.assertEqual(response["function_call"]["name"], "get_faq_answer")
+        self.assertEqual(
+            response["function_call"]["args"], {"question": "How do I cancel my ticket?"}
+        )
+        self.assertTrue(response["raw_model_response_part"].function_call)
+
+    async def test_change_booking_flow(self):
+        history: List[Content] = []
+
+        async def turn(message: str, tool_result: dict) -> dict:
+            response = await self.agent.get_gemini_response(history, message)
+            history.append(Content(role="user", parts=[Part.from_text(message)]))
+            history.append(
+                Content(role="model", parts=[response["raw_model_response_part"]])
+            )
+            history.append(
+                Content(
+                    role="function",
+                    parts=[
+                        Part.from_function_response(
+                            name=response["function_call"]["name"],
+                            response={"content": tool_result},
+                        )
+                    ],
+                )
+            )
+            follow_up = await self.agent.get_gemini_response(
+                history, "Based on the tool's output, what should I say to the user?"
+            )
+            history.append(
+                Content(role="model", parts=[follow_up["raw_model_response_part"]])
+            )
+            return response
+
+        first = await turn("I want to change my booking time", {"status": "flow_initiated"})
+        self.assertEqual(first["function_call"]["name"], "initiate_change_booking_time_flow")
+
+        second = await turn(
+            "My booking ID is VX123", {"status": "booking_id_received", "booking_id": "VX123"}
+        )
+        self.assertEqual(second["function_call"]["name"], "provide_booking_id_for_change")
+        self.assertEqual(second["function_call"]["args"], {"booking_id": "VX123"})
+
+        third = await turn("Change it to 2025-12-31 14:30:00", {"success": True})
+        self.assertEqual(third["function_call"]["name"], "confirm_booking_time_change")
+        self.assertEqual(
+            third["function_call"]["args"],
+            {"booking_id": "VX123", "new_time": "2025-12-31 14:30:00"},
+        )
+
+    async def test_text_after_tool_result_uses_tool_output(self):
+        history = [
+            Content(role="user", parts=[Part.from_text("How do I cancel my ticket?")]),
+            Content(
+                role="function",
+                parts=[
+                    Part.from_function_response(
+                        name="get_faq_answer",
+                        response={"content": {"answer": "Go to 'My Bookings'."}},
+                    )
+                ],
+            ),
+        ]
+        response = await self.agent.get_gemini_response(
+            history, "Based on the tool's output, what should I say to the user?"
+        )
+        self.assertEqual(response["text"], "Go to 'My Bookings'.")
+
+
+if __name__ == "__main__":
+    unittest.main()
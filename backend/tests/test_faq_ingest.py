@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app import tools
+from backend.app.faq_index import FaqIndex
+from backend.app.faq_ingest import ingest, split_html_sections, split_long_text
+
+MARKDOWN = """# Refund policy
+
+## Refunds for cancelled trips
+
+If the operator cancels the trip, Vexere refunds the full fare to the original payment method within 7 days.
+
+## Pet policy
+
+Small pets in carriers are allowed on selected operators; check the operator rules before booking.
+"""
+
+HTML = """<html><head><style>body {}</style></head><body>
+<nav>Home | Help</nav>
+<h2>Luggage on sleeper buses</h2><p>Each passenger may bring <b>20 kg</b> of luggage.</p>
+<h2>Pet policy</h2><p>Small pets in carriers are allowed on selected operators; check the operator rules before booking.</p>
+</body></html>"""
+
+CSV = """id,title,body,keywords,answer_vi
+hc-1,Student discount,Students get 10% off with a valid student card.,student discount;giảm giá sinh viên,Sinh viên được giảm 10% khi có thẻ sinh viên.
+hc-2,Empty row,,,
+"""
+
+
+class TestFaqIngest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.sources = os.path.join(self.tmp_dir.name, "kb")
+        os.makedirs(self.sources)
+        for name, content in (("policies.md", MARKDOWN), ("luggage.html", HTML), ("export.csv", CSV)):
+            self.write(name, content)
+        self.index_path = os.path.join(self.tmp_dir.name, "faq_index.bin")
+
+    def write(self, name: str, content: str) -> None:
+        with open(os.path.join(self.sources, name), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def run_ingest(self):
+        return ingest([self.sources, tools.FAQ_DATA_PATH], self.index_path, workers=1)
+
+    def test_chunks_dedupes_and_searches(self):
+        stats = self.run_ingest()
+        self.assertEqual(stats["sources_processed"], 4)
+        self.assertEqual(stats["duplicate_chunks"], 1)  # The pet policy is on two pages
+        index = FaqIndex(self.index_path)
+        self.addCleanup(index.close)
+        self.assertEqual(len(index), 2 + 2 - 1 + 1 + 5)  # Markdown + HTML sections, CSV row, faq_data.json
+
+        student = index.search("Giảm giá sinh viên?")[0]
+        self.assertEqual(student["id"], "hc-1")  # Manual keywords
+        self.assertEqual(student["localized_answers"], {"vi": "Sinh viên được giảm 10% khi có thẻ sinh viên."})
+        self.assertIn("vi", index.search("I want to cancel ticket")[0]["localized_answers"])  # From faq_data.json
+        refund = index.search("When is my refund for a cancelled trip paid?")[0]
+        self.assertEqual(refund["question"], "Refunds for cancelled trips")  # Extracted keywords
+        self.assertEqual(index.search("I want to cancel ticket")[0]["id"], "faq1")
+        self.assertEqual(index.search("xyz"), [])
+
+    def test_only_changed_sources_are_processed_again(self):
+        self.run_ingest()
+        unchanged = self.run_ingest()
+        self.assertEqual((unchanged["sources_processed"], unchanged["index_written"]), (0, False))
+
+        self.write("export.csv", CSV + "hc-3,Night buses,Night buses leave after 21:00.,night bus,\n")
+        changed = self.run_ingest()
+        self.assertEqual((changed["sources_processed"], changed["sources_changed"]), (1, 1))
+        self.assertEqual(changed["chunks"], 10)
+
+        os.remove(os.path.join(self.sources, "luggage.html"))
+        removed = self.run_ingest()
+        self.assertEqual((removed["sources_removed"], removed["chunks"]), (1, 9))
+
+    def test_get_faq_answer_uses_the_index(self):
+        self.run_ingest()
+        with mock.patch.dict(os.environ, {"FAQ_INDEX_PATH": self.index_path}), mock.patch.object(
+            tools, "_faq_index", None
+        ):
+            self.assertTrue(tools.faq_available())
+            answer = tools.get_faq_answer("Luggage rules on sleeper buses?")
+            tools._faq_index.close()
+        self.assertEqual(answer, {"answer": "Each passenger may bring 20 kg of luggage."})
+
+    def test_a_reingest_is_picked_up_without_a_restart(self):
+        self.run_ingest()
+        with mock.patch.dict(os.environ, {"FAQ_INDEX_PATH": self.index_path}), mock.patch.object(
+            tools, "_faq_index", None
+        ):
+            self.assertEqual(tools.search_faq("When does the night bus leave?"), [])
+            first = tools.load_faq_index()
+            self.assertIs(tools.load_faq_index(), first)  # Unchanged file: no reopen
+
+            self.write("export.csv", CSV + "hc-3,Night buses,Night buses leave after 21:00.,night bus,\n")
+            self.run_ingest()
+            answer = tools.get_faq_answer("When does the night bus leave?")
+            self.assertIsNot(tools._faq_index, first)
+            first.close()
+            tools._faq_index.close()
+        self.assertEqual(answer, {"answer": "Night buses leave after 21:00."})
+
+    def test_parsing_helpers(self):
+        sections = split_html_sections(HTML)
+        self.assertEqual([heading for heading, _ in sections], ["Luggage on sleeper buses", "Pet policy"])
+        pieces = split_long_text("One. Two.\n\n" + "Three is long. " * 20, 100)
+        self.assertTrue(all(len(piece) <= 100 for piece in pieces))
+        self.assertTrue(pieces[0].startswith("One. Two.\n\nThree is long. Three is long."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+import httpx
+
+from backend.app import faults
+from backend.app.fake_agent import FakeLLMAgent
+from backend.app.faults import (
+    FaultInjectingAgent,
+    FaultInjectingSessionStore,
+    FaultInjectingTransport,
+    FaultInjector,
+    parse_fault_plan,
+)
+from backend.app.session_store import InMemorySessionStore
+
+
+class TestFaultInjector(unittest.TestCase):
+    def test_schedule_then_probabilities(self):
+        injector = FaultInjector("llm", schedule=["ok", "error_429"], repeat=False, faults={"error_5xx": 1.0})
+        self.assertEqual(
+            [injector.next_fault() for _ in range(4)], [None, "error_429", "error_5xx", "error_5xx"]
+        )
+        repeating = FaultInjector("llm", schedule=["ok", "timeout"])
+        self.assertEqual([repeating.next_fault() for _ in range(4)], [None, "timeout", None, "timeout"])
+
+    def test_same_seed_same_faults(self):
+        def draws(seed):
+            injector = FaultInjector("booking_http", faults={"error_5xx": 0.3, "timeout": 0.2}, seed=seed)
+            return [injector.next_fault() for _ in range(200)]
+
+        self.assertEqual(draws(7), draws(7))
+        self.assertNotEqual(draws(7), draws(8))
+        counts = {kind: draws(7).count(kind) for kind in ("error_5xx", "timeout", None)}
+        self.assertTrue(40 <= counts["error_5xx"] <= 80 and 20 <= counts["timeout"] <= 60)
+
+    def test_latency_distributions(self):
+        self.assertEqual(FaultInjector("llm").sample_latency_ms(), 0.0)
+        self.assertEqual(FaultInjector("llm", latency={"ms": 25}).sample_latency_ms(), 25.0)
+        uniform = FaultInjector("llm", latency={"distribution": "uniform", "low": 10, "high": 20})
+        self.assertTrue(all(10 <= uniform.sample_latency_ms() <= 20 for _ in range(100)))
+        lognormal = FaultInjector("llm", latency={"distribution": "lognormal", "median": 100, "sigma": 0.5})
+        samples = sorted(lognormal.sample_latency_ms() for _ in range(1001))
+        self.assertTrue(80 <= samples[500] <= 120)
+        exponential = FaultInjector("llm", latency={"distribution": "exponential", "mean": 50})
+        self.assertTrue(all(exponential.sample_latency_ms() >= 0 for _ in range(100)))
+
+    def test_invalid_plans_are_rejected(self):
+        for plan in (
+            {"redis": {}},
+            {"session_store": {"faults": {"malformed_json": 0.1}}},
+            {"llm": {"schedule": ["ok", "crash"]}},
+            {"llm": {"faults": {"timeout": 0.6, "error_5xx": 0.6}}},
+            {"llm": {"latency": {"distribution": "pareto"}}},
+            {"llm": {"latency": {"distribution": "lognormal", "median": 100}}},
+        ):
+            with self.subTest(plan=plan), self.assertRaises(ValueError):
+                parse_fault_plan(plan)
+        injectors = parse_fault_plan('{"llm": {"faults": {"error_429": 0.5}}}', seed=3)
+        self.assertEqual(list(injectors), ["llm"])
+        self.assertEqual(parse_fault_plan(""), {})
+
+    def test_unconfigured_components_are_not_wrapped(self):
+        agent, store = FakeLLMAgent(latency_ms=0), InMemorySessionStore()
+        with mock.patch.object(faults, "_fault_injectors", {}):
+            self.assertIs(faults.wrap_agent(agent), agent)
+            self.assertIs(faults.wrap_session_store(store), store)
+            self.assertIsNone(faults.booking_http_transport())
+
+
+class TestFaultInjectingWrappers(unittest.IsolatedAsyncioTestCase):
+    async def test_agent_faults_and_malformed_responses(self):
+        schedule = ["error_429", "error_5xx", "empty_candidates", "part_without_content", "ok"]
+        agent = FaultInjectingAgent(FakeLLMAgent(latency_ms=0), FaultInjector("llm", schedule=schedule))
+        results = [await agent.get_gemini_response([], "hello") for _ in schedule]
+
+        self.assertIn("429", results[0]["error"])
+        self.assertIn("503", results[1]["error"])
+        self.assertIn("encountered an issue", results[2]["text"])
+        self.assertIn("unusual response", results[3]["text"])
+        self.assertNotIn("error", results[4])
+        self.assertEqual(agent.injector.stats()["injected"]["empty_candidates"], 1)
+        self.assertEqual(agent.latency_ms, 0)  # Other attributes are the agent's
+
+    async def test_transport_faults(self):
+        inner = httpx.MockTransport(lambda request: httpx.Response(200, json={"success": True}))
+        injector = FaultInjector("booking_http", schedule=["error_429", "error_5xx", "malformed_json", "timeout", "ok"])
+        injector.timeout_ms = 0
+        async with httpx.AsyncClient(transport=FaultInjectingTransport(injector, inner)) as client:
+            self.assertEqual((await client.get("http://mock/")).status_code, 429)
+            self.assertEqual((await client.get("http://mock/")).status_code, 503)
+            with self.assertRaises(ValueError):
+                (await client.get("http://mock/")).json()
+            with self.assertRaises(httpx.ReadTimeout):
+                await client.get("http://mock/")
+            self.assertEqual((await client.get("http://mock/")).json(), {"success": True})
+
+    async def test_session_store_faults(self):
+        injector = FaultInjector("session_store", schedule=["ok", "timeout", "error_5xx", "ok"], timeout_ms=0)
+        store = FaultInjectingSessionStore(InMemorySessionStore(), injector)
+        self.assertEqual((await store.load("u1")).version, 0)
+        with self.assertRaises(TimeoutError):
+            await store.load("u1")
+        with self.assertRaises(ConnectionError):
+            await store.load("u1")
+        self.assertEqual((await store.load("u1")).version, 0)
+        self.assertEqual(injector.stats()["calls"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import os
+import unittest
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.http_io import (
+    BodySizeLimitMiddleware,
+    CompressionMiddleware,
+    FastJSONResponse,
+    FastJSONRoute,
+    choose_encoding,
+    dumps,
+    loads,
+)
+from backend.app.models import ChatMessageInput
+
+
+def build_app() -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.router.route_class = FastJSONRoute
+
+    @app.post("/echo")
+    async def echo(payload: ChatMessageInput):
+        return {"message": payload.message, "padding": "x" * 2000}
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    app.add_middleware(CompressionMiddleware, encodings=["br", "gzip"], minimum_size=500)
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=1000)
+    return app
+
+
+class TestHttpIO(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(build_app())
+
+    def test_json_helpers_match_the_json_module(self):
+        value = {"text": "Xin chào", "n": [1, 2.5, None, True], 3: "non-str key", "big": 2**70}
+        self.assertEqual(loads(dumps(value)), json.loads(json.dumps(value)))
+        self.assertEqual(dumps({"a": "é"}), b'{"a":"\xc3\xa9"}')
+
+    def test_gzip_is_negotiated_for_large_responses_only(self):
+        response = self.client.post(
+            "/echo",
+            json={"user_id": "u1", "message": "hi"},
+            headers={"Accept-Encoding": "gzip"},
+        )
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(response.json()["message"], "hi")  # httpx decodes gzip
+
+        small = self.client.get("/small", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("content-encoding", small.headers)
+        identity = self.client.post(
+            "/echo", json={"user_id": "u1", "message": "hi"}, headers={"Accept-Encoding": "identity"}
+        )
+        self.assertNotIn("content-encoding", identity.headers)
+
+    def test_choose_encoding_honours_q_values(self):
+        self.assertEqual(choose_encoding("gzip, br", ["br", "gzip"]), "br")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip", ["br", "gzip"]), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=0, *", ["gzip"]), None)
+        self.assertEqual(choose_encoding("*", ["gzip"]), "gzip")
+
+    def test_oversized_bodies_are_rejected(self):
+        body = dumps({"user_id": "u1", "message": "x" * 2000})
+        response = self.client.post("/echo", content=body, headers={"Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 413)
+
+        def chunks():  # No Content-Length: the cap applies while streaming
+            yield body[:600]
+            yield body[600:]
+
+        streamed = self.client.post("/echo", content=chunks(), headers={"Content-Type": "application/json"})
+        self.assertEqual(streamed.status_code, 413)
+
+    def test_invalid_json_is_a_validation_error(self):
+        response = self.client.post("/echo", content=b"{oops", headers={"Content-Type": "application/json"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(response.json()["detail"][0]["type"], "json_invalid")
+
+
+class TestChatValidationErrors(unittest.TestCase):
+    def test_errors_do_not_echo_the_request(self):
+        with TestClient(main.app) as client:
+            response = client.post("/chat", json={"user_id": "u1", "image_base64": "A" * 5000})
+        self.assertEqual(response.status_code, 422)
+        self.assertLess(len(response.content), 500)
+        self.assertEqual(response.json()["detail"][0]["loc"], ["body", "message"])
+
+
+if __name__ == "__main__":
+    unittest.main()
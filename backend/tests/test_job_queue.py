@@ -0,0 +1,184 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app import job_queue as job_queue_module
+from backend.app import main
+from backend.app.job_queue import JobQueue, JobWorker, RetriableJobError
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(
+            os.path.join(self.tmp_dir.name, "jobs.db"),
+            max_attempts=3,
+            retry_base_seconds=0.01,
+        )
+        self.handlers = mock.patch.dict(job_queue_module.JOB_HANDLERS, clear=True)
+        self.handlers.start()
+
+    async def asyncTearDown(self):
+        self.handlers.stop()
+        await self.queue.close()
+        self.tmp_dir.cleanup()
+
+    async def run_until_idle(self) -> None:
+        for _ in range(200):
+            jobs = await self.queue.claim(10)
+            if jobs:
+                await asyncio.gather(*(self.queue.run_job(job) for job in jobs))
+            elif not (await self.queue.stats())["jobs_by_status"].get("queued"):
+                return
+            else:
+                await asyncio.sleep(0.01)
+
+    async def test_enqueue_is_idempotent(self):
+        first = await self.queue.enqueue("noop", {"n": 1}, idempotency_key="same")
+        second = await self.queue.enqueue("noop", {"n": 2}, idempotency_key="same")
+        self.assertEqual(first["job_id"], second["job_id"])
+        self.assertEqual(second["payload"], {"n": 1})
+
+    async def test_transient_failures_are_retried_then_dead_lettered(self):
+        attempts = {"flaky": 0, "down": 0}
+
+        async def flaky(payload):
+            attempts[payload["name"]] += 1
+            if payload["name"] == "down" or attempts["flaky"] < 2:
+                raise RetriableJobError("upstream unavailable")
+            return {"success": True}
+
+        job_queue_module.register_job_handler("flaky", flaky)
+        flaky_job = await self.queue.enqueue("flaky", {"name": "flaky"}, user_id="u1")
+        down_job = await self.queue.enqueue("flaky", {"name": "down"}, user_id="u1")
+        await self.run_until_idle()
+
+        self.assertEqual((await self.queue.get(flaky_job["job_id"]))["status"], "succeeded")
+        self.assertEqual((await self.queue.get(down_job["job_id"]))["status"], "dead")
+        self.assertEqual(attempts, {"flaky": 2, "down": 3})
+        self.assertEqual((await self.queue.stats())["dead_letters"], 1)
+
+        finished = await self.queue.take_finished("u1")
+        self.assertEqual([job["status"] for job in finished], ["succeeded", "dead"])
+        self.assertEqual(await self.queue.take_finished("u1"), [])
+
+    async def test_jobs_with_the_same_ordering_key_run_in_order(self):
+        order = []
+
+        async def record(payload):
+            order.append(payload["n"])
+            await asyncio.sleep(0.01)
+            return {}
+
+        job_queue_module.register_job_handler("record", record)
+        for n in range(3):
+            await self.queue.enqueue("record", {"n": n}, ordering_key="booking:VX1")
+        await self.queue.enqueue("record", {"n": 99}, ordering_key="booking:VX2")
+
+        claimed = await self.queue.claim(10)
+        self.assertEqual(sorted(job["payload"]["n"] for job in claimed), [0, 99])
+        await asyncio.gather(*(self.queue.run_job(job) for job in claimed))
+        await self.run_until_idle()
+        self.assertEqual([n for n in order if n != 99], [0, 1, 2])
+
+    async def test_worker_runs_jobs_in_the_background(self):
+        done = asyncio.Event()
+
+        async def handler(payload):
+            done.set()
+            return {"ok": True}
+
+        job_queue_module.register_job_handler("background", handler)
+        worker = JobWorker(self.queue, concurrency=2, poll_interval_s=0.05)
+        worker.start()
+        try:
+            job = await self.queue.enqueue("background", {})
+            await asyncio.wait_for(done.wait(), timeout=5)
+            for _ in range(100):
+                if (await self.queue.get(job["job_id"]))["status"] == "succeeded":
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual((await self.queue.get(job["job_id"]))["status"], "succeeded")
+        finally:
+            await worker.stop()
+
+    async def test_worker_survives_claim_errors(self):
+        done = asyncio.Event()
+        claim = self.queue.claim
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        async def flaky_claim(limit):
+            if failures:
+                raise failures.pop()
+            return await claim(limit)
+
+        async def handler(payload):
+            done.set()
+            return {"ok": True}
+
+        job_queue_module.register_job_handler("background", handler)
+        worker = JobWorker(self.queue, poll_interval_s=0.01)
+        with mock.patch.object(self.queue, "claim", flaky_claim):
+            worker.start()
+            try:
+                await self.queue.enqueue("background", {})
+                await asyncio.wait_for(done.wait(), timeout=5)
+            finally:
+                await worker.stop()
+        self.assertEqual(failures, [])
+        self.assertEqual(worker.claim_errors, 0)
+
+    async def test_stop_waits_for_running_jobs(self):
+        started = asyncio.Event()
+
+        async def slow(payload):
+            started.set()
+            await asyncio.sleep(0.1)
+            return {"ok": True}
+
+        job_queue_module.register_job_handler("slow", slow)
+        worker = JobWorker(self.queue, poll_interval_s=0.01)
+        worker.start()
+        job = await self.queue.enqueue("slow", {})
+        await asyncio.wait_for(started.wait(), timeout=5)
+        await worker.stop()
+        self.assertEqual(worker.running, set())
+        self.assertEqual((await self.queue.get(job["job_id"]))["status"], "succeeded")
+
+    async def test_only_the_current_attempt_records_an_outcome(self):
+        job_queue_module.register_job_handler("noop", mock.AsyncMock(return_value={"n": 1}))
+        self.queue.lease_seconds = -1  # Every lease has already expired
+        await self.queue.enqueue("noop", {})
+        (stale,) = await self.queue.claim(1)
+        (current,) = await self.queue.claim(1)  # Re-claimed after the lease ended
+        self.assertEqual((stale["attempts"], current["attempts"]), (1, 2))
+
+        self.assertEqual(await self.queue.run_job(stale), "lease_lost")
+        self.assertEqual(
+            await asyncio.to_thread(self.queue._fail_sync, stale, "late", False), "lease_lost"
+        )
+        self.assertEqual((await self.queue.get(current["job_id"]))["status"], "running")
+        self.assertEqual((await self.queue.stats())["dead_letters"], 0)
+        self.assertEqual(await self.queue.run_job(current), "succeeded")
+
+
+class TestFinishedJobNotices(unittest.TestCase):
+    def test_describe_finished_job(self):
+        succeeded = {"status": "succeeded", "result": {"message": "Changed."}, "payload": {}}
+        dead = {"status": "dead", "result": None, "payload": {"booking_id": "VX1"}}
+        self.assertEqual(main.describe_finished_job(succeeded), "Changed.")
+        self.assertIn("VX1", main.describe_finished_job(dead))
+
+
+if __name__ == "__main__":
+    unittest.main()
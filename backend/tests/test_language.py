@@ -0,0 +1,78 @@
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import main, tools
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.degraded import answer_without_llm
+from backend.app.language import detect_language, localization_report
+from backend.app.session_store import InMemorySessionStore
+
+CANCEL_ANSWER_VI = tools.load_faq_data()[0]["localized_answers"]["vi"]
+
+
+class TestDetectLanguage(unittest.TestCase):
+    def test_vietnamese_with_and_without_diacritics(self):
+        for message in ("Hủy vé thế nào?", "đổi giờ vé", "toi muon doi gio ve", "xin chào"):
+            self.assertEqual(detect_language(message), "vi", message)
+        for message in ("How do I cancel my ticket?", "Can I bring luggage", "VX12345", ""):
+            self.assertEqual(detect_language(message), "en", message)
+        self.assertEqual(detect_language("I want to đổi giờ vé"), "vi")  # Mixed: more Vietnamese words
+
+    def test_direct_faq_answer_needs_an_unambiguous_hit(self):
+        self.assertEqual(tools.direct_faq_answer("Làm sao để hủy vé?", "vi"), CANCEL_ANSWER_VI)
+        self.assertEqual(
+            tools.direct_faq_answer("How do I cancel ticket?", "en"), tools.load_faq_data()[0]["answer"]
+        )
+        self.assertIsNone(tools.direct_faq_answer("cancel ticket or luggage?", "en"))  # Tie
+        self.assertIsNone(tools.direct_faq_answer("What is the weather?", "vi"))
+        self.assertIsNone(tools.direct_faq_answer("hủy vé", "fr"))  # No curated answer
+
+
+class TestLocalizedFaqTurns(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        patches = [
+            mock.patch.dict(os.environ, {"FAQ_DIRECT_ANSWERS": "true"}),
+            mock.patch.object(main, "get_ai_manager", return_value=self.manager),
+            mock.patch.object(main, "get_session_store", return_value=InMemorySessionStore()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_curated_answer_skips_the_follow_up_call(self):
+        before = localization_report()
+        with TestClient(main.app) as client:
+            reply = client.post("/chat", json={"user_id": "vi-user", "message": "Làm sao để hủy vé?"})
+            self.assertEqual(reply.json()["bot_response"], CANCEL_ANSWER_VI)
+            self.assertEqual(self.manager.active_agent.call_count, 1)
+
+            with mock.patch.dict(os.environ, {"FAQ_DIRECT_ANSWERS": "false"}):
+                client.post("/chat", json={"user_id": "en-user", "message": "How do I cancel my ticket?"})
+            self.assertEqual(self.manager.active_agent.call_count, 3)  # Tool call + follow-up
+        after = localization_report()
+        self.assertEqual(after["turns_by_language"]["vi"] - before["turns_by_language"]["vi"], 1)
+        self.assertEqual(after["faq_tool_turns"] - before["faq_tool_turns"], 2)
+        self.assertEqual(after["direct_faq_answers_by_language"]["vi"] - before["direct_faq_answers_by_language"]["vi"], 1)
+        self.assertGreater(after["served_without_translation_rate"], 0)
+
+
+class TestDegradedLocalizedAnswers(unittest.IsolatedAsyncioTestCase):
+    async def test_degraded_mode_answers_in_the_users_language(self):
+        text, _ = await answer_without_llm("u1", "hủy vé", {}, "u1:0", language="vi")
+        self.assertEqual(text, CANCEL_ANSWER_VI)
+
+
+if __name__ == "__main__":
+    unittest.main()
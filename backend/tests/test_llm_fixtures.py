@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app.llm_fixtures import (
+    FixtureMismatchError,
+    RecordReplayTransport,
+    fixture_key,
+)
+from backend.app.vertex_agent import VertexAIAgent, vexere_tool_config
+from vertexai.generative_models import (
+    Content,
+    GenerationResponse,
+    Part,
+)
+
+FAQ_CALL_RESPONSE = {
+    "candidates": [
+        {
+            "content": {
+                "role": "model",
+                "parts": [
+                    {
+                        "function_call": {
+                            "name": "get_faq_answer",
+                            "args": {"question": "How do I cancel my ticket?"},
+                        }
+                    }
+                ],
+            },
+            "finish_reason": "STOP",
+        }
+    ]
+}
+
+
+class StubLiveTransport:
+    """Pretends to be the live model and counts the calls it receives."""
+
+    serves_offline = False
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, model, contents, tools):
+        self.calls += 1
+        return GenerationResponse.from_dict(FAQ_CALL_RESPONSE)
+
+
+def user_turn(text):
+    return [Content(role="user", parts=[Part.from_text(text)])]
+
+
+class TestRecordReplayTransport(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "fixtures.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_key_ignores_cosmetic_whitespace(self):
+        tools = [vexere_tool_config]
+        self.assertEqual(
+            fixture_key(user_turn("How do I  cancel my ticket?"), tools),
+            fixture_key(user_turn("How do I cancel my ticket? "), tools),
+        )
+        self.assertNotEqual(
+            fixture_key(user_turn("How do I cancel my ticket?"), tools),
+            fixture_key(user_turn("How do I change my ticket?"), tools),
+        )
+
+    def test_record_then_replay(self):
+        live = StubLiveTransport()
+        recorder = RecordReplayTransport("record", self.path, inner=live)
+        contents = user_turn("How do I cancel my ticket?")
+        recorder.generate_content(None, contents, [vexere_tool_config])
+        recorder.generate_content(None, contents, [vexere_tool_config])
+        self.assertEqual(live.calls, 1, "Existing recordings should be reused.")
+
+        replayer = RecordReplayTransport("replay", self.path)
+        response = replayer.generate_content(None, contents, [vexere_tool_config])
+        self.assertEqual(
+            response.candidates[0].content.parts[0].function_call.name,
+            "get_faq_answer",
+        )
+        self.assertEqual(replayer.stats()["hits"], 1)
+
+    def test_replay_mismatch_is_reported(self):
+        RecordReplayTransport("record", self.path, inner=StubLiveTransport()).generate_content(
+            None, user_turn("How do I cancel my ticket?"), [vexere_tool_config]
+        )
+        replayer = RecordReplayTransport("replay", self.path)
+        history = user_turn("Hello") + user_turn("How do I cancel my ticket?")
+        with self.assertRaises(FixtureMismatchError) as context:
+            replayer.generate_content(None, history, [vexere_tool_config])
+        message = str(context.exception)
+        self.assertIn("How do I cancel my ticket?", message)
+        self.assertIn("different history/tools", message)
+
+    async def test_agent_serves_replayed_responses_without_a_model(self):
+        RecordReplayTransport("record", self.path, inner=StubLiveTransport()).generate_content(
+            None, user_turn("How do I cancel my ticket?"), [vexere_tool_config]
+        )
+        agent = VertexAIAgent(transport=RecordReplayTransport("replay", self.path))
+        agent.model = None  # No credentials are needed in replay mode
+        self.assertTrue(agent.is_ready())
+        response = await agent.get_gemini_response([], "How do I cancel my ticket?")
+        self.assertEqual(response["function_call"]["name"], "get_faq_answer")
+
+
+if __name__ == "__main__":
+    unittest.main()
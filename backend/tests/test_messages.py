@@ -0,0 +1,65 @@
+import os
+import unittest
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from vertexai.generative_models import Content, Part
+
+from backend.app.messages import Message, as_message, to_content
+from backend.app.session_store import deserialize_history, serialize_history
+
+CONTENTS = [
+    Content(role="user", parts=[Part.from_text("Tôi muốn đổi giờ vé")]),
+    Content(
+        role="model",
+        parts=[Part.from_dict({"function_call": {"name": "provide_booking_id_for_change", "args": {"booking_id": "VX123"}}})],
+    ),
+    Content(
+        role="function",
+        parts=[Part.from_function_response(name="provide_booking_id_for_change", response={"content": {"status": "ok"}})],
+    ),
+    Content(role="model", parts=[Part.from_text("Done.")]),
+    Content(role="user", parts=[Part.from_text("a"), Part.from_text("b")]),  # Kept as raw parts
+]
+
+
+class TestMessages(unittest.TestCase):
+    def test_round_trips_content_layout(self):
+        for content in CONTENTS:
+            message = as_message(content)
+            self.assertEqual(message.to_dict(), content.to_dict())
+            self.assertEqual(to_content(message).to_dict(), content.to_dict())
+
+    def test_compact_forms(self):
+        call = as_message(CONTENTS[1])
+        self.assertTrue(call.is_function_call)
+        self.assertEqual((call.name, call.data()), ("provide_booking_id_for_change", {"booking_id": "VX123"}))
+        response = as_message(CONTENTS[2])
+        self.assertTrue(response.is_function_response)
+        self.assertEqual(response.data(), {"content": {"status": "ok"}})
+        self.assertEqual(as_message(CONTENTS[0]), Message.user_text("Tôi muốn đổi giờ vé"))
+        raw = as_message(CONTENTS[4])
+        self.assertIsNone(raw.text)
+        self.assertIsNone(raw.name)
+
+    def test_content_conversion_is_cached_per_message(self):
+        message = Message.model_text("cached")
+        self.assertIs(to_content(message), to_content(Message.model_text("cached")))
+        self.assertIs(to_content(CONTENTS[0]), CONTENTS[0])
+
+    def test_serialized_sessions_keep_the_content_layout(self):
+        data = serialize_history(CONTENTS)
+        self.assertEqual(data, serialize_history([as_message(content) for content in CONTENTS]))
+        self.assertEqual(
+            [message.to_dict() for message in deserialize_history(data)],
+            [content.to_dict() for content in CONTENTS],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
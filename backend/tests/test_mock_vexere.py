@@ -0,0 +1,132 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.mock_vexere import (
+    SEED_ROUTES,
+    MockVexereService,
+    seeded_change_request,
+    seeded_non_changeable_booking_id,
+)
+from backend.app.models import ChangeBookingTimePayload
+
+BOOKINGS, DAYS = 40, 2
+
+
+class TestStatefulMockVexere(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.service = MockVexereService(
+            mode="stateful", bookings=BOOKINGS, days=DAYS, seat_capacity=6
+        )
+
+    async def asyncTearDown(self):
+        await self.service.close()
+
+    async def change(self, booking_id: str, new_time: str, **extra) -> dict:
+        payload = ChangeBookingTimePayload(booking_id=booking_id, new_time=new_time, **extra)
+        return (await self.service.change_booking(payload)).model_dump()
+
+    async def available(self, route: str) -> dict:
+        return {
+            trip["trip_id"]: trip["seats_available"] for trip in await self.service.trips(route)
+        }
+
+    async def test_change_moves_seats_and_bumps_the_version(self):
+        booking_id, new_time = seeded_change_request(3, BOOKINGS, DAYS)
+        before = await self.service.get_booking(booking_id)
+        available_before = await self.available(before["route"])
+        result = await self.change(booking_id, new_time)
+        self.assertTrue(result["success"], result)
+        after = await self.service.get_booking(booking_id)
+        available_after = await self.available(before["route"])
+        self.assertEqual(after["departure_time"], new_time)
+        self.assertEqual(after["version"], before["version"] + 1)
+        seats = before["seats"]
+        self.assertEqual(
+            available_after[before["trip_id"]], available_before[before["trip_id"]] + seats
+        )
+        self.assertEqual(
+            available_after[after["trip_id"]], available_before[after["trip_id"]] - seats
+        )
+
+    async def test_rejections(self):
+        booking_id, new_time = seeded_change_request(5, BOOKINGS, DAYS)
+        cases = {
+            "BOOKING_NOT_FOUND": ("VX999999", new_time),
+            "NOT_CHANGEABLE": (seeded_non_changeable_booking_id(5, BOOKINGS), new_time),
+            "NO_SUCH_TRIP": (booking_id, "2025-12-25 07:00:00"),
+        }
+        available_before = [await self.available(route) for route in SEED_ROUTES]
+        for code, (target_id, target_time) in cases.items():
+            result = await self.change(target_id, target_time)
+            self.assertFalse(result["success"])
+            self.assertEqual(result["data"]["error_code"], code)
+        # Rejected changes leave every departure's seats as they were
+        self.assertEqual([await self.available(route) for route in SEED_ROUTES], available_before)
+
+    async def test_concurrent_changes_cannot_oversell_a_departure(self):
+        # Every 4th seeded booking is on the same route; move them all to its first departure.
+        route_bookings = [index for index in range(BOOKINGS) if index % 4 == 0]
+        requests = [
+            seeded_change_request(index, BOOKINGS, DAYS, to_first_departure=True)
+            for index in route_bookings
+        ]
+        results = await asyncio.gather(*(self.change(*request) for request in requests))
+        target_trip = (await self.service.get_booking(requests[0][0]))["trip_id"]
+        route = target_trip.split("@")[0]
+        trip = next(t for t in await self.service.trips(route) if t["trip_id"] == target_trip)
+        self.assertGreaterEqual(trip["seats_available"], 0)
+        sold_out = [r for r in results if not r["success"]]
+        self.assertTrue(sold_out)
+        self.assertTrue(all(r["data"]["error_code"] == "SOLD_OUT" for r in sold_out))
+
+    async def test_expected_version_rejects_a_stale_change(self):
+        booking_id, new_time = seeded_change_request(7, BOOKINGS, DAYS)
+        first = await self.change(booking_id, new_time, expected_version=1)
+        self.assertTrue(first["success"])
+        stale = await self.change(booking_id, new_time, expected_version=1)
+        self.assertEqual(stale["data"]["error_code"], "VERSION_CONFLICT")
+
+    async def test_idempotency_key_replays_the_first_response(self):
+        booking_id, new_time = seeded_change_request(9, BOOKINGS, DAYS)
+        first = await self.change(booking_id, new_time, idempotency_key="k1")
+        replay = await self.change(booking_id, new_time, idempotency_key="k1")
+        self.assertEqual(first, replay)
+        self.assertEqual((await self.service.get_booking(booking_id))["version"], 2)
+        reused = await self.change(booking_id, "2025-12-25 06:30:00", idempotency_key="k1")
+        self.assertEqual(reused["data"]["error_code"], "IDEMPOTENCY_KEY_REUSED")
+
+
+class TestMockVexereEndpoints(unittest.TestCase):
+    def test_injected_errors_and_stateless_mode(self):
+        failing = MockVexereService(error_rate=1.0)
+        stateless = MockVexereService()
+        payload = {"booking_id": "VX123", "new_time": "2025-12-31 14:30:00"}
+        with TestClient(main.app) as client:
+            with mock.patch.object(main, "get_mock_vexere_service", return_value=failing):
+                self.assertEqual(
+                    client.post("/mock_vexere/change_booking", json=payload).status_code, 503
+                )
+            with mock.patch.object(main, "get_mock_vexere_service", return_value=stateless):
+                self.assertTrue(
+                    client.post("/mock_vexere/change_booking", json=payload).json()["success"]
+                )
+                # Any well-formed id exists; "FAIL" ids cannot be changed
+                self.assertTrue(client.get("/mock_vexere/bookings/VX123").json()["changeable"])
+                self.assertFalse(client.get("/mock_vexere/bookings/VXFAIL1").json()["changeable"])
+                self.assertEqual(client.get("/mock_vexere/bookings/hello").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import pstats
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.app import main
+from backend.app.profiling import MemoryDiagnostics, ProfilingMiddleware, list_profiles
+
+
+def slow_work() -> int:
+    time.sleep(0.05)  # Blocks the event loop, so the sampler sees this frame
+    return 1
+
+
+def build_app(output_dir: str, profiler: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        return {"result": slow_work()}
+
+    app.add_middleware(ProfilingMiddleware, output_dir=output_dir, profiler=profiler, interval_ms=1.0)
+    return app
+
+
+class TestProfilingMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_only_requested_profiles_are_written_as_folded_stacks(self):
+        client = TestClient(build_app(self.tmp_dir.name, "sampling"))
+        self.assertNotIn("x-profile-id", client.get("/work").headers)
+        self.assertEqual(list_profiles(self.tmp_dir.name), [])
+
+        response = client.get("/work", headers={"X-Profile": "1"})
+        name = response.headers["x-profile-id"]
+        self.assertEqual(list_profiles(self.tmp_dir.name), [name])
+        with open(os.path.join(self.tmp_dir.name, name), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertIn("slow_work (test_profiling.py:", stack)
+        self.assertGreater(int(count), 5)
+
+    def test_cprofile_output_and_admin_key(self):
+        client = TestClient(build_app(self.tmp_dir.name, "cprofile"))
+        with mock.patch.dict(os.environ, {"ADMIN_API_KEY": "secret"}):
+            self.assertNotIn("x-profile-id", client.get("/work", headers={"X-Profile": "1"}).headers)
+            response = client.get("/work", headers={"X-Profile": "1", "X-Admin-Key": "secret"})
+        stats = pstats.Stats(os.path.join(self.tmp_dir.name, response.headers["x-profile-id"]))
+        self.assertTrue(any(function == "slow_work" for _, _, function in stats.stats))
+
+
+class TestMemoryDiagnostics(unittest.TestCase):
+    def test_diff_shows_growth_between_snapshots(self):
+        diagnostics = MemoryDiagnostics()
+        diagnostics.start()
+        self.addCleanup(diagnostics.stop)
+        before = diagnostics.take_snapshot()
+        retained = [bytearray(1000) for _ in range(200)]
+        after = diagnostics.take_snapshot()
+
+        diff = diagnostics.diff(before, after, path_filter="test_profiling")
+        self.assertGreater(diff[0]["size_diff_bytes"], 200 * 1000)
+        self.assertIn("test_profiling.py", diff[0]["location"])
+        self.assertEqual(len(retained), 200)
+        with self.assertRaises(KeyError):
+            diagnostics.diff(before, 99)
+
+    def test_admin_endpoints(self):
+        with mock.patch.dict(os.environ, {"ADMIN_API_KEY": "secret"}):
+            client = TestClient(main.app)
+            headers = {"X-Admin-Key": "secret"}
+            self.assertEqual(client.post("/debug/tracemalloc/start").status_code, 401)
+            self.assertTrue(client.post("/debug/tracemalloc/start", headers=headers).json()["tracing"])
+            try:
+                first = client.post("/debug/tracemalloc/snapshot", headers=headers).json()
+                second = client.post("/debug/tracemalloc/snapshot", headers=headers).json()
+                diff = client.get(
+                    "/debug/tracemalloc/diff",
+                    params={"before": first["snapshot_id"], "after": second["snapshot_id"]},
+                    headers=headers,
+                )
+                self.assertEqual(diff.status_code, 200)
+                self.assertIn("diff", diff.json())
+            finally:
+                self.assertFalse(client.post("/debug/tracemalloc/stop", headers=headers).json()["tracing"])
+            self.assertEqual(client.get("/debug/profiles/missing.prof", headers=headers).status_code, 404)
+            bad_key_type = client.post(
+                "/debug/tracemalloc/snapshot", params={"key_type": "bogus"}, headers=headers
+            )
+            self.assertEqual(bad_key_type.status_code, 400)
+
+    def test_admin_endpoints_are_off_without_a_key(self):
+        with mock.patch.dict(os.environ, {"ADMIN_API_KEY": ""}):
+            client = TestClient(main.app)
+            for method, path in (
+                ("post", "/debug/tracemalloc/start"),
+                ("get", "/debug/profiles"),
+                ("get", "/usage"),
+                ("get", "/prompts"),
+            ):
+                self.assertEqual(getattr(client, method)(path).status_code, 403, path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import os
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.prompts import (
+    DEFAULT_FOLLOW_UP_PROMPT,
+    PromptRegistry,
+    PromptVariant,
+    parse_variants,
+)
+from backend.app.session_store import InMemorySessionStore
+
+CONCISE = {
+    "version": "2",
+    "weight": 1,
+    "system_instruction": "Answer in one short sentence.",
+    "follow_up_prompt": "Reply briefly using the tool result.",
+    "generation_configs": {"follow_up": {"temperature": 0.2, "max_output_tokens": 8}},
+}
+
+
+class TestPromptRegistry(unittest.TestCase):
+    def test_assignment_is_deterministic_and_follows_weights(self):
+        registry = PromptRegistry(
+            [PromptVariant("baseline", weight=3), PromptVariant("concise", weight=1)], salt="exp-1"
+        )
+        users = [f"user-{i}" for i in range(4000)]
+        assigned = [registry.assign(user).name for user in users]
+        self.assertEqual(assigned, [registry.assign(user).name for user in users])
+        self.assertAlmostEqual(assigned.count("concise") / len(users), 0.25, delta=0.03)
+
+        reshuffled = PromptRegistry(registry.variants, salt="exp-2")
+        self.assertNotEqual(assigned, [reshuffled.assign(user).name for user in users])
+        paused = PromptRegistry([PromptVariant("baseline"), PromptVariant("concise", weight=0)])
+        self.assertEqual({paused.assign(user).name for user in users[:200]}, {"baseline"})
+
+    def test_parse_variants_validates_definitions(self):
+        self.assertEqual([variant.label for variant in parse_variants({})], ["baseline@1"])
+        variants = parse_variants('{"baseline": {}, "concise": {"version": "2"}}')
+        self.assertEqual([variant.label for variant in variants], ["baseline@1", "concise@2"])
+        self.assertEqual(variants[0].follow_up_prompt, DEFAULT_FOLLOW_UP_PROMPT)
+        with self.assertRaises(ValueError):
+            parse_variants({"bad": {"generation_configs": {"initial": {"max_tokens": 10}}}})
+        with self.assertRaises(ValueError):
+            PromptRegistry([PromptVariant("baseline", weight=0)])
+
+    def test_report_compares_variants_with_the_control(self):
+        registry = PromptRegistry([PromptVariant("baseline"), PromptVariant("concise")])
+        outcome = dict(llm_calls=2, tool_called=True, degraded=False, error=False, llm_latency_ms=90.0)
+        registry.record_turn(registry.variants[0], latency_ms=100.0, output_tokens=40, **outcome)
+        registry.record_turn(registry.variants[1], latency_ms=80.0, output_tokens=10, **outcome)
+        report = registry.report()
+        self.assertEqual(report["control"], "baseline@1")
+        concise = report["variants"][1]
+        self.assertEqual((concise["turns"], concise["tool_call_rate"]), (1, 1.0))
+        self.assertAlmostEqual(concise["mean_latency_ms_vs_control"], -0.2)
+        self.assertAlmostEqual(concise["mean_output_tokens_vs_control"], -0.75)
+
+
+class TestChatPromptVariants(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        self.registry = PromptRegistry(parse_variants({"concise": CONCISE}))
+        patches = [
+            mock.patch.object(main, "get_ai_manager", return_value=self.manager),
+            mock.patch.object(main, "get_session_store", return_value=InMemorySessionStore()),
+            mock.patch.object(main, "get_prompt_registry", return_value=self.registry),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_variant_prompts_reach_the_agent_and_turns_are_recorded(self):
+        agent = self.manager.active_agent
+        calls = []
+        original = agent.get_gemini_response
+
+        async def spy(*args, **kwargs):
+            calls.append(kwargs)
+            return await original(*args, **kwargs)
+
+        with mock.patch.object(agent, "get_gemini_response", side_effect=spy):
+            with TestClient(main.app) as client:
+                reply = client.post("/chat", json={"user_id": "u1", "message": "How do I cancel my ticket?"})
+                with mock.patch.dict(os.environ, {"ADMIN_API_KEY": "secret"}):
+                    self.assertEqual(client.get("/prompts").status_code, 401)
+                    report = client.get("/prompts", headers={"X-Admin-Key": "secret"}).json()
+
+        self.assertEqual(len(calls), 2)  # get_faq_answer, then the follow-up
+        self.assertEqual(calls[0]["system_instruction"], CONCISE["system_instruction"])
+        self.assertNotIn("generation_config", calls[0])  # No settings for the "initial" route
+        self.assertEqual(calls[1]["user_message"], CONCISE["follow_up_prompt"])
+        self.assertEqual(calls[1]["generation_config"]["max_output_tokens"], 8)
+        self.assertEqual(len(reply.json()["bot_response"]), 32)  # Truncated to ~8 tokens
+
+        self.assertEqual(report["definitions"][0]["name"], "concise")
+        concise = report["variants"][0]
+        self.assertEqual((concise["variant"], concise["turns"]), ("concise@2", 1))
+        self.assertEqual((concise["tool_call_rate"], concise["mean_llm_calls"]), (1.0, 2.0))
+        self.assertGreater(concise["mean_output_tokens"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,213 @@
+import os
+import socket
+import subprocess
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+from fastapi.testclient import TestClient
+
+from backend.app import main, tools
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.messages import Message
+from backend.app.session_store import (
+    InMemorySessionStore,
+    SessionConflictError,
+    SessionRecord,
+    SQLiteSessionStore,
+)
+from vertexai.generative_models import (
+    Content,
+    Part,
+)
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestSQLiteSessionStore(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "sessions.db")
+        self.store = SQLiteSessionStore(self.path)
+
+    async def asyncTearDown(self):
+        await self.store.close()
+        self.tmp_dir.cleanup()
+
+    async def test_history_round_trip_across_store_instances(self):
+        record = SessionRecord(
+            history=[
+                Message.user_text("đổi giờ vé"),
+                Message.function_call("initiate_change_booking_time_flow", {}),
+                # Entries from older callers are still accepted as Content
+                Content(role="model", parts=[Part.from_text("Your booking ID?")]),
+            ],
+            tool_state={"flow_name": "change_booking"},
+        )
+        await self.store.save("user-1", record)
+
+        other_worker_store = SQLiteSessionStore(self.path)
+        loaded = await other_worker_store.load("user-1")
+        await other_worker_store.close()
+        self.assertEqual(loaded.version, 1)
+        self.assertEqual(loaded.tool_state, {"flow_name": "change_booking"})
+        self.assertEqual(loaded.history[0], Message.user_text("đổi giờ vé"))
+        self.assertEqual(loaded.history[1].name, "initiate_change_booking_time_flow")
+        self.assertEqual(loaded.history[1].data(), {})
+        self.assertEqual(loaded.history[2], Message.model_text("Your booking ID?"))
+
+    async def test_stale_write_is_rejected(self):
+        await self.store.save("user-1", SessionRecord())
+        first = await self.store.load("user-1")
+        second = await self.store.load("user-1")
+        await self.store.save("user-1", first)
+        with self.assertRaises(SessionConflictError):
+            await self.store.save("user-1", second)
+        self.assertEqual((await self.store.load("user-1")).version, 2)
+
+
+class TestConflictAfterBookingChange(unittest.TestCase):
+    """A turn that changed a booking is kept when another turn saved first."""
+
+    def test_turn_is_merged_instead_of_asking_for_a_resend(self):
+        store = InMemorySessionStore()
+        awaiting_new_time = SessionRecord(
+            history=[
+                Message.user_text("change my booking time"),
+                Message.function_call("initiate_change_booking_time_flow", {}),
+                Message.function_response("initiate_change_booking_time_flow", {"content": {}}),
+                Message.model_text("What is your booking ID?"),
+                Message.user_text("VX10001"),
+                Message.function_call("provide_booking_id_for_change", {"booking_id": "VX10001"}),
+                Message.function_response("provide_booking_id_for_change", {"content": {}}),
+                Message.model_text("What is the new departure time?"),
+            ],
+            tool_state={
+                "flow_name": "change_booking",
+                "stage": "awaiting_new_time",
+                "collected_booking_id": "VX10001",
+            },
+        )
+
+        async def change_while_another_turn_saves(booking_id, new_time, idempotency_key):
+            other_turn = await store.load("busy-user")
+            other_turn.history = other_turn.history + [
+                Message.user_text("hello"),
+                Message.model_text("Hi!"),
+            ]
+            await store.save("busy-user", other_turn)
+            return httpx.Response(
+                200,
+                json={"success": True, "message": "Changed."},
+                request=httpx.Request("POST", "http://mock/mock_vexere/change_booking"),
+            )
+
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            manager = AIAgentsManager()
+        with mock.patch.object(main, "get_session_store", return_value=store), mock.patch.object(
+            main, "get_ai_manager", return_value=manager
+        ), mock.patch.object(tools, "_post_booking_change", change_while_another_turn_saves):
+            with TestClient(main.app) as client:
+                client.portal.call(store.save, "busy-user", awaiting_new_time)
+                response = client.post(
+                    "/chat", json={"user_id": "busy-user", "message": "2025-12-31 14:30:00"}
+                ).json()
+                stored = client.portal.call(store.load, "busy-user")
+
+        self.assertEqual(response["bot_response"], "Changed.")
+        texts = [message.text for message in stored.history if message.text]
+        self.assertEqual(texts[-4:], ["hello", "Hi!", "2025-12-31 14:30:00", "Changed."])
+        self.assertEqual(stored.tool_state, {})
+
+
+class TestConversationHopsBetweenWorkers(unittest.TestCase):
+    """Runs several backend workers sharing a SQLite session store."""
+
+    WORKERS = 3
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        ports = [free_port() for _ in range(cls.WORKERS)]
+        cls.base_urls = [f"http://127.0.0.1:{port}" for port in ports]
+        env = dict(
+            os.environ,
+            ACTIVE_LLM_PROVIDER="FAKE",
+            SESSION_STORE="sqlite",
+            SESSION_DB_PATH=os.path.join(cls.tmp_dir.name, "sessions.db"),
+            MOCK_API_BASE_URL=cls.base_urls[0],
+        )
+        cls.processes = [
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "uvicorn",
+                    "backend.app.main:app",
+                    "--port",
+                    str(port),
+                    "--log-level",
+                    "warning",
+                ],
+                cwd=PROJECT_ROOT,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            for port in ports
+        ]
+        deadline = time.monotonic() + 60
+        for base_url in cls.base_urls:
+            while True:
+                try:
+                    httpx.get(base_url + "/", timeout=1)
+                    break
+                except httpx.HTTPError:
+                    if time.monotonic() > deadline:
+                        cls.tearDownClass()
+                        raise RuntimeError(f"Worker at {base_url} did not start.")
+                    time.sleep(0.2)
+
+    @classmethod
+    def tearDownClass(cls):
+        for process in cls.processes:
+            process.terminate()
+        for process in cls.processes:
+            process.wait(timeout=10)
+        cls.tmp_dir.cleanup()
+
+    def chat(self, worker: int, message: str) -> dict:
+        response = httpx.post(
+            self.base_urls[worker] + "/chat",
+            json={"user_id": "hopping-user", "message": message},
+            timeout=30,
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_booking_flow_continues_on_other_workers(self):
+        first = self.chat(0, "I want to change my booking time")
+        self.assertIn("booking ID", first["bot_response"])
+
+        second = self.chat(1, "My booking ID is VX123")
+        self.assertIn("collected_booking_id", second["session_state"]["active_tool_state_keys"])
+
+        third = self.chat(2, "Please move it to 2025-12-31 14:30:00")
+        self.assertIn("Successfully changed booking VX123", third["bot_response"])
+        self.assertEqual(third["session_state"]["history_length"], 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.fake_agent import FakeLLMAgent
+from backend.app.llm_fixtures import LiveTransport
+from backend.app.vertex_agent import VertexAIAgent
+from backend.app.shadow import (
+    ShadowTraffic,
+    close_shadow_traffic,
+    compare_responses,
+    get_shadow_traffic,
+    read_comparisons,
+    summarize_comparisons,
+)
+
+
+def call(name, **args):
+    return {"function_call": {"name": name, "args": args}}
+
+
+class SlowAgent:
+    """Candidate that answers only when released."""
+
+    model_name = "slow-model"
+
+    def __init__(self, response):
+        self.response = response
+        self.release = asyncio.Event()
+        self.calls = 0
+        self.history_lengths = []
+
+    async def get_gemini_response(self, **kwargs):
+        self.calls += 1
+        self.history_lengths.append(len(kwargs["chat_history"]))
+        await self.release.wait()
+        return self.response
+
+
+class BlockingTransport:
+    """A provider whose SDK call blocks the calling thread."""
+
+    serves_offline = True
+
+    def generate_content(self, model, contents, tools, **options):
+        time.sleep(0.5)
+        raise AssertionError("should have timed out")
+
+
+class TestCompareResponses(unittest.TestCase):
+    def test_agreement(self):
+        change = call("provide_booking_id_for_change", booking_id="VX123")
+        self.assertEqual(compare_responses(change, call("provide_booking_id_for_change", booking_id="VX123")), "same_call")
+        self.assertEqual(compare_responses(change, call("provide_booking_id_for_change", booking_id="VX9")), "same_tool")
+        self.assertEqual(compare_responses(change, call("get_faq_answer", question="x")), "different_tool")
+        self.assertEqual(compare_responses({"text": "a"}, {"text": "b"}), "both_text")
+        self.assertEqual(compare_responses({"text": "a"}, change), "different_action")
+        self.assertEqual(compare_responses(change, {"error": "503"}), "candidate_error")
+
+
+class TestShadowTraffic(unittest.IsolatedAsyncioTestCase):
+    async def test_comparisons_are_logged_and_summarized(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = os.path.join(directory, "shadow.jsonl")
+            shadow = ShadowTraffic(
+                FakeLLMAgent(latency_ms=0), "FAKE", model_name="candidate", sample_rate=1.0, log_path=log_path
+            )
+            primary = FakeLLMAgent(latency_ms=0)
+            for message in ("How do I cancel my ticket?", "hello"):
+                request = {"chat_history": [], "user_message": message}
+                response = await primary.get_gemini_response(**request)
+                self.assertTrue(shadow.mirror(request, response, "FAKE", "fake-llm", 12.0))
+            await shadow.drain()
+
+            comparisons = list(read_comparisons(log_path))
+            self.assertEqual([row["agreement"] for row in comparisons], ["same_call", "both_text"])
+            self.assertEqual(comparisons[0]["candidate"]["tool"], "get_faq_answer")
+            self.assertEqual(comparisons[0]["primary"]["latency_ms"], 12.0)
+            summary = summarize_comparisons(comparisons)["FAKE/candidate"]
+            self.assertEqual(summary["comparisons"], 2)
+            self.assertEqual(summary["tool_agreement_rate"], 1.0)
+            self.assertEqual(summary["action_agreement_rate"], 1.0)
+            self.assertGreater(summary["candidate"]["mean_total_tokens"], 0)
+            self.assertEqual(shadow.stats()["recent"], summarize_comparisons(comparisons))
+
+    async def test_overload_drops_and_primary_errors_are_not_mirrored(self):
+        candidate = SlowAgent(call("confirm_booking_change"))
+        shadow = ShadowTraffic(candidate, "FAKE", sample_rate=1.0, max_concurrency=1)
+        request = {"chat_history": [], "user_message": "yes"}
+
+        self.assertFalse(shadow.mirror(request, {"error": "503"}, "FAKE", "fake-llm", 1.0))
+        self.assertTrue(shadow.mirror(request, {"text": "ok"}, "FAKE", "fake-llm", 1.0))
+        self.assertFalse(shadow.mirror(request, {"text": "ok"}, "FAKE", "fake-llm", 1.0))
+        stats = shadow.stats()
+        self.assertEqual((stats["sampled"], stats["dropped_overload"], stats["in_flight"]), (2, 1, 1))
+
+        candidate.release.set()
+        await shadow.drain()
+        self.assertEqual(candidate.calls, 1)
+        self.assertEqual(shadow.stats()["recent"]["FAKE/slow-model"]["agreement"]["different_action"], 1)
+
+    async def test_timeouts_are_candidate_errors(self):
+        shadow = ShadowTraffic(SlowAgent({"text": "late"}), "FAKE", sample_rate=1.0, timeout_s=0.01)
+        shadow.mirror({"chat_history": [], "user_message": "hi"}, {"text": "hi"}, "FAKE", "fake-llm", 1.0)
+        await shadow.drain()
+        row = shadow.stats()["recent"]["FAKE/slow-model"]
+        self.assertEqual(row["agreement"]["candidate_error"], 1)
+        self.assertIsNone(row["action_agreement_rate"])
+
+    async def test_blocking_candidate_neither_blocks_the_loop_nor_outlives_its_timeout(self):
+        shadow = ShadowTraffic(
+            VertexAIAgent(transport=BlockingTransport()), "VERTEX_AI", sample_rate=1.0, timeout_s=0.1
+        )
+        started = time.perf_counter()
+        shadow.mirror({"chat_history": [], "user_message": "hi"}, {"text": "hi"}, "FAKE", "fake-llm", 1.0)
+        await asyncio.sleep(0.05)  # Another request's coroutine
+        self.assertLess(time.perf_counter() - started, 0.2)
+        await shadow.drain()
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(shadow.stats()["recent"]["VERTEX_AI/" + shadow.model_name]["agreement"]["candidate_error"], 1)
+
+
+class TestManagerShadowTraffic(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await close_shadow_traffic()
+
+    async def test_sampled_calls_are_mirrored_in_the_background(self):
+        await close_shadow_traffic()
+        settings = {"ACTIVE_LLM_PROVIDER": "FAKE", "SHADOW_SAMPLE_RATE": "1.0", "SHADOW_MODEL_NAME": "candidate"}
+        with mock.patch.dict(os.environ, settings):
+            manager = AIAgentsManager()
+        candidate = SlowAgent(call("get_faq_answer", question="How do I cancel my ticket?"))
+        manager.shadow.agent = candidate
+
+        history = []
+        response = await manager.get_agent_response(history, "How do I cancel my ticket?")
+        # The user's answer does not wait for the candidate
+        self.assertEqual(response["function_call"]["name"], "get_faq_answer")
+        self.assertEqual(manager.shadow.stats()["in_flight"], 1)
+        history.append("later turn")
+
+        candidate.release.set()
+        await manager.shadow.drain()
+        comparison = manager.shadow.stats()["recent"]["FAKE/candidate"]
+        self.assertEqual(comparison["agreement"]["same_call"], 1)
+        self.assertEqual(candidate.history_lengths, [0])  # The history as of the mirrored call
+        self.assertEqual(manager.circuit_breaker.stats()["window_calls"], 1)
+
+    async def test_vertex_candidate_never_uses_the_fixture_transport(self):
+        await close_shadow_traffic()
+        with tempfile.TemporaryDirectory() as directory:
+            settings = {
+                "SHADOW_SAMPLE_RATE": "0.5",
+                "SHADOW_PROVIDER": "VERTEX_AI",
+                "LLM_FIXTURE_MODE": "record",
+                "LLM_FIXTURE_PATH": os.path.join(directory, "fixtures.jsonl"),
+            }
+            with mock.patch.dict(os.environ, settings):
+                shadow = get_shadow_traffic()
+        self.assertIsInstance(shadow.agent.transport, LiveTransport)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+
+from backend.app import main, tools
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.fake_agent import FakeLLMAgent
+from backend.app.session_store import InMemorySessionStore
+from backend.app.speculation import (
+    FaqSpeculator,
+    build_faq_context_message,
+    prompt_similarity,
+)
+
+FAQ_QUESTION = "What payment methods can I use?"
+
+
+class TestFaqSpeculator(unittest.IsolatedAsyncioTestCase):
+    async def test_similar_question_uses_the_precomputed_result(self):
+        speculator = FaqSpeculator("parallel", similarity_threshold=0.5, top_k=2)
+        speculation = await speculator.begin(FAQ_QUESTION)
+        result = await speculator.take(speculation, "what payment methods can i use")
+        speculator.finish(speculation, answered_directly=False)
+        self.assertEqual(result, tools.get_faq_answer(FAQ_QUESTION))
+        stats = speculator.stats()
+        self.assertEqual((stats["hits"], stats["hit_rate"]), (1, 1.0))
+
+    async def test_dissimilar_or_unused_speculation_is_a_miss(self):
+        speculator = FaqSpeculator("parallel", similarity_threshold=0.5, top_k=2)
+        speculation = await speculator.begin(FAQ_QUESTION)
+        self.assertIsNone(await speculator.take(speculation, "can I bring extra luggage"))
+        speculator.finish(speculation, answered_directly=False)
+        speculator.finish(await speculator.begin("hello"), answered_directly=True)
+        stats = speculator.stats()
+        self.assertEqual(stats["misses_dissimilar"], 1)
+        self.assertEqual(stats["misses_not_requested"], 1)
+        self.assertEqual(stats["hits"], 0)
+
+    async def test_off_mode_does_nothing(self):
+        self.assertIsNone(await FaqSpeculator("off", 0.5, 2).begin(FAQ_QUESTION))
+        with self.assertRaises(ValueError):
+            FaqSpeculator("always", 0.5, 2)
+
+    async def test_inject_mode_searches_off_the_event_loop(self):
+        speculator = FaqSpeculator("inject", similarity_threshold=0.5, top_k=2)
+        search_threads = []
+
+        def search_faq(question, top_k):
+            search_threads.append(threading.current_thread())
+            return [{"answer": "Card or cash."}]
+
+        with mock.patch.object(tools, "search_faq", search_faq):
+            speculation = await speculator.begin(FAQ_QUESTION)
+        speculator.finish(speculation, answered_directly=True)
+        self.assertEqual(speculation.snippets, [{"answer": "Card or cash."}])
+        self.assertIsNot(search_threads[0], threading.main_thread())
+
+    def test_prompt_similarity(self):
+        self.assertEqual(prompt_similarity("Hủy vé?", "làm sao để hủy vé"), 1.0)
+        self.assertLess(prompt_similarity("cancel ticket", "luggage allowance"), 0.5)
+        # Short messages are not "contained" in a longer prompt by their characters
+        for short, long in (
+            ("ok", "how do i book a ticket online"),
+            ("pay", "what payment methods are accepted"),
+            ("can", "can i cancel my ticket?"),
+        ):
+            self.assertLess(prompt_similarity(short, long), 0.5, short)
+
+    async def test_short_message_does_not_take_a_longer_prompts_result(self):
+        speculator = FaqSpeculator("parallel", similarity_threshold=0.5, top_k=2)
+        speculation = await speculator.begin("can i cancel my ticket?")
+        self.assertIsNone(await speculator.take(speculation, "can"))
+        speculator.finish(speculation, answered_directly=False)
+        self.assertEqual(speculator.stats()["misses_dissimilar"], 1)
+
+
+class TestInjectedFaqContext(unittest.IsolatedAsyncioTestCase):
+    async def test_fake_agent_answers_from_injected_snippets(self):
+        snippets = tools.search_faq(FAQ_QUESTION, top_k=2)
+        message = build_faq_context_message(FAQ_QUESTION, snippets)
+        response = await FakeLLMAgent().get_gemini_response([], message)
+        self.assertEqual(response["text"], snippets[0]["answer"])
+
+    def test_chat_answers_faq_in_one_round_trip_and_stores_plain_text(self):
+        speculator = FaqSpeculator("inject", similarity_threshold=0.5, top_k=2)
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}), mock.patch.object(
+            main, "faq_speculator", speculator
+        ), mock.patch.object(main, "get_session_store") as get_store:
+            store = InMemorySessionStore()
+            get_store.return_value = store
+            manager = AIAgentsManager()
+            with mock.patch.object(main, "get_ai_manager", return_value=manager):
+                with TestClient(main.app) as client:
+                    response = client.post(
+                        "/chat", json={"user_id": "spec-user", "message": FAQ_QUESTION}
+                    ).json()
+
+            self.assertEqual(response["bot_response"], tools.get_faq_answer(FAQ_QUESTION)["answer"])
+            self.assertEqual(response["session_state"]["history_length"], 2)
+            self.assertEqual(manager.active_agent.call_count, 1)
+            self.assertEqual(speculator.stats()["single_round_trip_answers"], 1)
+
+            session = asyncio.run(store.load("spec-user"))
+            self.assertEqual(session.history[0].text, FAQ_QUESTION)
+
+
+if __name__ == "__main__":
+    unittest.main()
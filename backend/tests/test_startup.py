@@ -0,0 +1,49 @@
+import os
+import subprocess
+import time
+import unittest
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, PROJECT_ROOT)
+
+from fastapi.testclient import TestClient
+
+from backend.app.main import app
+
+
+class TestLazyStartup(unittest.TestCase):
+    def test_importing_the_app_does_not_load_vertex_ai(self):
+        output = subprocess.check_output(
+            [
+                sys.executable,
+                "-c",
+                "import sys, backend.app.main; "
+                "print('vertexai' in sys.modules, backend.app.tools._faq_data is None)",
+            ],
+            cwd=PROJECT_ROOT,
+        )
+        self.assertEqual(output.decode().split(), ["False", "True"])
+
+    def test_health_and_readiness_endpoints(self):
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/healthz").json(), {"status": "ok"})
+            deadline = time.monotonic() + 60
+            while True:
+                response = client.get("/readyz")
+                status = response.json()
+                if status["warmup_complete"] or time.monotonic() > deadline:
+                    break
+                time.sleep(0.1)
+            self.assertTrue(status["warmup_complete"])
+            self.assertEqual(response.status_code, 200 if status["ready"] else 503)
+            self.assertEqual(
+                set(status["checks"]), {"session_store", "agent", "faq_index", "http_pool"}
+            )
+            self.assertEqual(status["checks"]["faq_index"], "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Ensure the project root is in the Python path for `backend.app` imports
+import sys
+
+sys.path.insert(
+    0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+)
+
+from fastapi.testclient import TestClient
+from backend.app import main
+from backend.app.ai_agents_manager import AIAgentsManager
+from backend.app.messages import Message
+from backend.app.session_store import InMemorySessionStore
+from backend.app.usage import (
+    BUDGET_EXCEEDED_MESSAGE,
+    InMemoryUsageStore,
+    SQLiteUsageStore,
+    UsageAccountant,
+    model_price,
+    truncate_history,
+    usage_day,
+)
+
+USAGE = {"prompt_tokens": 80, "completion_tokens": 20, "total_tokens": 100}
+
+
+class TestUsageAccountant(unittest.IsolatedAsyncioTestCase):
+    async def test_budget_actions_follow_usage(self):
+        accountant = UsageAccountant(
+            InMemoryUsageStore(), user_daily_tokens=1000, soft_ratio=0.5, soft_action="cheap_model"
+        )
+        self.assertEqual((await accountant.check("u1", "t1")).action, "none")
+
+        await accountant.record("u1", "t1", "gemini-2.5-pro", [USAGE] * 6)
+        decision = await accountant.check("u1", "t1")
+        self.assertEqual(decision.action, "cheap_model")
+        self.assertAlmostEqual(decision.used_fraction, 0.6)
+
+        await accountant.record("u1", "t1", "gemini-2.5-pro", [USAGE] * 4)
+        self.assertEqual((await accountant.check("u1", "t1")).action, "refuse")
+        self.assertEqual((await accountant.check("u2", "t1")).action, "none")
+
+    async def test_tenant_cost_budget_applies_to_all_its_users(self):
+        accountant = UsageAccountant(InMemoryUsageStore(), tenant_daily_cost_usd=0.001)
+        await accountant.record("u1", "partner", "gemini-2.5-pro-preview-05-06", [USAGE] * 4)
+        decision = await accountant.check("u2", "partner")
+        self.assertEqual(decision.action, "refuse")
+        self.assertIn("tenant partner", decision.reason)
+
+        report = await accountant.report(usage_day(), "tenant", None, 10)
+        self.assertEqual(report["usage"][0]["key"], "partner")
+        self.assertEqual(report["usage"][0]["total_tokens"], 400)
+        self.assertAlmostEqual(report["usage"][0]["cost_usd"], 0.0012)
+
+    async def test_sqlite_store_accumulates_per_day_scope_and_key(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = SQLiteUsageStore(os.path.join(tmp_dir, "usage.db"))
+            try:
+                await store.add("2025-12-20", "user", "u1", [1, 80, 20, 100, 0.5])
+                await store.add("2025-12-20", "user", "u1", [2, 80, 20, 100, 0.25])
+                await store.add("2025-12-20", "user", "u2", [1, 1, 1, 2, 0.0])
+                self.assertEqual(await store.get("2025-12-20", "user", "u1"), [3, 160, 40, 200, 0.75])
+                self.assertEqual(await store.get("2025-12-21", "user", "u1"), [0, 0, 0, 0, 0.0])
+                top = await store.top("2025-12-20", "user", 1)
+                self.assertEqual([key for key, _ in top], ["u1"])
+            finally:
+                await store.close()
+
+    def test_model_price_matches_versioned_names(self):
+        prices = {"gemini-2.5-flash": (0.3, 2.5), "gemini-2.5-flash-lite": (0.1, 0.4)}
+        self.assertEqual(model_price("gemini-2.5-flash-lite-001", prices), (0.1, 0.4))
+        self.assertEqual(model_price("fake-llm", prices), (0.0, 0.0))
+
+
+class TestTruncateHistory(unittest.TestCase):
+    def test_keeps_function_calls_with_their_responses(self):
+        history = [
+            Message.user_text("first"),
+            Message.model_text("reply"),
+            Message.user_text("change my booking time"),
+            Message.function_call("initiate_change_booking_time_flow", {}),
+            Message.function_response("initiate_change_booking_time_flow", {"content": {}}),
+            Message.model_text("Booking ID?"),
+        ]
+        truncated = truncate_history(history, 3)
+        self.assertEqual(truncated, [])
+        truncated = truncate_history(history, 4)
+        self.assertEqual(truncated[0].text, "change my booking time")
+        self.assertEqual(len(truncated), 4)
+        self.assertIs(truncate_history(history, 10), history)
+
+
+class TestChatBudgets(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.dict(os.environ, {"ACTIVE_LLM_PROVIDER": "FAKE"}):
+            self.manager = AIAgentsManager()
+        self.accountant = UsageAccountant(
+            InMemoryUsageStore(), user_daily_tokens=400, soft_ratio=0.3, soft_action="cheap_model"
+        )
+        patches = [
+            mock.patch.object(main, "get_ai_manager", return_value=self.manager),
+            mock.patch.object(main, "get_session_store", return_value=InMemorySessionStore()),
+            mock.patch.object(main, "get_usage_accountant", return_value=self.accountant),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_turns_are_accounted_then_downgraded_then_refused(self):
+        with TestClient(main.app) as client:
+            responses = [
+                client.post(
+                    "/chat",
+                    json={"user_id": "budget-user", "tenant_id": "partner", "message": "Hello"},
+                ).json()["bot_response"]
+                for _ in range(12)
+            ]
+            with mock.patch.dict(os.environ, {"ADMIN_API_KEY": "secret"}):
+                self.assertEqual(client.get("/usage").status_code, 401)
+                usage = client.get(
+                    "/usage", params={"scope": "tenant"}, headers={"X-Admin-Key": "secret"}
+                ).json()
+
+        self.assertEqual(responses[0], "Hello! I can answer Vexere FAQs or help you change a booking.")
+        self.assertEqual(responses[-1], BUDGET_EXCEEDED_MESSAGE)
+        self.assertEqual(self.manager.active_agent.last_model_name, "gemini-2.5-flash")
+        decisions = self.accountant.stats()["budget_decisions"]
+        self.assertGreater(decisions["cheap_model"], 0)
+        self.assertGreater(decisions["refuse"], 0)
+        self.assertEqual(usage["usage"][0]["key"], "partner")
+        self.assertGreaterEqual(usage["usage"][0]["total_tokens"], 400)
+
+    def test_truncation_only_shortens_the_history_sent_to_the_model(self):
+        self.accountant.soft_action = "truncate"
+        self.accountant.soft_ratio = 0.0
+        self.accountant.user_daily_tokens = 100000
+        self.accountant.truncate_messages = 2
+        agent = self.manager.active_agent
+        sent_history_lengths = []
+        original = agent.get_gemini_response
+
+        async def recording(chat_history, *args, **kwargs):
+            sent_history_lengths.append(len(chat_history))
+            return await original(chat_history, *args, **kwargs)
+
+        with mock.patch.object(agent, "get_gemini_response", recording), TestClient(main.app) as client:
+            states = [
+                client.post("/chat", json={"user_id": "truncate-user", "message": "Hello"}).json()["session_state"]
+                for _ in range(4)
+            ]
+
+        self.assertEqual([state["history_length"] for state in states], [2, 4, 6, 8])
+        self.assertEqual(sent_history_lengths, [0, 2, 2, 2])
+        self.assertGreater(self.accountant.stats()["budget_decisions"]["truncate"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()